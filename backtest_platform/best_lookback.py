@@ -11,28 +11,18 @@ if project_root not in sys.path:
 
 from core.backtester import Backtester
 from strategies.dual_momentum import DualMomentumStrategy
-from utils import load_market_data
+from datastore.catalog import get_catalog
 
 def main():
-    import optimization_config as cfg
-
-    # Загрузка данных
-    data_dir = os.path.join(project_root, cfg.data_dir)
-    data = {}
-    for ticker in cfg.tickers:
-        df = load_market_data(os.path.join(data_dir, f'{ticker}.csv'))
-        df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
-        data[ticker] = df
-
-    # Загрузка RVI
-    rvi_path = os.path.join(data_dir, 'RVI.csv')
-    if not os.path.exists(rvi_path):
-        raise FileNotFoundError("RVI.csv обязателен для этого анализа!")
-    rvi_data = load_market_data(rvi_path)
-    rvi_data['TRADEDATE'] = pd.to_datetime(rvi_data['TRADEDATE'])
-    rvi_data = rvi_data[['TRADEDATE', 'CLOSE']].rename(columns={'CLOSE': 'RVI'})
+    import config as cfg
 
-    market_df = data[cfg.market_ticker].copy()
+    # Загрузка данных (RVI обязателен для этого анализа)
+    catalog = get_catalog(cfg.data_dir, cfg.tickers, cfg.market_ticker, cfg.rvi_ticker)
+    data, market_df, rvi_data = catalog.as_tuple()
+    if rvi_data is None:
+        raise FileNotFoundError(f"{cfg.rvi_ticker}.csv обязателен для этого анализа!")
+    rvi_data = rvi_data[['TRADEDATE', 'CLOSE']].rename(columns={'CLOSE': 'RVI'})
+    market_df = market_df.copy()
 
     # Слияние данных с RVI по дате
     all_dates = set()
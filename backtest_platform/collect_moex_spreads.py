@@ -1,13 +1,68 @@
+# backtest_platform/collect_moex_spreads.py
+
 """
 Сбор текущих спредов по ETF на Московской бирже (MOEX)
 Тикеры: OBLG, EQMX, GOLD, LQDT
 Использует официальный ISS API: https://iss.moex.com
+
+Версия: 2.0.0 (сервис сбора по расписанию: общий запрос на режим торгов,
+               постоянные соединения, ограничение частоты, повторы с задержкой)
+Версия: 2.1.0 (запись снимков в SQLite-хранилище datastore/spread_store.py)
+Версия: 2.1.1 (сообщение о смене файла по умолчанию: moex_spreads_log.csv больше
+               не пополняется)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+ОПРОС:
+  • Тикеры TICKERS_CONFIG группируются по (market, board): на группу — один
+    запрос ISS securities.json?securities=A,B,C с проекцией колонок marketdata.
+    Группы опрашиваются параллельно в пуле потоков.
+  • Соединения HTTP/1.1 keep-alive берутся из пула (http.client, без внешних
+    зависимостей) и переиспользуются между опросами.
+  • Общий ограничитель частоты запросов (rate_limit запросов в секунду).
+  • Повтор при сетевой ошибке, 429 и 5xx: экспоненциальная задержка со
+    случайной добавкой, Retry-After сервера учитывается.
+  • Расписание: опрос каждые interval_sec секунд в торговые часы (время МСК,
+    дни недели), пропущенные из-за долгого опроса такты не накапливаются.
+Записи опроса передаются в sink. По умолчанию — хранилище SpreadStore
+(SQLite в режиме WAL, файл settings['output'] с расширением .sqlite/.db):
+бэктест читает профиль спреда, пока сборщик пишет. Для output с иным
+расширением записи, как раньше, дописываются в CSV. Накопленный журнал
+переносится однократно:
+    python -m datastore.spread_store import moex_spreads.sqlite moex_spreads_log.csv
+
+ЗАПУСК:
+    python collect_moex_spreads.py                  (один опрос, как раньше)
+    python collect_moex_spreads.py run [interval_sec]
+
+Для проверки без биржи: SpreadCollector(base_url='http://127.0.0.1:<порт>')
+с локальным HTTP-сервером, отвечающим в формате ISS (validation/test16:
+группировка запросов, keep-alive, повторы после 429/5xx, ограничение частоты).
 """
 
-import requests
-import pandas as pd
-from datetime import datetime, timezone
+import http.client
+import json
 import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+from datastore.spread_store import SpreadStore
+
+__version__ = "2.1.1"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+ISS_BASE_URL = 'https://iss.moex.com'
+MSK = timezone(timedelta(hours=3))
 
 # Конфигурация: ваши тикеры → параметры MOEX
 TICKERS_CONFIG = {
@@ -17,87 +72,382 @@ TICKERS_CONFIG = {
     'LQDT': {'market': 'shares', 'board': 'TQTF', 'secid': 'LQDT'},
 }
 
+# Параметры опроса по умолчанию
+COLLECTOR_SETTINGS = {
+    'interval_sec': 60,
+    'trading_hours': ('09:50', '18:50'),   # МСК; None — круглосуточно
+    'weekdays': (0, 1, 2, 3, 4),
+    'rate_limit': 5.0,                     # запросов в секунду на все потоки
+    'retries': 3,
+    'backoff_sec': 0.5,
+    'timeout_sec': 10.0,
+    'max_workers': 4,
+    'output': 'moex_spreads.sqlite'        # .sqlite/.db — SpreadStore, иначе CSV
+}
+
+MARKETDATA_COLUMNS = ('SECID', 'BOARDID', 'BID', 'OFFER', 'BIDDEPTHT', 'OFFERDEPTHT')
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+STORE_EXTENSIONS = ('.sqlite', '.db')
+LEGACY_CSV = 'moex_spreads_log.csv'        # журнал версий до 2.1.0
+
+
+def announce_output(output: str) -> None:
+    """Куда пишутся снимки; напоминание, что прежний CSV-журнал больше не пополняется."""
+    if not output.endswith(STORE_EXTENSIONS):
+        print(f"💾 Снимки дописываются в CSV {output}")
+        return
+    print(f"💾 Снимки пишутся в SQLite-хранилище {output} (по умолчанию с версии 2.1.0); "
+          f"{LEGACY_CSV} больше не пополняется")
+    if os.path.exists(LEGACY_CSV):
+        print(f"   Перенос накопленного журнала: python -m datastore.spread_store import {output} {LEGACY_CSV}")
+
+
+def spread_from_marketdata(d: Dict) -> Optional[Dict]:
+    """
+    Bid/ask/spread из строки marketdata ISS.
+    Возвращает словарь с данными или None, если котировок нет.
+    """
+    bid = d.get('BID')
+    ask = d.get('OFFER')  # На MOEX поле называется OFFER, а не ASK
+
+    if bid is None or ask is None or bid <= 0 or ask <= 0:
+        return None
+
+    spread_abs = ask - bid
+    mid = (ask + bid) / 2
+    spread_bps = (spread_abs / mid) * 10_000  # в базисных пунктах
+
+    return {
+        'bid': bid,
+        'ask': ask,
+        'spread_abs': spread_abs,
+        'spread_bps': round(spread_bps, 3),
+        'mid_price': round(mid, 6),
+        'volume_bid': d.get('BIDDEPTHT', 0),
+        'volume_ask': d.get('OFFERDEPTHT', 0),
+    }
+
+
+def append_csv(records: List[Dict], filename: str) -> None:
+    """Дописать записи в CSV (заголовок — при создании файла)."""
+    df = pd.DataFrame(records)
+    file_exists = os.path.isfile(filename)
+    df.to_csv(filename, mode='a', header=not file_exists, index=False)
+
+
+class RateLimiter:
+    """Не больше rate запросов в секунду на все потоки (равномерно)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class SpreadCollector:
+    """
+    Опрос спредов TICKERS_CONFIG по расписанию.
+
+    Аргументы:
+        tickers_config: {псевдоним: {'market', 'board', 'secid'}}
+        base_url: адрес ISS (для проверки — локальный сервер-заглушка)
+        sink: получатель записей опроса (None — SpreadStore или CSV settings['output'])
+        **settings: переопределение COLLECTOR_SETTINGS
+
+    Пример:
+        collector = SpreadCollector(interval_sec=30)
+        records = collector.poll_once()
+        collector.run()              # до stop() или Ctrl+C
+    """
+
+    def __init__(
+        self,
+        tickers_config: Optional[Dict[str, Dict]] = None,
+        base_url: str = ISS_BASE_URL,
+        sink: Optional[Callable[[List[Dict]], None]] = None,
+        **settings
+    ):
+        unknown = set(settings) - set(COLLECTOR_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры сборщика: {sorted(unknown)}")
+        self.settings = {**COLLECTOR_SETTINGS, **settings}
+        self.tickers_config = dict(tickers_config if tickers_config is not None else TICKERS_CONFIG)
+        self._store: Optional[SpreadStore] = None
+        if sink is None:
+            output = self.settings['output']
+            if output.endswith(STORE_EXTENSIONS):
+                self._store = SpreadStore(output)
+                sink = self._store.insert
+            else:
+                sink = lambda records: append_csv(records, output)
+        self.sink = sink
+
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Адрес ISS должен начинаться с http:// или https://, получено {base_url}")
+        self.scheme, self.host, self.port = url.scheme, url.hostname, url.port
+        self.base_path = url.path.rstrip('/')
+
+        self.limiter = RateLimiter(self.settings['rate_limit'])
+        self._connections: 'queue.LifoQueue[http.client.HTTPConnection]' = queue.LifoQueue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+        self.stats = {'polls': 0, 'requests': 0, 'retries': 0, 'failures': 0, 'connections': 0, 'records': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ======================
+    # HTTP
+    # ======================
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._connections.get_nowait()
+        except queue.Empty:
+            self._count('connections')
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.settings['timeout_sec'])
+
+    def get_json(self, path: str, params: Dict) -> Dict:
+        """GET с повторами; соединение возвращается в пул после полного чтения ответа."""
+        target = f"{self.base_path}{path}?{urlencode(params)}"
+        headers = {'Accept': 'application/json', 'User-Agent': f'backtest-platform-spreads/{__version__}'}
+        retries, backoff = self.settings['retries'], self.settings['backoff_sec']
+        for attempt in range(retries + 1):
+            self.limiter.wait()
+            self._count('requests')
+            conn = self._connection()
+            retry_after = None
+            try:
+                conn.request('GET', target, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                if resp.status == 200:
+                    self._connections.put(conn)
+                    return json.loads(body)
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._connections.put(conn)
+                error = f"HTTP {resp.status}"
+                if resp.status not in RETRY_STATUSES:
+                    raise RuntimeError(error)
+                header = resp.getheader('Retry-After')
+                retry_after = float(header) if header and header.replace('.', '', 1).isdigit() else None
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                error = f"{type(e).__name__}: {e}"
+            if attempt == retries:
+                raise ConnectionError(f"{path}: {error} (попыток: {retries + 1})")
+            self._count('retries')
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            time.sleep(max(delay, retry_after or 0.0))
+
+    def close(self) -> None:
+        """Закрыть соединения, пул потоков и хранилище."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ======================
+    # ОПРОС
+    # ======================
+
+    def groups(self) -> Dict[Tuple[str, str], List[str]]:
+        """Псевдонимы тикеров по (market, board) — один запрос ISS на группу."""
+        grouped: Dict[Tuple[str, str], List[str]] = {}
+        for alias, config in self.tickers_config.items():
+            grouped.setdefault((config['market'], config['board']), []).append(alias)
+        return grouped
+
+    def fetch_group(self, market: str, board: str, aliases: Sequence[str]) -> Dict[str, Optional[Dict]]:
+        """Спреды группы: {псевдоним: данные или None}."""
+        secids = {self.tickers_config[alias]['secid']: alias for alias in aliases}
+        data = self.get_json(
+            f"/iss/engines/stock/markets/{market}/boards/{board}/securities.json",
+            {
+                'iss.only': 'marketdata',
+                'iss.meta': 'off',
+                'securities': ','.join(secids),
+                'marketdata.columns': ','.join(MARKETDATA_COLUMNS)
+            }
+        )
+        marketdata = data.get('marketdata') or {}
+        columns = marketdata.get('columns', [])
+        result: Dict[str, Optional[Dict]] = {alias: None for alias in aliases}
+        for row in marketdata.get('data', []):
+            d = dict(zip(columns, row))
+            if d.get('BOARDID', board) != board or d.get('SECID') not in secids:
+                continue
+            result[secids[d['SECID']]] = spread_from_marketdata(d)
+        return result
+
+    def poll_once(self, verbose: bool = True) -> List[Dict]:
+        """Один опрос всех групп; записи передаются в sink."""
+        timestamp = datetime.now(timezone.utc).isoformat()
+        groups = self.groups()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, min(self.settings['max_workers'], len(groups))))
+
+        futures = {key: self._executor.submit(self.fetch_group, key[0], key[1], aliases)
+                   for key, aliases in groups.items()}
+        spreads: Dict[str, Optional[Dict]] = {}
+        for (market, board), future in futures.items():
+            try:
+                spreads.update(future.result())
+            except (ConnectionError, RuntimeError, ValueError) as e:
+                self._count('failures')
+                print(f"⚠️ Ошибка при загрузке {market}/{board}: {e}")
+
+        records = []
+        for alias, config in self.tickers_config.items():
+            spread_data = spreads.get(alias)
+            if spread_data:
+                records.append({
+                    'datetime_utc': timestamp,
+                    'alias': alias,
+                    'secid': config['secid'],
+                    'market': config['market'],
+                    'board': config['board'],
+                    **spread_data
+                })
+            elif verbose:
+                print(f"    ❌ Нет данных по {alias}")
+
+        self._count('polls')
+        self._count('records', len(records))
+        if records:
+            self.sink(records)
+            if verbose:
+                line = ', '.join(f"{r['alias']} {r['spread_bps']:.1f}" for r in records)
+                print(f"✅ {timestamp[:19]} | {len(records)} записей | спред, bps: {line}")
+        elif verbose:
+            print("🛑 Нет данных для сохранения. Возможно, сейчас выходной или нерабочее время.")
+        return records
+
+    # ======================
+    # РАСПИСАНИЕ
+    # ======================
+
+    def in_session(self, moment: Optional[datetime] = None) -> bool:
+        """Время (МСК) попадает в торговые часы и дни недели расписания."""
+        moment = (moment or datetime.now(timezone.utc)).astimezone(MSK)
+        if moment.weekday() not in self.settings['weekdays']:
+            return False
+        hours = self.settings['trading_hours']
+        if hours is None:
+            return True
+        now = moment.strftime('%H:%M')
+        return hours[0] <= now <= hours[1]
+
+    def run(self, max_polls: Optional[int] = None, verbose: bool = True) -> None:
+        """Опрос каждые interval_sec секунд до stop() (или max_polls опросов)."""
+        interval = self.settings['interval_sec']
+        hours = self.settings['trading_hours']
+        print(f"🛰️  Сбор спредов MOEX: {len(self.tickers_config)} тикеров, {len(self.groups())} запросов на опрос, "
+              f"каждые {interval} сек" + (f", {hours[0]}–{hours[1]} МСК" if hours else ""))
+        announce_output(self.settings['output'])
+        polls = 0
+        next_tick = time.monotonic()
+        try:
+            while not self._stop.is_set() and (max_polls is None or polls < max_polls):
+                if self.in_session():
+                    self.poll_once(verbose=verbose)
+                    polls += 1
+                # Следующий такт сетки расписания; пропущенные такты не догоняются
+                now = time.monotonic()
+                next_tick += interval * max(1, int((now - next_tick) // interval) + 1)
+                if max_polls is not None and polls >= max_polls:
+                    break
+                self._stop.wait(max(0.0, next_tick - now))
+        finally:
+            self.close()
+            print(f"⏹️  Сбор остановлен: {self.stats}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
 def fetch_spread(market, board, secid):
     """
     Получает текущий bid/ask/spread для заданного инструмента на MOEX.
     Возвращает словарь с данными или None при ошибке.
     """
-    url = f"https://iss.moex.com/iss/engines/stock/markets/{market}/boards/{board}/securities/{secid}.json"
-    params = {'iss.only': 'marketdata'}
-    
-    try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        marketdata = data.get('marketdata')
-        if not marketdata or not marketdata.get('data'):
+    config = {secid: {'market': market, 'board': board, 'secid': secid}}
+    with SpreadCollector(config, sink=lambda records: None) as collector:
+        try:
+            return collector.fetch_group(market, board, [secid])[secid]
+        except (ConnectionError, RuntimeError, ValueError) as e:
+            print(f"⚠️ Ошибка при загрузке {secid}: {e}")
             return None
-        
-        columns = marketdata['columns']
-        row = marketdata['data'][0]
-        d = dict(zip(columns, row))
-        
-        bid = d.get('BID')
-        ask = d.get('OFFER')  # На MOEX поле называется OFFER, а не ASK
-        
-        if bid is None or ask is None or bid <= 0 or ask <= 0:
-            return None
-        
-        spread_abs = ask - bid
-        mid = (ask + bid) / 2
-        spread_bps = (spread_abs / mid) * 10_000  # в базисных пунктах
-        
-        return {
-            'bid': bid,
-            'ask': ask,
-            'spread_abs': spread_abs,
-            'spread_bps': round(spread_bps, 3),
-            'mid_price': round(mid, 6),
-            'volume_bid': d.get('BIDDEPTHT', 0),
-            'volume_ask': d.get('OFFERDEPTHT', 0),
-        }
-    except Exception as e:
-        print(f"⚠️ Ошибка при загрузке {secid}: {e}")
-        return None
+
 
 def main():
-    """Основная функция: сбор данных и сохранение в CSV."""
-    timestamp = datetime.now(timezone.utc).isoformat()
-    records = []
-    
+    """
+    Основная функция: один опрос и сохранение в settings['output'].
+
+    По умолчанию это хранилище SpreadStore moex_spreads.sqlite; прежний
+    moex_spreads_log.csv больше не пополняется (см. announce_output).
+    """
     print("🔍 Сбор спредов с MOEX...")
-    for alias, config in TICKERS_CONFIG.items():
-        print(f"  → {alias} ({config['secid']})")
-        spread_data = fetch_spread(config['market'], config['board'], config['secid'])
-        
-        if spread_data:
-            record = {
-                'datetime_utc': timestamp,
-                'alias': alias,
-                'secid': config['secid'],
-                'market': config['market'],
-                'board': config['board'],
-                **spread_data
-            }
-            records.append(record)
-        else:
-            print(f"    ❌ Нет данных по {alias}")
-    
-    if not records:
-        print("\n🛑 Нет данных для сохранения. Возможно, сейчас выходной или нерабочее время.")
-        return
-    
-    df = pd.DataFrame(records)
-    
-    # Сохраняем в CSV (дописываем новые строки)
-    filename = 'moex_spreads_log.csv'
-    file_exists = os.path.isfile(filename)
-    df.to_csv(filename, mode='a', header=not file_exists, index=False)
-    
-    print(f"\n✅ Успешно сохранено {len(records)} записей в {filename}")
-    print("\nТекущие спреды (bps):")
-    print(df[['alias', 'spread_bps', 'bid', 'ask']].to_string(index=False))
+    with SpreadCollector() as collector:
+        records = collector.poll_once()
+        output = collector.settings['output']
+    if records:
+        df = pd.DataFrame(records)
+        print(f"\n✅ Успешно сохранено {len(records)} записей в {output}")
+        announce_output(output)
+        print("\nТекущие спреды (bps):")
+        print(df[['alias', 'spread_bps', 'bid', 'ask']].to_string(index=False))
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка:
+        python collect_moex_spreads.py [once]
+        python collect_moex_spreads.py run [interval_sec]
+    """
+    if not argv or argv[0] == 'once':
+        main()
+        return 0
+    if argv[0] != 'run' or len(argv) > 2:
+        print(_main.__doc__)
+        return 2
+    settings = {'interval_sec': float(argv[1])} if len(argv) == 2 else {}
+    collector = SpreadCollector(**settings)
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        collector.stop()
+    return 0
+
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(_main(sys.argv[1:]))
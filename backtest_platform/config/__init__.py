@@ -52,7 +52,7 @@ __date__ = "2026-02-13"
 
 from .common_cfg import (
     # Системные параметры
-    data_dir, results_dir, cache_dir,
+    data_dir, results_dir, cache_dir, result_cache_max_mb,
     
     # Тикеры и рыночные инструменты
     tickers, market_ticker, rvi_ticker, risk_free_ticker,
@@ -65,6 +65,7 @@ from .common_cfg import (
     # Издержки торговли
     commission, default_commission, commission_rate,
     slippage, default_slippage, use_slippage,
+    spread_slippage_store, spread_slippage_time, spread_slippage_percentile,
     use_variable_commission,
     
     # Конвертеры волатильности
@@ -130,6 +131,9 @@ from .optimization_cfg import (
     
     # Настройки алгоритма оптимизации
     optimization_settings,
+
+    # Конвейер пошаговой калибровки
+    calibration_pipeline,
     
     # Диагностические параметры
     sensitivity_analysis_params,
@@ -144,13 +148,14 @@ from .optimization_cfg import (
 
 __all__ = [
     # common_cfg.py
-    'data_dir', 'results_dir', 'cache_dir',
+    'data_dir', 'results_dir', 'cache_dir', 'result_cache_max_mb',
     'tickers', 'market_ticker', 'rvi_ticker', 'risk_free_ticker',
     'start_date', 'end_date', 'initial_capital',
     'rebalance_frequency', 'time_filter_enabled',
     'trading_start_time', 'trading_end_time',
     'commission', 'default_commission', 'commission_rate',
     'slippage', 'default_slippage', 'use_slippage',
+    'spread_slippage_store', 'spread_slippage_time', 'spread_slippage_percentile',
     'use_variable_commission',
     'ANNUAL_TO_DAILY', 'DAILY_TO_ANNUAL',
     'config_version', 'last_updated',
@@ -175,7 +180,7 @@ __all__ = [
     
     # optimization_cfg.py
     'param_grid', 'quick_optimization_grid',
-    'optimization_settings',
+    'optimization_settings', 'calibration_pipeline',
     'sensitivity_analysis_params',
     'OPTIMIZATION_METADATA', 'OPTIMIZATION_GUIDELINES',
 ]
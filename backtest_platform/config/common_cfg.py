@@ -65,6 +65,10 @@ cache_dir = 'cache'                  # Директория для кэширо
                                      #   • Предварительно рассчитанные индикаторы (волатильность, тренды)
                                      #   • Кэш рыночных фильтров для разных окон
                                      #   • Метаданные о версии данных (защита от неконсистентности)
+                                     #   • results/ — кэш результатов бэктеста (optimization/result_cache.py)
+
+result_cache_max_mb = 512            # Предельный размер кэша результатов бэктеста (МБ)
+                                     # При превышении удаляются давно не использованные записи
 
 # ======================
 # РЫНОЧНЫЕ ИНСТРУМЕНТЫ — Тикеры для торговли и анализа
@@ -217,6 +221,20 @@ use_slippage = True                 # Включить учёт проскаль
                                     # Рекомендуется: всегда True для реалистичной оценки
                                     # Отключение допустимо ТОЛЬКО для отладки
 
+spread_slippage_store = None        # Хранилище спредов MOEX (collect_moex_spreads.py,
+                                    # например 'backtest_platform/moex_spreads.sqlite';
+                                    # относительный путь — от корня проекта)
+                                    # Если задано и файл существует — проскальзывание по
+                                    # тикерам берётся из профиля спреда (половина спреда,
+                                    # datastore/spread_store.py) вместо slippage
+                                    # None — фиксированное slippage
+
+spread_slippage_time = None         # Время исполнения по МСК для профиля ('HH:MM')
+                                    # None — профиль за весь торговый день
+
+spread_slippage_percentile = 50     # Перцентиль спреда профиля (50, 75, 90, 95)
+                                    # 75+ — консервативная оценка для продакшена
+
 use_variable_commission = False     # Использовать разную комиссию по тикерам
                                     # Требует словаря {тикер: комиссия} в backtester.py
                                     # Для продакшена: установить в True
@@ -225,8 +225,64 @@ optimization_settings = {
     'walk_forward_validation': True, # Использовать walk-forward валидацию
                                      # Тестирует устойчивость параметров на "будущих" данных
                                      # Критически важно для избежания переобучения
+
+    'walk_forward_train_days': 504,  # Обучающее окно walk-forward: ≈2 года торговых дней
+    'walk_forward_test_days': 126,   # Тестовое (невидимое) окно: ≈6 месяцев
+    'walk_forward_anchored': False,  # False: скользящее окно обучения
+                                     # True: расширяющееся окно от начала истории
+
+    'progress_report_seconds': 30,   # Интервал событий прогресса RunMonitor (скорость, ETA), секунд
+
+    'use_daemon': False,             # True: шаги stepwise_optimization4.py считаются на запущенном
+                                     # сервисе optimization/daemon.py (данные и признаки уже в памяти);
+                                     # если сервис не отвечает — локальный расчёт
+    'daemon_port': 8765,             # Порт сервиса оптимизации на 127.0.0.1
 }
 
+# ======================
+# КОНВЕЙЕР ПОШАГОВОЙ КАЛИБРОВКИ (optimization/pipeline.py)
+# ======================
+
+# Шаги 1-4 из описания выше: свободные параметры шага перебираются, остальные
+# фиксированы лучшими значениями предыдущих шагов (начальные — production_params).
+# Запуск: cd backtest_platform && python -m optimization.pipeline
+calibration_pipeline = [
+    {
+        'name': 'Step_1_Windows',
+        'grid': {
+            'base_lookback': [15, 20, 25, 29, 35],
+            'base_vol_window': [8, 9, 10, 12],
+            'market_vol_window': [15, 21, 25, 30],
+        },
+        'objective': 'sharpe',
+    },
+    {
+        'name': 'Step_2_Thresholds',
+        'grid': {
+            'max_vol_threshold': [0.25, 0.30, 0.35, 0.40],
+            'market_vol_threshold': [0.30, 0.35, 0.40],
+        },
+        'objective': 'calmar',       # Баланс защиты (просадка) и участия в рынке (CAGR)
+    },
+    {
+        'name': 'Step_3_RVI',
+        'grid': {
+            'rvi_high_exit_threshold': [30, 34, 36, 40],
+            'rvi_low_threshold': [15, 17, 19, 21],
+            'rvi_medium_threshold': [23, 25, 27, 29],
+            'rvi_low_multiplier': [1.1, 1.2, 1.3],
+            'rvi_high_multiplier': [0.65, 0.70, 0.75],
+        },
+        'objective': 'sharpe',
+    },
+    {
+        'name': 'Step_4_Holdout',
+        'validate_days': 126,        # Последние ≈6 месяцев торговых дней
+        'candidates': 10,            # Лучшие комбинации шага 3
+        'objective': 'sharpe',
+    },
+]
+
 # ======================
 # ДИАГНОСТИЧЕСКИЕ ПАРАМЕТРЫ ДЛЯ АНАЛИЗА ВЛИЯНИЯ
 # ======================
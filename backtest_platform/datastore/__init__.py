@@ -0,0 +1 @@
+"""Data storage module for backtesting platform."""
\ No newline at end of file
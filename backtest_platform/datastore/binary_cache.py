@@ -0,0 +1,475 @@
+# backtest_platform/datastore/binary_cache.py
+
+"""
+Прозрачный бинарный кэш таблиц, прочитанных из CSV.
+
+Версия: 1.0.0
+Версия: 1.1.0 (дописанный хвост источника разбирается отдельно и дописывается в запись)
+Версия: 1.2.0 (варианты разбора одного источника — отдельные записи, variant)
+Версия: 1.3.0 (файл данных записи версионируется: отображённый в память файл
+               не удаляется и не подменяется — работает на Windows)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+utils.load_market_data при каждом запуске скрипта заново разбирает CSV
+(pd.read_csv + pd.to_datetime). Здесь результат разбора при первой загрузке
+сохраняется в типизированном колоночном бинарном файле, а последующие
+загрузки отображают его в память (memory map) без разбора текста.
+
+КЛЮЧ И ПРОВЕРКИ:
+  • запись кэша привязана к абсолютному пути источника и варианту разбора
+    (variant: например, проекция колонок datastore/ingest.py); действительна, пока
+    совпадают размер и mtime_ns файла, версия формата и версии pandas/numpy
+    (правила разбора CSV зависят от версии pandas)
+  • при записи таблица читается обратно и сравнивается с результатом разбора
+    (DataFrame.equals: значения, типы колонок, индекс); при расхождении кэш
+    для файла не создаётся — загрузка совпадает с CSV бит в бит
+  • поддерживаются числовые и логические колонки, datetime64 без часового
+    пояса, строковые колонки и индекс RangeIndex / целочисленный; таблица
+    с другими типами не кэшируется
+
+ФОРМАТ ЗАПИСИ (<cache_dir>/<sha1 пути и варианта>/):
+  meta.json          — источник, колонки (тип, смещение, длина), индекс, число строк,
+                       имя файла данных (data_file)
+  columns-<id>.bin   — значения колонок подряд, каждая с границы 64 байт
+                       (datetime64 — как int64, строки — как numpy 'U')
+Файл отображается в память один раз, колонки — представления без копирования.
+Новое содержимое пишется в новый файл данных, затем meta.json подменяется
+атомарно (os.replace). Прежний файл данных удаляется, если это возможно: на
+Windows отображённый в память файл (таблица, ещё живая у вызывающего кода)
+удалить нельзя — он остаётся до следующей записи и не мешает ей.
+
+ДОПИСЫВАНИЕ (CSV растут на строку в день):
+Если источник только вырос — совпадают строка заголовка и последние
+APPEND_CHECK_BYTES байт прежнего содержимого, прежний размер оканчивался
+переводом строки — parser разбирает лишь заголовок + новые строки. Хвост
+присоединяется к записи при совместимых типах колонок (тип хвоста приводится
+к типу записи без потерь, как при разборе всего файла); индекс строится так же,
+как после dropna по всему файлу. Разбор пропорционален числу новых строк,
+запись файла данных — копирование байтов без разбора текста.
+Дописывание недоступно (полный разбор, как раньше), если в источнике есть
+кавычки или пустые строки (строка файла ≠ строка таблицы), последняя строка
+не завершена, parser меняет нумерацию строк или тип колонки расширяется.
+Контракт parser: принимает путь или файловый объект CSV, строка данных CSV —
+строка таблицы, индекс — номер строки данных (RangeIndex после read_csv,
+возможно прореженный dropna).
+
+Пример:
+    cache = BinaryFrameCache()
+    df = cache.load('data/GOLD.csv', parse_market_csv)
+    df, status = cache.update('data/GOLD.csv', parse_market_csv)   # 'hit' | 'append' | 'parse'
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+__version__ = "1.3.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+CACHE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+APPEND_CHECK_BYTES = 64 * 1024
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Директория config.cache_dir в корне проекта (config здесь не импортируется:
+# он печатает баннер, а utils используется и вне скриптов платформы)
+DEFAULT_CACHE_DIR = os.path.join(project_root, 'cache', 'market_data')
+
+
+def source_signature(path: str, variant: str = '') -> Dict:
+    """Путь, вариант разбора, размер и время изменения файла-источника."""
+    stat = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'variant': variant,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'format': CACHE_FORMAT_VERSION,
+        'pandas': pd.__version__,
+        'numpy': np.__version__
+    }
+
+
+def _encode_column(series: pd.Series):
+    """Колонка → (массив для записи, описание типа) или None, если тип не поддерживается."""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return series.to_numpy(), {'kind': 'numeric', 'dtype': dtype.str}
+    if isinstance(dtype, np.dtype) and dtype.kind == 'M':
+        return series.to_numpy().view(np.int64), {'kind': 'datetime', 'dtype': dtype.str}
+    if isinstance(dtype, pd.StringDtype) or dtype == object:
+        values = series.to_numpy(dtype=object)
+        if not all(type(value) is str for value in values):
+            return None
+        return np.array(values, dtype=str), {'kind': 'string', 'dtype': str(dtype)}
+    return None
+
+
+def _decode_column(values: np.ndarray, spec: Dict):
+    if spec['kind'] == 'numeric':
+        return values
+    if spec['kind'] == 'datetime':
+        return values.view(np.dtype(spec['dtype']))
+    strings = values.astype(object)
+    if spec['dtype'] == 'object':
+        return strings
+    return pd.array(strings, dtype=pd.api.types.pandas_dtype(spec['dtype']))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _read_range(path: str, start: int, stop: int) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+def _appendable_lines(data: bytes) -> Optional[int]:
+    """Число строк в блоке CSV или None, если строка файла может не совпасть со строкой таблицы."""
+    if not data.endswith(b'\n') or b'"' in data or b'\n\n' in data or b'\n\r\n' in data:
+        return None
+    return data.count(b'\n')
+
+
+def _row_positions(index: pd.Index, n_lines: int) -> Optional[np.ndarray]:
+    """Номера строк данных CSV по индексу таблицы или None, если индекс — не номера строк."""
+    if not (isinstance(index.dtype, np.dtype) and index.dtype.kind in 'iu'):
+        return None
+    positions = index.to_numpy().astype(np.int64)
+    if len(positions) and (positions[0] < 0 or positions[-1] >= n_lines or (np.diff(positions) <= 0).any()):
+        return None
+    return positions
+
+
+class BinaryFrameCache:
+    """
+    Кэш результатов разбора CSV в колоночных бинарных файлах.
+
+    Аргументы:
+        cache_dir: директория кэша (по умолчанию cache/market_data в корне проекта)
+        mmap: читать числовые колонки через memory map (копирование при записи —
+              изменение таблицы не затрагивает файлы кэша)
+
+    Пример:
+        cache = BinaryFrameCache()
+        df = cache.load(path, parse_market_csv)
+        print(cache.stats())   # {'hits': 1, 'misses': 0, 'appends': 0, 'writes': 0, 'uncacheable': 0}
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, mmap: bool = True):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.mmap = mmap
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.uncacheable = 0
+        self.appends = 0
+
+    def entry_dir(self, path: str, variant: str = '') -> str:
+        """Директория записи для файла-источника и варианта разбора."""
+        key = os.path.abspath(path) + (f'|{variant}' if variant else '')
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, digest)
+
+    # ======================
+    # ЗАГРУЗКА
+    # ======================
+
+    def load(self, path: str, parser: Callable[[str], pd.DataFrame], variant: str = '') -> pd.DataFrame:
+        """
+        Таблица из кэша или parser(path) с сохранением результата в кэш.
+
+        variant: отличает записи одного источника, разобранного разными parser
+        (строка должна однозначно описывать параметры разбора)
+        """
+        return self.update(path, parser, variant)[0]
+
+    def update(
+        self,
+        path: str,
+        parser: Callable[[str], pd.DataFrame],
+        variant: str = ''
+    ) -> Tuple[pd.DataFrame, str]:
+        """
+        Таблица и способ получения: 'hit' — запись действительна, 'append' — разобраны
+        только дописанные строки, 'parse' — полный разбор источника.
+        """
+        signature = source_signature(path, variant)
+        frame = self.read(path, signature)
+        if frame is not None:
+            self.hits += 1
+            return frame, 'hit'
+        self.misses += 1
+        frame = self._append(path, signature, parser)
+        if frame is not None:
+            self.appends += 1
+            return frame, 'append'
+        df = parser(path)
+        self.write(path, signature, df)
+        return df, 'parse'
+
+    def read(self, path: str, signature: Optional[Dict] = None, variant: str = '') -> Optional[pd.DataFrame]:
+        """Таблица из кэша или None (нет записи, источник изменился, запись повреждена)."""
+        signature = signature or source_signature(path, variant)
+        entry = self.entry_dir(path, signature.get('variant', ''))
+        meta_path = os.path.join(entry, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta['source'] != signature:
+                return None
+            return self._read_entry(entry, meta)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Запись кэша {entry} не прочитана ({e}) — разбор CSV")
+            return None
+
+    def _read_entry(self, entry: str, meta: Dict) -> pd.DataFrame:
+        n_rows = meta['n_rows']
+        data_file = meta.get('data_file', 'columns.bin')
+        data_path = os.path.join(entry, data_file)
+        if os.path.getsize(data_path) != meta['n_bytes']:
+            raise ValueError(f"{data_file}: {os.path.getsize(data_path)} байт вместо {meta['n_bytes']}")
+        if meta['n_bytes'] == 0:
+            blob = np.empty(0, dtype=np.uint8)
+        elif self.mmap:
+            blob = np.memmap(data_path, dtype=np.uint8, mode='c')
+        else:
+            blob = np.fromfile(data_path, dtype=np.uint8)
+
+        def view(spec):
+            values = blob[spec['offset']:spec['offset'] + spec['n_bytes']].view(np.dtype(spec['storage']))
+            if len(values) != n_rows:
+                raise ValueError(f"{spec.get('name', 'индекс')}: {len(values)} строк вместо {n_rows}")
+            return values
+
+        columns = {spec['name']: _decode_column(view(spec), spec) for spec in meta['columns']}
+        index_spec = meta['index']
+        if index_spec['kind'] == 'range':
+            index = pd.RangeIndex(*index_spec['range'])
+        else:
+            index = pd.Index(np.asarray(view(index_spec)))
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def _append(self, path: str, signature: Dict, parser: Callable) -> Optional[pd.DataFrame]:
+        """Запись, дополненная разбором дописанных строк, или None (нужен полный разбор)."""
+        entry = self.entry_dir(path, signature['variant'])
+        try:
+            with open(os.path.join(entry, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        source, state = meta.get('source', {}), meta.get('append')
+        old_size = source.get('size', 0)
+        if (state is None or signature['size'] <= old_size
+                or {key: source.get(key) for key in ('path', 'variant', 'format', 'pandas', 'numpy')}
+                != {key: signature[key] for key in ('path', 'variant', 'format', 'pandas', 'numpy')}):
+            return None
+
+        try:
+            # === ИСТОЧНИК ТОЛЬКО ВЫРОС: заголовок и конец прежнего содержимого не изменились ===
+            header = _read_range(path, 0, state['header_bytes'])
+            check_start = max(state['header_bytes'], old_size - APPEND_CHECK_BYTES)
+            if (_digest(header) != state['header_sha1']
+                    or _digest(_read_range(path, check_start, old_size)) != state['check_sha1']):
+                return None
+            tail = _read_range(path, old_size, signature['size'])
+            tail_lines = _appendable_lines(tail)
+            if tail_lines is None or len(tail) != signature['size'] - old_size:
+                return None
+
+            old = self._read_entry(entry, meta)
+            new = parser(io.BytesIO(header + tail))
+            tail_positions = _row_positions(new.index, tail_lines)
+            if list(new.columns) != list(old.columns) or tail_positions is None:
+                return None
+            # Тип колонки после разбора всего файла — общий тип записи и хвоста
+            columns = {}
+            for name in old.columns:
+                old_dtype, new_dtype = old[name].dtype, new[name].dtype
+                if new_dtype != old_dtype:
+                    if not (isinstance(old_dtype, np.dtype) and isinstance(new_dtype, np.dtype)
+                            and old_dtype.kind in 'biuf' and np.result_type(old_dtype, new_dtype) == old_dtype):
+                        return None
+                columns[name] = np.concatenate([old[name].to_numpy(), new[name].to_numpy().astype(old_dtype)]) \
+                    if isinstance(old_dtype, np.dtype) else pd.concat([old[name], new[name]], ignore_index=True).array
+
+            # Индекс — как после dropna по всему файлу: RangeIndex всех строк, прореженный маской
+            old_lines = state['lines']
+            positions = np.concatenate([_row_positions(old.index, old_lines), old_lines + tail_positions])
+            mask = np.zeros(old_lines + tail_lines, dtype=bool)
+            mask[positions] = True
+            df = pd.DataFrame(columns, index=pd.RangeIndex(old_lines + tail_lines)[mask])
+        except Exception as e:  # parser хвоста: любой сбой → полный разбор
+            print(f"⚠️  Дописанные строки {path} не разобраны отдельно ({e}) — полный разбор")
+            return None
+
+        check_start = max(state['header_bytes'], signature['size'] - APPEND_CHECK_BYTES)
+        append_state = {
+            'header_bytes': state['header_bytes'],
+            'header_sha1': state['header_sha1'],
+            'check_sha1': _digest(_read_range(path, check_start, signature['size'])),
+            'lines': old_lines + tail_lines
+        }
+        if not self.write(path, signature, df, append_state):
+            return None
+        return df
+
+    # ======================
+    # ЗАПИСЬ
+    # ======================
+
+    def write(self, path: str, signature: Dict, df: pd.DataFrame, append_state: Optional[Dict] = None) -> bool:
+        """Сохранить разобранную таблицу; False — тип не поддерживается или нет совпадения при проверке."""
+        encoded = self._encode(df)
+        if encoded is None:
+            self.uncacheable += 1
+            return False
+        arrays, meta = encoded
+        meta['source'] = signature
+        meta['append'] = append_state if append_state is not None else self._append_state(path, signature, df)
+
+        # Новый файл данных рядом с прежним: прежний может быть отображён в память
+        entry = self.entry_dir(path, signature.get('variant', ''))
+        data_file = f"columns-{uuid.uuid4().hex[:16]}.bin"
+        tmp_file = f".tmp-{os.getpid()}-{data_file}"
+        tmp_data = os.path.join(entry, tmp_file)
+        tmp_meta = os.path.join(entry, f".tmp-{os.getpid()}-meta.json")
+        try:
+            os.makedirs(entry, exist_ok=True)
+            with open(tmp_data, 'wb') as f:
+                for spec, values in arrays:
+                    f.write(b'\0' * (spec['offset'] - f.tell()))
+                    f.write(np.ascontiguousarray(values).tobytes())
+
+            # Контроль: обратное чтение совпадает с результатом разбора
+            check = BinaryFrameCache(self.cache_dir, mmap=False)._read_entry(entry, {**meta, 'data_file': tmp_file})
+            if not check.equals(df) or list(check.dtypes) != list(df.dtypes):
+                self.uncacheable += 1
+                os.remove(tmp_data)
+                return False
+
+            os.replace(tmp_data, os.path.join(entry, data_file))
+            meta['data_file'] = data_file
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_meta, os.path.join(entry, 'meta.json'))
+        except OSError as e:
+            print(f"⚠️  Кэш для {path} не записан: {e}")
+            for tmp_path in (tmp_data, tmp_meta):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+        self._remove_stale(entry)
+        self.writes += 1
+        return True
+
+    @staticmethod
+    def _remove_stale(entry: str) -> None:
+        """Удалить файлы данных, на которые не ссылается meta.json (занятые — пропускаются)."""
+        try:
+            with open(os.path.join(entry, 'meta.json'), 'r', encoding='utf-8') as f:
+                current = json.load(f).get('data_file')
+        except (OSError, ValueError):
+            return
+        for name in os.listdir(entry):
+            if name != current and (name.startswith('columns-') or name == 'columns.bin'):
+                try:
+                    os.remove(os.path.join(entry, name))
+                except OSError:
+                    pass   # Windows: файл ещё отображён в память — удалится при следующей записи
+
+    @staticmethod
+    def _append_state(path: str, signature: Dict, df: pd.DataFrame) -> Optional[Dict]:
+        """Отпечаток источника для проверки дописывания или None, если дописывание недоступно."""
+        try:
+            content = _read_range(path, 0, signature['size'])
+        except OSError:
+            return None
+        header_bytes = content.find(b'\n') + 1
+        lines = _appendable_lines(content[header_bytes:]) if header_bytes and len(content) == signature['size'] else None
+        if lines is None or _row_positions(df.index, lines) is None:
+            return None
+        check_start = max(header_bytes, len(content) - APPEND_CHECK_BYTES)
+        return {
+            'header_bytes': header_bytes,
+            'header_sha1': _digest(content[:header_bytes]),
+            'check_sha1': _digest(content[check_start:]),
+            'lines': lines
+        }
+
+    @staticmethod
+    def _encode(df: pd.DataFrame):
+        """Таблица → ([(описание, массив)], meta) или None, если типы не поддерживаются."""
+        if not all(isinstance(column, str) for column in df.columns) or df.columns.duplicated().any():
+            return None
+        arrays = []
+        offset = 0
+
+        def place(spec: Dict, values: np.ndarray) -> Dict:
+            nonlocal offset
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            spec.update({'storage': values.dtype.str, 'offset': offset, 'n_bytes': values.nbytes})
+            arrays.append((spec, values))
+            offset += values.nbytes
+            return spec
+
+        columns = []
+        for name in df.columns:
+            encoded = _encode_column(df[name])
+            if encoded is None:
+                return None
+            values, spec = encoded
+            columns.append(place({'name': name, **spec}, values))
+
+        index = df.index
+        if isinstance(index, pd.RangeIndex):
+            index_spec = {'kind': 'range', 'range': [index.start, index.stop, index.step]}
+        elif isinstance(index.dtype, np.dtype) and index.dtype.kind in 'iu':
+            index_spec = place({'kind': 'array'}, index.to_numpy())
+        else:
+            return None
+        return arrays, {'n_rows': len(df), 'n_bytes': offset, 'columns': columns, 'index': index_spec}
+
+    # ======================
+    # ОБСЛУЖИВАНИЕ
+    # ======================
+
+    def invalidate(self, path: str, variant: str = '') -> None:
+        """Удалить запись файла-источника."""
+        shutil.rmtree(self.entry_dir(path, variant), ignore_errors=True)
+
+    def clear(self) -> None:
+        """Удалить все записи кэша."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'appends': self.appends,
+                'writes': self.writes, 'uncacheable': self.uncacheable}
+
+
+_DEFAULT_CACHE: Optional[BinaryFrameCache] = None
+
+
+def default_cache() -> BinaryFrameCache:
+    """Общий на процесс кэш в директории по умолчанию (для utils.load_market_data)."""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = BinaryFrameCache()
+    return _DEFAULT_CACHE
@@ -0,0 +1,281 @@
+# backtest_platform/datastore/catalog.py
+
+"""
+Единый каталог рыночных данных проекта: загрузка, проверка, общий календарь.
+
+Версия: 1.0.0
+Версия: 1.1.0 (проекция колонок при загрузке, columns → utils.load_market_data)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+run_example.py, stepwise_optimization4.py, best_lookback.py и
+test_rvi_impact.py каждый по-своему читали CSV тикеров (tickers),
+рыночного индекса (market_ticker) и RVI (rvi_ticker) — последовательно,
+с повторным разбором дат. DataCatalog делает это в одном месте:
+  • все инструменты загружаются параллельно в пуле потоков
+    (utils.load_market_data, с бинарным кэшем datastore/binary_cache.py)
+  • проверка один раз при загрузке: наличие файлов и колонок TRADEDATE/CLOSE,
+    порядок и уникальность дат, пропуски CLOSE
+  • торговый календарь — даты, присутствующие во ВСЕХ тикерах (логика,
+    скрытая в цикле Backtester.run(): дата пропускается, если хотя бы у
+    одного тикера нет строки), с учётом фильтра времени торговли
+  • выровненные по календарю массивы полей [даты × тикеры]
+  • get_catalog() запоминает каталог на процесс: повторные вызовы из разных
+    модулей не читают файлы заново; после обновления CSV в долгоживущем
+    процессе память сбрасывается clear_catalogs() (команда reload сервиса
+    optimization/daemon.py)
+
+Таблицы каталога общие для всех потребителей процесса — изменять их на месте
+нельзя (Backtester.run() и FeatureCache работают с копиями).
+
+Пример:
+    catalog = get_catalog()                     # пути и тикеры из config
+    data, market_df, rvi_data = catalog.as_tuple()
+    calendar = catalog.calendar()               # datetime64[ns]
+    close = catalog.aligned('CLOSE')            # [len(calendar) × len(tickers)]
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import load_market_data
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class DataCatalog:
+    """
+    Рыночные данные проекта с общим торговым календарём.
+
+    Аргументы (None — значение из config):
+        data_dir: директория CSV (относительный путь — от корня проекта)
+        tickers: торгуемые тикеры
+        market_ticker: рыночный индекс (обязателен при require_market)
+        rvi_ticker: индекс волатильности (необязателен: нет файла — rvi = None)
+        max_workers: потоков загрузки
+        use_cache: бинарный кэш load_market_data
+        columns: загружаемые колонки (None — все колонки выгрузки; иначе типизированное
+                 чтение datastore/ingest.py, например ('TRADEDATE', 'CLOSE'))
+    """
+
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        tickers: Optional[Sequence[str]] = None,
+        market_ticker: Optional[str] = None,
+        rvi_ticker: Optional[str] = None,
+        max_workers: int = 8,
+        use_cache: bool = True,
+        require_market: bool = True,
+        columns: Optional[Sequence[str]] = None
+    ):
+        if data_dir is None or tickers is None or market_ticker is None or rvi_ticker is None:
+            import config
+            data_dir = data_dir if data_dir is not None else config.data_dir
+            tickers = tickers if tickers is not None else config.tickers
+            market_ticker = market_ticker if market_ticker is not None else config.market_ticker
+            rvi_ticker = rvi_ticker if rvi_ticker is not None else config.rvi_ticker
+        if not tickers:
+            raise ValueError("Список тикеров не может быть пустым")
+
+        self.data_dir = data_dir if os.path.isabs(data_dir) else os.path.join(project_root, data_dir)
+        self.tickers: List[str] = list(tickers)
+        self.market_ticker = market_ticker
+        self.rvi_ticker = rvi_ticker
+        self.max_workers = max_workers
+        self.use_cache = use_cache
+        self.require_market = require_market
+        self.columns = tuple(columns) if columns is not None else None
+
+        self.data: Dict[str, pd.DataFrame] = {}
+        self.market: Optional[pd.DataFrame] = None
+        self.rvi: Optional[pd.DataFrame] = None
+        self.loaded = False
+        self._memo: Dict[tuple, object] = {}
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.data_dir, f'{ticker}.csv')
+
+    # ======================
+    # ЗАГРУЗКА И ПРОВЕРКА
+    # ======================
+
+    def load(self, verbose: bool = True) -> 'DataCatalog':
+        """Параллельная загрузка всех инструментов и однократная проверка."""
+        if self.loaded:
+            return self
+        for ticker in self.tickers:
+            if not os.path.exists(self.path(ticker)):
+                raise FileNotFoundError(f"❌ Файл не найден: {self.path(ticker)}")
+        has_market = self.market_ticker is not None and os.path.exists(self.path(self.market_ticker))
+        if self.require_market and not has_market:
+            raise FileNotFoundError(f"❌ Файл рыночного индекса не найден: {self.path(self.market_ticker)}")
+        has_rvi = self.rvi_ticker is not None and os.path.exists(self.path(self.rvi_ticker))
+
+        names = list(dict.fromkeys(
+            self.tickers + ([self.market_ticker] if has_market else []) + ([self.rvi_ticker] if has_rvi else [])
+        ))
+        if verbose:
+            print(f"\n📥 ЗАГРУЗКА ДАННЫХ ИЗ CSV ({len(names)} инструментов, {self.max_workers} потоков)...")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(names)))) as pool:
+            frames = dict(zip(names, pool.map(
+                lambda name: load_market_data(self.path(name), use_cache=self.use_cache, columns=self.columns), names
+            )))
+        for name, df in frames.items():
+            self._validate(name, df)
+
+        self.data = {ticker: frames[ticker] for ticker in self.tickers}
+        self.market = frames[self.market_ticker] if has_market else None
+        self.rvi = frames[self.rvi_ticker] if has_rvi else None
+        self.loaded = True
+
+        if verbose:
+            for ticker, df in self.data.items():
+                print(f"✅ {ticker}: {df['TRADEDATE'].min().date()} → {df['TRADEDATE'].max().date()} ({len(df)} строк)")
+            if self.market is not None:
+                print(f"✅ {self.market_ticker} загружен: {self.market['TRADEDATE'].min().date()} → "
+                      f"{self.market['TRADEDATE'].max().date()} ({len(self.market)} строк)")
+            if self.rvi is not None:
+                print(f"✅ {self.rvi_ticker} загружен: {self.rvi['TRADEDATE'].min().date()} → "
+                      f"{self.rvi['TRADEDATE'].max().date()}")
+            else:
+                print(f"⚠️ {self.rvi_ticker}.csv не найден — используется средний уровень волатильности для рыночного фильтра")
+        return self
+
+    @staticmethod
+    def _validate(name: str, df: pd.DataFrame) -> None:
+        for column in ('TRADEDATE', 'CLOSE'):
+            if column not in df.columns:
+                raise ValueError(f"❌ В {name}.csv отсутствует колонка {column}")
+        if df.empty:
+            raise ValueError(f"❌ {name}.csv не содержит строк")
+        dates = df['TRADEDATE'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if len(dates) > 1 and not (np.diff(dates) > 0).all():
+            print(f"⚠️  {name}.csv: даты TRADEDATE не упорядочены по возрастанию или повторяются")
+        missing = int(df['CLOSE'].isna().sum())
+        if missing:
+            print(f"⚠️  {name}.csv: {missing} пропусков CLOSE")
+
+    def as_tuple(self) -> Tuple[Dict[str, pd.DataFrame], Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """(data_dict, market_df, rvi_data) — как load_all_data() в stepwise_optimization4.py."""
+        self.load()
+        return self.data, self.market, self.rvi
+
+    # ======================
+    # КАЛЕНДАРЬ И ВЫРОВНЕННЫЕ МАССИВЫ
+    # ======================
+
+    @property
+    def has_intraday_time(self) -> bool:
+        """TRADEDATE содержит время (не полночь) — имеет смысл фильтр времени торговли."""
+        self.load()
+        first = self.data[self.tickers[0]]['TRADEDATE'].iloc[0]
+        return first.time() != pd.Timestamp('00:00:00').time()
+
+    def trade_time_filter(self) -> Optional[str]:
+        """Фильтр времени из config (trading_start_time), если данные внутридневные и фильтр включён."""
+        from config import trading_start_time, time_filter_enabled
+        return trading_start_time if self.has_intraday_time and time_filter_enabled else None
+
+    def _cached(self, key: tuple, factory):
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+
+    def _filtered(self, ticker: str, trade_time_filter: Optional[str]) -> pd.DataFrame:
+        def factory():
+            df = self.data[ticker]
+            if trade_time_filter:
+                from core.backtester import Backtester
+                df = Backtester(trade_time_filter=trade_time_filter)._filter_by_time(df.copy())
+            return df
+        return self._cached(('filtered', ticker, trade_time_filter), factory)
+
+    def calendar(self, trade_time_filter: Optional[str] = None) -> np.ndarray:
+        """
+        Торговый календарь: отсортированные даты, присутствующие во всех тикерах
+        (после фильтра времени) — ровно те даты, которые обрабатывает Backtester.run().
+        """
+        self.load()
+
+        def factory():
+            calendar = None
+            for ticker in self.tickers:
+                dates = self._filtered(ticker, trade_time_filter)['TRADEDATE'].to_numpy(dtype='datetime64[ns]')
+                calendar = np.unique(dates) if calendar is None else np.intersect1d(calendar, dates)
+            return calendar
+        return self._cached(('calendar', trade_time_filter), factory)
+
+    def aligned(self, field: str = 'CLOSE', trade_time_filter: Optional[str] = None) -> np.ndarray:
+        """
+        Поле всех тикеров на датах календаря: массив [даты × тикеры] в порядке self.tickers.
+        При повторяющихся датах берётся последняя строка.
+        """
+        calendar = self.calendar(trade_time_filter)
+
+        def factory():
+            out = np.empty((len(calendar), len(self.tickers)), dtype=np.float64)
+            for j, ticker in enumerate(self.tickers):
+                df = self._filtered(ticker, trade_time_filter)
+                series = pd.Series(df[field].to_numpy(dtype=np.float64),
+                                   index=pd.DatetimeIndex(df['TRADEDATE'])).groupby(level=0).last()
+                out[:, j] = series.reindex(pd.DatetimeIndex(calendar)).to_numpy()
+            out.setflags(write=False)
+            return out
+        return self._cached(('aligned', field, trade_time_filter), factory)
+
+    def rvi_on_calendar(self, trade_time_filter: Optional[str] = None) -> np.ndarray:
+        """Значение RVI на датах календаря (NaN — нет значения или RVI не загружен)."""
+        calendar = self.calendar(trade_time_filter)
+
+        def factory():
+            if self.rvi is None:
+                values = np.full(len(calendar), np.nan)
+            else:
+                series = pd.Series(self.rvi['CLOSE'].to_numpy(dtype=np.float64),
+                                   index=pd.DatetimeIndex(self.rvi['TRADEDATE'])).groupby(level=0).last()
+                values = series.reindex(pd.DatetimeIndex(calendar)).to_numpy()
+            values.setflags(write=False)
+            return values
+        return self._cached(('rvi', trade_time_filter), factory)
+
+
+# ======================
+# ПАМЯТЬ КАТАЛОГОВ ПРОЦЕССА
+# ======================
+
+_CATALOGS: Dict[tuple, DataCatalog] = {}
+
+
+def get_catalog(
+    data_dir: Optional[str] = None,
+    tickers: Optional[Sequence[str]] = None,
+    market_ticker: Optional[str] = None,
+    rvi_ticker: Optional[str] = None,
+    use_cache: bool = True,
+    require_market: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    verbose: bool = True
+) -> DataCatalog:
+    """Загруженный каталог; один экземпляр на процесс для каждого набора аргументов."""
+    catalog = DataCatalog(data_dir, tickers, market_ticker, rvi_ticker,
+                          use_cache=use_cache, require_market=require_market, columns=columns)
+    key = (catalog.data_dir, tuple(catalog.tickers), catalog.market_ticker, catalog.rvi_ticker,
+           use_cache, require_market, catalog.columns)
+    if key not in _CATALOGS:
+        _CATALOGS[key] = catalog.load(verbose=verbose)
+    return _CATALOGS[key]
+
+
+def clear_catalogs() -> None:
+    """Сброс памяти каталогов (например, после обновления CSV в долгоживущем процессе)."""
+    _CATALOGS.clear()
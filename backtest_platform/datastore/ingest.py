@@ -0,0 +1,162 @@
+# backtest_platform/datastore/ingest.py
+
+"""
+Типизированное чтение CSV рыночных данных с проекцией колонок.
+
+Версия: 1.0.0
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+utils.parse_market_csv читает все колонки выгрузки с выводом типов и удаляет
+строку целиком при пропуске в ЛЮБОЙ колонке. Стратегии нужны только TRADEDATE
+и CLOSE, иногда OPEN/HIGH/LOW/VOLUME. read_market_csv читает по явной схеме
+только запрошенные колонки:
+  • цены — float64 или float32 (price_dtype), VOLUME — float64
+    (объём может отсутствовать; целые до 2^53 представляются точно)
+  • TRADEDATE — datetime64[ns] или int64 наносекунд от эпохи (epoch_dates)
+  • строка удаляется только при пропуске в обязательных колонках
+    (по умолчанию TRADEDATE и CLOSE); пропуски в остальных остаются NaN
+  • индекс — номер строки данных CSV, как после dropna в parse_market_csv
+    (контракт parser для дописывания в datastore/binary_cache.py)
+Прочие колонки выгрузки не разбираются вовсе, поэтому время разбора и пиковая
+память пропорциональны числу используемых колонок.
+
+ПОТОКОВЫЙ РЕЖИМ (chunksize):
+Многогигабайтные внутридневные выгрузки читаются частями по chunksize строк:
+в памяти одновременно одна сырая часть и уже типизированные массивы колонок.
+Результат совпадает с чтением за один раз.
+
+Пример:
+    df = read_market_csv('data/GOLD.csv', columns=('TRADEDATE', 'CLOSE'))
+    df = read_market_csv('data/SBER_1m.csv', price_dtype='float32', chunksize=1_000_000)
+    df = load_market_data('data/GOLD.csv', columns=MARKET_COLUMNS)    # то же через кэш
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+__version__ = "1.0.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+# Схема выгрузок MOEX: колонка → вид значения
+MARKET_SCHEMA: Dict[str, str] = {
+    'TRADEDATE': 'date',
+    'OPEN': 'price',
+    'HIGH': 'price',
+    'LOW': 'price',
+    'CLOSE': 'price',
+    'VOLUME': 'volume'
+}
+MARKET_COLUMNS = tuple(MARKET_SCHEMA)
+REQUIRED_COLUMNS = ('TRADEDATE', 'CLOSE')
+
+
+def _header(source) -> List[str]:
+    """Имена колонок CSV (файловый объект возвращается к началу)."""
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return columns
+
+
+def _convert(chunk: pd.DataFrame, columns: Sequence[str], price_dtype: np.dtype) -> Dict[str, np.ndarray]:
+    """Сырые колонки части → типизированные массивы (даты — int64 наносекунд, NaT — минимум int64)."""
+    arrays = {}
+    for name in columns:
+        kind = MARKET_SCHEMA[name]
+        if kind == 'date':
+            dates = pd.to_datetime(chunk[name]).to_numpy(dtype='datetime64[ns]')
+            arrays[name] = dates.view(np.int64)
+        elif kind == 'price':
+            arrays[name] = chunk[name].to_numpy(dtype=price_dtype, na_value=np.nan)
+        else:
+            arrays[name] = chunk[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    return arrays
+
+
+def _present(arrays: Dict[str, np.ndarray], required: Sequence[str]) -> np.ndarray:
+    """Маска строк без пропусков в обязательных колонках."""
+    n = len(next(iter(arrays.values())))
+    mask = np.ones(n, dtype=bool)
+    for name in required:
+        values = arrays[name]
+        if MARKET_SCHEMA[name] == 'date':
+            mask &= values != np.iinfo(np.int64).min
+        else:
+            mask &= ~np.isnan(values)
+    return mask
+
+
+def read_market_csv(
+    source,
+    columns: Optional[Sequence[str]] = None,
+    price_dtype: str = 'float64',
+    epoch_dates: bool = False,
+    required: Sequence[str] = REQUIRED_COLUMNS,
+    chunksize: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Чтение CSV по схеме MARKET_SCHEMA.
+
+    Аргументы:
+        source: путь или файловый объект CSV
+        columns: колонки результата (None — все колонки схемы, присутствующие в файле);
+                 обязательные добавляются автоматически
+        price_dtype: 'float64' или 'float32' для цен
+        epoch_dates: TRADEDATE как int64 наносекунд от эпохи вместо datetime64[ns]
+        required: колонки, пропуск в которых удаляет строку
+        chunksize: читать частями по chunksize строк
+
+    Возвращает:
+        pd.DataFrame: колонки в порядке схемы, индекс — номера строк данных CSV
+    """
+    price_dtype = np.dtype(price_dtype)
+    if price_dtype.kind != 'f':
+        raise ValueError(f"Тип цен должен быть float, получено {price_dtype}")
+    unknown = [name for name in list(columns or []) + list(required) if name not in MARKET_SCHEMA]
+    if unknown:
+        raise ValueError(f"Колонки вне схемы MARKET_SCHEMA: {unknown}")
+
+    header = _header(source)
+    missing = [name for name in required if name not in header]
+    if missing:
+        raise ValueError(f"В CSV отсутствуют обязательные колонки: {missing}")
+    requested = list(columns) if columns is not None else [name for name in MARKET_SCHEMA if name in header]
+    absent = [name for name in requested if name not in header]
+    if absent:
+        raise ValueError(f"В CSV отсутствуют колонки: {absent}")
+    wanted = set(requested) | set(required)
+    projected = [name for name in MARKET_SCHEMA if name in wanted]
+
+    # Даты читаются строками (разбор — pd.to_datetime), числа — сразу в float
+    dtypes = {name: (object if MARKET_SCHEMA[name] == 'date' else np.float64) for name in projected}
+    reader = pd.read_csv(source, usecols=projected, dtype=dtypes, chunksize=chunksize)
+    chunks = [reader] if chunksize is None else reader
+
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in projected}
+    masks: List[np.ndarray] = []
+    for chunk in chunks:
+        arrays = _convert(chunk, projected, price_dtype)
+        mask = _present(arrays, required)
+        masks.append(mask)
+        for name in projected:
+            parts[name].append(arrays[name][mask])
+        del chunk, arrays
+    del reader, chunks
+
+    mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    data = {}
+    for name in projected:
+        values = np.concatenate(parts[name]) if parts[name] else np.empty(0)
+        parts[name] = []
+        if MARKET_SCHEMA[name] == 'date':
+            values = values.astype(np.int64, copy=False)
+            data[name] = values if epoch_dates else values.view('datetime64[ns]')
+        else:
+            data[name] = values.astype(price_dtype if MARKET_SCHEMA[name] == 'price' else np.float64, copy=False)
+    # Индекс — как после dropna по RangeIndex строк
+    return pd.DataFrame(data, index=pd.RangeIndex(len(mask))[mask], copy=False)
@@ -0,0 +1,455 @@
+# backtest_platform/datastore/price_store.py
+
+"""
+Хранилище цен большого набора тикеров в отображаемом в память массиве.
+
+Версия: 1.0.0
+Версия: 1.1.0 (sync_csv: дописывание только новых строк выросшего CSV)
+Версия: 1.2.0 (отпечаток источника тикера в meta.json; перестройка пишет новые
+               файлы вместо подмены отображённых в память)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Платформа работает с четырьмя фондами, но моментум по всему рынку акций и
+фондов MOEX — это сотни тикеров. Хранить их как отдельные CSV и DataFrame
+в каждом процессе оптимизации дорого. PriceStore держит на диске один
+массив float (даты × тикеры × поля) с общим календарём и словарём тикеров;
+бэктестер и процессы оптимизации открывают его только для чтения через
+memory map — данные не копируются, страницы файла общие для всех процессов.
+
+ФОРМАТ ДИРЕКТОРИИ:
+  meta.json      — поля, тикеры (номер слота), ёмкость по тикерам, число дат, тип,
+                   имена файлов календаря и цен, отпечатки CSV-источников тикеров
+  calendar*.i8   — даты календаря (datetime64[ns] как int64), по возрастанию
+  prices*.bin    — массив [даты, ёмкость по тикерам, поля] в порядке C;
+                   NaN — тикер не торговался в эту дату
+
+РОСТ БЕЗ ПЕРЕЗАПИСИ:
+  • Новые дни дописываются в конец файла (даты — внешнее измерение).
+  • Новый тикер занимает свободный слот: по тикерам резервируется ёмкость
+    (ticker_capacity), при её исчерпании файл перестраивается с удвоенной
+    ёмкостью — амортизированно редко.
+  • Даты раньше начала календаря или внутри него, которых в календаре нет,
+    требуют перестройки файла (печатается предупреждение).
+meta.json записывается последним (временный файл + os.replace): читатель
+видит либо прежнее, либо новое число дат; refresh() перечитывает его.
+Перестройка пишет календарь и цены в НОВЫЕ файлы и переключает на них
+meta.json: отображённые в память файлы (у этого или других процессов) не
+подменяются и не удаляются на ходу — на Windows это невозможно. Прежние файлы
+удаляются, когда освобождены (иначе — при следующей перестройке).
+
+ЕЖЕДНЕВНОЕ ОБНОВЛЕНИЕ:
+sync_csv() читает CSV через бинарный кэш (выросший файл разбирается только по
+дописанным строкам, datastore/binary_cache.py). Что писать, решает отпечаток
+источника, сохранённый хранилищем при прошлой синхронизации (размер, mtime,
+sha1 синхронизированного содержимого), а не состояние общего кэша, который
+мог обновить другой загрузчик:
+  • размер и mtime не изменились — ничего не пишется
+  • прежнее содержимое — начало нового файла — только строки позже
+    последней даты тикера (стоимость ∝ числу новых дней)
+  • иначе (история исправлена, файл заменён) — тикер записывается заново
+
+Пример:
+    store = PriceStore.create('data-store/moex', ticker_capacity=512)
+    for ticker, df in data.items():
+        store.write(ticker, df)
+    ...
+    store = PriceStore('data-store/moex')             # только чтение
+    close = store.field('CLOSE')                      # представление [даты × тикеры]
+    data_dict = store.data_dict(['GOLD', 'EQMX'])     # DataFrame для Backtester.run()
+    store.sync_csv('GOLD', 'data/GOLD.csv')           # ежедневно: только новые строки
+"""
+
+import hashlib
+import json
+import os
+import sys
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_FIELDS = ('OPEN', 'HIGH', 'LOW', 'CLOSE', 'VOLUME')
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def _source_state(path: str, prefix_size: int = 0):
+    """
+    Отпечаток файла-источника за один проход чтения.
+
+    Возвращает:
+        ({'path', 'size', 'mtime_ns', 'sha1'}, sha1 первых prefix_size байт или None,
+         если файл короче prefix_size)
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    prefix_sha1 = digest.hexdigest() if prefix_size == 0 else None
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            if prefix_sha1 is None and size + len(chunk) >= prefix_size:
+                split = prefix_size - size
+                digest.update(chunk[:split])
+                prefix_sha1 = digest.hexdigest()
+                chunk = chunk[split:]
+                size = prefix_size
+            digest.update(chunk)
+            size += len(chunk)
+    state = {'path': os.path.abspath(path), 'size': size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest.hexdigest()}
+    return state, prefix_sha1
+
+
+class PriceStore:
+    """
+    Массив цен (даты × тикеры × поля) на диске с общим календарём.
+
+    Аргументы:
+        path: директория хранилища (создаётся через PriceStore.create)
+        mode: 'r' — только чтение (процессы бэктеста и оптимизации), 'r+' — запись
+
+    При передаче в процесс пула сериализуется только путь и режим —
+    процесс открывает тот же файл через memory map.
+    """
+
+    def __init__(self, path: str, mode: str = 'r'):
+        if mode not in ('r', 'r+'):
+            raise ValueError(f"mode должен быть 'r' или 'r+', получено '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.refresh()
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        dtype: str = 'float64',
+        ticker_capacity: int = 64
+    ) -> 'PriceStore':
+        """Пустое хранилище; существующее в path не перезаписывается."""
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            raise FileExistsError(f"Хранилище уже существует: {path}")
+        if np.dtype(dtype).kind != 'f':
+            raise ValueError(f"Тип значений должен быть float, получено {dtype}")
+        os.makedirs(path, exist_ok=True)
+        open(os.path.join(path, 'calendar.i8'), 'wb').close()
+        open(os.path.join(path, 'prices.bin'), 'wb').close()
+        cls._write_meta(path, {
+            'format': STORE_FORMAT_VERSION,
+            'fields': list(fields),
+            'dtype': np.dtype(dtype).str,
+            'tickers': [],
+            'ticker_capacity': max(1, int(ticker_capacity)),
+            'n_dates': 0,
+            'calendar_file': 'calendar.i8',
+            'prices_file': 'prices.bin',
+            'sources': {}
+        })
+        return cls(path, mode='r+')
+
+    # ======================
+    # СОСТОЯНИЕ И ОТОБРАЖЕНИЕ
+    # ======================
+
+    def refresh(self) -> None:
+        """Перечитать meta.json и заново отобразить файлы (видны дописанные дни и тикеры)."""
+        with open(os.path.join(self.path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Формат хранилища {meta.get('format')} не поддерживается")
+        self.meta = meta
+        self.fields: List[str] = meta['fields']
+        self.tickers: List[str] = meta['tickers']
+        self.dtype = np.dtype(meta['dtype'])
+        self.ticker_capacity: int = meta['ticker_capacity']
+        self.n_dates: int = meta['n_dates']
+        self.calendar_file: str = meta.get('calendar_file', 'calendar.i8')
+        self.prices_file: str = meta.get('prices_file', 'prices.bin')
+        self.sources: Dict[str, Dict] = meta.get('sources', {})
+        self._slots = {ticker: slot for slot, ticker in enumerate(self.tickers)}
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._map()
+
+    def _map(self) -> None:
+        n = self.n_dates
+        if n == 0:
+            self._prices = np.empty((0, self.ticker_capacity, len(self.fields)), dtype=self.dtype)
+            self._calendar = np.empty(0, dtype=np.int64)
+            return
+        self._prices = np.memmap(os.path.join(self.path, self.prices_file), dtype=self.dtype, mode=self.mode,
+                                 shape=(n, self.ticker_capacity, len(self.fields)))
+        self._calendar = np.memmap(os.path.join(self.path, self.calendar_file), dtype=np.int64, mode='r', shape=(n,))
+
+    def __getstate__(self):
+        return {'path': self.path, 'mode': self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['mode'])
+
+    @staticmethod
+    def _write_meta(path: str, meta: Dict) -> None:
+        tmp_path = os.path.join(path, f"meta.json.tmp-{os.getpid()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def _commit_meta(self) -> None:
+        self.meta.update({
+            'tickers': self.tickers,
+            'ticker_capacity': self.ticker_capacity,
+            'n_dates': self.n_dates,
+            'calendar_file': self.calendar_file,
+            'prices_file': self.prices_file,
+            'sources': self.sources
+        })
+        self._write_meta(self.path, self.meta)
+
+    # ======================
+    # ЧТЕНИЕ (без копирования)
+    # ======================
+
+    @property
+    def calendar(self) -> np.ndarray:
+        """Даты календаря (datetime64[ns])."""
+        return self._calendar.view('datetime64[ns]')
+
+    @property
+    def array(self) -> np.ndarray:
+        """Представление [даты × тикеры × поля] (только занятые слоты)."""
+        return self._prices[:, :len(self.tickers), :]
+
+    def slot(self, ticker: str) -> int:
+        if ticker not in self._slots:
+            raise KeyError(f"Тикер {ticker} отсутствует в хранилище")
+        return self._slots[ticker]
+
+    def field(self, name: str) -> np.ndarray:
+        """Представление [даты × тикеры] одного поля."""
+        return self._prices[:, :len(self.tickers), self._field_index[name]]
+
+    def series(self, ticker: str, field: str = 'CLOSE') -> np.ndarray:
+        """Представление одного поля тикера по всем датам календаря (NaN — нет торгов)."""
+        return self._prices[:, self.slot(ticker), self._field_index[field]]
+
+    def frame(self, ticker: str, fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Таблица тикера в формате load_market_data: TRADEDATE + поля,
+        только даты с ценой закрытия (копия — DataFrame для Backtester.run()).
+        """
+        fields = list(fields) if fields is not None else self.fields
+        slot = self.slot(ticker)
+        close_field = 'CLOSE' if 'CLOSE' in self._field_index else fields[0]
+        present = ~np.isnan(self._prices[:, slot, self._field_index[close_field]])
+        df = pd.DataFrame({'TRADEDATE': self.calendar[present]})
+        for field in fields:
+            df[field] = self._prices[present, slot, self._field_index[field]]
+        return df
+
+    def data_dict(self, tickers: Optional[Sequence[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Словарь {тикер: DataFrame} для Backtester.run() / optimize_dual_momentum."""
+        return {ticker: self.frame(ticker) for ticker in (tickers if tickers is not None else self.tickers)}
+
+    # ======================
+    # ЗАПИСЬ
+    # ======================
+
+    def write(self, ticker: str, df: pd.DataFrame) -> int:
+        """
+        Записать строки тикера (TRADEDATE + любые поля хранилища).
+
+        Существующие даты перезаписываются на месте, новые после конца календаря
+        дописываются; новый тикер занимает свободный слот.
+
+        Возвращает:
+            int: число записанных строк
+        """
+        if self.mode != 'r+':
+            raise PermissionError("Хранилище открыто только для чтения")
+        if 'TRADEDATE' not in df.columns:
+            raise ValueError(f"{ticker}: отсутствует колонка TRADEDATE")
+        dates = pd.to_datetime(df['TRADEDATE']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if len(np.unique(dates)) != len(dates):
+            raise ValueError(f"{ticker}: даты TRADEDATE не уникальны")
+
+        if ticker not in self._slots:
+            if len(self.tickers) == self.ticker_capacity:
+                self._rebuild(self._calendar, self.ticker_capacity * 2)
+            self.tickers.append(ticker)
+            self._slots[ticker] = len(self.tickers) - 1
+
+        known = np.isin(dates, self._calendar)
+        new_dates = np.unique(dates[~known])
+        if len(new_dates):
+            if self.n_dates and new_dates[0] <= self._calendar[-1]:
+                print(f"⚠️  {ticker}: даты внутри или до начала календаря — перестройка хранилища")
+                self._rebuild(np.union1d(self._calendar, new_dates), self.ticker_capacity)
+            else:
+                self._append_dates(new_dates)
+
+        rows = np.searchsorted(self._calendar, dates)
+        slot = self._slots[ticker]
+        for field in self.fields:
+            if field in df.columns:
+                self._prices[rows, slot, self._field_index[field]] = df[field].to_numpy(dtype=self.dtype)
+        self._prices.flush()
+        self._commit_meta()
+        return len(rows)
+
+    def last_date(self, ticker: str) -> Optional[np.datetime64]:
+        """Последняя дата с ценой тикера или None."""
+        close_field = 'CLOSE' if 'CLOSE' in self._field_index else self.fields[0]
+        present = np.flatnonzero(~np.isnan(self.series(ticker, close_field)))
+        return self.calendar[present[-1]] if len(present) else None
+
+    def sync_csv(self, ticker: str, path: str, cache=None) -> int:
+        """
+        Записать в хранилище строки CSV тикера, которых в нём ещё нет.
+
+        Если прежнее синхронизированное содержимое источника — начало файла,
+        пишутся только строки позже last_date(ticker). Новый тикер, тикер без
+        отпечатка источника и изменённый источник записываются целиком
+        (значения тикера предварительно очищаются).
+
+        Возвращает:
+            int: число записанных строк
+        """
+        from datastore.binary_cache import default_cache
+        from utils import parse_market_csv
+
+        if self.mode != 'r+':
+            raise PermissionError("Хранилище открыто только для чтения")
+        previous = self.sources.get(ticker) if ticker in self._slots else None
+        if previous is not None and previous['path'] != os.path.abspath(path):
+            previous = None
+        stat = os.stat(path)
+        if previous is not None and (previous['size'], previous['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return 0
+        state, prefix_sha1 = _source_state(path, previous['size'] if previous is not None else 0)
+        appended = previous is not None and prefix_sha1 == previous['sha1']
+
+        df, _ = (cache or default_cache()).update(path, parse_market_csv)
+        if appended:
+            last = self.last_date(ticker)
+            if last is not None:
+                df = df[df['TRADEDATE'].to_numpy(dtype='datetime64[ns]') > last]
+        elif ticker in self._slots:
+            print(f"♻️  {ticker}: источник {path} изменён не только дописыванием — тикер записывается заново")
+            self._prices[:, self._slots[ticker], :] = np.nan
+
+        self.sources[ticker] = state
+        if df.empty:
+            if isinstance(self._prices, np.memmap):
+                self._prices.flush()
+            self._commit_meta()
+            return 0
+        return self.write(ticker, df)
+
+    def _append_dates(self, new_dates: np.ndarray) -> None:
+        """Дописать даты в конец календаря и строки NaN в конец массива цен."""
+        n_old = self.n_dates
+        with open(os.path.join(self.path, self.calendar_file), 'r+b') as f:
+            f.seek(n_old * 8)
+            f.write(new_dates.astype(np.int64).tobytes())
+            f.truncate()
+        self.n_dates = n_old + len(new_dates)
+        self._map()
+        self._prices[n_old:] = np.nan
+        # meta.json обновляется вызывающим методом после записи значений
+
+    def _rebuild(self, calendar: np.ndarray, ticker_capacity: int) -> None:
+        """Новые файлы под новый календарь и ёмкость по тикерам (прежние не подменяются)."""
+        calendar = np.asarray(calendar, dtype=np.int64)
+        n_fields = len(self.fields)
+        generation = uuid.uuid4().hex[:12]
+        prices_file, calendar_file = f"prices-{generation}.bin", f"calendar-{generation}.i8"
+        prices_tmp = os.path.join(self.path, f"{prices_file}.tmp-{os.getpid()}")
+        calendar_tmp = os.path.join(self.path, f"{calendar_file}.tmp-{os.getpid()}")
+
+        if len(calendar):
+            new_prices = np.memmap(prices_tmp, dtype=self.dtype, mode='w+',
+                                   shape=(len(calendar), ticker_capacity, n_fields))
+            new_prices[:] = np.nan
+            if self.n_dates:
+                rows = np.searchsorted(calendar, self._calendar)
+                new_prices[rows, :self.ticker_capacity, :] = self._prices[:, :, :]
+            new_prices.flush()
+            del new_prices
+        else:
+            open(prices_tmp, 'wb').close()
+        calendar.tofile(calendar_tmp)
+
+        self._prices = self._calendar = None
+        os.replace(prices_tmp, os.path.join(self.path, prices_file))
+        os.replace(calendar_tmp, os.path.join(self.path, calendar_file))
+        self.prices_file, self.calendar_file = prices_file, calendar_file
+        self.n_dates = len(calendar)
+        self.ticker_capacity = ticker_capacity
+        self._commit_meta()
+        self._map()
+        self._remove_stale()
+
+    def _remove_stale(self) -> None:
+        """Удалить файлы прежних перестроек (отображённые в память на Windows — пропускаются)."""
+        current = {self.prices_file, self.calendar_file}
+        for name in os.listdir(self.path):
+            if name in current or '.tmp-' in name:
+                continue
+            if (name.startswith('prices') and name.endswith('.bin')) or \
+                    (name.startswith('calendar') and name.endswith('.i8')):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def summary(self) -> Dict:
+        """Размер хранилища и диапазон дат."""
+        return {
+            'tickers': len(self.tickers),
+            'ticker_capacity': self.ticker_capacity,
+            'fields': self.fields,
+            'n_dates': self.n_dates,
+            'first_date': str(self.calendar[0]) if self.n_dates else None,
+            'last_date': str(self.calendar[-1]) if self.n_dates else None,
+            'size_mb': os.path.getsize(os.path.join(self.path, self.prices_file)) / 1024 / 1024
+        }
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка:
+        python -m datastore.price_store build <store_dir> <file.csv> [...]   (тикер — имя файла)
+        python -m datastore.price_store info <store_dir>
+    В существующее хранилище build дописывает только новые строки CSV.
+    """
+    if len(argv) < 2 or argv[0] not in ('build', 'info') or (argv[0] == 'build' and len(argv) < 3):
+        print(_main.__doc__)
+        return 2
+    if argv[0] == 'info':
+        print(json.dumps(PriceStore(argv[1]).summary(), ensure_ascii=False, indent=2))
+        return 0
+
+    store_dir, paths = argv[1], argv[2:]
+    if os.path.exists(os.path.join(store_dir, 'meta.json')):
+        store = PriceStore(store_dir, mode='r+')
+    else:
+        store = PriceStore.create(store_dir, ticker_capacity=max(64, 2 * len(paths)))
+    for csv_path in paths:
+        ticker = os.path.splitext(os.path.basename(csv_path))[0]
+        rows = store.sync_csv(ticker, csv_path)
+        print(f"✅ {ticker}: {rows} строк")
+    print(json.dumps(store.summary(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,499 @@
+# backtest_platform/datastore/spread_store.py
+
+"""
+Хранилище снимков спредов MOEX (SQLite, WAL) и профиль спреда по времени дня.
+
+Версия: 1.0.0
+Версия: 1.1.0 (configured_slippage: проскальзывание бэктеста и оптимизации из
+               профиля по настройкам spread_slippage_* в config/common_cfg.py)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+collect_moex_spreads.py дописывал снимки в moex_spreads_log.csv без блокировок,
+а любой анализ перечитывал весь CSV. SpreadStore пишет снимки в SQLite:
+  • режим WAL — сборщик пишет, бэктест и анализ читают одновременно из
+    других процессов, не блокируя друг друга
+  • таблица spreads кластеризована по (alias, ts) (WITHOUT ROWID): выборка
+    тикера за период — проход по диапазону ключа
+  • вставка пакетом в одной транзакции; повтор снимка (alias, ts)
+    игнорируется, поэтому импорт CSV можно повторять
+  • ts — миллисекунды UTC (int64), цены и глубина — REAL
+
+ПРОФИЛЬ СПРЕДА:
+spread_profile() — векторная агрегация снимков: по тикеру и интервалу времени
+дня (МСК, bucket_minutes минут) перцентили спреда в bps, средний спред и
+статистика глубины стакана (медианы BIDDEPTHT/OFFERDEPTHT, 10-й перцентиль
+меньшей из сторон). Строка bucket = -1 — весь торговый день.
+Профиль материализуется в таблице spread_profile и пересчитывается только
+после вставки новых снимков — чтение готового профиля занимает миллисекунды
+при любом объёме истории.
+
+ПРОСКАЛЬЗЫВАНИЕ:
+slippage_bps() переводит профиль в словарь {тикер: bps} — половина спреда
+выбранного перцентиля (пересечение спреда от середины), в формате параметра
+slippage бэктестера (core/backtester.py, use_slippage=True). Время сделки
+задаётся как trade_time_filter ('HH:MM' или 'HH:MM:SS').
+configured_slippage() — то же по настройкам проекта: если в common_cfg.py задан
+spread_slippage_store, run_example.py и оптимизация (optimizer.py, в том числе
+stepwise_optimization4.py) берут проскальзывание из профиля вместо slippage.
+
+Пример:
+    store = SpreadStore('moex_spreads.sqlite')
+    store.import_csv('moex_spreads_log.csv')                  # однократно
+    SpreadCollector(sink=store.insert).run()                  # или output='*.sqlite'
+    ...
+    profile = SpreadStore('moex_spreads.sqlite', readonly=True).profile()
+    slip = slippage_bps(profile, at='18:40', percentile=75)   # {'GOLD': 3.6, ...}
+    Backtester(slippage=slip, use_slippage=True)
+
+Командная строка:
+    python -m datastore.spread_store import <store.sqlite> <log.csv> [...]
+    python -m datastore.spread_store profile <store.sqlite> [bucket_minutes]
+    python -m datastore.spread_store slippage <store.sqlite> [HH:MM] [percentile]
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STORE_FORMAT_VERSION = 1
+MSK_OFFSET_MIN = 180                  # МСК = UTC+3 (без перехода на летнее время)
+DEFAULT_BUCKET_MINUTES = 30
+PROFILE_PERCENTILES = (50, 75, 90, 95)
+ALL_DAY = -1
+
+# Колонки записи сборщика (collect_moex_spreads.py)
+SPREAD_COLUMNS = (
+    'datetime_utc', 'alias', 'secid', 'market', 'board', 'bid', 'ask',
+    'spread_abs', 'spread_bps', 'mid_price', 'volume_bid', 'volume_ask'
+)
+_TEXT_COLUMNS = ('alias', 'secid', 'market', 'board')
+_REAL_COLUMNS = ('bid', 'ask', 'spread_abs', 'spread_bps', 'mid_price', 'volume_bid', 'volume_ask')
+_PROFILE_STATS = tuple(f'p{p}' for p in PROFILE_PERCENTILES) + (
+    'mean_bps', 'depth_bid_p50', 'depth_ask_p50', 'depth_min_p10'
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS spreads (
+    alias TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    secid TEXT, market TEXT, board TEXT,
+    {', '.join(f'{name} REAL' for name in _REAL_COLUMNS)},
+    PRIMARY KEY (alias, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spread_profile (
+    alias TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    {', '.join(f'{name} REAL' for name in _PROFILE_STATS)},
+    PRIMARY KEY (alias, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_epoch_ms(values) -> np.ndarray:
+    """Строки ISO / datetime → миллисекунды UTC (int64)."""
+    stamps = pd.to_datetime(pd.Series(values), utc=True, format='ISO8601')
+    return stamps.to_numpy(dtype='datetime64[ns]').view(np.int64) // 1_000_000
+
+
+def _minute_of_day(ts_ms: np.ndarray) -> np.ndarray:
+    """Минута дня по МСК для меток времени в мс UTC."""
+    return (ts_ms // 60_000 + MSK_OFFSET_MIN) % 1440
+
+
+def _parse_time(at: str) -> int:
+    """'HH:MM' или 'HH:MM:SS' → минута дня."""
+    parts = at.split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+def spread_profile(
+    snapshots: pd.DataFrame,
+    bucket_minutes: int = DEFAULT_BUCKET_MINUTES,
+    percentiles: Sequence[int] = PROFILE_PERCENTILES
+) -> pd.DataFrame:
+    """
+    Профиль спреда по тикеру и времени дня (векторно, без цикла по группам).
+
+    Аргументы:
+        snapshots: снимки с колонками alias, spread_bps, volume_bid, volume_ask
+                   и ts (мс UTC) либо datetime_utc
+        bucket_minutes: ширина интервала времени дня, минут (делитель 1440)
+        percentiles: перцентили спреда
+
+    Возвращает:
+        pd.DataFrame: колонки alias, bucket (минута начала интервала по МСК;
+        -1 — весь день), n, p<перцентиль>..., mean_bps, depth_bid_p50,
+        depth_ask_p50, depth_min_p10
+    """
+    if bucket_minutes <= 0 or 1440 % bucket_minutes:
+        raise ValueError(f"bucket_minutes должен делить сутки (1440 мин), получено {bucket_minutes}")
+    columns = ['alias', 'bucket', 'n'] + [f'p{p}' for p in percentiles] + list(_PROFILE_STATS[len(PROFILE_PERCENTILES):])
+    if snapshots.empty:
+        empty = pd.DataFrame(columns=columns)
+        empty.attrs['bucket_minutes'] = bucket_minutes
+        return empty
+
+    ts = (snapshots['ts'].to_numpy(dtype=np.int64) if 'ts' in snapshots.columns
+          else _to_epoch_ms(snapshots['datetime_utc']))
+    bucket = _minute_of_day(ts) // bucket_minutes * bucket_minutes
+    volume_bid = snapshots['volume_bid'].to_numpy(dtype=np.float64)
+    volume_ask = snapshots['volume_ask'].to_numpy(dtype=np.float64)
+    frame = pd.DataFrame({
+        'alias': snapshots['alias'].to_numpy(),
+        'bucket': bucket,
+        'spread_bps': snapshots['spread_bps'].to_numpy(dtype=np.float64),
+        'depth_bid': volume_bid,
+        'depth_ask': volume_ask,
+        'depth_min': np.fmin(volume_bid, volume_ask)
+    })
+    # Интервалы и весь день (bucket = -1) — одной группировкой
+    frame = pd.concat([frame, frame.assign(bucket=ALL_DAY)], ignore_index=True)
+
+    grouped = frame.groupby(['alias', 'bucket'], sort=True)
+    spread = grouped['spread_bps']
+    quantiles = spread.quantile([p / 100 for p in percentiles]).unstack()
+    quantiles.columns = [f'p{p}' for p in percentiles]
+    result = pd.concat([
+        spread.size().rename('n'),
+        quantiles,
+        spread.mean().rename('mean_bps'),
+        grouped['depth_bid'].median().rename('depth_bid_p50'),
+        grouped['depth_ask'].median().rename('depth_ask_p50'),
+        grouped['depth_min'].quantile(0.1).rename('depth_min_p10')
+    ], axis=1).reset_index()[columns]
+    result.attrs['bucket_minutes'] = bucket_minutes
+    return result
+
+
+def slippage_bps(
+    profile: pd.DataFrame,
+    at: Optional[str] = None,
+    percentile: int = 50,
+    half_spread: bool = True
+) -> Dict[str, float]:
+    """
+    Проскальзывание по тикерам из профиля спреда, bps.
+
+    Аргументы:
+        profile: результат spread_profile() / SpreadStore.profile()
+                 (ширина интервала — profile.attrs['bucket_minutes'])
+        at: время сделки по МСК ('HH:MM' или 'HH:MM:SS'); None — весь день.
+            Тикеры без снимков в этом интервале берут значение за весь день
+        percentile: перцентиль спреда из профиля
+        half_spread: половина спреда (исполнение от середины) или полный спред
+
+    Возвращает:
+        Dict[str, float]: {тикер: bps} для параметра slippage бэктестера
+    """
+    column = f'p{percentile}'
+    if column not in profile.columns:
+        raise ValueError(f"В профиле нет перцентиля {percentile}: {list(profile.columns)}")
+    factor = 0.5 if half_spread else 1.0
+    all_day = profile[profile['bucket'] == ALL_DAY].set_index('alias')[column]
+    values = all_day
+    if at is not None:
+        width = int(profile.attrs.get('bucket_minutes', DEFAULT_BUCKET_MINUTES))
+        target = _parse_time(at) // width * width
+        at_time = profile[profile['bucket'] == target].set_index('alias')[column]
+        values = at_time.reindex(all_day.index).fillna(all_day)
+    return {alias: round(float(value) * factor, 3) for alias, value in values.items()}
+
+
+def configured_slippage(
+    default: Union[Dict[str, float], float],
+    tickers: Optional[Sequence[str]] = None
+) -> Union[Dict[str, float], float]:
+    """
+    Проскальзывание по настройкам проекта (config/common_cfg.py).
+
+    Если spread_slippage_store задан и файл существует — {тикер: bps} из профиля
+    спреда (spread_slippage_time, spread_slippage_percentile); тикеры из tickers,
+    которых нет в профиле, получают default. Иначе — default без изменений.
+    """
+    from config import spread_slippage_store, spread_slippage_time, spread_slippage_percentile
+
+    if not spread_slippage_store:
+        return default
+    path = spread_slippage_store if os.path.isabs(spread_slippage_store) \
+        else os.path.join(project_root, spread_slippage_store)
+    if not os.path.exists(path):
+        print(f"⚠️  Хранилище спредов {path} не найдено — проскальзывание из slippage")
+        return default
+    with SpreadStore(path, readonly=True) as store:
+        slip = store.slippage(at=spread_slippage_time, percentile=spread_slippage_percentile)
+    if not slip:
+        return default
+    if tickers is not None and not isinstance(default, dict):
+        slip = {**{ticker: default for ticker in tickers}, **slip}
+    return slip
+
+
+class SpreadStore:
+    """
+    Снимки спредов в SQLite (WAL) с материализованным профилем.
+
+    Аргументы:
+        path: файл базы (создаётся при первой записи)
+        readonly: только чтение (бэктест, анализ) — не мешает писателю
+
+    Методы insert/import_csv потокобезопасны в пределах процесса;
+    insert подходит как sink для SpreadCollector.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Хранилище спредов не найдено: {path}")
+            uri = f"file:{os.path.abspath(path)}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('format_version', ?)",
+                                   (str(STORE_FORMAT_VERSION),))
+                self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('data_version', '0')")
+        self._conn.execute('PRAGMA busy_timeout=5000')
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # В процесс пула передаются только путь и режим
+        return {'path': self.path, 'readonly': self.readonly}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], readonly=state['readonly'])
+
+    # ======================
+    # META
+    # ======================
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values) -> None:
+        self._conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                               [(key, str(value)) for key, value in values.items()])
+
+    # ======================
+    # ЗАПИСЬ
+    # ======================
+
+    def insert(self, records: Union[List[Dict], pd.DataFrame]) -> int:
+        """
+        Записать снимки (записи сборщика или DataFrame с колонками SPREAD_COLUMNS).
+
+        Возвращает:
+            int: число новых строк (повторы (alias, ts) пропускаются)
+        """
+        if self.readonly:
+            raise PermissionError(f"Хранилище открыто только для чтения: {self.path}")
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        if df.empty:
+            return 0
+        missing = [name for name in SPREAD_COLUMNS if name not in df.columns]
+        if missing:
+            raise ValueError(f"В записях спредов отсутствуют колонки: {missing}")
+
+        ts = _to_epoch_ms(df['datetime_utc'])
+        text = [df[name].astype(str).to_numpy() for name in _TEXT_COLUMNS]
+        real = [pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64) for name in _REAL_COLUMNS]
+        rows = zip(text[0], ts.tolist(), text[1], text[2], text[3], *(col.tolist() for col in real))
+        sql = (f"INSERT OR IGNORE INTO spreads (alias, ts, secid, market, board, {', '.join(_REAL_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * (5 + len(_REAL_COLUMNS)))})")
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(sql, rows)
+            added = self._conn.total_changes - before
+            if added:
+                self._set_meta(data_version=int(self._meta('data_version') or 0) + 1)
+        return added
+
+    def import_csv(self, path: str, chunksize: int = 200_000) -> int:
+        """Импорт moex_spreads_log.csv частями; возвращает число новых строк."""
+        added = 0
+        for chunk in pd.read_csv(path, usecols=list(SPREAD_COLUMNS), chunksize=chunksize):
+            added += self.insert(chunk)
+        return added
+
+    # ======================
+    # ЧТЕНИЕ
+    # ======================
+
+    def aliases(self) -> List[str]:
+        return [row[0] for row in self._conn.execute('SELECT DISTINCT alias FROM spreads ORDER BY alias')]
+
+    def snapshots(
+        self,
+        aliases: Optional[Iterable[str]] = None,
+        start=None,
+        end=None,
+        columns: Sequence[str] = ('spread_bps', 'volume_bid', 'volume_ask')
+    ) -> pd.DataFrame:
+        """
+        Снимки тикеров за период [start, end] (границы — дата/время UTC или None).
+
+        Возвращает:
+            pd.DataFrame: alias, ts (мс UTC) и запрошенные колонки, по (alias, ts)
+        """
+        unknown = [name for name in columns if name not in _REAL_COLUMNS + _TEXT_COLUMNS[1:]]
+        if unknown:
+            raise ValueError(f"Неизвестные колонки спредов: {unknown}")
+        where, params = [], []
+        if aliases is not None:
+            aliases = list(aliases)
+            where.append(f"alias IN ({', '.join('?' * len(aliases))})")
+            params.extend(aliases)
+        if start is not None:
+            where.append('ts >= ?')
+            params.append(int(_to_epoch_ms([start])[0]))
+        if end is not None:
+            where.append('ts <= ?')
+            params.append(int(_to_epoch_ms([end])[0]))
+        sql = f"SELECT alias, ts{''.join(', ' + name for name in columns)} FROM spreads"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        rows = self._conn.execute(sql + ' ORDER BY alias, ts', params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=['alias', 'ts', *columns])
+        df['ts'] = df['ts'].astype(np.int64)
+        return df
+
+    # ======================
+    # ПРОФИЛЬ
+    # ======================
+
+    def refresh_profile(self, bucket_minutes: int = DEFAULT_BUCKET_MINUTES) -> pd.DataFrame:
+        """Пересчитать профиль по всем снимкам и сохранить в spread_profile."""
+        if self.readonly:
+            raise PermissionError(f"Хранилище открыто только для чтения: {self.path}")
+        with self._lock:
+            version = self._meta('data_version')
+            profile = spread_profile(self.snapshots(), bucket_minutes=bucket_minutes)
+            names = ['alias', 'bucket', 'n', *_PROFILE_STATS]
+            rows = profile[names].astype(object).where(profile[names].notna(), None).itertuples(index=False)
+            with self._conn:
+                self._conn.execute('DELETE FROM spread_profile')
+                self._conn.executemany(
+                    f"INSERT INTO spread_profile ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    rows)
+                self._set_meta(profile_version=version, bucket_minutes=bucket_minutes)
+        return profile
+
+    def profile(self, bucket_minutes: Optional[int] = None) -> pd.DataFrame:
+        """
+        Профиль спреда из spread_profile.
+
+        Пересчитывается, если после прошлого расчёта вставлялись снимки или
+        запрошена другая ширина интервала. В режиме readonly читается
+        сохранённый профиль (он может отставать от последних вставок), а без
+        подходящего сохранённого профиля он считается в памяти.
+        """
+        stored_bucket = self._meta('bucket_minutes')
+        other_bucket = bucket_minutes is not None and str(bucket_minutes) != stored_bucket
+        stale = other_bucket or self._meta('profile_version') != self._meta('data_version')
+        if stale and not self.readonly:
+            return self.refresh_profile(bucket_minutes or int(stored_bucket or DEFAULT_BUCKET_MINUTES))
+        if other_bucket or stored_bucket is None:
+            return spread_profile(self.snapshots(), bucket_minutes=bucket_minutes or DEFAULT_BUCKET_MINUTES)
+        names = ['alias', 'bucket', 'n', *_PROFILE_STATS]
+        rows = self._conn.execute(f"SELECT {', '.join(names)} FROM spread_profile ORDER BY alias, bucket").fetchall()
+        profile = pd.DataFrame.from_records(rows, columns=names)
+        profile[list(_PROFILE_STATS)] = profile[list(_PROFILE_STATS)].astype(np.float64)
+        profile.attrs['bucket_minutes'] = int(stored_bucket or DEFAULT_BUCKET_MINUTES)
+        return profile
+
+    def slippage(self, at: Optional[str] = None, percentile: int = 50) -> Dict[str, float]:
+        """Проскальзывание по тикерам, bps (см. slippage_bps)."""
+        return slippage_bps(self.profile(), at=at, percentile=percentile)
+
+    def summary(self) -> Dict:
+        rows = self._conn.execute(
+            'SELECT alias, COUNT(*), MIN(ts), MAX(ts) FROM spreads GROUP BY alias ORDER BY alias').fetchall()
+        return {
+            'path': self.path,
+            'tickers': {
+                alias: {
+                    'snapshots': count,
+                    'first': pd.Timestamp(first, unit='ms', tz='UTC').isoformat(),
+                    'last': pd.Timestamp(last, unit='ms', tz='UTC').isoformat()
+                }
+                for alias, count, first, last in rows
+            }
+        }
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка:
+        python -m datastore.spread_store import <store.sqlite> <log.csv> [...]
+        python -m datastore.spread_store profile <store.sqlite> [bucket_minutes]
+        python -m datastore.spread_store slippage <store.sqlite> [HH:MM] [percentile]
+    """
+    if len(argv) < 2 or argv[0] not in ('import', 'profile', 'slippage') or (argv[0] == 'import' and len(argv) < 3):
+        print(_main.__doc__)
+        return 2
+    command, path = argv[0], argv[1]
+
+    if command == 'import':
+        with SpreadStore(path) as store:
+            for csv_path in argv[2:]:
+                added = store.import_csv(csv_path)
+                print(f"📥 {csv_path}: {added} новых снимков")
+            for alias, info in store.summary()['tickers'].items():
+                print(f"   {alias}: {info['snapshots']} снимков, {info['first'][:16]} — {info['last'][:16]}")
+        return 0
+
+    with SpreadStore(path) as store:
+        if command == 'profile':
+            bucket = int(argv[2]) if len(argv) > 2 else None
+            profile = store.profile(bucket)
+            view = profile.copy()
+            view['bucket'] = [
+                'весь день' if b == ALL_DAY else f"{b // 60:02d}:{b % 60:02d}" for b in view['bucket']
+            ]
+            print(f"📊 Профиль спреда, bps (интервал {profile.attrs['bucket_minutes']} мин, МСК):")
+            print(view.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+        else:
+            at = argv[2] if len(argv) > 2 else None
+            percentile = int(argv[3]) if len(argv) > 3 else 50
+            slip = store.slippage(at=at, percentile=percentile)
+            print(f"🎯 Проскальзывание (половина спреда p{percentile}"
+                  f"{', ' + at + ' МСК' if at else ', весь день'}), bps:")
+            for alias, value in slip.items():
+                print(f"   {alias}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
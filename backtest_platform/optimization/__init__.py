@@ -0,0 +1 @@
+"""Optimization module for backtesting platform."""
\ No newline at end of file
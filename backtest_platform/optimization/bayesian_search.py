@@ -0,0 +1,281 @@
+# backtest_platform/optimization/bayesian_search.py
+
+"""
+Последовательный модельно-ориентированный поиск (SMBO) по сетке параметров.
+
+Версия: 1.1.0
+Версия: 1.1.1 (случайные кандидаты — выбор без возвращения среди ещё не исключённых номеров)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Полная сетка param_grid из optimization_cfg.py содержит миллионы комбинаций,
+поэтому полный перебор невозможен. Режим search_mode='bayesian' в
+optimize_dual_momentum оценивает лишь заданный бюджет комбинаций из той же
+сетки, выбирая следующих кандидатов по суррогатной модели.
+
+СУРРОГАТНЫЕ МОДЕЛИ:
+  • 'forest' — ансамбль ExtraTreesRegressor (scikit-learn); среднее и разброс
+    предсказаний деревьев дают Expected Improvement для максимизации метрики
+  • 'tpe'    — Tree-structured Parzen Estimator: распределения значений каждого
+    параметра среди лучших (γ-квантиль) и остальных комбинаций; кандидаты
+    выбираются по отношению l(x)/g(x)
+
+Каждая итерация предлагает ПАКЕТ из batch_size кандидатов, который оценивается
+параллельно (n_jobs процессов через ComboEvaluator). Эквивалентные комбинации
+(optimization/canonical.py) не предлагаются повторно.
+
+Версия 1.1.0: пространство поиска — ParamGrid (optimization/param_grid.py);
+случайные кандидаты выбираются по номеру только среди допустимых комбинаций.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from optimization.canonical import canonicalize_params
+from optimization.evaluator import ComboEvaluator
+from optimization.param_grid import ParamGrid, as_param_grid
+
+__version__ = "1.1.1"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+_erf = np.vectorize(math.erf)
+
+
+def _is_numeric_axis(values: List) -> bool:
+    """Ось кодируется значением, если все значения числовые (bool → 0/1)."""
+    return all(isinstance(v, (int, float, bool, np.integer, np.floating)) for v in values)
+
+
+class _GridSpace:
+    """Сетка параметров как пространство поиска: случайный доступ и кодирование."""
+
+    def __init__(self, grid: ParamGrid):
+        self.grid = grid
+        self.keys = grid.keys
+        self.values = grid.values
+        self.sizes = grid.sizes
+        self.total = len(grid)
+        self.numeric = [_is_numeric_axis(v) for v in self.values]
+
+    def decode(self, index: int) -> Dict:
+        """Допустимая комбинация по номеру (ParamGrid.__getitem__)."""
+        return self.grid[index]
+
+    def from_positions(self, positions) -> Dict:
+        return {k: vals[p] for k, vals, p in zip(self.keys, self.values, positions)}
+
+    def encode(self, params: Dict) -> List[float]:
+        """Числовой вектор признаков для суррогатной модели."""
+        row = []
+        for key, values, numeric in zip(self.keys, self.values, self.numeric):
+            value = params[key]
+            row.append(float(value) if numeric else float(values.index(value)))
+        return row
+
+    def positions(self, params: Dict) -> List[int]:
+        return [values.index(params[key]) for key, values in zip(self.keys, self.values)]
+
+
+def _expected_improvement(mu: np.ndarray, sigma: np.ndarray, best: float, xi: float = 0.01) -> np.ndarray:
+    """Expected Improvement для задачи максимизации."""
+    sigma = np.maximum(sigma, 1e-12)
+    improvement = mu - best - xi
+    z = improvement / sigma
+    cdf = 0.5 * (1.0 + _erf(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+    return improvement * cdf + sigma * pdf
+
+
+def run_bayesian_search(
+    evaluator: ComboEvaluator,
+    param_grid: Union[Dict[str, List], ParamGrid],
+    is_valid: Optional[Callable[[Dict], bool]] = None,
+    progress_callback: Optional[Callable] = None,
+    n_trials: int = 100,
+    n_initial: int = 20,
+    batch_size: int = 4,
+    n_jobs: int = 1,
+    surrogate: str = 'forest',
+    n_candidates: int = 2000,
+    objective: str = 'sharpe',
+    gamma: float = 0.25,
+    random_state: Optional[int] = 42
+) -> Tuple[List[Dict], Dict]:
+    """
+    Модельно-ориентированный поиск лучшей комбинации в пределах бюджета.
+
+    Аргументы:
+        evaluator: оценщик комбинаций (данные, издержки, кэш)
+        param_grid: сетка значений или ParamGrid с ограничениями — пространство поиска
+        is_valid: дополнительный фильтр допустимых комбинаций
+        progress_callback: вызывается как (номер, бюджет, params, строка результата)
+        n_trials: бюджет — количество уникальных оценённых комбинаций
+        n_initial: случайных комбинаций до первого обучения суррогата
+        batch_size: кандидатов в одном пакете (оцениваются параллельно)
+        n_jobs: процессов для оценки пакета
+        surrogate: 'forest' (ExtraTrees + Expected Improvement) или 'tpe'
+        n_candidates: размер случайного пула кандидатов на итерацию
+        objective: максимизируемая метрика (колонка строки результата)
+        gamma: доля лучших наблюдений для TPE
+        random_state: зерно генератора случайных чисел
+
+    Возвращает:
+        (строки результатов, статистика {'evaluated', 'errors', 'rejected_invalid', 'iterations'})
+    """
+    if surrogate not in ('forest', 'tpe'):
+        raise ValueError(f"Неизвестная суррогатная модель: {surrogate} (допустимо: 'forest', 'tpe')")
+
+    space = _GridSpace(as_param_grid(param_grid))
+    rng = np.random.default_rng(random_state)
+    is_valid = is_valid or (lambda params: True)
+    budget = min(n_trials, space.total)
+
+    seen = set()            # канонические ключи уже предложенных комбинаций
+    spent = set()           # номера сетки, исключённые навсегда (оценены, недопустимы, дубликаты)
+    rows: List[Dict] = []
+    X: List[List[float]] = []
+    y: List[float] = []
+    observed_positions: List[List[int]] = []
+    stats = {'evaluated': 0, 'errors': 0, 'rejected_invalid': 0, 'iterations': 0}
+
+    def canonical(params):
+        return tuple(canonicalize_params(params, evaluator.has_rvi).items())
+
+    def accept(params, batch_keys, index: Optional[int] = None) -> bool:
+        # Кандидаты TPE собираются по осям независимо и могут нарушать ограничения сетки
+        if not space.grid.is_feasible(params) or not is_valid(params):
+            stats['rejected_invalid'] += 1
+            if index is not None:
+                spent.add(index)
+            return False
+        key = canonical(params)
+        if key in seen:
+            if index is not None:
+                spent.add(index)
+            return False
+        if key in batch_keys:
+            return False
+        batch_keys.add(key)
+        return True
+
+    def random_candidates(n: int) -> List[Dict]:
+        """Случайные допустимые и ещё не оценённые комбинации (выбор без возвращения)."""
+        found, keys, tried = [], set(), set()
+        while len(found) < n:
+            excluded = len(spent) + len(tried)
+            if excluded >= space.total:
+                break  # пространство исчерпано
+            if space.total - excluded <= 4 * n or excluded >= space.total // 2:
+                # Осталось немного: перестановка всех неисключённых номеров
+                mask = np.ones(space.total, dtype=bool)
+                mask[list(spent | tried)] = False
+                order = rng.permutation(np.flatnonzero(mask))
+            else:
+                order = rng.integers(0, space.total, size=4 * n)
+            for index in map(int, order):
+                if index in spent or index in tried:
+                    continue
+                tried.add(index)
+                params = space.decode(index)
+                if accept(params, keys, index):
+                    found.append(params)
+                    if len(found) >= n:
+                        break
+        return found
+
+    def tpe_candidates(n: int) -> List[Dict]:
+        """Кандидаты из распределения лучших наблюдений l(x) и их оценка log l(x) − log g(x)."""
+        order = np.argsort(y)[::-1]
+        n_good = max(1, int(math.ceil(gamma * len(y))))
+        good = [observed_positions[i] for i in order[:n_good]]
+        bad = [observed_positions[i] for i in order[n_good:]] or good
+
+        log_ratio = []
+        l_probs = []
+        for axis, size in enumerate(space.sizes):
+            l_counts = np.bincount([p[axis] for p in good], minlength=size) + 1.0
+            g_counts = np.bincount([p[axis] for p in bad], minlength=size) + 1.0
+            l_p = l_counts / l_counts.sum()
+            g_p = g_counts / g_counts.sum()
+            l_probs.append(l_p)
+            log_ratio.append(np.log(l_p) - np.log(g_p))
+
+        sampled = np.column_stack([
+            rng.choice(size, size=4 * n, p=l_probs[axis])
+            for axis, size in enumerate(space.sizes)
+        ])
+        found, keys, scores = [], set(), []
+        for positions in sampled:
+            params = space.from_positions(positions)
+            if accept(params, keys):
+                found.append(params)
+                scores.append(sum(log_ratio[axis][p] for axis, p in enumerate(positions)))
+                if len(found) >= n:
+                    break
+        return [found[i] for i in np.argsort(scores)[::-1]]
+
+    def forest_candidates(n: int) -> List[Dict]:
+        """Случайный пул, упорядоченный по Expected Improvement суррогата ExtraTrees."""
+        from sklearn.ensemble import ExtraTreesRegressor
+
+        pool = random_candidates(n_candidates)
+        if not pool:
+            return []
+        model = ExtraTreesRegressor(
+            n_estimators=100,
+            min_samples_leaf=2,
+            random_state=random_state,
+            n_jobs=1
+        )
+        model.fit(np.asarray(X), np.asarray(y))
+        features = np.asarray([space.encode(p) for p in pool])
+        per_tree = np.stack([tree.predict(features) for tree in model.estimators_])
+        ei = _expected_improvement(per_tree.mean(axis=0), per_tree.std(axis=0), max(y))
+        return [pool[i] for i in np.argsort(ei)[::-1][:n]]
+
+    def evaluate_batch(batch: List[Dict]) -> None:
+        outcomes = evaluator.evaluate_many(batch, n_jobs=n_jobs)
+        for params, outcome in zip(batch, outcomes):
+            seen.add(canonical(params))
+            spent.add(space.grid.index_of(params))
+            stats['evaluated'] += 1
+            if isinstance(outcome, Exception):
+                stats['errors'] += 1
+                continue
+            row = evaluator.build_row(params, outcome)
+            row['search_iteration'] = stats['iterations']
+            rows.append(row)
+            value = row.get(objective)
+            if value is not None and np.isfinite(value):
+                X.append(space.encode(params))
+                y.append(float(value))
+                observed_positions.append(space.positions(params))
+            if progress_callback:
+                progress_callback(stats['evaluated'], budget, params, row)
+
+    # === НАЧАЛЬНЫЙ СЛУЧАЙНЫЙ ДИЗАЙН ===
+    initial = random_candidates(min(max(n_initial, 2), budget))
+    if initial:
+        evaluate_batch(initial)
+
+    # === ПОСЛЕДОВАТЕЛЬНЫЕ ПАКЕТЫ ПО СУРРОГАТУ ===
+    while stats['evaluated'] < budget:
+        stats['iterations'] += 1
+        n = min(batch_size, budget - stats['evaluated'])
+        if len(y) < 2:
+            batch = random_candidates(n)
+        elif surrogate == 'tpe':
+            batch = tpe_candidates(n)
+        else:
+            batch = forest_candidates(n)
+        if not batch:
+            batch = random_candidates(n)
+        if not batch:
+            break  # пространство исчерпано
+        evaluate_batch(batch)
+
+    return rows, stats
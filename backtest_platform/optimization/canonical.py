@@ -0,0 +1,136 @@
+# backtest_platform/optimization/canonical.py
+
+"""
+Канонизация параметров стратегии Dual Momentum для дедупликации сетки оптимизации.
+
+Версия: 1.0.0
+Версия: 1.1.0 (STRATEGY_PARAMS — параметры конструктора стратегии, общие для конвейера и анализа плато)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Многие комбинации полной сетки param_grid поведенчески идентичны: часть параметров
+не влияет на результат бэктеста при определённых значениях других параметров.
+Модуль приводит каждую комбинацию к её ЭФФЕКТИВНОМУ (каноническому) набору,
+чтобы оптимизатор запускал бэктест один раз на каждый канонический набор и
+размножал результат на все эквивалентные строки.
+
+ПРАВИЛА ЭКВИВАЛЕНТНОСТИ (соответствуют DualMomentumStrategy v1.2.1):
+  • market_vol_window=None → base_vol_window; market_vol_threshold=None → max_vol_threshold
+  • rvi_data отсутствует → уровень RVI всегда 'medium', выход по RVI невозможен:
+    все пороги и множители RVI не влияют на результат
+  • use_rvi_adaptation=False → множители не применяются; rvi_low/medium_threshold
+    влияют только на диагностику rvi_low_days (не входит в строки оптимизатора)
+  • use_rvi_adaptation=True → trend_window игнорируется (окно тренда = lookback × 0.7)
+  • use_trend_filter=False → trend_window и trend_filter_on_insufficient_data не используются
+  • bare_mode=True → фильтры волатильности и тренда активов не используются
+  • debug не влияет на результат
+"""
+
+import inspect
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from strategies.dual_momentum import DualMomentumStrategy
+from optimization.param_grid import ParamGrid, as_param_grid
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+# Параметры конструктора DualMomentumStrategy — всё остальное в таблицах результатов не параметры
+STRATEGY_PARAMS = tuple(
+    name for name in inspect.signature(DualMomentumStrategy.__init__).parameters if name != 'self'
+)
+
+# Параметры стратегии, определяющие поведение бэктеста (debug исключён)
+BEHAVIOUR_FIELDS = (
+    'base_lookback', 'base_vol_window', 'market_vol_window',
+    'max_vol_threshold', 'market_vol_threshold', 'risk_free_ticker',
+    'use_rvi_adaptation', 'bare_mode',
+    'rvi_high_exit_threshold', 'rvi_low_threshold', 'rvi_medium_threshold',
+    'rvi_low_multiplier', 'rvi_high_multiplier',
+    'use_trend_filter', 'trend_window', 'trend_filter_on_insufficient_data'
+)
+
+RVI_FIELDS = (
+    'rvi_high_exit_threshold', 'rvi_low_threshold', 'rvi_medium_threshold',
+    'rvi_low_multiplier', 'rvi_high_multiplier'
+)
+
+
+def canonicalize_params(params: Dict, has_rvi: bool) -> Dict:
+    """
+    Приводит комбинацию параметров к эффективному каноническому набору.
+
+    Значения по умолчанию и подстановки (market_vol_window, market_vol_threshold)
+    разрешаются через сам конструктор DualMomentumStrategy, чтобы правила не
+    расходились со стратегией. Параметры, не влияющие на результат, заменяются на None.
+
+    Аргументы:
+        params: комбинация параметров из сетки (аргументы DualMomentumStrategy)
+        has_rvi: передаются ли в бэктест данные RVI (rvi_data is not None)
+
+    Возвращает:
+        Словарь {параметр: эффективное значение или None} по BEHAVIOUR_FIELDS
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        strategy = DualMomentumStrategy(**params)
+
+    canonical = {field: getattr(strategy, field) for field in BEHAVIOUR_FIELDS}
+
+    if not has_rvi:
+        for field in RVI_FIELDS:
+            canonical[field] = None
+    elif not canonical['use_rvi_adaptation']:
+        for field in ('rvi_low_threshold', 'rvi_medium_threshold',
+                      'rvi_low_multiplier', 'rvi_high_multiplier'):
+            canonical[field] = None
+
+    if canonical['bare_mode']:
+        for field in ('base_vol_window', 'max_vol_threshold', 'use_trend_filter',
+                      'trend_window', 'trend_filter_on_insufficient_data'):
+            canonical[field] = None
+    else:
+        if canonical['use_rvi_adaptation']:
+            canonical['trend_window'] = None
+        if not canonical['use_trend_filter']:
+            canonical['trend_window'] = None
+            canonical['trend_filter_on_insufficient_data'] = None
+
+    return canonical
+
+
+def canonical_key(params: Dict, has_rvi: bool) -> Tuple:
+    """Хешируемый ключ канонического набора (для группировки эквивалентных комбинаций)."""
+    canonical = canonicalize_params(params, has_rvi)
+    return tuple((field, canonical[field]) for field in BEHAVIOUR_FIELDS)
+
+
+def unique_combinations(
+    param_grid: Union[Dict[str, List], ParamGrid],
+    has_rvi: bool,
+    is_valid: Optional[Callable[[Dict], bool]] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Допустимые комбинации сетки, по одной на каждый канонический набор.
+
+    Возвращает:
+        (комбинации в порядке перебора сетки, {'rejected_invalid': N, 'duplicates': N};
+         rejected_invalid учитывает только is_valid — ограничения ParamGrid отсекаются при генерации)
+    """
+    combos: List[Dict] = []
+    seen = set()
+    stats = {'rejected_invalid': 0, 'duplicates': 0}
+    for params in as_param_grid(param_grid):
+        if is_valid is not None and not is_valid(params):
+            stats['rejected_invalid'] += 1
+            continue
+        key = canonical_key(params, has_rvi)
+        if key in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(key)
+        combos.append(params)
+    return combos, stats
@@ -0,0 +1,513 @@
+# backtest_platform/optimization/daemon.py
+
+"""
+Долгоживущий сервис оптимизации: данные, признаки и пул процессов в памяти.
+
+Версия: 1.0.0
+Версия: 1.1.0 (проскальзывание проекта — профиль спреда при заданном config.spread_slippage_store)
+Версия: 1.2.0 (reload сбрасывает каталоги процесса — данные действительно читаются с диска)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Каждый запуск stepwise_optimization4.py заново читает CSV, собирает DataFrame
+и считает индикаторы — до первой комбинации шага проходят секунды и минуты.
+Сервис делает это один раз при старте и держит в памяти:
+  • данные по активам, рыночный индекс и RVI
+  • ComboEvaluator с быстрым движком: кэш признаков FeatureCache, маски
+    фильтров и память выбора актива живут между заданиями
+  • прогретый пул процессов (признаки построены в каждом процессе)
+  • память дедупликации — повторное задание с пересекающейся сеткой берёт
+    уже посчитанные комбинации из памяти
+
+ПРОТОКОЛ:
+TCP на 127.0.0.1, JSON Lines: запрос — одна строка {"cmd": ...}, ответ —
+поток событий, последнее из которых 'done' или 'error':
+  {"cmd": "ping"}                          → {"event": "done", "pong": true}
+  {"cmd": "status"}                        → {"event": "done", "status": {...}}
+  {"cmd": "grid", "param_grid": {...}}     → start, rows (пакетами), done
+  {"cmd": "reload"}                        → перечитать данные с диска
+  {"cmd": "clear"}                         → сбросить память дедупликации
+  {"cmd": "shutdown"}                      → остановить сервис
+Задания выполняются по одному; параллельный клиент ждёт своей очереди.
+
+ЗАПУСК:
+    cd backtest_platform
+    python -m optimization.daemon serve [port] [n_jobs]
+    python -m optimization.daemon grid step.json [port]
+    python -m optimization.daemon status|reload|clear|stop [port]
+
+Из кода: OptimizationClient().run_grid(param_grid) → DataFrame по убыванию Sharpe.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Запуск командой python -m: стратегии импортируются как backtest_platform.*
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from datastore.catalog import clear_catalogs
+from optimization.evaluator import ComboEvaluator
+from optimization.result_cache import ResultCache
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Настройки издержек, которые задание может переопределить
+COST_SETTINGS = ('commission', 'default_commission', 'slippage', 'use_slippage', 'initial_capital')
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, default=_json_default, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class OptimizationService:
+    """
+    Данные и оценщик, загруженные один раз и переиспользуемые между заданиями.
+
+    Аргументы:
+        loader: функция без аргументов → (data_dict, market_data, rvi_data)
+        n_jobs: размер пула процессов (1 — оценка в процессе сервиса)
+        engine: движок бэктеста ('fast' — признаки считаются один раз на процесс)
+        trade_time_filter, result_cache, **costs: как у optimize_dual_momentum
+
+    Пример:
+        service = OptimizationService(load_all_data, n_jobs=4, commission=0.001)
+        for event in service.run_grid({'base_lookback': [20, 30], ...}):
+            ...
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Tuple[Dict[str, pd.DataFrame], pd.DataFrame, Optional[pd.DataFrame]]],
+        n_jobs: int = 1,
+        engine: str = 'fast',
+        trade_time_filter: Optional[str] = None,
+        result_cache: Optional[ResultCache] = None,
+        **costs
+    ):
+        unknown = set(costs) - set(COST_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные настройки издержек: {', '.join(sorted(unknown))}")
+        self.loader = loader
+        self.n_jobs = n_jobs
+        self.engine = engine
+        self.trade_time_filter = trade_time_filter
+        self.result_cache = result_cache
+        self.costs = costs
+
+        self.lock = threading.Lock()   # задания выполняются по одному
+        self.jobs_done = 0
+        self.current_job: Optional[Dict] = None
+        self.evaluator: Optional[ComboEvaluator] = None
+        self._evaluator_costs: Optional[Dict] = None
+        self.warm_workers = 0
+        self.load()
+
+    # ======================
+    # ДАННЫЕ И ОЦЕНЩИК
+    # ======================
+
+    def load(self) -> None:
+        """Загрузка данных и прогрев оценщика (при старте и по команде reload)."""
+        started = time.perf_counter()
+        self.data_dict, self.market_data, self.rvi_data = self.loader()
+        self.loaded_at = time.time()
+        self._set_evaluator(self.costs)
+        self.load_seconds = time.perf_counter() - started
+        print(f"🔥 Сервис готов: {len(self.data_dict)} активов, прогрето процессов {self.warm_workers} "
+              f"({self.load_seconds:.1f} с)")
+
+    def _set_evaluator(self, costs: Dict) -> ComboEvaluator:
+        if self.evaluator is not None:
+            if costs == self._evaluator_costs:
+                return self.evaluator
+            self.evaluator.close()
+        self.evaluator = ComboEvaluator(
+            self.data_dict,
+            self.market_data,
+            self.rvi_data,
+            trade_time_filter=self.trade_time_filter,
+            result_cache=self.result_cache,
+            engine=self.engine,
+            **costs
+        )
+        self._evaluator_costs = dict(costs)
+        self.warm_workers = self.evaluator.warm_up(self.n_jobs)
+        return self.evaluator
+
+    def close(self) -> None:
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
+
+    def status(self) -> Dict:
+        evaluator = self.evaluator
+        return {
+            'pid': os.getpid(),
+            'tickers': sorted(self.data_dict),
+            'rows': {ticker: len(df) for ticker, df in self.data_dict.items()},
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 3),
+            'engine': self.engine,
+            'n_jobs': self.n_jobs,
+            'warm_workers': self.warm_workers,
+            'jobs_done': self.jobs_done,
+            'current_job': self.current_job,
+            'runs': evaluator.runs if evaluator is not None else 0,
+            'reused': evaluator.reused if evaluator is not None else 0,
+            'memo_size': len(evaluator._memo) if evaluator is not None else 0,
+            'costs': self._evaluator_costs
+        }
+
+    # ======================
+    # ЗАДАНИЕ: ПЕРЕБОР СЕТКИ
+    # ======================
+
+    def run_grid(
+        self,
+        param_grid: Dict[str, List],
+        costs: Optional[Dict] = None,
+        skip_invalid_windows: bool = True,
+        chunk_size: int = 256
+    ) -> Iterator[Dict]:
+        """
+        Перебор сетки с потоковой выдачей строк.
+
+        Аргументы:
+            param_grid: {параметр: значения}
+            costs: переопределение настроек издержек сервиса на это задание
+            chunk_size: комбинаций в пакете (пакет распределяется по пулу)
+
+        Возвращает:
+            Итератор событий: start, rows (строки пакета), done (итоги задания)
+        """
+        from optimizer import build_param_grid
+
+        costs = {**self.costs, **(costs or {})}
+        unknown = set(costs) - set(COST_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные настройки издержек: {', '.join(sorted(unknown))}")
+
+        started = time.perf_counter()
+        evaluator = self._set_evaluator(costs)
+        grid = build_param_grid(param_grid, skip_invalid_windows)
+        runs_before, reused_before = evaluator.runs, evaluator.reused
+        total = len(grid)
+        self.current_job = {'total': total, 'done': 0, 'started': time.time()}
+        yield {'event': 'start', 'total': total, 'grid_total': grid.total}
+
+        done = rows_count = errors = 0
+        error_samples: List[str] = []
+        for start in range(0, total, chunk_size):
+            params_list = list(grid.iter_range(start, min(start + chunk_size, total)))
+            outcomes = evaluator.evaluate_many(params_list, n_jobs=self.n_jobs)
+            rows = []
+            for params, outcome in zip(params_list, outcomes):
+                if isinstance(outcome, Exception):
+                    errors += 1
+                    if len(error_samples) < 5:
+                        error_samples.append(f"{type(outcome).__name__}: {outcome}")
+                    continue
+                rows.append(evaluator.build_row(params, outcome))
+            done += len(params_list)
+            rows_count += len(rows)
+            self.current_job['done'] = done
+            yield {'event': 'rows', 'done': done, 'rows': rows}
+
+        self.jobs_done += 1
+        self.current_job = None
+        yield {
+            'event': 'done',
+            'total': total,
+            'rows': rows_count,
+            'errors': errors,
+            'error_samples': error_samples,
+            'runs': evaluator.runs - runs_before,
+            'reused': evaluator.reused - reused_before,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def handle(self, request: Dict) -> Iterator[Dict]:
+        """Выполнение команды протокола → поток событий."""
+        command = request.get('cmd')
+        if command == 'ping':
+            yield {'event': 'done', 'pong': True}
+        elif command == 'status':
+            yield {'event': 'done', 'status': self.status()}
+        elif command in ('grid', 'reload', 'clear'):
+            with self.lock:
+                if command == 'grid':
+                    if not request.get('param_grid'):
+                        raise ValueError("Команда 'grid' требует непустой param_grid")
+                    yield from self.run_grid(
+                        request['param_grid'],
+                        costs=request.get('costs'),
+                        skip_invalid_windows=request.get('skip_invalid_windows', True),
+                        chunk_size=request.get('chunk_size', 256)
+                    )
+                elif command == 'reload':
+                    self.close()
+                    clear_catalogs()   # иначе get_catalog() вернёт таблицы прошлой загрузки
+                    self.load()
+                    yield {'event': 'done', 'status': self.status()}
+                else:
+                    self.evaluator.clear_memo()
+                    yield {'event': 'done', 'status': self.status()}
+        else:
+            raise ValueError(f"Неизвестная команда: {command} "
+                             "(допустимо: ping, status, grid, reload, clear, shutdown)")
+
+
+# ======================
+# TCP-СЕРВЕР
+# ======================
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service: OptimizationService = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if request.get('cmd') == 'shutdown':
+                    self.wfile.write(_encode({'event': 'done', 'stopping': True}))
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                for event in service.handle(request):
+                    self.wfile.write(_encode(event))
+            except (BrokenPipeError, ConnectionResetError):
+                return   # клиент отключился — задание прерывается на границе пакета
+            except Exception as e:
+                self.wfile.write(_encode({'event': 'error', 'message': f"{type(e).__name__}: {e}"}))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(service: OptimizationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Обслуживание клиентов до команды shutdown (или Ctrl+C)."""
+    with _Server((host, port), _RequestHandler) as server:
+        server.service = service
+        print(f"📡 Сервис оптимизации слушает {host}:{port} (остановка: python -m optimization.daemon stop {port})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
+    print("🛑 Сервис оптимизации остановлен")
+
+
+# ======================
+# КЛИЕНТ
+# ======================
+
+class OptimizationClient:
+    """
+    Клиент сервиса оптимизации.
+
+    Пример:
+        client = OptimizationClient()
+        if client.ping():
+            df = client.run_grid(temp_param_grid, on_rows=lambda done, total, rows: ...)
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def request(self, payload: Dict) -> Iterator[Dict]:
+        """Отправка команды → события ответа (ошибка сервиса → RuntimeError)."""
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(_encode(payload))
+            with sock.makefile('r', encoding='utf-8') as stream:
+                for line in stream:
+                    event = json.loads(line)
+                    if event['event'] == 'error':
+                        raise RuntimeError(f"Сервис оптимизации: {event['message']}")
+                    yield event
+                    if event['event'] == 'done':
+                        return
+        raise ConnectionError("Сервис оптимизации закрыл соединение до завершения ответа")
+
+    def _call(self, payload: Dict) -> Dict:
+        for event in self.request(payload):
+            if event['event'] == 'done':
+                return event
+        return {}
+
+    def ping(self) -> bool:
+        """Сервис запущен и отвечает."""
+        try:
+            return bool(OptimizationClient(self.host, self.port, timeout=1.0)._call({'cmd': 'ping'}).get('pong'))
+        except OSError:
+            return False
+
+    def status(self) -> Dict:
+        return self._call({'cmd': 'status'})['status']
+
+    def reload(self) -> Dict:
+        return self._call({'cmd': 'reload'})['status']
+
+    def clear(self) -> Dict:
+        return self._call({'cmd': 'clear'})['status']
+
+    def shutdown(self) -> None:
+        self._call({'cmd': 'shutdown'})
+
+    def run_grid(
+        self,
+        param_grid: Dict[str, List],
+        on_rows: Optional[Callable[[int, int, List[Dict]], None]] = None,
+        costs: Optional[Dict] = None,
+        skip_invalid_windows: bool = True,
+        chunk_size: int = 256
+    ) -> pd.DataFrame:
+        """
+        Перебор сетки на сервисе.
+
+        Аргументы:
+            on_rows: вызывается на каждый пакет (готово, всего, строки пакета)
+
+        Возвращает:
+            pd.DataFrame, отсортированный по Sharpe (итоги задания — в df.attrs['job'])
+        """
+        payload = {
+            'cmd': 'grid',
+            'param_grid': {key: list(values) for key, values in param_grid.items()},
+            'costs': costs,
+            'skip_invalid_windows': skip_invalid_windows,
+            'chunk_size': chunk_size
+        }
+        rows: List[Dict] = []
+        total = 0
+        summary: Dict = {}
+        for event in self.request(payload):
+            if event['event'] == 'start':
+                total = event['total']
+            elif event['event'] == 'rows':
+                rows.extend(event['rows'])
+                if on_rows is not None:
+                    on_rows(event['done'], total, event['rows'])
+            elif event['event'] == 'done':
+                summary = event
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df = df.sort_values('sharpe', ascending=False).reset_index(drop=True)
+        df.attrs['job'] = summary
+        return df
+
+
+# ======================
+# КОМАНДНАЯ СТРОКА
+# ======================
+
+def _project_service(n_jobs: int) -> OptimizationService:
+    """Сервис с данными и издержками проекта (как stepwise_optimization4.py + optimize_dual_momentum)."""
+    from config import (
+        cache_dir, result_cache_max_mb, commission, default_commission,
+        slippage, use_slippage, initial_capital,
+        trading_start_time, time_filter_enabled
+    )
+    from datastore.spread_store import configured_slippage
+    from stepwise_optimization4 import load_all_data
+
+    initial = [load_all_data()]
+
+    def loader():
+        # Первая загрузка нужна до создания сервиса (фильтр времени), reload читает диск заново
+        return initial.pop() if initial else load_all_data()
+
+    first = next(iter(initial[0][0].values()))
+    has_time = first['TRADEDATE'].iloc[0].time() != pd.Timestamp('00:00:00').time()
+    cache = ResultCache(os.path.join(project_root, cache_dir), max_size_mb=result_cache_max_mb)
+    return OptimizationService(
+        loader,
+        n_jobs=n_jobs,
+        trade_time_filter=trading_start_time if has_time and time_filter_enabled else None,
+        result_cache=cache,
+        commission=commission,
+        default_commission=default_commission,
+        slippage=configured_slippage(slippage, tickers=list(initial[0][0])),
+        use_slippage=use_slippage,
+        initial_capital=initial_capital
+    )
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка:
+        python -m optimization.daemon serve [port] [n_jobs]
+        python -m optimization.daemon grid <param_grid.json> [port]
+        python -m optimization.daemon status|reload|clear|stop [port]
+    """
+    commands = ('serve', 'grid', 'status', 'reload', 'clear', 'stop')
+    if not argv or argv[0] not in commands or (argv[0] == 'grid' and len(argv) < 2):
+        print(_main.__doc__)
+        return 2
+    command = argv[0]
+
+    if command == 'serve':
+        port = int(argv[1]) if len(argv) > 1 else DEFAULT_PORT
+        n_jobs = int(argv[2]) if len(argv) > 2 else max(1, (os.cpu_count() or 2) - 1)
+        serve(_project_service(n_jobs), port=port)
+        return 0
+
+    if command == 'grid':
+        with open(argv[1], encoding='utf-8') as f:
+            param_grid = json.load(f)
+        client = OptimizationClient(port=int(argv[2]) if len(argv) > 2 else DEFAULT_PORT)
+        df = client.run_grid(
+            param_grid,
+            on_rows=lambda done, total, rows: print(f"   📦 {done:,}/{total:,}", flush=True)
+        )
+        job = df.attrs['job']
+        print(f"✅ Комбинаций {job['total']:,}: бэктестов {job['runs']:,}, из памяти {job['reused']:,}, "
+              f"ошибок {job['errors']:,} ({job['seconds']:.2f} с)")
+        if not df.empty:
+            print(df.head(10).to_string(index=False))
+        return 0
+
+    client = OptimizationClient(port=int(argv[1]) if len(argv) > 1 else DEFAULT_PORT)
+    if not client.ping():
+        print(f"❌ Сервис не отвечает на {client.host}:{client.port}")
+        return 1
+    if command == 'stop':
+        client.shutdown()
+        print("🛑 Команда остановки отправлена")
+    else:
+        status = getattr(client, command)()
+        print(json.dumps(status, ensure_ascii=False, indent=2, default=_json_default))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
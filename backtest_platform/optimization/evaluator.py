@@ -0,0 +1,567 @@
+# backtest_platform/optimization/evaluator.py
+
+"""
+Оценщик комбинаций параметров Dual Momentum — общий для всех режимов оптимизации.
+
+Версия: 1.4.0
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Инкапсулирует прогон бэктеста одной комбинации вместе с оптимизациями,
+которые должны работать одинаково в полном переборе и в поисковых режимах:
+  • дедупликация эквивалентных комбинаций (optimization/canonical.py)
+  • персистентный кэш результатов (optimization/result_cache.py)
+  • параллельная оценка пакета комбинаций в пуле процессов
+
+Данные передаются в процессы пула ОДИН раз (через initializer), дальше
+в задачи уходят только словари параметров.
+
+ВЕРСИЯ 1.1.0:
+  • engine='fast' — прогон через векторизованный FastBacktester
+    (optimization/fast_backtester.py); результаты совпадают с Backtester.run()
+  • evaluate_fidelity() — оценка на отрезке истории / прореженных датах
+    для многоуровневых режимов (successive halving); в кэш не сохраняется
+
+ВЕРСИЯ 1.2.0:
+  • monitor (optimization/instrumentation.py) — каждая оценка учитывается с
+    источником результата (бэктест / память / кэш), временем фаз «сигналы» и
+    «симуляция» и номером процесса пула
+
+ВЕРСИЯ 1.3.0:
+  • warm_up() — пул процессов запускается заранее, признаки быстрого движка
+    строятся в каждом процессе до первого задания (долгоживущий сервис
+    optimization/daemon.py); clear_memo() — сброс памяти дедупликации
+
+ВЕРСИЯ 1.4.0:
+  • selection_stats() учитывает память выбора актива быстрого движка во всех
+    процессах пула: задания пула возвращают прирост счётчиков вместе с результатом
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from core.backtester import Backtester
+from strategies.dual_momentum import DualMomentumStrategy
+from optimization.canonical import canonicalize_params
+from optimization.result_cache import ResultCache, fingerprint_inputs
+from optimization.features import FeatureCache
+from optimization.fast_backtester import FastBacktester
+from optimization.instrumentation import RunMonitor
+
+__version__ = "1.4.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+# Диагностические поля стратегии, сохраняемые в строке результата
+STRATEGY_ROW_FIELDS = (
+    'rvi_low_multiplier', 'rvi_high_multiplier',
+    'rvi_low_threshold', 'rvi_medium_threshold', 'rvi_high_exit_threshold',
+    'use_rvi_adaptation', 'use_trend_filter'
+)
+
+ENGINES = ('backtester', 'fast')
+
+
+def extract_metrics(res: Dict) -> Dict:
+    """Извлечение метрик и диагностических полей из результата Backtester.run()."""
+    return {
+        'used_market_vol_window': res.get('used_market_vol_window', None),
+        'total_trades': res.get('total_trades', None),
+        'time_in_cash_pct': res.get('time_in_cash_pct', None),
+        'final_value': res['final_value'],
+        'cagr': res['cagr'],
+        'sharpe': res['sharpe'],
+        'max_drawdown': res['max_drawdown'],
+        'calmar': res.get('calmar', None),
+        'sortino': res.get('sortino', None),
+        'volatility': res.get('volatility', None)
+    }
+
+
+# ======================
+# ПУЛ ПРОЦЕССОВ
+# ======================
+
+_WORKER_EVALUATOR = None
+
+
+def _selection_counts(evaluator: 'ComboEvaluator'):
+    """Счётчики памяти выбора актива быстрого движка (попадания, расчёты)."""
+    fast = evaluator._fast
+    return (fast.selection_hits, fast.selection_misses) if fast is not None else (0, 0)
+
+
+def _with_selection_delta(run, *args, **kwargs):
+    """Вызов в процессе пула → (результат, прирост счётчиков памяти выбора актива)."""
+    hits, misses = _selection_counts(_WORKER_EVALUATOR)
+    try:
+        outcome = run(*args, **kwargs)
+    except Exception as e:
+        outcome = e
+    hits_after, misses_after = _selection_counts(_WORKER_EVALUATOR)
+    return outcome, (hits_after - hits, misses_after - misses)
+
+
+def _init_worker(evaluator: 'ComboEvaluator') -> None:
+    """Инициализация процесса пула: данные загружаются один раз на процесс."""
+    global _WORKER_EVALUATOR
+    _WORKER_EVALUATOR = evaluator
+
+
+def _worker_run(params: Dict):
+    """Прогон бэктеста в процессе пула; исключение возвращается как значение."""
+    return _with_selection_delta(_WORKER_EVALUATOR.run_backtest, params)
+
+
+def _worker_run_fidelity(task):
+    """Прогон на неполной истории в процессе пула (params, start, stride)."""
+    params, start, stride = task
+    return _with_selection_delta(_WORKER_EVALUATOR.run_fidelity, params, start=start, stride=stride)
+
+
+def _worker_run_timed(params: Dict):
+    """Прогон с замером фаз в процессе пула → ((результат, замер), прирост счётчиков)."""
+    return _with_selection_delta(_WORKER_EVALUATOR.run_timed, params)
+
+
+def _worker_run_fidelity_timed(task):
+    """Прогон на неполной истории с замером фаз → ((результат, замер), прирост счётчиков)."""
+    params, start, stride = task
+    return _with_selection_delta(_WORKER_EVALUATOR.run_timed, params, start=start, stride=stride)
+
+
+def _worker_warm(_):
+    """Прогрев процесса пула: признаки быстрого движка строятся до первого задания."""
+    if _WORKER_EVALUATOR.engine == 'fast':
+        _WORKER_EVALUATOR.fast_engine()
+    time.sleep(0.05)   # задачи прогрева расходятся по разным процессам
+    return os.getpid()
+
+
+class ComboEvaluator:
+    """
+    Оценка комбинаций параметров с дедупликацией, кэшем и параллельным режимом.
+
+    Пример:
+        with ComboEvaluator(data, market_df, rvi_data, commission=0.001) as ev:
+            outcomes = ev.evaluate_many(list_of_params, n_jobs=4)
+            rows = [ev.build_row(p, o) for p, o in zip(list_of_params, outcomes)
+                    if not isinstance(o, Exception)]
+    """
+
+    def __init__(
+        self,
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: Optional[pd.DataFrame],
+        rvi_data: Optional[pd.DataFrame] = None,
+        commission=0.0,
+        default_commission: float = 0.0,
+        slippage=0.0,
+        use_slippage: bool = False,
+        initial_capital: float = 100_000,
+        trade_time_filter: Optional[str] = None,
+        deduplicate: bool = True,
+        result_cache: Optional[ResultCache] = None,
+        engine: str = 'backtester',
+        monitor: Optional[RunMonitor] = None
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный движок бэктеста: {engine} (допустимо: {', '.join(ENGINES)})")
+        self.data_dict = data_dict
+        self.market_data = market_data
+        self.rvi_data = rvi_data
+        self.commission = commission
+        self.default_commission = default_commission
+        self.slippage = slippage
+        self.use_slippage = use_slippage
+        self.initial_capital = initial_capital
+        self.trade_time_filter = trade_time_filter
+        self.deduplicate = deduplicate
+        self.result_cache = result_cache
+        self.engine = engine
+        self.monitor = monitor
+
+        self.has_rvi = rvi_data is not None
+        self.runs = 0           # фактически выполненные бэктесты
+        self.reused = 0         # результаты, взятые из памяти дедупликации
+        self._memo: Dict[tuple, object] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_size = 0
+        self._fast: Optional[FastBacktester] = None
+        self._pool_selection = [0, 0]   # попадания / расчёты памяти выбора актива в процессах пула
+
+        if result_cache is not None:
+            self._inputs_fp = fingerprint_inputs(data_dict, market_data, rvi_data)
+            self._cost_settings = {
+                'commission': commission,
+                'default_commission': default_commission,
+                'slippage': slippage,
+                'use_slippage': use_slippage,
+                'initial_capital': initial_capital,
+                'trade_time_filter': trade_time_filter
+            }
+
+    def __getstate__(self):
+        # В процессы пула уходят только данные и настройки, без памяти и пула
+        state = self.__dict__.copy()
+        state['_memo'] = {}
+        state['_pool'] = None
+        state['result_cache'] = None
+        state['monitor'] = None   # замеры возвращаются из процессов вместе с результатом
+        state['_fast'] = None   # признаки строятся заново в каждом процессе
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Остановка пула процессов (если был запущен)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_size = 0
+
+    # ======================
+    # ПРОГОН ОДНОЙ КОМБИНАЦИИ
+    # ======================
+
+    def fast_engine(self) -> FastBacktester:
+        """Векторизованный движок на общем кэше признаков (создаётся при первом вызове)."""
+        if self._fast is None:
+            features = FeatureCache(
+                self.data_dict,
+                self.market_data,
+                self.rvi_data,
+                trade_time_filter=self.trade_time_filter
+            )
+            self._fast = FastBacktester(
+                features,
+                commission=self.commission,
+                default_commission=self.default_commission,
+                slippage=self.slippage,
+                use_slippage=self.use_slippage,
+                initial_capital=self.initial_capital
+            )
+        return self._fast
+
+    def selection_stats(self) -> Optional[Dict]:
+        """
+        Статистика памяти выбора актива быстрого движка: попадания и расчёты
+        суммируются по текущему процессу и процессам пула; entries — записи в
+        памяти текущего процесса. None — быстрый движок нигде не работал.
+        """
+        pool_hits, pool_misses = self._pool_selection
+        if self._fast is None and pool_hits + pool_misses == 0:
+            return None
+        local_hits, local_misses = _selection_counts(self)
+        hits, misses = local_hits + pool_hits, local_misses + pool_misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'entries': len(self._fast._selection_memo) if self._fast is not None else 0,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+        }
+
+    def _from_pool(self, computed):
+        """Результаты заданий пула без счётчиков памяти выбора (счётчики суммируются)."""
+        for outcome, (hits, misses) in computed:
+            self._pool_selection[0] += hits
+            self._pool_selection[1] += misses
+            yield outcome
+
+    def run_backtest(self, params: Dict, phases: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Прогон бэктеста без кэшей. Исключения пробрасываются вызывающему коду.
+
+        phases: словарь, в который добавляется время фаз 'signals' (генерация сигналов)
+                и 'simulate' (симуляция портфеля); None — без замеров
+        """
+        if self.engine == 'fast':
+            if phases is None:
+                return extract_metrics(self.fast_engine().run(params))
+            return extract_metrics(self._run_fast_timed(params, phases))
+
+        strategy = DualMomentumStrategy(**params)
+        if phases is not None:
+            # Время generate_signal накапливается обёрткой метода экземпляра стратегии
+            signal_seconds = [0.0]
+            generate_signal = strategy.generate_signal
+
+            def timed_generate_signal(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return generate_signal(*args, **kwargs)
+                finally:
+                    signal_seconds[0] += time.perf_counter() - started
+
+            strategy.generate_signal = timed_generate_signal
+            run_started = time.perf_counter()
+
+        bt = Backtester(
+            commission=self.commission,
+            default_commission=self.default_commission,
+            slippage=self.slippage,
+            use_slippage=self.use_slippage,
+            trade_time_filter=self.trade_time_filter
+        )
+        res = bt.run(
+            strategy,
+            self.data_dict,
+            market_data=self.market_data,
+            rvi_data=self.rvi_data,
+            initial_capital=self.initial_capital
+        )
+        if phases is not None:
+            total = time.perf_counter() - run_started
+            phases['signals'] = phases.get('signals', 0.0) + signal_seconds[0]
+            phases['simulate'] = phases.get('simulate', 0.0) + total - signal_seconds[0]
+        return extract_metrics(res)
+
+    def _run_fast_timed(self, params: Dict, phases: Dict[str, float], start: int = 0, stride: int = 1) -> Dict:
+        """Прогон быстрым движком с раздельным замером признаков, сигналов и симуляции."""
+        if self._fast is None:
+            started = time.perf_counter()
+            self.fast_engine()
+            phases['features'] = phases.get('features', 0.0) + time.perf_counter() - started
+        started = time.perf_counter()
+        signals = self._fast.signals(params)
+        middle = time.perf_counter()
+        res = self._fast.simulate(signals, start=start, stride=stride)
+        phases['signals'] = phases.get('signals', 0.0) + middle - started
+        phases['simulate'] = phases.get('simulate', 0.0) + time.perf_counter() - middle
+        return res
+
+    def run_timed(self, params: Dict, start: Optional[int] = None, stride: int = 1):
+        """
+        Прогон с замером для монитора.
+
+        Аргументы:
+            start: None — полный прогон выбранным движком; иначе отрезок [start:]
+                   с шагом stride быстрым движком (как run_fidelity)
+
+        Возвращает:
+            (метрики или объект исключения, {'worker': pid, 'seconds', 'phases'})
+        """
+        phases: Dict[str, float] = {}
+        started = time.perf_counter()
+        try:
+            if start is None:
+                outcome = self.run_backtest(params, phases=phases)
+            else:
+                outcome = extract_metrics(self._run_fast_timed(params, phases, start=start, stride=stride))
+        except Exception as e:
+            outcome = e
+        timing = {'worker': os.getpid(), 'seconds': time.perf_counter() - started, 'phases': phases}
+        return outcome, timing
+
+    def _record(self, source: str, outcome, timing: Optional[Dict] = None, count: int = 1) -> None:
+        if self.monitor is not None and count > 0:
+            self.monitor.record(source, error=isinstance(outcome, Exception), timing=timing, count=count)
+
+    def _lookup(self, params: Dict):
+        """
+        Поиск готового результата в памяти дедупликации и кэше.
+
+        Возвращает:
+            (ключ дедупликации, ключ кэша, результат или None, источник 'memo' | 'cache' | None)
+        """
+        if not self.deduplicate and self.result_cache is None:
+            return None, None, None, None
+
+        canonical = canonicalize_params(params, self.has_rvi)
+        memo_key = tuple(canonical.items()) if self.deduplicate else None
+        if memo_key is not None and memo_key in self._memo:
+            self.reused += 1
+            return memo_key, None, self._memo[memo_key], 'memo'
+
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key(self._inputs_fp, canonical, self._cost_settings)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                if memo_key is not None:
+                    self._memo[memo_key] = cached
+                return memo_key, cache_key, cached, 'cache'
+        return memo_key, cache_key, None, None
+
+    def _store(self, memo_key, cache_key, outcome) -> None:
+        self.runs += 1
+        if memo_key is not None:
+            self._memo[memo_key] = outcome
+        if cache_key is not None and not isinstance(outcome, Exception):
+            self.result_cache.put(cache_key, outcome)
+
+    def evaluate(self, params: Dict):
+        """
+        Оценка одной комбинации.
+
+        Возвращает:
+            Словарь метрик или объект исключения, если бэктест завершился ошибкой
+        """
+        memo_key, cache_key, outcome, source = self._lookup(params)
+        if outcome is not None:
+            self._record(source, outcome)
+            return outcome
+        timing = None
+        if self.monitor is not None:
+            outcome, timing = self.run_timed(params)
+        else:
+            try:
+                outcome = self.run_backtest(params)
+            except Exception as e:
+                outcome = e
+        self._store(memo_key, cache_key, outcome)
+        self._record('run', outcome, timing)
+        return outcome
+
+    # ======================
+    # ПАКЕТНАЯ ОЦЕНКА
+    # ======================
+
+    def warm_up(self, n_jobs: int = 1) -> int:
+        """
+        Подготовка к оценке без ожидания первого задания: признаки быстрого
+        движка в текущем процессе и (при n_jobs > 1) запущенный пул процессов
+        с построенными признаками.
+
+        Возвращает:
+            Число прогретых процессов пула (0 — пул не используется)
+        """
+        if self.engine == 'fast':
+            self.fast_engine()
+        if n_jobs <= 1:
+            return 0
+        pool = self._get_pool(n_jobs)
+        return len(set(pool.map(_worker_warm, range(n_jobs * 2))))
+
+    def clear_memo(self) -> None:
+        """Сброс памяти дедупликации (например, после изменения данных)."""
+        self._memo.clear()
+
+    def _get_pool(self, n_jobs: int) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_size != n_jobs:
+            self.close()
+            self._pool = ProcessPoolExecutor(
+                max_workers=n_jobs,
+                initializer=_init_worker,
+                initargs=(self,)
+            )
+            self._pool_size = n_jobs
+        return self._pool
+
+    def evaluate_many(self, params_list: List[Dict], n_jobs: int = 1) -> List:
+        """
+        Оценка пакета комбинаций (порядок результатов совпадает с params_list).
+
+        Эквивалентные комбинации внутри пакета считаются один раз; при n_jobs > 1
+        уникальные прогоны распределяются по пулу процессов.
+        """
+        outcomes: List = [None] * len(params_list)
+        pending: Dict = {}   # ключ прогона → (memo_key, cache_key, params, [позиции])
+
+        for pos, params in enumerate(params_list):
+            memo_key, cache_key, outcome, source = self._lookup(params)
+            if outcome is not None:
+                outcomes[pos] = outcome
+                self._record(source, outcome)
+                continue
+            run_key = memo_key if memo_key is not None else ('#', pos)
+            if run_key in pending:
+                pending[run_key][3].append(pos)
+                self.reused += 1
+            else:
+                pending[run_key] = (memo_key, cache_key, params, [pos])
+
+        jobs = list(pending.values())
+        timed = self.monitor is not None
+        if n_jobs > 1 and len(jobs) > 1:
+            pool = self._get_pool(n_jobs)
+            computed = self._from_pool(pool.map(_worker_run_timed if timed else _worker_run, [job[2] for job in jobs]))
+        elif timed:
+            computed = (self.run_timed(job[2]) for job in jobs)
+        else:
+            computed = []
+            for job in jobs:
+                try:
+                    computed.append(self.run_backtest(job[2]))
+                except Exception as e:
+                    computed.append(e)
+
+        # Результаты пула разбираются по мере готовности — монитор видит живую скорость
+        for (memo_key, cache_key, _, positions), outcome in zip(jobs, computed):
+            timing = None
+            if timed:
+                outcome, timing = outcome
+            self._store(memo_key, cache_key, outcome)
+            self._record('run', outcome, timing)
+            self._record('memo', outcome, count=len(positions) - 1)
+            for pos in positions:
+                outcomes[pos] = outcome
+        return outcomes
+
+    def run_fidelity(self, params: Dict, start: int = 0, stride: int = 1) -> Dict:
+        """Прогон на отрезке календаря [start:] с шагом stride (всегда быстрый движок)."""
+        return extract_metrics(self.fast_engine().run(params, start=start, stride=stride))
+
+    def evaluate_fidelity(
+        self,
+        params_list: List[Dict],
+        start: int = 0,
+        stride: int = 1,
+        n_jobs: int = 1
+    ) -> List:
+        """
+        Оценка пакета на неполной истории (порядок результатов совпадает с params_list).
+
+        Признаки считаются по всей истории один раз на процесс и переиспользуются
+        между уровнями точности. Результаты не сохраняются ни в память
+        дедупликации, ни в персистентный кэш — там хранятся только полные прогоны.
+        """
+        tasks = [(params, start, stride) for params in params_list]
+        if self.monitor is not None:
+            if n_jobs > 1 and len(tasks) > 1:
+                pool = self._get_pool(n_jobs)
+                chunksize = max(1, len(tasks) // (n_jobs * 4))
+                computed = self._from_pool(pool.map(_worker_run_fidelity_timed, tasks, chunksize=chunksize))
+            else:
+                computed = (self.run_timed(*task) for task in tasks)
+            outcomes = []
+            for outcome, timing in computed:
+                self._record('fidelity', outcome, timing)
+                outcomes.append(outcome)
+            return outcomes
+
+        if n_jobs > 1 and len(tasks) > 1:
+            pool = self._get_pool(n_jobs)
+            chunksize = max(1, len(tasks) // (n_jobs * 4))
+            return list(self._from_pool(pool.map(_worker_run_fidelity, tasks, chunksize=chunksize)))
+
+        outcomes = []
+        for task in tasks:
+            try:
+                outcomes.append(self.run_fidelity(*task))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    # ======================
+    # СТРОКА РЕЗУЛЬТАТА
+    # ======================
+
+    @staticmethod
+    def build_row(params: Dict, metrics: Dict) -> Dict:
+        """Строка результата оптимизации: параметры + поля адаптации RVI + метрики."""
+        strategy = DualMomentumStrategy(**params)
+        return {
+            **params,
+            **{field: getattr(strategy, field, None) for field in STRATEGY_ROW_FIELDS},
+            **metrics
+        }
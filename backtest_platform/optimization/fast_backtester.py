@@ -0,0 +1,387 @@
+# backtest_platform/optimization/fast_backtester.py
+
+"""
+Векторизованный движок бэктеста Dual Momentum для оптимизации.
+
+Версия: 1.3.0
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Воспроизводит Backtester.run() + DualMomentumStrategy.generate_signal() на
+признаках из FeatureCache: выбор актива считается сразу для всех дат массивами
+numpy, а симуляция портфеля повторяет цикл Backtester (те же формулы издержек,
+порядок операций и расчёт метрик). На полной истории результаты совпадают с
+Backtester.run().
+
+ДОПОЛНИТЕЛЬНЫЕ ВОЗМОЖНОСТИ (для многоуровневой оптимизации и walk-forward):
+  • start / end — симуляция на отрезке календаря; индикаторы при этом берутся
+    из полной истории (без «холодного старта» на начале отрезка)
+  • stride — симуляция только на каждой stride-й дате (например, 5 ≈ недельные бары)
+  • market_until — ограничение рыночного ряда датой (без заглядывания вперёд)
+
+ВЕРСИЯ 1.1.0 — ОБЩАЯ ПАМЯТЬ ВЫБОРА АКТИВА:
+Разные точки сетки часто дают одинаковые эффективные окна после
+int(окно × множитель RVI) в _get_adaptive_windows (25 × 1.2 и 30 × 1.0 → 30).
+Результат select_best_asset зависит только от эффективных окон и порогов
+активной стороны, поэтому серия выбора по датам хранится в LRU-памяти движка
+с ключом (lookback, vol_window, окно тренда, max_vol_threshold, флаги тренда,
+risk_free_ticker) и переиспользуется всеми комбинациями прогона. Память работает
+только в этом движке (engine='fast'); Backtester считает выбор через стратегию
+на каждой дате. Общей памяти между процессами нет: каждый процесс пула строит
+движок заново и накапливает собственную память, а ComboEvaluator.selection_stats()
+суммирует счётчики по процессам.
+
+ВЕРСИЯ 1.2.0 — УПАКОВАННЫЕ МАСКИ ФИЛЬТРОВ:
+Допуск кандидатов (история, волатильность, тренд) и проверка абсолютного
+импульса берутся из битовых масок optimization/filter_masks.py — маска
+строится один раз на значение параметра и объединяется побитовым AND.
+
+ВЕРСИЯ 1.3.0 — ПРОДОЛЖЕНИЕ СИМУЛЯЦИИ С СОСТОЯНИЯ:
+Цикл портфеля вынесен в advance(): состояние (деньги, актив, количество,
+число сделок) можно сохранить после прогона и продолжить симуляцию только
+на новых датах (optimization/incremental.py). signals() дополнительно
+возвращает решение рыночного фильтра по уровням RVI (market_signature) —
+оно зависит от всего рыночного ряда и определяет, остались ли прежние
+сигналы в силе после добавления новых баров.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backtester import Backtester
+from strategies.dual_momentum import DualMomentumStrategy
+from optimization.features import FeatureCache
+from optimization.filter_masks import FilterMasks
+
+__version__ = "1.3.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+_LEVEL_CODES = {'low': 0, 'medium': 1, 'high': 2}
+
+
+def portfolio_metrics(values: np.ndarray) -> Dict:
+    """Метрики кривой капитала — теми же выражениями pandas, что и в Backtester.run()."""
+    value = pd.Series(values)
+    returns = value.pct_change().dropna()
+    cagr = (value.iloc[-1] / value.iloc[0]) ** (252 / len(value)) - 1 if len(value) > 1 else 0.0
+    sharpe = (returns.mean() * 252) / (returns.std() * np.sqrt(252)) if returns.std() != 0 else 0.0
+    dd = (value / value.cummax() - 1).min()
+    return {
+        'final_value': value.iloc[-1],
+        'cagr': cagr,
+        'sharpe': sharpe,
+        'max_drawdown': dd
+    }
+
+
+class FastBacktester:
+    """
+    Быстрый бэктест комбинаций параметров на общем кэше признаков.
+
+    Пример:
+        features = FeatureCache(data, market_df, rvi_data)
+        engine = FastBacktester(features, commission=0.001, slippage=0.0005, use_slippage=True)
+        res = engine.run({'base_lookback': 29, 'base_vol_window': 9, 'market_vol_window': 21})
+    """
+
+    def __init__(
+        self,
+        features: FeatureCache,
+        commission=0.0,
+        default_commission: float = 0.0,
+        slippage=0.0,
+        use_slippage: bool = False,
+        initial_capital: float = 100_000,
+        selection_memo_size: int = 4096
+    ):
+        self.features = features
+        self.masks = FilterMasks(features)
+        self.initial_capital = initial_capital
+        # LRU-память серий выбора актива: ключ эффективных окон → коды тикеров по датам
+        self.selection_memo_size = selection_memo_size
+        self._selection_memo: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self.selection_hits = 0
+        self.selection_misses = 0
+        # Издержки считаются методами Backtester → идентичная арифметика
+        self._costs = Backtester(
+            commission=commission,
+            default_commission=default_commission,
+            slippage=slippage,
+            use_slippage=use_slippage
+        )
+
+    # ======================
+    # ВЫБОР АКТИВА
+    # ======================
+
+    def _rvi_levels(self, strategy: DualMomentumStrategy) -> np.ndarray:
+        """Коды уровня RVI по датам (повтор DualMomentumStrategy._get_rvi_level)."""
+        f = self.features
+        levels = np.full(f.n_dates, _LEVEL_CODES['medium'], dtype=np.int8)
+        if not f.rvi_present.any():
+            return levels
+        value = f.rvi_value
+        with np.errstate(invalid='ignore'):
+            is_low = value < strategy.rvi_low_threshold
+            is_medium = ~is_low & (value < strategy.rvi_medium_threshold)
+        computed = np.where(is_low, 0, np.where(is_medium, 1, 2)).astype(np.int8)
+        return np.where(f.rvi_present, computed, levels)
+
+    @staticmethod
+    def selection_key(strategy: DualMomentumStrategy, windows: Dict[str, int]) -> Tuple:
+        """
+        Ключ серии выбора актива: всё, от чего зависит select_best_asset().
+
+        Параметры, не влияющие на выбор в данном режиме, в ключ не входят
+        (в bare_mode — пороги и тренд, без фильтра тренда — окно тренда).
+        """
+        lookback = windows['lookback_period']
+        if strategy.bare_mode:
+            return (strategy.risk_free_ticker, True, lookback)
+        use_trend = bool(strategy.use_trend_filter)
+        trend_window = None
+        allow = None
+        if use_trend:
+            trend_window = int(lookback * 0.7) if strategy.use_rvi_adaptation else strategy.trend_window
+            allow = strategy.trend_filter_on_insufficient_data == 'allow'
+        return (strategy.risk_free_ticker, False, lookback, windows['vol_window_asset'],
+                use_trend, trend_window, allow, float(strategy.max_vol_threshold))
+
+    def selection_codes(self, strategy: DualMomentumStrategy, windows: Dict[str, int]) -> np.ndarray:
+        """
+        Результат trading_logic.select_best_asset() на всех датах календаря.
+
+        Серии с одинаковым selection_key() считаются один раз за время жизни движка.
+
+        Возвращает:
+            Массив индексов тикеров (позиция в features.tickers); -1 — risk_free_ticker
+            (массив только для чтения — общий для всех комбинаций с тем же ключом)
+        """
+        if self.selection_memo_size <= 0:
+            return self._compute_selection(strategy, windows)
+        key = self.selection_key(strategy, windows)
+        memo = self._selection_memo
+        codes = memo.get(key)
+        if codes is not None:
+            memo.move_to_end(key)
+            self.selection_hits += 1
+            return codes
+
+        self.selection_misses += 1
+        codes = self._compute_selection(strategy, windows).astype(np.int16)
+        codes.flags.writeable = False
+        memo[key] = codes
+        if len(memo) > self.selection_memo_size:
+            memo.popitem(last=False)
+        return codes
+
+    def selection_stats(self) -> Dict:
+        """Статистика памяти выбора актива (в текущем процессе)."""
+        calls = self.selection_hits + self.selection_misses
+        return {
+            'hits': self.selection_hits,
+            'misses': self.selection_misses,
+            'entries': len(self._selection_memo),
+            'hit_rate': self.selection_hits / calls if calls else 0.0
+        }
+
+    def _compute_selection(self, strategy: DualMomentumStrategy, windows: Dict[str, int]) -> np.ndarray:
+        """Расчёт серии выбора актива без памяти (допуск кандидатов — из упакованных масок)."""
+        f = self.features
+        rf = strategy.risk_free_ticker
+        lookback = windows['lookback_period']
+        vol_window = windows['vol_window_asset']
+
+        best_score = np.full(f.n_dates, -np.inf)
+        best = np.full(f.n_dates, -1, dtype=np.int64)
+
+        eligible_bits = self.masks.eligible(strategy, windows)
+        if not eligible_bits.any():
+            return best
+        eligible = self.masks.unpack(eligible_bits)
+
+        for code, ticker in enumerate(f.tickers):
+            if ticker == rf or not eligible[code].any():
+                continue
+            mom = f.momentum(ticker, lookback)
+            if strategy.bare_mode:
+                score = mom
+            else:
+                vol = f.asset_vol(ticker, vol_window)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    score = np.where(vol > 0, mom / vol, -np.inf)
+            with np.errstate(invalid='ignore'):
+                better = eligible[code] & (score > best_score)
+            best_score = np.where(better, score, best_score)
+            best = np.where(better, code, best)
+
+        # === АБСОЛЮТНЫЙ ИМПУЛЬС (AbsoluteMomentumWrapper) ===
+        candidate = best >= 0
+        if candidate.any():
+            if rf not in f.prefix_len:
+                raise KeyError(rf)
+            passed = self.masks.unpack(self.masks.absolute(lookback, rf))
+            keep = candidate & passed[np.maximum(best, 0), np.arange(f.n_dates)]
+            best = np.where(keep, best, -1)
+        return best
+
+    def signals(self, params: Dict, market_until=None) -> Dict:
+        """
+        Сигналы стратегии на всех датах календаря.
+
+        Возвращает:
+            {'codes': индексы выбранных тикеров (-1 = risk_free_ticker),
+             'levels': коды уровня RVI, 'used_window': окно рыночного фильтра (-1 = None),
+             'market_signature': ((выход по рынку, окно или -1) для уровней low, medium, high)}
+        """
+        f = self.features
+        strategy = DualMomentumStrategy(**params)
+        levels = self._rvi_levels(strategy)
+
+        codes = np.full(f.n_dates, -1, dtype=np.int64)
+        used_window = np.full(f.n_dates, -1, dtype=np.int64)
+        with np.errstate(invalid='ignore'):
+            rvi_exit = f.rvi_present & (f.rvi_value >= strategy.rvi_high_exit_threshold)
+
+        market_signature = []
+        for level, level_code in _LEVEL_CODES.items():
+            windows = strategy._get_adaptive_windows(level)
+            market_vol, effective = f.market_vol(windows['vol_window_market'], until=market_until)
+            vol_exit = market_vol is not None and market_vol >= strategy.market_vol_threshold
+            market_signature.append((bool(vol_exit), -1 if effective is None else int(effective)))
+            mask = levels == level_code
+            if not mask.any():
+                continue
+            if effective is not None:
+                used_window[mask] = effective
+
+            trade_mask = mask & ~rvi_exit
+            if vol_exit or not trade_mask.any():
+                continue
+            selected = self.selection_codes(strategy, windows)
+            codes[trade_mask] = selected[trade_mask]
+
+        return {'codes': codes, 'levels': levels, 'used_window': used_window,
+                'risk_free_ticker': strategy.risk_free_ticker,
+                'market_signature': tuple(market_signature)}
+
+    # ======================
+    # СИМУЛЯЦИЯ ПОРТФЕЛЯ
+    # ======================
+
+    def initial_state(self) -> Dict:
+        """Состояние портфеля до первой даты (как в начале Backtester.run())."""
+        return {'cash': self.initial_capital, 'asset': 'LQDT', 'quantity': 0.0, 'trades': 0}
+
+    def advance(self, signals: Dict, index: np.ndarray, state: Dict) -> Tuple[np.ndarray, Dict]:
+        """
+        Цикл Backtester.run() по датам календаря index, начиная с состояния state.
+
+        Возвращает:
+            (стоимость портфеля на датах index, состояние после последней даты)
+        """
+        f = self.features
+        tickers = f.tickers
+        rf = signals['risk_free_ticker']
+        prices = {t: f.price_at(t) for t in tickers}
+        codes = signals['codes']
+
+        cash = state['cash']
+        positions = {t: 0.0 for t in tickers}
+        current_asset = state['asset']
+        if current_asset in positions:
+            positions[current_asset] = state['quantity']
+        total_trades = state['trades']
+        values = np.empty(len(index))
+
+        for k, i in enumerate(index):
+            code = codes[i]
+            selected = rf if code < 0 else tickers[code]
+            if selected != current_asset:
+                if current_asset in positions and positions[current_asset] > 0:
+                    market_price = prices[current_asset][i]
+                    execution_price = self._costs._apply_costs(market_price, current_asset, is_buy=False)
+                    cash = positions[current_asset] * execution_price
+                    positions[current_asset] = 0.0
+                    total_trades += 1
+                if selected in positions:
+                    market_price = prices[selected][i]
+                    execution_price = self._costs._apply_costs(market_price, selected, is_buy=True)
+                    quantity = cash / execution_price if execution_price > 0 else 0.0
+                    positions[selected] = quantity
+                    cash = 0.0 if quantity > 0 else cash
+                    total_trades += 1
+                current_asset = selected
+
+            current_value = cash
+            for ticker, qty in positions.items():
+                if qty > 0:
+                    current_value += qty * prices[ticker][i]
+            values[k] = current_value
+
+        quantity = positions.get(current_asset, 0.0)
+        return values, {'cash': cash, 'asset': current_asset, 'quantity': quantity, 'trades': total_trades}
+
+    def simulate(
+        self,
+        signals: Dict,
+        start: int = 0,
+        end: Optional[int] = None,
+        stride: int = 1,
+        return_equity: bool = False
+    ) -> Dict:
+        """Повтор цикла Backtester.run() по датам календаря [start:end:stride]."""
+        f = self.features
+        index = np.arange(f.n_dates)[start:end:stride]
+        values, state = self.advance(signals, index, self.initial_state())
+        total_trades = state['trades']
+
+        used = signals['used_window'][index]
+        used = used[used >= 0]
+        result = {
+            'total_trades': total_trades,
+            'used_market_vol_window': int(used.max()) if len(used) else None,
+            'rvi_low_days': int((signals['levels'][index] == _LEVEL_CODES['low']).sum())
+        }
+
+        if len(values) == 0:
+            result.update({'final_value': self.initial_capital, 'cagr': 0.0, 'sharpe': 0.0,
+                           'max_drawdown': 0.0, 'used_market_vol_window': None})
+            if return_equity:
+                result['portfolio_value'] = pd.DataFrame()
+            return result
+
+        result.update(portfolio_metrics(values))
+        if return_equity:
+            result['portfolio_value'] = pd.DataFrame({
+                'date': pd.DatetimeIndex(f.calendar[index]),
+                'value': values
+            })
+        return result
+
+    def run(
+        self,
+        params: Dict,
+        start: int = 0,
+        end: Optional[int] = None,
+        stride: int = 1,
+        market_until=None,
+        return_equity: bool = False
+    ) -> Dict:
+        """
+        Бэктест комбинации параметров (ключи результата совпадают с Backtester.run()).
+
+        Аргументы:
+            params: параметры DualMomentumStrategy
+            start, end: отрезок календаря (позиции, как в срезе Python)
+            stride: шаг по датам (1 — каждый день)
+            market_until: ограничение рыночного ряда датой (None — весь ряд, как в Backtester)
+            return_equity: добавить 'portfolio_value' (дата, стоимость) в результат
+        """
+        signals = self.signals(params, market_until=market_until)
+        return self.simulate(signals, start=start, end=end, stride=stride, return_equity=return_equity)
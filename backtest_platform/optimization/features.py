@@ -0,0 +1,366 @@
+# backtest_platform/optimization/features.py
+
+"""
+Кэш индикаторных признаков для быстрого движка бэктеста.
+
+Версия: 1.0.0
+Версия: 1.1.0 (extend(): дописанные даты без пересчёта мемоизированных индикаторов)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Backtester.run() на каждой дате заново режет DataFrame и пересчитывает
+волатильность, моментум и тренд по всей истории до этой даты. При оптимизации
+одни и те же ряды считаются тысячи раз. FeatureCache считает каждый признак
+ОДИН раз по всей истории тикера и хранит его в numpy-массиве:
+  • momentum(L), abs_return(L) — моментум в формулах AdaptiveMomentumLogic /
+    BareMomentumLogic и AbsoluteMomentumWrapper
+  • asset_vol(W) — годовая rolling-волатильность доходностей (rolling_volatility)
+  • uptrend(T) — знак наклона линейной регрессии на окне T (np.polyfit)
+  • market_vol(W) — рыночная волатильность в семантике DualMomentumStrategy.market_filter
+
+ЭКВИВАЛЕНТНОСТЬ С BACKTESTER:
+Все индикаторы причинные (значение на позиции p зависит только от строк 0..p),
+поэтому значение, посчитанное по всей истории, совпадает со значением,
+посчитанным по срезу df[TRADEDATE <= date]. Признаки, зависящие от знака
+(наклон тренда), в пограничных случаях досчитываются тем же вызовом np.polyfit,
+что и в торговой логике.
+
+ДОПИСЫВАНИЕ ДАТ:
+extend() принимает те же данные с дописанными в конец строками. Благодаря
+причинности прежние значения индикаторов не меняются: для каждого
+мемоизированного ряда досчитывается только хвост новых дат календаря
+(asset_vol — по всему ряду доходностей, чтобы совпасть с полным расчётом бит
+в бит; вычисление векторное). market_vol без ограничения until зависит от
+всего ряда индекса и сбрасывается. Если изменилась уже известная часть
+истории, сбрасываются все индикаторы.
+
+ТРЕБОВАНИЯ К ДАННЫМ:
+Даты каждого тикера отсортированы и уникальны, CLOSE без пропусков
+(так формирует данные utils.load_market_data для выгрузок MOEX).
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.backtester import Backtester
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+ANNUALIZATION = np.sqrt(252)
+
+
+def _iloc_neg_index(prefix_len: np.ndarray, lookback: int) -> np.ndarray:
+    """Позиция, к которой обращается series.iloc[-lookback] у префикса длины prefix_len."""
+    if lookback > 0:
+        return prefix_len - lookback
+    return np.full_like(prefix_len, -lookback)
+
+
+class FeatureCache:
+    """
+    Выровненные по торговому календарю ряды и мемоизированные индикаторы.
+
+    Торговый календарь совпадает с датами, которые обрабатывает Backtester.run():
+    даты, присутствующие во ВСЕХ тикерах data_dict (после фильтра по времени).
+    """
+
+    def __init__(
+        self,
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: Optional[pd.DataFrame] = None,
+        rvi_data: Optional[pd.DataFrame] = None,
+        trade_time_filter: Optional[str] = None,
+        price_col: str = 'CLOSE'
+    ):
+        if not data_dict:
+            raise ValueError("data_dict не может быть пустым")
+
+        self.trade_time_filter = trade_time_filter
+        self.price_col = price_col
+        self._set_data(data_dict, market_data, rvi_data)
+        self._memo: Dict[tuple, object] = {}
+
+    def _set_data(
+        self,
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: Optional[pd.DataFrame],
+        rvi_data: Optional[pd.DataFrame]
+    ) -> None:
+        """Ряды тикеров, торговый календарь, рынок и RVI (индикаторы не затрагиваются)."""
+        time_filter = Backtester(trade_time_filter=self.trade_time_filter)
+        self.tickers = list(data_dict.keys())
+
+        # === РЯДЫ ТИКЕРОВ ===
+        self.dates: Dict[str, np.ndarray] = {}
+        self.close: Dict[str, np.ndarray] = {}
+        self.prices: Dict[str, np.ndarray] = {}
+        for ticker, df in data_dict.items():
+            df = time_filter._filter_by_time(df.copy()) if self.trade_time_filter else df
+            dates = pd.to_datetime(df['TRADEDATE']).to_numpy(dtype='datetime64[ns]')
+            if len(dates) > 1 and not (np.diff(dates.astype(np.int64)) > 0).all():
+                raise ValueError(f"FeatureCache: даты {ticker} должны быть отсортированы и уникальны")
+            close = df['CLOSE'].to_numpy(dtype=np.float64)
+            if np.isnan(close).any():
+                raise ValueError(f"FeatureCache: в CLOSE {ticker} есть пропуски")
+            self.dates[ticker] = dates
+            self.close[ticker] = close
+            self.prices[ticker] = df[self.price_col].to_numpy(dtype=np.float64)
+
+        # === ТОРГОВЫЙ КАЛЕНДАРЬ: пересечение дат всех тикеров ===
+        calendar = self.dates[self.tickers[0]]
+        for ticker in self.tickers[1:]:
+            calendar = np.intersect1d(calendar, self.dates[ticker])
+        self.calendar = calendar
+        self.n_dates = len(calendar)
+
+        # Позиция строки даты календаря в собственном ряду тикера и длина префикса
+        self.position: Dict[str, np.ndarray] = {}
+        self.prefix_len: Dict[str, np.ndarray] = {}
+        for ticker in self.tickers:
+            pos = np.searchsorted(self.dates[ticker], calendar)
+            self.position[ticker] = pos
+            self.prefix_len[ticker] = pos + 1
+
+        # === РЫНОК (весь ряд, как в DualMomentumStrategy.market_filter) ===
+        self.market_close = None
+        self.market_dates = None
+        if market_data is not None:
+            market_df = time_filter._filter_by_time(market_data) if self.trade_time_filter else market_data
+            self.market_close = market_df['CLOSE'].to_numpy(dtype=np.float64)
+            self.market_dates = pd.to_datetime(market_df['TRADEDATE']).to_numpy(dtype='datetime64[ns]')
+
+        # === RVI по датам календаря: последнее значение с совпадающей датой или NaN ===
+        self.has_rvi = rvi_data is not None
+        self.rvi_present = np.zeros(self.n_dates, dtype=bool)
+        self.rvi_value = np.full(self.n_dates, np.nan)
+        if rvi_data is not None and not rvi_data.empty:
+            rvi_last = (
+                pd.Series(rvi_data['CLOSE'].to_numpy(dtype=np.float64),
+                          index=pd.to_datetime(rvi_data['TRADEDATE']))
+                .groupby(level=0).last()
+            )
+            matched = rvi_last.reindex(pd.DatetimeIndex(calendar))
+            self.rvi_present = matched.index.isin(rvi_last.index)
+            self.rvi_value = matched.to_numpy(dtype=np.float64)
+
+
+    # ======================
+    # ИНДИКАТОРЫ АКТИВОВ (значения на датах календаря)
+    # ======================
+
+    def _cached(self, key: tuple, factory):
+        value = self._memo.get(key)
+        if value is None:
+            value = factory()
+            self._memo[key] = value
+        return value
+
+    def _tail(self, key: tuple, start: int) -> np.ndarray:
+        """Значения индикатора key на датах календаря начиная с позиции start."""
+        kind = key[0]
+        if kind == 'price':
+            return self.prices[key[1]][self.position[key[1]][start:]]
+        return getattr(self, f'_{kind}')(*key[1:], start)
+
+    def momentum(self, ticker: str, lookback: int) -> np.ndarray:
+        """(close[-1] − close[-L]) / close[-L]; NaN при недостатке данных."""
+        key = ('momentum', ticker, lookback)
+        return self._cached(key, lambda: self._tail(key, 0))
+
+    def _momentum(self, ticker: str, lookback: int, start: int) -> np.ndarray:
+        close = self.close[ticker]
+        n = self.prefix_len[ticker][start:]
+        idx = _iloc_neg_index(n, lookback)
+        valid = (idx >= 0) & (idx < n)
+        base = close[np.clip(idx, 0, len(close) - 1)]
+        current = close[self.position[ticker][start:]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = (current - base) / base
+        return np.where(valid, out, np.nan)
+
+    def abs_return(self, ticker: str, lookback: int) -> np.ndarray:
+        """close[-1] / close[-L] − 1 (формула AbsoluteMomentumWrapper)."""
+        key = ('abs_return', ticker, lookback)
+        return self._cached(key, lambda: self._tail(key, 0))
+
+    def _abs_return(self, ticker: str, lookback: int, start: int) -> np.ndarray:
+        close = self.close[ticker]
+        n = self.prefix_len[ticker][start:]
+        idx = _iloc_neg_index(n, lookback)
+        valid = (idx >= 0) & (idx < n)
+        base = close[np.clip(idx, 0, len(close) - 1)]
+        current = close[self.position[ticker][start:]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = (current / base) - 1
+        return np.where(valid, out, np.nan)
+
+    def asset_vol(self, ticker: str, window: int) -> np.ndarray:
+        """Последнее значение rolling_volatility(returns_prefix, window) на каждой дате."""
+        key = ('asset_vol', ticker, window)
+        return self._cached(key, lambda: self._tail(key, 0))
+
+    def _asset_vol(self, ticker: str, window: int, start: int) -> np.ndarray:
+        returns = pd.Series(self.close[ticker]).pct_change().iloc[1:].reset_index(drop=True)
+        vol = (returns.rolling(window).std() * ANNUALIZATION).to_numpy(dtype=np.float64)
+        n_returns = self.position[ticker][start:]  # у префикса длины p+1 ровно p доходностей
+        out = np.full(len(n_returns), np.nan)
+        has = (n_returns >= 1) & (n_returns >= window)
+        out[has] = vol[n_returns[has] - 1]
+        return out
+
+    def uptrend(self, ticker: str, window: int) -> np.ndarray:
+        """
+        Знак наклона регрессии np.polyfit(arange(window), close[-window:], 1) > 0.
+
+        Возвращает float-массив: 1.0 / 0.0, NaN — окно с NaN/inf или данных меньше окна
+        (решение в этом случае зависит от trend_filter_on_insufficient_data).
+        """
+        key = ('uptrend', ticker, window)
+        return self._cached(key, lambda: self._tail(key, 0))
+
+    def _uptrend(self, ticker: str, window: int, start: int) -> np.ndarray:
+        close = self.close[ticker]
+        pos = self.position[ticker][start:]
+        out = np.full(len(pos), np.nan)
+        if window < 2:
+            for i, p in enumerate(pos):
+                out[i] = self._polyfit_uptrend(close[:p + 1], window)
+            return out
+
+        has = pos + 1 >= window
+        if not has.any() or len(close) < window:
+            return out
+        windows = np.lib.stride_tricks.sliding_window_view(close, window)  # [k] = close[k:k+window]
+        rows = windows[pos[has] - window + 1]
+        finite = np.isfinite(rows).all(axis=1)
+
+        x = np.arange(window, dtype=np.float64)
+        slopes = np.full(len(rows), np.nan)
+        if finite.any():
+            good = rows[finite]
+            xc = x - x.mean()
+            slopes[finite] = (good - good.mean(axis=1, keepdims=True)) @ xc / (xc @ xc)
+
+        result = np.where(finite, (slopes > 0).astype(np.float64), np.nan)
+        # Пограничные наклоны досчитываются тем же вызовом, что и в торговой логике
+        scale = np.abs(rows).max(axis=1) if len(rows) else np.array([])
+        ambiguous = finite & (np.abs(slopes) <= 1e-9 * np.maximum(scale, 1.0))
+        for j in np.nonzero(ambiguous)[0]:
+            result[j] = 1.0 if np.polyfit(x.astype(int), rows[j], 1)[0] > 0 else 0.0
+        out[has] = result
+        return out
+
+    @staticmethod
+    def _polyfit_uptrend(prices: np.ndarray, window: int) -> float:
+        """Буквальный повтор AdaptiveMomentumLogic._is_uptrend для вырожденных окон."""
+        if len(prices) < window:
+            return np.nan
+        y = prices[-window:]
+        if np.any(np.isnan(y)) or np.any(np.isinf(y)):
+            return np.nan
+        slope, _ = np.polyfit(np.arange(window), y, 1)
+        return 1.0 if slope > 0 else 0.0
+
+    # ======================
+    # РЫНОЧНАЯ ВОЛАТИЛЬНОСТЬ
+    # ======================
+
+    def market_vol(self, window: int, until: Optional[np.datetime64] = None):
+        """
+        Волатильность рынка в семантике DualMomentumStrategy.market_filter().
+
+        Backtester передаёт в стратегию ВЕСЬ ряд рыночного индекса, поэтому
+        результат не зависит от даты сигнала. Параметр until ограничивает ряд
+        датой (используется walk-forward анализом для исключения заглядывания вперёд).
+
+        Возвращает:
+            (волатильность или None, фактически использованное окно или None)
+        """
+        def factory():
+            if self.market_close is None:
+                return (None, None)
+            close = self.market_close
+            if until is not None:
+                close = close[self.market_dates <= until]
+            if len(close) <= 1:
+                return (None, None)
+            returns = pd.Series(close).pct_change().dropna()
+            available = len(returns)
+            effective = max(5, available) if available < window else window
+            if effective < 5:
+                return (None, None)
+            if len(returns) < effective:
+                return (None, None)
+            vol_series = returns.rolling(effective).std() * ANNUALIZATION
+            if vol_series.empty or pd.isna(vol_series.iloc[-1]):
+                return (None, None)
+            return (float(vol_series.iloc[-1]), effective)
+        return self._cached(('market_vol', window, until), factory)
+
+    # ======================
+    # ПРОЧЕЕ
+    # ======================
+
+    def price_at(self, ticker: str) -> np.ndarray:
+        """Цена исполнения (price_col) тикера на датах календаря."""
+        key = ('price', ticker)
+        return self._cached(key, lambda: self._tail(key, 0))
+
+    def clear(self) -> None:
+        """Сброс мемоизированных индикаторов (исходные ряды сохраняются)."""
+        self._memo.clear()
+
+    def extend(
+        self,
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: Optional[pd.DataFrame] = None,
+        rvi_data: Optional[pd.DataFrame] = None
+    ) -> int:
+        """
+        Принять данные с дописанными строками, досчитав индикаторы только на новых датах.
+
+        Возвращает:
+            int: число дат календаря, для которых сохранены прежние значения
+                 (0 — известная часть истории изменилась, индикаторы сброшены)
+        """
+        old_tickers, old_calendar = self.tickers, self.calendar
+        old_dates, old_close, old_prices = self.dates, self.close, self.prices
+        old_market = self.market_close
+        self._set_data(data_dict, market_data, rvi_data)
+
+        n_old = len(old_calendar)
+        kept = (
+            self.tickers == old_tickers
+            and n_old <= self.n_dates
+            and np.array_equal(self.calendar[:n_old], old_calendar)
+            and all(
+                np.array_equal(self.dates[t][:len(old_dates[t])], old_dates[t])
+                and np.array_equal(self.close[t][:len(old_close[t])], old_close[t])
+                and np.array_equal(self.prices[t][:len(old_prices[t])], old_prices[t], equal_nan=True)
+                for t in self.tickers
+            )
+        )
+        if not kept:
+            self._memo.clear()
+            return 0
+
+        market_kept = (
+            old_market is not None and self.market_close is not None
+            and np.array_equal(self.market_close[:len(old_market)], old_market)
+        )
+        last_market_date = self.market_dates[len(old_market) - 1] if market_kept and len(old_market) else None
+        for key in list(self._memo):
+            if key[0] == 'market_vol':
+                # Ряд до until не изменился — значение прежнее; иначе зависит от новых строк
+                until = key[2]
+                if not (market_kept and until is not None and last_market_date is not None
+                        and until <= last_market_date):
+                    del self._memo[key]
+            elif n_old < self.n_dates:
+                self._memo[key] = np.concatenate([self._memo[key], self._tail(key, n_old)])
+        return n_old
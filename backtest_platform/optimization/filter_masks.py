@@ -0,0 +1,176 @@
+# backtest_platform/optimization/filter_masks.py
+
+"""
+Упакованные битовые маски фильтров активов для быстрого движка бэктеста.
+
+Версия: 1.0.0
+Версия: 1.0.1 (удалён неиспользуемый eligible_days: np.bitwise_count требует numpy ≥ 2.0)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Фильтр волатильности, фильтр тренда, достаточность истории и проверка
+абсолютного импульса в торговых логиках сводятся к булеву значению на
+(дату, тикер, значение параметра). FilterMasks хранит каждое такое решение
+как упакованный битовый массив (тикеры × даты, np.packbits по датам) для
+одного значения параметра, а допуск кандидата для комбинации получается
+побитовым AND масок по осям параметров:
+
+    допуск = история(min_required) & волатильность(vol_window, max_vol_threshold)
+             & тренд(trend_window, политика)            # если фильтр тренда включён
+
+ПАМЯТЬ:
+Маска занимает n_tickers × n_dates / 8 байт: 100 тикеров × 10 лет дневных
+данных ≈ 32 КБ, поэтому маски всех значений сетки помещаются в память каждого
+процесса пула, а допуск тысяч комбинаций считается со скоростью чтения памяти.
+
+ЭКВИВАЛЕНТНОСТЬ:
+Маски строятся из тех же признаков FeatureCache и тех же сравнений, что
+FastBacktester до версии 1.2.0 (NaN волатильности → недопуск, NaN тренда →
+политика trend_filter_on_insufficient_data).
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from strategies.dual_momentum import DualMomentumStrategy
+from optimization.features import FeatureCache
+
+__version__ = "1.0.1"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+
+class FilterMasks:
+    """
+    Мемоизированные упакованные маски фильтров на общем кэше признаков.
+
+    Пример:
+        masks = FilterMasks(features)
+        bits = masks.eligible(strategy, windows)   # uint8 [n_tickers, ceil(n_dates / 8)]
+        allowed = masks.unpack(bits)               # bool  [n_tickers, n_dates]
+    """
+
+    def __init__(self, features: FeatureCache):
+        self.features = features
+        self.n_tickers = len(features.tickers)
+        self.n_dates = features.n_dates
+        self._memo: Dict[tuple, np.ndarray] = {}
+
+    # ======================
+    # УПАКОВКА
+    # ======================
+
+    def pack(self, rows: Sequence[np.ndarray]) -> np.ndarray:
+        """Булевы ряды по тикерам (в порядке features.tickers) → упакованная маска."""
+        matrix = np.asarray(rows, dtype=bool).reshape(self.n_tickers, self.n_dates)
+        bits = np.packbits(matrix, axis=1)
+        bits.flags.writeable = False
+        return bits
+
+    def unpack(self, bits: np.ndarray) -> np.ndarray:
+        """Упакованная маска → bool [n_tickers, n_dates]."""
+        return np.unpackbits(bits, axis=-1, count=self.n_dates).astype(bool)
+
+    @staticmethod
+    def combine(*masks: np.ndarray) -> np.ndarray:
+        """Побитовое AND масок одинаковой формы."""
+        out = masks[0]
+        for mask in masks[1:]:
+            out = np.bitwise_and(out, mask)
+        return out
+
+    def _cached(self, key: tuple, factory) -> np.ndarray:
+        bits = self._memo.get(key)
+        if bits is None:
+            bits = factory()
+            self._memo[key] = bits
+        return bits
+
+    # ======================
+    # МАСКИ ПО ЗНАЧЕНИЮ ПАРАМЕТРА
+    # ======================
+
+    def history(self, min_required: int) -> np.ndarray:
+        """Длина истории тикера на дату ≥ min_required."""
+        f = self.features
+        return self._cached(('history', min_required), lambda: self.pack(
+            [f.prefix_len[t] >= min_required for t in f.tickers]))
+
+    def volatility(self, vol_window: int, max_vol_threshold: float) -> np.ndarray:
+        """Волатильность на окне vol_window рассчитана и не выше max_vol_threshold."""
+        f = self.features
+
+        def factory():
+            rows = []
+            for ticker in f.tickers:
+                vol = f.asset_vol(ticker, vol_window)
+                with np.errstate(invalid='ignore'):
+                    rows.append((f.position[ticker] >= vol_window) & ~np.isnan(vol)
+                                & ~(vol > max_vol_threshold))
+            return self.pack(rows)
+        return self._cached(('volatility', vol_window, float(max_vol_threshold)), factory)
+
+    def trend(self, trend_window: int, allow_insufficient: bool) -> np.ndarray:
+        """Восходящий тренд на окне trend_window (NaN → allow_insufficient)."""
+        f = self.features
+
+        def factory():
+            rows = []
+            for ticker in f.tickers:
+                trend = f.uptrend(ticker, trend_window)
+                rows.append(np.where(np.isnan(trend), allow_insufficient, trend == 1.0))
+            return self.pack(rows)
+        return self._cached(('trend', trend_window, bool(allow_insufficient)), factory)
+
+    def absolute(self, lookback: int, risk_free_ticker: str) -> np.ndarray:
+        """Проверка AbsoluteMomentumWrapper: доходность за lookback выше доходности risk_free_ticker."""
+        f = self.features
+
+        def factory():
+            rf_len = f.prefix_len[risk_free_ticker]
+            rf_return = f.abs_return(risk_free_ticker, lookback)
+            rows = []
+            for ticker in f.tickers:
+                enough = (f.prefix_len[ticker] >= lookback) & (rf_len >= lookback)
+                with np.errstate(invalid='ignore'):
+                    rows.append(enough & (f.abs_return(ticker, lookback) > rf_return))
+            return self.pack(rows)
+        return self._cached(('absolute', lookback, risk_free_ticker), factory)
+
+    # ======================
+    # ДОПУСК КАНДИДАТА ДЛЯ КОМБИНАЦИИ
+    # ======================
+
+    @staticmethod
+    def components(strategy: DualMomentumStrategy, windows: Dict[str, int]) -> List[Tuple]:
+        """Маски (вид, аргументы), AND которых даёт допуск кандидата select_best_asset()."""
+        lookback = windows['lookback_period']
+        if strategy.bare_mode:
+            return [('history', lookback)]
+        vol_window = windows['vol_window_asset']
+        min_required = max(lookback, vol_window)
+        parts = [('volatility', vol_window, float(strategy.max_vol_threshold))]
+        if strategy.use_trend_filter:
+            trend_window = int(lookback * 0.7) if strategy.use_rvi_adaptation else strategy.trend_window
+            min_required = max(min_required, trend_window)
+            parts.append(('trend', trend_window, strategy.trend_filter_on_insufficient_data == 'allow'))
+        return [('history', min_required)] + parts
+
+    def mask(self, component: Tuple) -> np.ndarray:
+        kind, *args = component
+        return getattr(self, kind)(*args)
+
+    def eligible(self, strategy: DualMomentumStrategy, windows: Dict[str, int]) -> np.ndarray:
+        """Упакованная маска допуска кандидатов (без исключения risk_free_ticker)."""
+        parts = self.components(strategy, windows)
+        return self._cached(('eligible',) + tuple(parts),
+                            lambda: self.combine(*(self.mask(part) for part in parts)))
+
+    def nbytes(self) -> int:
+        """Память, занятая масками."""
+        return sum(bits.nbytes for bits in self._memo.values())
+
+    def clear(self) -> None:
+        self._memo.clear()
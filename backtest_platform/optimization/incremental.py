@@ -0,0 +1,522 @@
+# backtest_platform/optimization/incremental.py
+
+"""
+Инкрементальная переоптимизация сетки при поступлении новых торговых дней.
+
+Версия: 1.0.0
+Версия: 1.1.0 (признаки между вызовами refresh() дополняются FeatureCache.extend())
+Версия: 1.2.0 (командная строка: проскальзывание из профиля спреда при заданном
+               config.spread_slippage_store)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Каждое утро к истории добавляется один бар, и та же сетка пересчитывалась
+с нуля, чтобы увидеть, сместился ли оптимум. Здесь после прогона для каждой
+комбинации сохраняется состояние симуляции:
+  • портфель: деньги, актив, количество, число сделок
+  • кривая капитала: число точек, первое и последнее значение, максимум
+    (для просадки) и минимальная просадка
+  • доходности для Sharpe: количество, среднее и сумма квадратов отклонений
+    (объединение выборок по Чану — без хранения кривой капитала)
+  • диагностика: максимальное окно рыночного фильтра, дни низкого RVI
+При следующем вызове refresh() быстрый движок продолжает симуляцию только
+на новых датах календаря; пересчитываются лишь сигналы комбинации.
+
+КОГДА КОМБИНАЦИЯ ПЕРЕСЧИТЫВАЕТСЯ ЦЕЛИКОМ:
+  • Индикаторы активов и уровни RVI причинны — новый бар не меняет сигналы
+    прошлых дат. Рыночный фильтр (как в Backtester.run()) считается по ВСЕМУ
+    ряду индекса: новый бар может переключить выход по рынку для всех дат
+    уровня. Решение фильтра по уровням (FastBacktester.signals →
+    market_signature) хранится в состоянии; если оно изменилось, комбинация
+    симулируется заново на всей истории.
+  • Изменилась старая часть истории (календарь, цены, RVI) — отпечаток
+    префикса не совпал, пересчитываются все комбинации.
+
+Метрики совпадают с FastBacktester.run() на полной истории: final_value,
+max_drawdown и число сделок — точно, Sharpe и CAGR — с точностью до
+округления (среднее и дисперсия доходностей накапливаются по частям).
+
+Пример:
+    leaderboard = IncrementalOptimizer(param_grid, commission=0.001)
+    df = leaderboard.refresh(data, market_df, rvi_data)   # первый раз — полный прогон
+    ...                                                    # добавлен новый бар
+    df = leaderboard.refresh(data, market_df, rvi_data)   # только новые дни
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimization.canonical import unique_combinations
+from optimization.evaluator import ComboEvaluator, extract_metrics
+from optimization.features import FeatureCache
+from optimization.fast_backtester import FastBacktester, _LEVEL_CODES
+from optimization.param_grid import ParamGrid
+from optimization.result_cache import ENGINE_VERSION
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+STATE_FORMAT_VERSION = 1
+
+# Числовые поля состояния комбинации (массивы длины n_combos в файле состояния)
+FLOAT_FIELDS = ('cash', 'quantity', 'first_value', 'last_value', 'peak', 'min_drawdown',
+                'ret_mean', 'ret_m2')
+INT_FIELDS = ('asset', 'trades', 'n_values', 'n_returns', 'used_window', 'rvi_low_days')
+
+# Комбинаций в одной задаче: векторизованное обновление статистик и ограничение
+# памяти матрицы стоимостей при полном прогоне длинной истории
+CHUNK_SIZE = 2000
+
+
+def _prefix_digest(features: FeatureCache, n_dates: int) -> str:
+    """Отпечаток всего, что видят сигналы и симуляция на первых n_dates датах календаря."""
+    h = hashlib.sha256()
+    h.update(features.calendar[:n_dates].tobytes())
+    for ticker in features.tickers:
+        rows = int(features.prefix_len[ticker][n_dates - 1]) if n_dates else 0
+        h.update(ticker.encode('utf-8'))
+        h.update(features.close[ticker][:rows].tobytes())
+        h.update(features.price_at(ticker)[:n_dates].tobytes())
+    h.update(np.asarray(features.rvi_present[:n_dates]).tobytes())
+    h.update(features.rvi_value[:n_dates].tobytes())
+    return h.hexdigest()
+
+
+def _signature_row(signals: Dict) -> List[int]:
+    """Решение рыночного фильтра по уровням low/medium/high → плоский список чисел."""
+    row = []
+    for vol_exit, effective in signals['market_signature']:
+        row.extend((int(vol_exit), effective))
+    return row
+
+
+def _reset_row(state: Dict, i: int) -> None:
+    """Обнулить состояние комбинации i перед симуляцией с первой даты."""
+    for name in FLOAT_FIELDS + INT_FIELDS:
+        state[name][i] = 0
+    state['used_window'][i] = -1
+
+
+def _update_curve_stats(state: Dict, rows: np.ndarray, values: np.ndarray) -> None:
+    """
+    Добавить к статистикам кривой капитала строк rows новые стоимости values.
+
+    Доходности — выражение pandas pct_change(); просадка — value / cummax - 1,
+    максимум продолжается с сохранённого значения.
+    """
+    n_values = state['n_values'][rows]
+    fresh = n_values == 0
+
+    # === ДОХОДНОСТИ: первая новая точка продолжает сохранённую кривую ===
+    if fresh.all():
+        returns = values[:, 1:] / values[:, :-1] - 1
+    elif not fresh.any():
+        previous = np.concatenate([state['last_value'][rows][:, None], values[:, :-1]], axis=1)
+        returns = values / previous - 1
+    else:
+        raise ValueError("Пакет должен содержать только новые или только продолжаемые кривые")
+
+    n_b = returns.shape[1]
+    if n_b:
+        n_a = state['n_returns'][rows]
+        mean_a = state['ret_mean'][rows]
+        mean_b = returns.mean(axis=1)
+        m2_b = ((returns - mean_b[:, None]) ** 2).sum(axis=1)
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        state['ret_mean'][rows] = mean_a + delta * n_b / n
+        state['ret_m2'][rows] = state['ret_m2'][rows] + m2_b + delta ** 2 * n_a * n_b / n
+        state['n_returns'][rows] = n
+
+    # === ПРОСАДКА ===
+    start_peak = np.where(fresh, -np.inf, state['peak'][rows])
+    peaks = np.maximum.accumulate(np.concatenate([start_peak[:, None], values], axis=1), axis=1)[:, 1:]
+    drawdown = (values / peaks - 1).min(axis=1)
+    state['min_drawdown'][rows] = np.where(fresh, drawdown, np.minimum(state['min_drawdown'][rows], drawdown))
+    state['peak'][rows] = peaks[:, -1]
+
+    state['first_value'][rows] = np.where(fresh, values[:, 0], state['first_value'][rows])
+    state['last_value'][rows] = values[:, -1]
+    state['n_values'][rows] = n_values + values.shape[1]
+
+
+def advance_chunk(engine: FastBacktester, task):
+    """
+    Продвинуть пакет комбинаций до последней даты календаря engine.
+
+    task = (комбинации, состояние пакета, имена активов по строкам или None,
+            число уже обработанных дат, продолжать ли сохранённое состояние)
+
+    Возвращает:
+        (новое состояние пакета, имена активов по строкам, число пересчитанных целиком)
+    """
+    combos, state, assets, n_old, incremental = task
+    state = {name: values.copy() for name, values in state.items()}
+    n_dates = engine.features.n_dates
+    names = []
+    resimulated = 0
+    full_rows, full_values = [], []
+    tail_rows, tail_values = [], []
+
+    for i, params in enumerate(combos):
+        signals = engine.signals(params)
+        signature = _signature_row(signals)
+        resume = incremental and list(state['signature'][i]) == signature
+        if resume:
+            start = n_old
+            portfolio = {
+                'cash': float(state['cash'][i]),
+                'asset': assets[i],
+                'quantity': float(state['quantity'][i]),
+                'trades': int(state['trades'][i])
+            }
+        else:
+            start = 0
+            portfolio = engine.initial_state()
+            _reset_row(state, i)
+            resimulated += 1
+        index = np.arange(start, n_dates)
+        values, portfolio = engine.advance(signals, index, portfolio)
+
+        names.append(portfolio['asset'])
+        state['cash'][i] = portfolio['cash']
+        state['quantity'][i] = portfolio['quantity']
+        state['trades'][i] = portfolio['trades']
+        state['signature'][i] = signature
+
+        used = signals['used_window'][index]
+        used = used[used >= 0]
+        if len(used):
+            state['used_window'][i] = max(int(state['used_window'][i]), int(used.max()))
+        state['rvi_low_days'][i] += int((signals['levels'][index] == _LEVEL_CODES['low']).sum())
+
+        (tail_rows if resume else full_rows).append(i)
+        (tail_values if resume else full_values).append(values)
+
+    for rows, values in ((full_rows, full_values), (tail_rows, tail_values)):
+        if rows and len(values[0]):
+            _update_curve_stats(state, np.asarray(rows), np.vstack(values))
+    return state, names, resimulated
+
+
+# ======================
+# ПУЛ ПРОЦЕССОВ
+# ======================
+
+_WORKER_ENGINE = None
+
+
+def _init_worker(engine: FastBacktester) -> None:
+    """Инициализация процесса пула: признаки передаются один раз на процесс."""
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = engine
+
+
+def _worker_advance(task):
+    return advance_chunk(_WORKER_ENGINE, task)
+
+
+class IncrementalOptimizer:
+    """
+    Таблица результатов сетки, обновляемая по новым торговым дням.
+
+    Аргументы:
+        param_grid: сетка {имя: [значения]} или готовый ParamGrid
+        state_path: файл состояния (по умолчанию data-optimization/incremental/<ключ>.npz;
+                    ключ — сетка, издержки и версия движка)
+        n_jobs: процессов для продвижения пакетов комбинаций (1 — в текущем процессе)
+        chunk_size: комбинаций в одной задаче
+        остальные — издержки и фильтр времени, как в optimize_dual_momentum
+
+    Пример:
+        optimizer = IncrementalOptimizer(param_grid, state_path='data-optimization/incremental/daily.npz')
+        df = optimizer.refresh(data, market_df, rvi_data)
+        print(optimizer.last_refresh)   # {'mode': 'incremental', 'new_days': 1, 'resimulated': 12, ...}
+    """
+
+    def __init__(
+        self,
+        param_grid: Union[Dict[str, List], ParamGrid],
+        state_path: Optional[str] = None,
+        commission=0.0,
+        default_commission: float = 0.0,
+        slippage=0.0,
+        use_slippage: bool = False,
+        initial_capital: float = 100_000,
+        trade_time_filter: Optional[str] = None,
+        skip_invalid_windows: bool = True,
+        n_jobs: int = 1,
+        chunk_size: int = CHUNK_SIZE
+    ):
+        from optimizer import build_param_grid
+
+        self.grid = build_param_grid(param_grid, skip_invalid_windows)
+        self.costs = {
+            'commission': commission,
+            'default_commission': default_commission,
+            'slippage': slippage,
+            'use_slippage': use_slippage,
+            'initial_capital': initial_capital
+        }
+        self.trade_time_filter = trade_time_filter
+        self.skip_invalid_windows = skip_invalid_windows
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.state_key = self._make_state_key()
+        if state_path is None:
+            state_path = os.path.join(project_root, 'data-optimization', 'incremental',
+                                      f"{self.state_key[:16]}.npz")
+        self.state_path = state_path
+        self.last_refresh: Optional[Dict] = None
+        self._features: Optional[FeatureCache] = None
+
+    def _make_state_key(self) -> str:
+        """Ключ состояния: сетка, ограничения, издержки и версия движка (без данных)."""
+        payload = json.dumps(
+            {
+                'engine': ENGINE_VERSION,
+                'format': STATE_FORMAT_VERSION,
+                'grid': [[key, list(values)] for key, values in zip(self.grid.keys, self.grid.values)],
+                'constraints': [name for _, _, name in self.grid.constraints],
+                'costs': self.costs,
+                'trade_time_filter': self.trade_time_filter
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # ======================
+    # ФАЙЛ СОСТОЯНИЯ
+    # ======================
+
+    def _load_state(self) -> Optional[Dict]:
+        """Сохранённое состояние или None (нет файла, другая сетка/издержки, повреждён)."""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with np.load(self.state_path, allow_pickle=False) as npz:
+                state = {name: npz[name] for name in npz.files}
+            meta = json.loads(str(state.pop('meta')))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Состояние {self.state_path} не прочитано ({e}) — полный прогон")
+            return None
+        if meta.get('key') != self.state_key:
+            print(f"⚠️  Состояние {self.state_path} построено для другой сетки или издержек — полный прогон")
+            return None
+        state['meta'] = meta
+        return state
+
+    def _save_state(self, state: Dict, meta: Dict) -> None:
+        """Атомарная запись состояния (временный файл + os.replace)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp.npz"
+        arrays = {name: state[name] for name in FLOAT_FIELDS + INT_FIELDS + ('signature',)}
+        np.savez(tmp_path, meta=np.array(json.dumps(meta, default=str)), **arrays)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _empty_state(n_combos: int) -> Dict:
+        state = {name: np.zeros(n_combos, dtype=np.float64) for name in FLOAT_FIELDS}
+        state.update({name: np.zeros(n_combos, dtype=np.int64) for name in INT_FIELDS})
+        state['signature'] = np.zeros((n_combos, 2 * len(_LEVEL_CODES)), dtype=np.int64)
+        return state
+
+    # ======================
+    # ОБНОВЛЕНИЕ
+    # ======================
+
+    def refresh(
+        self,
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: Optional[pd.DataFrame] = None,
+        rvi_data: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Продвинуть все комбинации до последней даты календаря и вернуть таблицу.
+
+        Возвращает:
+            pd.DataFrame: строки как в optimize_dual_momentum, отсортированные по Sharpe Ratio
+        """
+        start_time = time.time()
+        # В долгоживущем процессе индикаторы прежних дат не пересчитываются
+        if self._features is not None:
+            self._features.extend(data_dict, market_data, rvi_data)
+        else:
+            self._features = FeatureCache(data_dict, market_data, rvi_data, trade_time_filter=self.trade_time_filter)
+        features = self._features
+        engine = FastBacktester(features, **self.costs)
+        combos, _ = unique_combinations(self.grid, features.has_rvi)
+        n_combos = len(combos)
+        n_dates = features.n_dates
+
+        # === ПРИГОДНОСТЬ СОХРАНЁННОГО СОСТОЯНИЯ ===
+        saved = self._load_state()
+        n_old = 0
+        reason = None
+        if saved is None:
+            reason = 'нет сохранённого состояния'
+        else:
+            meta = saved['meta']
+            n_old = meta['n_dates']
+            if meta['n_combos'] != n_combos or meta['has_rvi'] != features.has_rvi:
+                reason = 'изменился набор комбинаций'
+            elif meta['tickers'] != features.tickers:
+                reason = 'изменился набор тикеров'
+            elif n_old > n_dates or meta['prefix_digest'] != _prefix_digest(features, n_old):
+                reason = 'изменилась уже обработанная часть истории'
+        if reason is not None:
+            n_old = 0
+            state = self._empty_state(n_combos)
+            assets = []
+        else:
+            state = {name: saved[name].copy() for name in FLOAT_FIELDS + INT_FIELDS + ('signature',)}
+            assets = list(saved['meta']['assets'])
+
+        mode = 'full' if reason is not None else 'incremental'
+        print(f"\n📈 ИНКРЕМЕНТАЛЬНАЯ ТАБЛИЦА: {n_combos:,} комбинаций, дат {n_old} → {n_dates}")
+        if reason is not None:
+            print(f"   Полный прогон: {reason}")
+
+        # === ПРОДВИЖЕНИЕ КОМБИНАЦИЙ ПАКЕТАМИ (chunk_size комбинаций на задачу) ===
+        tasks = []
+        for chunk_start in range(0, n_combos, self.chunk_size):
+            rows = slice(chunk_start, min(chunk_start + self.chunk_size, n_combos))
+            chunk_state = {name: values[rows] for name, values in state.items()}
+            chunk_assets = [assets[code] for code in chunk_state['asset']] if mode == 'incremental' else None
+            tasks.append((combos[rows], chunk_state, chunk_assets, n_old, mode == 'incremental'))
+
+        if self.n_jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(engine,)) as pool:
+                outcomes = list(pool.map(_worker_advance, tasks))
+        else:
+            outcomes = [advance_chunk(engine, task) for task in tasks]
+
+        resimulated = 0
+        asset_codes = {name: code for code, name in enumerate(assets)}
+        chunk_start = 0
+        for chunk_state, chunk_assets, chunk_resimulated in outcomes:
+            for name in chunk_assets:
+                if name not in asset_codes:
+                    asset_codes[name] = len(assets)
+                    assets.append(name)
+            chunk_state['asset'] = np.array([asset_codes[name] for name in chunk_assets], dtype=np.int64)
+            rows = slice(chunk_start, chunk_start + len(chunk_assets))
+            for name, values in chunk_state.items():
+                state[name][rows] = values
+            chunk_start += len(chunk_assets)
+            resimulated += chunk_resimulated
+
+        meta = {
+            'key': self.state_key,
+            'n_dates': n_dates,
+            'n_combos': n_combos,
+            'has_rvi': features.has_rvi,
+            'tickers': features.tickers,
+            'last_date': str(pd.Timestamp(features.calendar[-1])) if n_dates else None,
+            'prefix_digest': _prefix_digest(features, n_dates),
+            'assets': assets
+        }
+        self._save_state(state, meta)
+
+        df = self.leaderboard(combos, state)
+        elapsed = time.time() - start_time
+        self.last_refresh = {
+            'mode': mode,
+            'new_days': n_dates - n_old,
+            'n_combos': n_combos,
+            'resimulated': resimulated,
+            'elapsed_sec': elapsed
+        }
+        print(f"✅ Обновлено за {elapsed:.1f} сек: новых дней {n_dates - n_old}, "
+              f"пересчитано целиком {resimulated:,} из {n_combos:,}")
+        if len(df):
+            print(f"   Лучший Sharpe: {df['sharpe'].max():.4f} | Медианный Sharpe: {df['sharpe'].median():.4f}")
+        return df
+
+    def metrics(self, state: Dict, i: int) -> Dict:
+        """Метрики комбинации i из сохранённых статистик (поля как у FastBacktester.run())."""
+        n_values = int(state['n_values'][i])
+        if n_values == 0:
+            return {'final_value': self.costs['initial_capital'], 'cagr': 0.0, 'sharpe': 0.0,
+                    'max_drawdown': 0.0, 'total_trades': int(state['trades'][i]),
+                    'used_market_vol_window': None, 'rvi_low_days': int(state['rvi_low_days'][i])}
+        first, last = state['first_value'][i], state['last_value'][i]
+        n_returns = int(state['n_returns'][i])
+        mean = state['ret_mean'][i] if n_returns else np.nan
+        std = np.sqrt(state['ret_m2'][i] / (n_returns - 1)) if n_returns > 1 else np.nan
+        used = int(state['used_window'][i])
+        return {
+            'total_trades': int(state['trades'][i]),
+            'used_market_vol_window': used if used >= 0 else None,
+            'rvi_low_days': int(state['rvi_low_days'][i]),
+            'final_value': float(last),
+            'cagr': (last / first) ** (252 / n_values) - 1 if n_values > 1 else 0.0,
+            'sharpe': (mean * 252) / (std * np.sqrt(252)) if std != 0 else 0.0,
+            'max_drawdown': float(state['min_drawdown'][i])
+        }
+
+    def leaderboard(self, combos: List[Dict], state: Dict) -> pd.DataFrame:
+        """Строки результата всех комбинаций, отсортированные по Sharpe Ratio."""
+        rows = [ComboEvaluator.build_row(params, extract_metrics(self.metrics(state, i)))
+                for i, params in enumerate(combos)]
+        df = pd.DataFrame(rows)
+        if len(df):
+            df = df.sort_values('sharpe', ascending=False).reset_index(drop=True)
+        return df
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка (данные и издержки проекта, как stepwise_optimization4.py):
+        python -m optimization.incremental <param_grid.json> [top]
+    """
+    if not argv:
+        print(_main.__doc__)
+        return 2
+    from config import (
+        commission, default_commission, slippage, use_slippage, initial_capital,
+        trading_start_time, time_filter_enabled
+    )
+    from datastore.spread_store import configured_slippage
+    from stepwise_optimization4 import load_all_data
+
+    with open(argv[0], 'r', encoding='utf-8') as f:
+        param_grid = json.load(f)
+    top = int(argv[1]) if len(argv) > 1 else 20
+
+    data, market_df, rvi_data = load_all_data()
+    first = next(iter(data.values()))
+    has_time = first['TRADEDATE'].iloc[0].time() != pd.Timestamp('00:00:00').time()
+    optimizer = IncrementalOptimizer(
+        param_grid,
+        commission=commission,
+        default_commission=default_commission,
+        slippage=configured_slippage(slippage, tickers=list(data)),
+        use_slippage=use_slippage,
+        initial_capital=initial_capital,
+        trade_time_filter=trading_start_time if has_time and time_filter_enabled else None
+    )
+    df = optimizer.refresh(data, market_df, rvi_data)
+    columns = [c for c in param_grid if c in df.columns] + ['sharpe', 'cagr', 'max_drawdown', 'total_trades']
+    print(df[columns].head(top).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
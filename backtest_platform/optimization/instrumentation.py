@@ -0,0 +1,275 @@
+# backtest_platform/optimization/instrumentation.py
+
+"""
+Инструментирование прогонов оптимизации: пропускная способность, ETA, фазы, процессы.
+
+Версия: 1.0.0
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+progress_callback сообщает лишь (номер, всего, params, строка). RunMonitor
+собирает структурированную картину прогона, чтобы оценивать размер сетки и
+замечать регрессии до запуска ночных прогонов:
+  • периодические события прогресса со скользящей скоростью (комбинаций/с) и ETA
+  • источник результата: бэктест / память дедупликации / персистентный кэш
+  • суммарное время фаз (генерация сигналов, симуляция портфеля, запись, ...)
+  • статистика процессов пула: число прогонов, занятое время, загрузка
+
+СОБЫТИЯ:
+Каждое событие — словарь {'event': 'start'|'progress'|'phase'|'finish', 'time', ...}.
+События хранятся в памяти, при jsonl_path дописываются в файл JSON Lines по мере
+появления (файл можно читать во время прогона), при listener передаются в функцию.
+
+Пример:
+    monitor = RunMonitor(jsonl_path='data-optimization/run_events.jsonl')
+    df = optimize_dual_momentum(data, market_df, rvi_data, param_grid=grid, monitor=monitor)
+    print(monitor.summary())
+"""
+
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+__version__ = "1.0.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+# Источники результата комбинации
+SOURCES = ('run', 'memo', 'cache', 'fidelity')
+
+
+class RunMonitor:
+    """
+    Сборщик метрик прогона оптимизации.
+
+    Аргументы:
+        report_every: интервал событий прогресса, секунд (0 — после каждой комбинации)
+        window: число последних комбинаций для скользящей скорости
+        jsonl_path: файл JSON Lines для событий (дописывается)
+        listener: функция, получающая каждое событие
+        verbose: печатать события прогресса в консоль
+    """
+
+    def __init__(
+        self,
+        report_every: float = 30.0,
+        window: int = 200,
+        jsonl_path: Optional[str] = None,
+        listener: Optional[Callable[[Dict], None]] = None,
+        verbose: bool = True
+    ):
+        self.report_every = report_every
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.listener = listener
+        self.verbose = verbose
+        self.events: List[Dict] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        self.mode: Optional[str] = None
+        self.total: Optional[int] = None
+        self.done = 0
+        self.errors = 0
+        self.sources = {source: 0 for source in SOURCES}
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.workers: Dict[int, Dict[str, float]] = {}
+        self._recent = deque(maxlen=max(2, self.window))
+        self._started = None
+        self._finished = None
+        self._last_report = 0.0
+
+    # ======================
+    # ЖИЗНЕННЫЙ ЦИКЛ ПРОГОНА
+    # ======================
+
+    def start(self, total: Optional[int] = None, mode: str = 'grid', **meta) -> None:
+        """Начало прогона: total — ожидаемое число комбинаций (None — неизвестно)."""
+        self._reset()
+        self.mode = mode
+        self.total = total
+        self._started = time.perf_counter()
+        self._last_report = self._started
+        self._emit({'event': 'start', 'mode': mode, 'total': total, **meta})
+
+    def set_total(self, total: Optional[int]) -> None:
+        """Уточнение ожидаемого числа комбинаций (например, после плана уровней halving)."""
+        self.total = total
+
+    def finish(self, **extra) -> Dict:
+        """Завершение прогона; возвращает итоговую сводку (она же событие 'finish')."""
+        self._finished = time.perf_counter()
+        summary = self.summary()
+        self._emit({'event': 'finish', **summary, **extra})
+        return summary
+
+    # ======================
+    # ЗАПИСЬ ИЗМЕРЕНИЙ
+    # ======================
+
+    def record(
+        self,
+        source: str = 'run',
+        error: bool = False,
+        timing: Optional[Dict] = None,
+        count: int = 1
+    ) -> None:
+        """
+        Учёт завершённых комбинаций.
+
+        Аргументы:
+            source: 'run' — бэктест, 'memo' — память дедупликации, 'cache' — персистентный
+                    кэш, 'fidelity' — прогон на неполной истории (successive halving)
+            error: бэктест завершился ошибкой
+            timing: замер прогона {'worker': pid, 'seconds': ..., 'phases': {фаза: секунды}}
+            count: число комбинаций с этим результатом
+        """
+        if self._started is None:
+            self.start()
+        now = time.perf_counter()
+        self.done += count
+        self.sources[source] = self.sources.get(source, 0) + count
+        if error:
+            self.errors += count
+        if timing is not None:
+            worker = self.workers.setdefault(timing['worker'], {'runs': 0, 'busy_seconds': 0.0})
+            worker['runs'] += 1
+            worker['busy_seconds'] += timing['seconds']
+            for name, seconds in timing.get('phases', {}).items():
+                self.add_phase(name, seconds)
+        self._recent.append((now, self.done))
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            self.report()
+
+    def add_phase(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Добавление замера фазы."""
+        phase = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        phase['seconds'] += seconds
+        phase['calls'] += calls
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Замер фазы в основном процессе: with monitor.phase('write'): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    # ======================
+    # СКОРОСТЬ И ETA
+    # ======================
+
+    def elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def throughput(self) -> float:
+        """Средняя скорость за весь прогон, комбинаций в секунду."""
+        elapsed = self.elapsed()
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def rolling_throughput(self) -> float:
+        """Скорость по последним window комбинациям (устойчива к «разгону» и кэшу в начале)."""
+        if len(self._recent) < 2:
+            return self.throughput()
+        (t0, n0), (t1, n1) = self._recent[0], self._recent[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else self.throughput()
+
+    def eta_seconds(self) -> Optional[float]:
+        """Оценка оставшегося времени (None — total неизвестен или скорость нулевая)."""
+        if self.total is None:
+            return None
+        rate = self.rolling_throughput()
+        if rate <= 0:
+            return None
+        return max(0, self.total - self.done) / rate
+
+    def snapshot(self) -> Dict:
+        """Текущее состояние прогона."""
+        served = sum(self.sources[s] for s in ('memo', 'cache'))
+        return {
+            'mode': self.mode,
+            'done': self.done,
+            'total': self.total,
+            'errors': self.errors,
+            'elapsed_seconds': round(self.elapsed(), 3),
+            'throughput': round(self.throughput(), 3),
+            'rolling_throughput': round(self.rolling_throughput(), 3),
+            'eta_seconds': None if self.eta_seconds() is None else round(self.eta_seconds(), 1),
+            'reuse_rate': round(served / self.done, 4) if self.done else 0.0,
+            'sources': dict(self.sources)
+        }
+
+    def summary(self) -> Dict:
+        """Сводка прогона: состояние + агрегаты фаз и процессов."""
+        elapsed = self.elapsed()
+        workers = {
+            str(pid): {
+                'runs': int(stats['runs']),
+                'busy_seconds': round(stats['busy_seconds'], 3),
+                'utilization': round(stats['busy_seconds'] / elapsed, 4) if elapsed > 0 else 0.0
+            }
+            for pid, stats in self.workers.items()
+        }
+        phases = {
+            name: {
+                'seconds': round(stats['seconds'], 3),
+                'calls': int(stats['calls']),
+                'mean_ms': round(1000 * stats['seconds'] / stats['calls'], 3) if stats['calls'] else 0.0
+            }
+            for name, stats in self.phases.items()
+        }
+        return {**self.snapshot(), 'phases': phases, 'workers': workers}
+
+    # ======================
+    # СОБЫТИЯ
+    # ======================
+
+    def report(self) -> None:
+        """Событие прогресса с текущей скоростью и ETA."""
+        event = {'event': 'progress', **self.snapshot()}
+        self._emit(event)
+        if self.verbose:
+            total = f"/{self.total:,}" if self.total is not None else ""
+            eta = event['eta_seconds']
+            eta_text = f", ETA {_format_seconds(eta)}" if eta is not None else ""
+            print(f"   ⏱️  {self.done:,}{total} комбинаций | "
+                  f"{event['rolling_throughput']:.1f} комб/с{eta_text} | "
+                  f"повторно использовано {event['reuse_rate']:.0%}")
+
+    def _emit(self, event: Dict) -> None:
+        event = {'time': round(time.time(), 3), **event}
+        self.events.append(event)
+        if self.jsonl_path:
+            directory = os.path.dirname(self.jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+        if self.listener is not None:
+            self.listener(event)
+
+    def export_jsonl(self, path: str) -> None:
+        """Запись всех накопленных событий в файл JSON Lines (перезапись)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+
+
+def _format_seconds(seconds: float) -> str:
+    """Длительность в виде 1ч 02м 03с / 02м 03с / 3.0с."""
+    seconds = float(seconds)
+    if seconds < 60:
+        return f"{seconds:.1f}с"
+    minutes, sec = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}ч {minutes:02d}м {sec:02d}с"
+    return f"{minutes:02d}м {sec:02d}с"
@@ -0,0 +1,261 @@
+# backtest_platform/optimization/param_grid.py
+
+"""
+Ленивая сетка параметров с ограничениями, арифметическим подсчётом и доступом по номеру.
+
+Версия: 1.0.0
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+optimize_dual_momentum и run_stepwise_optimization считали комбинации через
+len(list(itertools.product(...))), материализуя всю сетку, а правило окон
+волатильности отбрасывало недопустимые комбинации уже ПОСЛЕ их генерации.
+ParamGrid:
+  • считает допустимые комбинации арифметически, не перебирая сетку
+  • перебирает комбинации лениво, отсекая недопустимые поддеревья целиком
+  • выдаёт комбинацию по номеру (grid[i]) — для шардирования и случайной выборки
+
+ОГРАНИЧЕНИЯ:
+Ограничение — предикат над несколькими параметрами, например
+    grid.add_constraint(('base_vol_window', 'market_vol_window'), lambda b, m: b < m)
+Оси, связанные ограничениями, объединяются в группы; допустимые наборы каждой
+группы перечисляются один раз (это произведение лишь нескольких коротких осей),
+остальные оси свободны. Число комбинаций = Π(допустимых наборов групп) ×
+Π(размеров свободных осей).
+
+ПОРЯДОК:
+Комбинации нумеруются в порядке itertools.product по исходной сетке с
+пропуском недопустимых — номер устойчив для одной и той же сетки и ограничений.
+"""
+
+import itertools
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+__version__ = "1.0.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+
+class ParamGrid:
+    """
+    Сетка параметров {имя: [значения]} с ограничениями.
+
+    Пример:
+        grid = ParamGrid(param_grid)
+        grid.add_constraint(('base_vol_window', 'market_vol_window'), lambda b, m: b < m)
+        print(grid.total, len(grid))         # все / допустимые комбинации
+        for params in grid: ...              # ленивый перебор
+        params = grid[12345]                 # комбинация по номеру
+        for params in grid.shard(2, 8): ...  # третья из восьми равных частей
+    """
+
+    def __init__(self, param_grid: Dict[str, Sequence]):
+        self.keys: List[str] = list(param_grid.keys())
+        self.values: List[list] = [list(v) for v in param_grid.values()]
+        self.sizes: List[int] = [len(v) for v in self.values]
+        self._axis = {key: i for i, key in enumerate(self.keys)}
+        self.constraints: List[Tuple[Tuple[int, ...], Callable, str]] = []
+        self._prepared = False
+
+    # ======================
+    # ОГРАНИЧЕНИЯ
+    # ======================
+
+    def add_constraint(
+        self,
+        params: Sequence[str],
+        predicate: Callable[..., bool],
+        name: Optional[str] = None
+    ) -> 'ParamGrid':
+        """
+        Добавление ограничения: predicate(*значения params) → True для допустимых.
+
+        Ограничение над параметрами, которых нет в сетке, не применяется
+        (значение берётся из умолчаний стратегии и не перебирается).
+        """
+        if not all(p in self._axis for p in params):
+            return self
+        axes = tuple(self._axis[p] for p in params)
+        self.constraints.append((axes, predicate, name or ' & '.join(params)))
+        self._prepared = False
+        return self
+
+    def _prepare(self) -> None:
+        """Группировка осей по ограничениям и перечисление допустимых наборов групп."""
+        if self._prepared:
+            return
+        n = len(self.keys)
+        parent = list(range(n))
+
+        def find(a):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        for axes, _, _ in self.constraints:
+            for a in axes[1:]:
+                parent[find(a)] = find(axes[0])
+
+        groups: Dict[int, List[int]] = {}
+        for axis in range(n):
+            groups.setdefault(find(axis), []).append(axis)
+        self._groups: List[List[int]] = list(groups.values())
+        self._group_of = [0] * n
+        self._rank_in_group = [0] * n
+        for g, axes in enumerate(self._groups):
+            for rank, axis in enumerate(axes):
+                self._group_of[axis] = g
+                self._rank_in_group[axis] = rank
+
+        # Для каждой группы: число допустимых наборов с заданным префиксом позиций
+        self._prefix_counts: List[List[Counter]] = []
+        self._group_size: List[int] = []
+        for axes in self._groups:
+            checks = [(tuple(axes.index(a) for a in c_axes), pred)
+                      for c_axes, pred, _ in self.constraints if c_axes[0] in axes]
+            counters = [Counter() for _ in range(len(axes) + 1)]
+            for positions in itertools.product(*(range(self.sizes[a]) for a in axes)):
+                if all(pred(*(self.values[axes[i]][positions[i]] for i in idx)) for idx, pred in checks):
+                    for k in range(len(axes) + 1):
+                        counters[k][positions[:k]] += 1
+            self._prefix_counts.append(counters)
+            self._group_size.append(counters[0][()])
+        self._prepared = True
+
+    # ======================
+    # ПОДСЧЁТ
+    # ======================
+
+    @property
+    def total(self) -> int:
+        """Количество комбинаций без учёта ограничений."""
+        count = 1
+        for size in self.sizes:
+            count *= size
+        return count
+
+    def count(self) -> int:
+        """Количество допустимых комбинаций (без перебора сетки)."""
+        self._prepare()
+        count = 1
+        for size in self._group_size:
+            count *= size
+        return count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _completions(self, positions: List[int]) -> int:
+        """Число допустимых комбинаций с заданным префиксом позиций по осям."""
+        depth = len(positions)
+        count = 1
+        for g, axes in enumerate(self._groups):
+            k = 0
+            while k < len(axes) and axes[k] < depth:
+                k += 1
+            key = tuple(positions[a] for a in axes[:k])
+            count *= self._prefix_counts[g][k].get(key, 0)
+            if count == 0:
+                return 0
+        return count
+
+    # ======================
+    # ПЕРЕБОР И ДОСТУП ПО НОМЕРУ
+    # ======================
+
+    def _to_params(self, positions: Sequence[int]) -> Dict:
+        return {key: self.values[axis][pos] for axis, (key, pos) in enumerate(zip(self.keys, positions))}
+
+    def _group_prefix_ok(self, positions: List[int], axis: int) -> bool:
+        """Есть ли допустимые наборы группы оси axis с уже выбранными позициями."""
+        g = self._group_of[axis]
+        axes = self._groups[g]
+        k = self._rank_in_group[axis] + 1
+        return self._prefix_counts[g][k].get(tuple(positions[a] for a in axes[:k]), 0) > 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Ленивый перебор допустимых комбинаций (недопустимые поддеревья не порождаются)."""
+        self._prepare()
+        n = len(self.keys)
+        if self.count() == 0:
+            return
+        positions: List[int] = []
+
+        def walk(axis: int):
+            if axis == n:
+                yield self._to_params(positions)
+                return
+            for pos in range(self.sizes[axis]):
+                positions.append(pos)
+                if self._group_prefix_ok(positions, axis):
+                    yield from walk(axis + 1)
+                positions.pop()
+
+        yield from walk(0)
+
+    def __getitem__(self, index: int) -> Dict:
+        """Допустимая комбинация с номером index (отрицательные номера — с конца)."""
+        self._prepare()
+        size = self.count()
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"Номер комбинации {index} вне диапазона [0, {size})")
+        positions: List[int] = []
+        for axis in range(len(self.keys)):
+            for pos in range(self.sizes[axis]):
+                positions.append(pos)
+                block = self._completions(positions)
+                if index < block:
+                    break
+                index -= block
+                positions.pop()
+        return self._to_params(positions)
+
+    def index_of(self, params: Dict) -> int:
+        """Номер допустимой комбинации (обратная операция к grid[i])."""
+        self._prepare()
+        if not self.is_feasible(params):
+            raise ValueError("Комбинация не принадлежит сетке или нарушает ограничения")
+        index = 0
+        positions: List[int] = []
+        for axis, key in enumerate(self.keys):
+            target = self.values[axis].index(params[key])
+            for pos in range(target):
+                index += self._completions(positions + [pos])
+            positions.append(target)
+        return index
+
+    def is_feasible(self, params: Dict) -> bool:
+        """Принадлежит ли комбинация сетке и выполняются ли все ограничения."""
+        for key, values in zip(self.keys, self.values):
+            if key not in params or params[key] not in values:
+                return False
+        return all(pred(*(params[self.keys[a]] for a in axes)) for axes, pred, _ in self.constraints)
+
+    def iter_range(self, start: int, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Комбинации с номерами [start, stop)."""
+        stop = self.count() if stop is None else min(stop, self.count())
+        for index in range(start, stop):
+            yield self[index]
+
+    def shard(self, shard_index: int, n_shards: int) -> Iterator[Dict]:
+        """Часть shard_index из n_shards примерно равных непрерывных частей сетки."""
+        if not 0 <= shard_index < n_shards:
+            raise ValueError(f"shard_index должен быть в [0, {n_shards})")
+        size = self.count()
+        start = size * shard_index // n_shards
+        stop = size * (shard_index + 1) // n_shards
+        return self.iter_range(start, stop)
+
+    def to_dict(self) -> Dict[str, list]:
+        """Исходная сетка {параметр: значения}."""
+        return dict(zip(self.keys, self.values))
+
+
+def as_param_grid(param_grid: Union[Dict[str, Sequence], ParamGrid]) -> ParamGrid:
+    """ParamGrid из словаря сетки (готовый ParamGrid возвращается как есть)."""
+    return param_grid if isinstance(param_grid, ParamGrid) else ParamGrid(param_grid)
@@ -0,0 +1,317 @@
+# backtest_platform/optimization/pareto_search.py
+
+"""
+Многокритериальный популяционный поиск (NSGA-II) по сетке параметров.
+
+Версия: 1.0.0
+Версия: 1.0.1 (pareto_rank с нуля, как у non_dominated_sort: 0 — фронт Парето)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Параметры выбираются компромиссом между Sharpe, просадкой и числом сделок,
+а optimize_dual_momentum сортирует только по Sharpe. Режим
+search_mode='pareto' ищет по той же сетке набор НЕДОМИНИРУЕМЫХ комбинаций
+(фронт Парето): ни одна другая оценённая комбинация не лучше сразу по всем
+критериям. Компромиссы по риску остаются явными, выбор — за исследователем.
+
+АЛГОРИТМ (Deb et al., 2002):
+  1. Начальная популяция — случайные допустимые комбинации сетки
+  2. Потомки: турнирный отбор по (рангу фронта, crowding distance),
+     равномерное скрещивание позиций осей, мутация (соседнее значение
+     числовой оси или случайное значение категориальной)
+  3. Родители + потомки сортируются по фронтам недоминирования; следующее
+     поколение заполняется фронтами целиком, последний — по crowding distance
+Поколение оценивается одним пакетом через ComboEvaluator (параллельно в пуле
+процессов, с дедупликацией и персистентным кэшем результатов).
+
+КРИТЕРИИ ПО УМОЛЧАНИЮ:
+  sharpe → max, max_drawdown → max (просадка отрицательная: ближе к нулю — лучше),
+  total_trades → min
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from optimization.canonical import canonicalize_params
+from optimization.evaluator import ComboEvaluator
+from optimization.param_grid import ParamGrid, as_param_grid
+
+__version__ = "1.0.1"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+DEFAULT_OBJECTIVES = (('sharpe', 'max'), ('max_drawdown', 'max'), ('total_trades', 'min'))
+
+
+# ======================
+# НЕДОМИНИРУЕМАЯ СОРТИРОВКА
+# ======================
+
+def non_dominated_sort(F: np.ndarray) -> np.ndarray:
+    """
+    Ранги фронтов Парето (0 — недоминируемые) для задачи минимизации.
+
+    Аргументы:
+        F: матрица [n, m] значений критериев (меньше — лучше)
+    """
+    n = len(F)
+    ranks = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return ranks
+    le = (F[:, None, :] <= F[None, :, :]).all(axis=2)
+    lt = (F[:, None, :] < F[None, :, :]).any(axis=2)
+    dominates = le & lt                       # [i, j]: i доминирует j
+    dominated_count = dominates.sum(axis=0)
+    front = np.nonzero(dominated_count == 0)[0]
+    rank = 0
+    while len(front):
+        ranks[front] = rank
+        dominated_count = dominated_count - dominates[front].sum(axis=0)
+        dominated_count[ranks >= 0] = -1
+        front = np.nonzero(dominated_count == 0)[0]
+        rank += 1
+    return ranks
+
+
+def pareto_front_mask(F: np.ndarray, chunk: int = 512) -> np.ndarray:
+    """Маска недоминируемых строк F (минимизация) без матрицы n × n целиком."""
+    n = len(F)
+    mask = np.ones(n, dtype=bool)
+    for start in range(0, n, chunk):
+        block = F[start:start + chunk]
+        le = (F[None, :, :] <= block[:, None, :]).all(axis=2)
+        lt = (F[None, :, :] < block[:, None, :]).any(axis=2)
+        mask[start:start + chunk] = ~(le & lt).any(axis=1)
+    return mask
+
+
+def crowding_distance(F: np.ndarray) -> np.ndarray:
+    """Crowding distance точек одного фронта (крайние точки — бесконечность)."""
+    n, m = F.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for j in range(m):
+        order = np.argsort(F[:, j], kind='stable')
+        values = F[order, j]
+        span = values[-1] - values[0]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0 and np.isfinite(span):
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+def _objective_matrix(rows: List[Dict], objectives: Sequence[Tuple[str, str]]) -> np.ndarray:
+    """Строки результатов → матрица минимизации (NaN / отсутствие → худшее значение)."""
+    F = np.empty((len(rows), len(objectives)))
+    for j, (column, direction) in enumerate(objectives):
+        sign = -1.0 if direction == 'max' else 1.0
+        for i, row in enumerate(rows):
+            value = row.get(column)
+            F[i, j] = sign * float(value) if value is not None and np.isfinite(value) else np.inf
+    return F
+
+
+# ======================
+# ОСНОВНАЯ ФУНКЦИЯ
+# ======================
+
+def run_pareto_search(
+    evaluator: ComboEvaluator,
+    param_grid: Union[Dict[str, List], ParamGrid],
+    progress_callback: Optional[Callable] = None,
+    objectives: Sequence[Tuple[str, str]] = DEFAULT_OBJECTIVES,
+    population_size: int = 40,
+    n_generations: int = 10,
+    crossover_rate: float = 0.9,
+    mutation_rate: Optional[float] = None,
+    n_jobs: int = 1,
+    return_all: bool = False,
+    random_state: Optional[int] = 42
+) -> Tuple[List[Dict], Dict]:
+    """
+    NSGA-II по сетке параметров.
+
+    Аргументы:
+        evaluator: оценщик комбинаций (данные, издержки, кэш)
+        param_grid: сетка значений или ParamGrid с ограничениями
+        progress_callback: вызывается как (номер, бюджет, params, строка результата)
+        objectives: критерии [(колонка, 'max' | 'min'), ...]
+        population_size: размер популяции
+        n_generations: число поколений потомков (бюджет ≈ population_size × (n_generations + 1))
+        crossover_rate: вероятность скрещивания пары родителей
+        mutation_rate: вероятность мутации оси (None — 1 / число осей)
+        n_jobs: процессов для оценки поколения
+        return_all: вернуть все оценённые строки (иначе — только фронт Парето)
+        random_state: зерно генератора случайных чисел
+
+    Возвращает:
+        (строки фронта Парето по всем оценённым комбинациям с колонками
+         'pareto_rank' (0 — недоминируемые; при return_all и больше 4000 строк
+         доминируемые получают 1 без точного ранга), 'crowding_distance'
+         (только для фронта, остальным 0), 'search_generation';
+         статистика {'evaluated', 'errors', 'generations', 'front_size'})
+    """
+    for column, direction in objectives:
+        if direction not in ('max', 'min'):
+            raise ValueError(f"Направление критерия '{column}' должно быть 'max' или 'min' (получено {direction})")
+
+    grid = as_param_grid(param_grid)
+    rng = np.random.default_rng(random_state)
+    sizes = np.asarray(grid.sizes)
+    n_axes = len(sizes)
+    numeric = [all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+                   for v in values) for values in grid.values]
+    mutation_rate = mutation_rate if mutation_rate is not None else 1.0 / max(n_axes, 1)
+    feasible_total = len(grid)
+    budget = min(population_size * (n_generations + 1), feasible_total)
+
+    stats = {'evaluated': 0, 'errors': 0, 'generations': 0, 'front_size': 0}
+    archive: Dict[tuple, Dict] = {}      # канонический ключ → строка результата
+    archive_order: List[tuple] = []
+
+    def to_params(positions) -> Dict:
+        return {key: grid.values[axis][int(p)] for axis, (key, p) in enumerate(zip(grid.keys, positions))}
+
+    def key_of(params: Dict) -> tuple:
+        return tuple(canonicalize_params(params, evaluator.has_rvi).items())
+
+    def random_individuals(n: int) -> List[np.ndarray]:
+        if feasible_total == 0:
+            return []
+        if feasible_total <= n:
+            indices = rng.permutation(feasible_total)
+        else:
+            indices = rng.choice(feasible_total, size=n, replace=False)
+        return [np.asarray([grid.values[a].index(v) for a, v in enumerate(grid[int(i)].values())])
+                for i in indices]
+
+    def evaluate(population: List[np.ndarray], generation: int) -> List[Optional[Dict]]:
+        """Оценка поколения одним пакетом; повторно встреченные комбинации берутся из архива."""
+        params_list = [to_params(p) for p in population]
+        keys = [key_of(p) for p in params_list]
+        fresh = [i for i, k in enumerate(keys) if k not in archive]
+        # Дубликаты внутри поколения оцениваются один раз (ComboEvaluator дедуплицирует пакет)
+        outcomes = evaluator.evaluate_many([params_list[i] for i in fresh], n_jobs=n_jobs) if fresh else []
+        for i, outcome in zip(fresh, outcomes):
+            if keys[i] in archive:
+                continue
+            stats['evaluated'] += 1
+            if isinstance(outcome, Exception):
+                stats['errors'] += 1
+                archive[keys[i]] = None
+            else:
+                row = evaluator.build_row(params_list[i], outcome)
+                row['search_generation'] = generation
+                archive[keys[i]] = row
+                if progress_callback:
+                    progress_callback(stats['evaluated'], budget, params_list[i], row)
+            archive_order.append(keys[i])
+        return [archive[k] for k in keys]
+
+    def rank_population(rows: List[Optional[Dict]]) -> Tuple[np.ndarray, np.ndarray]:
+        F = _objective_matrix([r or {} for r in rows], objectives)
+        ranks = non_dominated_sort(F)
+        crowd = np.zeros(len(rows))
+        for rank in np.unique(ranks):
+            members = np.nonzero(ranks == rank)[0]
+            crowd[members] = crowding_distance(F[members])
+        return ranks, crowd
+
+    def tournament(ranks: np.ndarray, crowd: np.ndarray) -> int:
+        a, b = rng.integers(0, len(ranks), size=2)
+        if ranks[a] != ranks[b]:
+            return a if ranks[a] < ranks[b] else b
+        return a if crowd[a] >= crowd[b] else b
+
+    def mutate(child: np.ndarray) -> np.ndarray:
+        for axis in range(n_axes):
+            if sizes[axis] < 2 or rng.random() >= mutation_rate:
+                continue
+            if numeric[axis]:
+                step = 1 if rng.random() < 0.5 else -1
+                child[axis] = int(np.clip(child[axis] + step, 0, sizes[axis] - 1))
+            else:
+                child[axis] = rng.integers(0, sizes[axis])
+        return child
+
+    def offspring(population: List[np.ndarray], ranks: np.ndarray, crowd: np.ndarray) -> List[np.ndarray]:
+        children: List[np.ndarray] = []
+        attempts = 0
+        while len(children) < population_size and attempts < population_size * 20:
+            attempts += 1
+            first = population[tournament(ranks, crowd)]
+            second = population[tournament(ranks, crowd)]
+            if rng.random() < crossover_rate:
+                take = rng.random(n_axes) < 0.5
+                child = np.where(take, first, second)
+            else:
+                child = first.copy()
+            child = mutate(child)
+            if grid.is_feasible(to_params(child)):
+                children.append(child)
+        # Недостающие потомки (сетка почти исчерпана ограничениями) — случайные допустимые
+        if len(children) < population_size:
+            children.extend(random_individuals(population_size - len(children)))
+        return children
+
+    # === НАЧАЛЬНАЯ ПОПУЛЯЦИЯ ===
+    population = random_individuals(population_size)
+    if not population:
+        return [], stats
+    rows = evaluate(population, 0)
+    ranks, crowd = rank_population(rows)
+    print(f"   🧬 Поколение 0: {len(population)} комбинаций, фронт {int((ranks == 0).sum())}")
+
+    # === ПОКОЛЕНИЯ ===
+    for generation in range(1, n_generations + 1):
+        if len(archive) >= feasible_total:
+            break   # сетка исчерпана
+        children = offspring(population, ranks, crowd)
+        child_rows = evaluate(children, generation)
+
+        merged = population + children
+        merged_rows = rows + child_rows
+        merged_ranks, merged_crowd = rank_population(merged_rows)
+
+        # Отбор: сначала ранг, затем crowding distance; дубликаты комбинаций не размножаются
+        order = np.lexsort((-merged_crowd, merged_ranks))
+        chosen, chosen_keys = [], set()
+        for i in order:
+            key = tuple(int(p) for p in merged[i])
+            if key in chosen_keys:
+                continue
+            chosen_keys.add(key)
+            chosen.append(i)
+            if len(chosen) >= population_size:
+                break
+        population = [merged[i] for i in chosen]
+        rows = [merged_rows[i] for i in chosen]
+        ranks, crowd = rank_population(rows)
+        stats['generations'] = generation
+        print(f"   🧬 Поколение {generation}: оценено {stats['evaluated']:,}, фронт {int((ranks == 0).sum())}")
+
+    # === ФРОНТ ПАРЕТО ПО ВСЕМ ОЦЕНЁННЫМ КОМБИНАЦИЯМ ===
+    evaluated = [archive[k] for k in archive_order if archive[k] is not None]
+    if not evaluated:
+        return [], stats
+    F = _objective_matrix(evaluated, objectives)
+    if return_all:
+        all_ranks = non_dominated_sort(F) if len(F) <= 4000 else np.where(pareto_front_mask(F), 0, 1)
+    else:
+        all_ranks = np.where(pareto_front_mask(F), 0, 1)
+    front = np.nonzero(all_ranks == 0)[0]
+    crowd = np.zeros(len(evaluated))
+    crowd[front] = crowding_distance(F[front])
+    stats['front_size'] = len(front)
+
+    selected = range(len(evaluated)) if return_all else front
+    result = []
+    for i in selected:
+        row = dict(evaluated[i])
+        row['pareto_rank'] = int(all_ranks[i])
+        row['crowding_distance'] = float(crowd[i])
+        result.append(row)
+    return result, stats
@@ -0,0 +1,409 @@
+# backtest_platform/optimization/pipeline.py
+
+"""
+Декларативный многошаговый конвейер оптимизации с общим состоянием.
+
+Версия: 1.0.0
+Версия: 1.1.0 (шаги оптимизации не видят отрезок проверки: история до начала holdout)
+Версия: 1.2.0 (slippage=None — профиль спреда при заданном config.spread_slippage_store)
+Версия: 1.2.1 (STRATEGY_PARAMS перенесён в optimization/canonical.py)
+Версия: 1.3.0 (проверка не выбирает параметры по holdout: только отчёт и порог min_score)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Пошаговая калибровка из optimization_cfg.py (окна → пороги → RVI → проверка
+на невидимом периоде) раньше выполнялась правкой сетки в __main__
+stepwise_optimization4.py и ручным переносом лучших параметров между
+запусками. Конвейер принимает упорядоченный список шагов и выполняет их
+подряд в одном процессе:
+  • лучшие параметры шага фиксируются для следующих шагов
+  • данные, кэш признаков FeatureCache, маски фильтров, память выбора актива
+    и память дедупликации — один ComboEvaluator на весь конвейер
+  • персистентный кэш результатов (если передан) общий для всех шагов
+  • если в конвейере есть шаги проверки, шаги оптимизации считаются на
+    истории, обрезанной перед самым длинным отрезком проверки (отдельный
+    оценщик): проверка идёт на действительно невидимых днях
+  • шаг проверки параметры не выбирает: лучшие параметры предыдущего шага
+    остаются, метрики кандидатов на отрезке проверки — отчёт; при заданном
+    min_score конвейер отклоняется, если лучшие параметры не набрали порог
+
+ОПИСАНИЕ ШАГА (словарь):
+  Шаг оптимизации:
+    {'name': 'Step_1_Windows',
+     'grid': {'base_lookback': [20, 25, 29], ...},  # свободные параметры шага
+     'objective': 'sharpe',          # колонка, 'calmar', 'constrained' или функция row → число
+     'search_mode': 'grid',          # необязательно: режим optimize_dual_momentum
+     'search_options': {...},        # необязательно
+     'top_k': 200}                   # необязательно: хранить только K лучших строк
+  Шаг проверки на последних днях истории (невидимых для шагов оптимизации):
+    {'name': 'Step_4_Holdout',
+     'validate_days': 126,           # отрезок проверки (≈6 месяцев торговых дней)
+     'candidates': 10,               # лучшие комбинации предыдущего шага (в отчёт)
+     'objective': 'sharpe',
+     'min_score': 0.0}               # необязательно: порог целевой функции лучших параметров
+  Остальные параметры стратегии на каждом шаге фиксированы текущими лучшими
+  (начальные — base_params, обычно production_params).
+
+Пример:
+    pipeline = OptimizationPipeline(calibration_pipeline, data, market_df, rvi_data,
+                                    base_params=production_params, commission=0.001)
+    best = pipeline.run()
+    print(pipeline.summary())
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from optimization.canonical import STRATEGY_PARAMS
+from optimization.evaluator import ComboEvaluator
+from optimization.result_cache import ResultCache
+from optimization.top_k import TopKCollector
+
+__version__ = "1.3.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+
+def strategy_params(params: Dict) -> Dict:
+    """Только параметры стратегии (без метрик, версий и служебных полей)."""
+    return {key: value for key, value in params.items() if key in STRATEGY_PARAMS}
+
+
+def _plain(value):
+    """numpy-скаляр → значение Python (для сеток и JSON)."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _truncate(df: Optional[pd.DataFrame], cutoff: pd.Timestamp) -> Optional[pd.DataFrame]:
+    """Строки с TRADEDATE раньше cutoff."""
+    if df is None:
+        return None
+    return df[pd.to_datetime(df['TRADEDATE']) < cutoff].reset_index(drop=True)
+
+
+def _validate_step(step: Dict, position: int) -> None:
+    name = step.get('name') or f"#{position}"
+    if 'grid' in step and 'validate_days' in step:
+        raise ValueError(f"Шаг {name}: нужно одно из 'grid' или 'validate_days'")
+    if 'grid' in step:
+        unknown = set(step['grid']) - set(STRATEGY_PARAMS)
+        if unknown:
+            raise ValueError(f"Шаг {name}: неизвестные параметры стратегии: {', '.join(sorted(unknown))}")
+        if not step['grid']:
+            raise ValueError(f"Шаг {name}: пустая сетка")
+    elif 'validate_days' in step:
+        if position == 0:
+            raise ValueError(f"Шаг {name}: проверке нужен предшествующий шаг оптимизации")
+        if step['validate_days'] < 1:
+            raise ValueError(f"Шаг {name}: validate_days должно быть ≥ 1")
+    else:
+        raise ValueError(f"Шаг {name}: нужно 'grid' (оптимизация) или 'validate_days' (проверка)")
+
+
+class OptimizationPipeline:
+    """
+    Последовательность шагов оптимизации на общем оценщике.
+
+    Аргументы:
+        steps: упорядоченный список описаний шагов (см. модуль)
+        data_dict, market_data, rvi_data: данные (загружаются вызывающим кодом один раз)
+        base_params: начальные значения всех параметров стратегии
+        engine: движок бэктеста ('fast' — признаки считаются один раз на конвейер)
+        result_cache: персистентный кэш результатов, общий для шагов
+        output_dir: директория CSV шагов и итогового JSON (None — без сохранения)
+        commission, default_commission, slippage, use_slippage: None — из common_cfg.py
+    """
+
+    def __init__(
+        self,
+        steps: List[Dict],
+        data_dict: Dict[str, pd.DataFrame],
+        market_data: pd.DataFrame,
+        rvi_data: Optional[pd.DataFrame] = None,
+        base_params: Optional[Dict] = None,
+        engine: str = 'fast',
+        result_cache: Optional[ResultCache] = None,
+        output_dir: Optional[str] = None,
+        commission: Optional[float] = None,
+        default_commission: Optional[float] = None,
+        slippage: Optional[float] = None,
+        use_slippage: Optional[bool] = None,
+        initial_capital: float = 100_000,
+        trade_time_filter: Optional[str] = None,
+        skip_invalid_windows: bool = True
+    ):
+        if not steps:
+            raise ValueError("Конвейер должен содержать хотя бы один шаг")
+        for position, step in enumerate(steps):
+            _validate_step(step, position)
+
+        from config import (
+            commission as default_rate, default_commission as fallback_rate,
+            slippage as default_slippage, use_slippage as default_use_slippage
+        )
+        from datastore.spread_store import configured_slippage
+        self.steps = steps
+        self.data_dict = data_dict
+        self.market_data = market_data
+        self.rvi_data = rvi_data
+        self.output_dir = output_dir
+        self.skip_invalid_windows = skip_invalid_windows
+        self.best_params = strategy_params(base_params or {})
+        self.history: List[Dict] = []
+
+        settings = {
+            'commission': commission if commission is not None else default_rate,
+            'default_commission': default_commission if default_commission is not None else fallback_rate,
+            'slippage': slippage if slippage is not None else configured_slippage(default_slippage, data_dict),
+            'use_slippage': use_slippage if use_slippage is not None else default_use_slippage,
+            'initial_capital': initial_capital,
+            'trade_time_filter': trade_time_filter,
+            'result_cache': result_cache,
+            'engine': engine
+        }
+        # 🔑 Один оценщик на все шаги: признаки, маски и результаты не пересчитываются
+        self.evaluator = ComboEvaluator(data_dict, market_data, rvi_data, **settings)
+
+        # 🔒 Отрезок проверки невидим для шагов оптимизации: они считаются на истории до его начала
+        self.holdout_days = max((step['validate_days'] for step in steps if 'validate_days' in step), default=0)
+        self.search_end: Optional[pd.Timestamp] = None
+        self.search_evaluator = self.evaluator
+        if self.holdout_days:
+            features = self.evaluator.fast_engine().features
+            days = min(self.holdout_days, features.n_dates - 1)
+            self.search_end = pd.Timestamp(features.calendar[features.n_dates - days])
+            self.search_evaluator = ComboEvaluator(
+                {ticker: _truncate(df, self.search_end) for ticker, df in data_dict.items()},
+                _truncate(market_data, self.search_end),
+                _truncate(rvi_data, self.search_end),
+                **settings
+            )
+
+    @property
+    def evaluators(self) -> List[ComboEvaluator]:
+        """Оценщик шагов оптимизации и (если есть проверка) оценщик полной истории."""
+        if self.search_evaluator is self.evaluator:
+            return [self.evaluator]
+        return [self.search_evaluator, self.evaluator]
+
+    def _runs(self) -> int:
+        return sum(evaluator.runs for evaluator in self.evaluators)
+
+    def close(self) -> None:
+        for evaluator in self.evaluators:
+            evaluator.close()
+
+    def step_grid(self, step: Dict) -> Dict[str, List]:
+        """Сетка шага: текущие лучшие значения фиксированы, свободные параметры — из шага."""
+        return {**{key: [value] for key, value in self.best_params.items()}, **step['grid']}
+
+    # ======================
+    # ВЫПОЛНЕНИЕ
+    # ======================
+
+    def run(self) -> Dict:
+        """
+        Выполнение всех шагов по порядку.
+
+        Возвращает:
+            Лучшие параметры стратегии после последнего шага
+        """
+        started = time.perf_counter()
+        if self.search_end is not None:
+            print(f"🔒 Шаги оптимизации — на истории до {self.search_end.date()}, "
+                  f"последние {self.holdout_days} дней — только для проверки")
+        try:
+            for position, step in enumerate(self.steps, 1):
+                name = step.get('name') or f"Step_{position}"
+                print("\n" + "=" * 70)
+                print(f"🎯 ШАГ {position}/{len(self.steps)}: {name}")
+                print("=" * 70)
+                step_started = time.perf_counter()
+                runs_before = self._runs()
+                if 'grid' in step:
+                    record = self._run_search_step(name, step)
+                else:
+                    record = self._run_validation_step(name, step)
+                record.update({
+                    'step': name,
+                    'backtests': self._runs() - runs_before,
+                    'seconds': time.perf_counter() - step_started
+                })
+                self.history.append(record)
+                changed = ', '.join(
+                    f"{key}={value}" for key, value in record['best_params'].items()
+                    if self.best_params.get(key, object()) != value
+                ) or 'параметры не изменились'
+                self.best_params = {**self.best_params, **record['best_params']}
+                self._save_step(name, record)
+                print(f"   ✨ Лучшее по '{record['objective']}' = {record['best_score']:.4f}: {changed}")
+        finally:
+            self.close()
+
+        total_seconds = time.perf_counter() - started
+        print(f"\n✅ КОНВЕЙЕР ЗАВЕРШЁН: {len(self.steps)} шагов за {total_seconds:.1f} с, "
+              f"бэктестов {self._runs():,} (из памяти {sum(e.reused for e in self.evaluators):,})")
+        self._save_final(total_seconds)
+        return dict(self.best_params)
+
+    def _run_search_step(self, name: str, step: Dict) -> Dict:
+        from optimizer import optimize_dual_momentum, build_param_grid
+
+        grid = self.step_grid(step)
+        objective = step.get('objective', 'sharpe')
+        # Ранжирование по целевой функции шага — через TopKCollector (все строки, если top_k не задан)
+        k = step.get('top_k') or max(1, len(build_param_grid(grid, self.skip_invalid_windows)))
+        collector = TopKCollector(k=k, objective=objective, params=list(step['grid']))
+
+        evaluator = self.search_evaluator
+        results_df = optimize_dual_momentum(
+            data_dict=evaluator.data_dict,
+            market_data=evaluator.market_data,
+            rvi_data=evaluator.rvi_data,
+            param_grid=grid,
+            skip_invalid_windows=self.skip_invalid_windows,
+            search_mode=step.get('search_mode', 'grid'),
+            search_options=step.get('search_options'),
+            top_k=collector,
+            evaluator=evaluator
+        )
+        if results_df.empty:
+            raise ValueError(f"Шаг {name}: ни одна комбинация не прошла отбор по '{collector.objective_name}'")
+        best = results_df.iloc[0]
+        return {
+            'kind': 'search',
+            'objective': collector.objective_name,
+            'best_score': float(best['objective_score']),
+            'best_params': {key: _plain(best[key]) for key in step['grid']},
+            'combinations': collector.seen,
+            'results': results_df
+        }
+
+    def _run_validation_step(self, name: str, step: Dict) -> Dict:
+        """
+        Метрики кандидатов предыдущего шага на отрезке проверки.
+
+        Отрезок проверки в выборе не участвует: лучшие параметры остаются прежними
+        (первый кандидат), остальные кандидаты — для сравнения устойчивости.
+        """
+        previous = self.history[-1]['results']
+        candidates = previous.head(step.get('candidates', 10))
+        params_list = [
+            {**self.best_params, **strategy_params({key: _plain(value) for key, value in row.items()})}
+            for row in candidates.to_dict('records')
+        ]
+        n_dates = self.evaluator.fast_engine().features.n_dates
+        days = min(step['validate_days'], n_dates - 1)
+        start = n_dates - days
+        print(f"   🔎 Проверка {len(params_list)} лучших комбинаций на последних {days} днях истории")
+
+        collector = TopKCollector(k=len(params_list), objective=step.get('objective', 'sharpe'))
+        outcomes = self.evaluator.evaluate_fidelity(params_list, start=start)
+        rows = []
+        for rank, (params, outcome) in enumerate(zip(params_list, outcomes), 1):
+            if isinstance(outcome, Exception):
+                print(f"   ⚠️  Ошибка проверки: {outcome}")
+                continue
+            row = self.evaluator.build_row(params, outcome)
+            rows.append({**row, 'search_rank': rank, 'objective_score': collector.score(row)})
+        results_df = pd.DataFrame(rows)
+        if results_df.empty or results_df['search_rank'].iloc[0] != 1:
+            raise ValueError(f"Шаг {name}: лучшие параметры предыдущего шага не удалось проверить")
+
+        display_cols = [c for c in ('search_rank', 'base_lookback', 'base_vol_window', 'market_vol_window',
+                                    'cagr', 'sharpe', 'max_drawdown', 'objective_score')
+                        if c in results_df.columns]
+        print(results_df[display_cols].to_string(index=False))
+
+        best_score = float(results_df['objective_score'].iloc[0])
+        min_score = step.get('min_score')
+        if min_score is not None and not best_score >= min_score:
+            raise ValueError(f"Шаг {name}: на отрезке проверки '{collector.objective_name}' = {best_score:.4f} "
+                             f"ниже порога {min_score} — параметры отклонены")
+        return {
+            'kind': 'validation',
+            'objective': collector.objective_name,
+            'best_score': best_score,
+            'best_params': dict(self.best_params),
+            'combinations': len(params_list),
+            'validate_days': days,
+            'results': results_df
+        }
+
+    # ======================
+    # ОТЧЁТ
+    # ======================
+
+    def summary(self) -> pd.DataFrame:
+        """Сводка по шагам: целевая функция, лучшее значение, комбинации, бэктесты, время."""
+        return pd.DataFrame([
+            {key: record[key] for key in ('step', 'kind', 'objective', 'best_score',
+                                          'combinations', 'backtests', 'seconds')}
+            for record in self.history
+        ])
+
+    def _save_step(self, name: str, record: Dict) -> None:
+        if self.output_dir is None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = name.lower().replace(' ', '_')
+        record['results'].to_csv(os.path.join(self.output_dir, f"pipeline_{slug}.csv"), index=False)
+
+    def _save_final(self, total_seconds: float) -> None:
+        if self.output_dir is None:
+            return
+        path = os.path.join(self.output_dir, "pipeline_best_params.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'best_params': self.best_params,
+                'steps': self.summary().to_dict('records'),
+                'seconds': round(total_seconds, 3)
+            }, f, ensure_ascii=False, indent=2, default=str)
+        print(f"   💾 Итог конвейера: '{path}'")
+
+
+# ======================
+# КОМАНДНАЯ СТРОКА
+# ======================
+
+def _main() -> int:
+    """
+    Полная калибровка по config.calibration_pipeline на данных проекта:
+        cd backtest_platform && python -m optimization.pipeline
+    """
+    from config import (
+        cache_dir, result_cache_max_mb, initial_capital, trading_start_time,
+        time_filter_enabled, production_params, calibration_pipeline
+    )
+    from stepwise_optimization4 import load_all_data, project_root
+
+    data, market_df, rvi_data = load_all_data()
+    first = next(iter(data.values()))
+    has_time = first['TRADEDATE'].iloc[0].time() != pd.Timestamp('00:00:00').time()
+    pipeline = OptimizationPipeline(
+        calibration_pipeline,
+        data,
+        market_df,
+        rvi_data,
+        base_params=production_params,
+        result_cache=ResultCache(os.path.join(project_root, cache_dir), max_size_mb=result_cache_max_mb),
+        output_dir=os.path.join(project_root, "data-optimization"),
+        initial_capital=initial_capital,
+        trade_time_filter=trading_start_time if has_time and time_filter_enabled else None
+    )
+    best = pipeline.run()
+    print(pipeline.summary().to_string(index=False))
+    print("\n✨ ЛУЧШИЕ ПАРАМЕТРЫ КОНВЕЙЕРА:")
+    for key, value in sorted(best.items()):
+        print(f"  {key:30s}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(_main())
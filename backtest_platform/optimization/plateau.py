@@ -0,0 +1,275 @@
+# backtest_platform/optimization/plateau.py
+
+"""
+Поиск плато параметров по таблице результатов сетки.
+
+Версия: 1.0.0
+Версия: 1.1.0 (уровень None — отдельный срез, не сосед числовых значений оси)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Лучший Sharpe из optimize_dual_momentum — чаще всего случайный пик: соседние
+значения параметров дают заметно худший результат. Устойчивая комбинация
+лежит на широком плато. Здесь результаты раскладываются в плотный
+n-мерный массив по осям параметров и для каждой ячейки считаются
+статистики её окрестности (гиперкуб ±radius шагов по каждой оси):
+  • plateau_mean     — среднее целевой функции по заполненным соседям
+  • plateau_std      — разброс в окрестности (локальная устойчивость)
+  • plateau_min      — худший сосед
+  • plateau_coverage — доля заполненных ячеек окрестности
+  • plateau_score    — plateau_mean − penalty · plateau_std
+Комбинации ранжируются по plateau_score.
+
+ОСИ И ПРОПУСКИ:
+  • Ось — параметр с несколькими значениями; значения упорядочены по
+    возрастанию, None (например, market_vol_window=None — окно base_vol_window)
+    — отдельный уровень в конце оси. Это другой режим, а не следующее
+    значение: уровень None не входит в окрестность числовых значений оси и
+    сам образует срез с соседями только по остальным осям.
+  • Ячейки без результата (недопустимые окна, отсечённые режимами поиска,
+    дубликаты канонизации, NaN целевой функции) — пропуски: в статистики
+    окрестности не входят и снижают plateau_coverage. Ячейки с покрытием
+    ниже min_coverage не ранжируются.
+
+ВЫЧИСЛЕНИЕ:
+Суммы по окрестности разделимы: скользящая сумма вдоль каждой оси через
+кумулятивные суммы (O(ячеек · осей), не зависит от radius), минимум —
+скользящее окно numpy вдоль каждой оси. Миллионы ячеек — секунды.
+
+Пример:
+    df = optimize_dual_momentum(data, market_df, rvi_data, param_grid=grid)
+    robust = find_parameter_plateaus(df, objective='sharpe', radius=1, penalty=1.0)
+    print(robust.head(10))
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from optimization.canonical import STRATEGY_PARAMS
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+PLATEAU_COLUMNS = ('plateau_mean', 'plateau_std', 'plateau_min', 'plateau_coverage', 'plateau_score')
+
+
+def objective_values(
+    results_df: pd.DataFrame,
+    objective: Union[str, Callable[[pd.DataFrame], np.ndarray]] = 'sharpe'
+) -> np.ndarray:
+    """
+    Целевая функция по всем строкам сразу.
+
+    objective: колонка, 'calmar' (CAGR / |max_drawdown|, если колонки нет)
+               или функция DataFrame → массив
+    """
+    if callable(objective):
+        values = objective(results_df)
+    elif objective in results_df.columns and results_df[objective].notna().any():
+        values = results_df[objective]
+    elif objective == 'calmar':
+        drawdown = results_df['max_drawdown'].abs().replace(0, np.nan)
+        values = results_df['cagr'] / drawdown
+    else:
+        raise ValueError(f"Целевая функция '{objective}' отсутствует в результатах")
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, np.nan)
+
+
+def _window_sum(a: np.ndarray, axis: int, radius: int) -> np.ndarray:
+    """Сумма по окну [i − radius, i + radius] вдоль оси (окно обрезается на краях)."""
+    n = a.shape[axis]
+    shape = list(a.shape)
+    shape[axis] = 1
+    cumulative = np.concatenate([np.zeros(shape), np.cumsum(a, axis=axis)], axis=axis)
+    positions = np.arange(n)
+    upper = np.minimum(positions + radius + 1, n)
+    lower = np.maximum(positions - radius, 0)
+    return np.take(cumulative, upper, axis=axis) - np.take(cumulative, lower, axis=axis)
+
+
+def _window_min(a: np.ndarray, axis: int, radius: int) -> np.ndarray:
+    """Минимум по окну [i − radius, i + radius] вдоль оси (+inf за краями)."""
+    pad = [(0, 0)] * a.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(a, pad, constant_values=np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=axis)
+    return windows.min(axis=-1)
+
+
+def _window(window: Callable, a: np.ndarray, axis: int, radius: int, separate_last: bool) -> np.ndarray:
+    """Окно вдоль оси; separate_last — последний уровень (None) не входит в окно числовых уровней."""
+    if not separate_last:
+        return window(a, axis, radius)
+    n = a.shape[axis]
+    if n < 2:
+        return a
+    numeric = window(np.take(a, np.arange(n - 1), axis=axis), axis, radius)
+    return np.concatenate([numeric, np.take(a, [n - 1], axis=axis)], axis=axis)
+
+
+class ResultCube:
+    """
+    Плотный n-мерный массив целевой функции по осям параметров.
+
+    Атрибуты:
+        axes: имена осей
+        levels: {ось: значения по порядку}
+        values: массив формы (len(levels[ось]) для каждой оси), NaN — нет результата
+        cell_of_row: номер ячейки (в values.ravel()) для каждой строки таблицы, −1 — нет ячейки
+
+    Пример:
+        cube = ResultCube.from_results(df, objective='sharpe')
+        stats = cube.neighbourhood(radius=1)
+    """
+
+    def __init__(self, axes: List[str], levels: Dict[str, list], values: np.ndarray, cell_of_row: np.ndarray):
+        self.axes = axes
+        self.levels = levels
+        self.values = values
+        self.cell_of_row = cell_of_row
+
+    @classmethod
+    def from_results(
+        cls,
+        results_df: pd.DataFrame,
+        objective: Union[str, Callable[[pd.DataFrame], np.ndarray]] = 'sharpe',
+        axes: Optional[Sequence[str]] = None
+    ) -> 'ResultCube':
+        """
+        Раскладка таблицы результатов по осям.
+
+        axes: None — параметры стратегии, принимающие в таблице больше одного значения.
+        Несколько строк в одной ячейке (оси заданы не полностью) усредняются.
+        """
+        if axes is None:
+            axes = [column for column in results_df.columns
+                    if column in STRATEGY_PARAMS and results_df[column].nunique(dropna=False) > 1]
+        else:
+            missing = [axis for axis in axes if axis not in results_df.columns]
+            if missing:
+                raise ValueError(f"Оси отсутствуют в результатах: {missing}")
+            axes = list(axes)
+        if not axes:
+            raise ValueError("Нет осей: ни один параметр не принимает больше одного значения")
+
+        objective_row = objective_values(results_df, objective)
+        levels: Dict[str, list] = {}
+        codes = []
+        for axis in axes:
+            column = results_df[axis]
+            present = column.notna()
+            axis_levels = sorted(column[present].unique().tolist())
+            axis_codes = np.full(len(column), len(axis_levels), dtype=np.int64)
+            axis_codes[present.to_numpy()] = pd.Index(axis_levels).get_indexer(column[present])
+            if not present.all():
+                axis_levels.append(None)
+            levels[axis] = axis_levels
+            codes.append(axis_codes)
+
+        shape = tuple(len(levels[axis]) for axis in axes)
+        cell_of_row = np.ravel_multi_index(codes, shape)
+        valid = ~np.isnan(objective_row)
+
+        n_cells = int(np.prod(shape))
+        sums = np.bincount(cell_of_row[valid], weights=objective_row[valid], minlength=n_cells)
+        counts = np.bincount(cell_of_row[valid], minlength=n_cells)
+        if (counts > 1).any():
+            print(f"⚠️  {int((counts > 1).sum()):,} ячеек содержат несколько строк — значения усреднены "
+                  f"(оси: {', '.join(axes)})")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan).reshape(shape)
+        return cls(axes, levels, values, cell_of_row)
+
+    @property
+    def coverage(self) -> float:
+        """Доля заполненных ячеек массива."""
+        return float(np.isfinite(self.values).mean())
+
+    def neighbourhood(self, radius: Union[int, Dict[str, int]] = 1) -> Dict[str, np.ndarray]:
+        """
+        Статистики окрестности каждой ячейки (массивы формы values).
+
+        radius: число шагов по каждой оси или {ось: шагов} (не указанные оси — 1)
+        """
+        radii = [radius.get(axis, 1) if isinstance(radius, dict) else radius for axis in self.axes]
+        has_none = [self.levels[axis][-1] is None for axis in self.axes]
+        valid = np.isfinite(self.values)
+        filled = np.where(valid, self.values, 0.0)
+
+        total = np.ones(self.values.shape)
+        count = valid.astype(np.float64)
+        sums = filled
+        squares = filled * filled
+        minimum = np.where(valid, self.values, np.inf)
+        for axis, (r, separate) in enumerate(zip(radii, has_none)):
+            if r <= 0:
+                continue
+            total = _window(_window_sum, total, axis, r, separate)
+            count = _window(_window_sum, count, axis, r, separate)
+            sums = _window(_window_sum, sums, axis, r, separate)
+            squares = _window(_window_sum, squares, axis, r, separate)
+            minimum = _window(_window_min, minimum, axis, r, separate)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / count
+            variance = np.maximum(squares / count - mean * mean, 0.0)
+            std = np.sqrt(variance * count / (count - 1))
+        std = np.where(count > 1, std, 0.0)
+        return {
+            'plateau_mean': np.where(count > 0, mean, np.nan),
+            'plateau_std': np.where(count > 0, std, np.nan),
+            'plateau_min': np.where(np.isfinite(minimum), minimum, np.nan),
+            'plateau_coverage': count / total
+        }
+
+
+def find_parameter_plateaus(
+    results_df: pd.DataFrame,
+    objective: Union[str, Callable[[pd.DataFrame], np.ndarray]] = 'sharpe',
+    axes: Optional[Sequence[str]] = None,
+    radius: Union[int, Dict[str, int]] = 1,
+    penalty: float = 1.0,
+    min_coverage: float = 0.5
+) -> pd.DataFrame:
+    """
+    Ранжирование комбинаций по устойчивости окрестности.
+
+    Аргументы:
+        results_df: таблица результатов optimize_dual_momentum (или сохранённый CSV)
+        objective: колонка, 'calmar' или функция DataFrame → массив
+        axes: оси массива (None — варьируемые параметры стратегии)
+        radius: полуширина окрестности в шагах сетки (число или {ось: шагов})
+        penalty: вес разброса в plateau_score
+        min_coverage: минимальная доля заполненных соседей для ранжирования
+
+    Возвращает:
+        pd.DataFrame: строки с результатом и колонками plateau_*, по убыванию plateau_score
+                      (нераспределённые по покрытию — в конце с plateau_score = NaN)
+    """
+    cube = ResultCube.from_results(results_df, objective, axes)
+    stats = cube.neighbourhood(radius)
+    stats['plateau_score'] = np.where(
+        stats['plateau_coverage'] >= min_coverage,
+        stats['plateau_mean'] - penalty * stats['plateau_std'],
+        np.nan
+    )
+
+    df = results_df.copy()
+    own = objective_values(results_df, objective)
+    for column in PLATEAU_COLUMNS:
+        values = stats[column].ravel()[cube.cell_of_row]
+        df[column] = np.where(np.isnan(own), np.nan, values) if column == 'plateau_score' else values
+    df = df.sort_values('plateau_score', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+    df.attrs['plateau_axes'] = cube.axes
+    df.attrs['plateau_grid_coverage'] = cube.coverage
+
+    ranked = int(df['plateau_score'].notna().sum())
+    shape = ' × '.join(str(len(cube.levels[axis])) for axis in cube.axes)
+    print(f"🏔️  ПЛАТО ПАРАМЕТРОВ: массив {shape} ({cube.values.size:,} ячеек, "
+          f"заполнено {cube.coverage:.1%}), ранжировано {ranked:,} комбинаций")
+    return df
@@ -0,0 +1,318 @@
+# backtest_platform/optimization/result_cache.py
+
+"""
+Персистентный контентно-адресуемый кэш результатов бэктеста.
+
+Версия: 1.0.0
+Версия: 1.1.0 (версия движка включает хэш исходного кода бэктеста)
+Версия: 1.2.0 (numpy-скаляры в ключе и записи — числа Python, а не строки;
+               CACHE_FORMAT_VERSION = 2)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Пошаговая оптимизация (stepwise_optimization4.py) многократно пересчитывает
+комбинации, уже оценённые на предыдущих шагах. Кэш сохраняет метрики каждого
+прогона на диске, и повторный запуск с перекрывающейся сеткой получает их мгновенно.
+
+КЛЮЧ ЗАПИСИ (sha256) формируется из:
+  • отпечатка входных данных (содержимое DataFrame активов, рынка и RVI)
+  • канонического набора параметров стратегии (optimization/canonical.py)
+  • настроек издержек, капитала и фильтра времени
+  • версии движка (Backtester + DualMomentumStrategy + формат кэша + хэш
+    исходников, от которых зависят метрики: ENGINE_SOURCES). Правка логики
+    торговли, индикаторов или быстрого движка без повышения __version__ всё
+    равно делает старые записи недоступными
+
+УСТРОЙСТВО ХРАНИЛИЩА:
+  <cache_dir>/results/<первые 2 символа ключа>/<ключ>.json
+  • Запись атомарна (временный файл + os.replace) → параллельные читатели никогда
+    не видят частично записанный файл, параллельные писатели безопасно перезаписывают
+    одинаковое содержимое
+  • Попадание обновляет mtime записи → вытеснение по размеру удаляет самые
+    давно использованные записи (LRU)
+  • Повреждённая или удалённая другим процессом запись считается промахом
+  • numpy-скаляры (np.int64, np.bool_, ...) пишутся как числа / bool Python:
+    прежний default=str превращал их в строки — метрика total_trades
+    возвращалась из кэша как '12', а параметр np.int64(20) давал другой ключ,
+    чем int 20
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from core import backtester as _backtester_module
+from strategies import dual_momentum as _strategy_module
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+CACHE_FORMAT_VERSION = 2   # 2: numpy-скаляры сохраняются числами, а не строками
+
+PLATFORM_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Исходники, от которых зависят метрики прогона (шаблоны относительно backtest_platform/)
+ENGINE_SOURCES = (
+    'core/backtester.py',
+    'core/base_strategy.py',
+    'strategies/dual_momentum.py',
+    'strategies/trading_logics/*.py',
+    'indicators/*.py',
+    'optimization/canonical.py',
+    'optimization/features.py',
+    'optimization/filter_masks.py',
+    'optimization/fast_backtester.py'
+)
+
+
+def source_fingerprint(patterns: Sequence[str] = ENGINE_SOURCES, root: str = PLATFORM_ROOT) -> str:
+    """
+    Отпечаток исходного кода (относительные пути + содержимое файлов).
+
+    Переводы строк нормализуются — отпечаток не зависит от настроек git checkout.
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(os.path.join(root, pattern))})
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read().replace(b'\r\n', b'\n')
+        h.update(os.path.relpath(path, root).replace(os.sep, '/').encode('utf-8') + b'\0')
+        h.update(hashlib.sha256(content).digest())
+    return h.hexdigest()
+
+
+# Любое изменение логики бэктестера, стратегии или быстрого движка меняет версию →
+# старые записи кэша, файлы частей и состояния инкрементального пересчёта не используются
+ENGINE_VERSION = (
+    f"backtester-{_backtester_module.__version__}"
+    f"/strategy-{_strategy_module.__version__}"
+    f"/cache-{CACHE_FORMAT_VERSION}"
+    f"/src-{source_fingerprint()[:16]}"
+)
+
+
+def _json_default(value):
+    """numpy-скаляры → значения Python; прочие несериализуемые значения → str."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _hash_frame(df: Optional[pd.DataFrame]) -> str:
+    """Отпечаток содержимого DataFrame (значения + имена колонок, без индекса)."""
+    if df is None:
+        return 'none'
+    h = hashlib.sha256()
+    h.update(','.join(map(str, df.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def fingerprint_inputs(
+    data_dict: Dict[str, pd.DataFrame],
+    market_data: Optional[pd.DataFrame] = None,
+    rvi_data: Optional[pd.DataFrame] = None
+) -> str:
+    """
+    Отпечаток всех входных данных бэктеста.
+
+    Порядок тикеров учитывается: Backtester перебирает активы в порядке словаря,
+    и при равных оценках порядок влияет на выбор актива.
+    """
+    h = hashlib.sha256()
+    for ticker, df in data_dict.items():
+        h.update(f"{ticker}:{_hash_frame(df)};".encode('utf-8'))
+    h.update(f"market:{_hash_frame(market_data)};".encode('utf-8'))
+    h.update(f"rvi:{_hash_frame(rvi_data)};".encode('utf-8'))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Дисковый кэш метрик бэктеста с вытеснением по размеру и статистикой попаданий.
+
+    Пример:
+        cache = ResultCache('cache', max_size_mb=512)
+        inputs_fp = fingerprint_inputs(data, market_df, rvi_data)
+        key = cache.make_key(inputs_fp, canonical_params, costs)
+        metrics = cache.get(key)
+        if metrics is None:
+            metrics = ...  # прогон бэктеста
+            cache.put(key, metrics)
+        print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_mb: float = 512,
+        eviction_check_interval: int = 200
+    ):
+        """
+        Аргументы:
+            cache_dir: корневая директория кэша (config.cache_dir)
+            max_size_mb: предельный размер записей результатов на диске
+            eviction_check_interval: проверка размера после каждых N записей
+        """
+        self.root = os.path.join(cache_dir, 'results')
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.eviction_check_interval = eviction_check_interval
+        os.makedirs(self.root, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._writes_since_check = 0
+
+    # ======================
+    # КЛЮЧИ
+    # ======================
+
+    @staticmethod
+    def make_key(inputs_fingerprint: str, params: Dict, costs: Dict) -> str:
+        """
+        Контентный ключ записи.
+
+        Аргументы:
+            inputs_fingerprint: результат fingerprint_inputs()
+            params: канонический набор параметров (canonicalize_params)
+            costs: издержки, капитал и фильтр времени прогона
+        """
+        payload = json.dumps(
+            {
+                'engine': ENGINE_VERSION,
+                'inputs': inputs_fingerprint,
+                'params': params,
+                'costs': costs
+            },
+            sort_keys=True,
+            default=_json_default
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    # ======================
+    # ЧТЕНИЕ / ЗАПИСЬ
+    # ======================
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Возвращает сохранённые метрики или None при промахе."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            os.utime(path, None)  # отметка использования для LRU-вытеснения
+        except OSError:
+            pass
+        return entry['metrics']
+
+    def put(self, key: str, metrics: Dict) -> None:
+        """Атомарно сохраняет метрики прогона."""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'engine': ENGINE_VERSION, 'metrics': metrics}, f, default=_json_default)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self.writes += 1
+        self._writes_since_check += 1
+        if self._writes_since_check >= self.eviction_check_interval:
+            self.evict()
+
+    # ======================
+    # ВЫТЕСНЕНИЕ И СТАТИСТИКА
+    # ======================
+
+    def _scan(self):
+        """Список (mtime, size, path) всех записей кэша."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith('.json') or name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # запись удалена другим процессом
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size_bytes(self) -> int:
+        """Текущий размер записей кэша на диске."""
+        return sum(size for _, size, _ in self._scan())
+
+    def evict(self) -> int:
+        """
+        Удаляет давно не использованные записи, пока размер кэша превышает предел
+        (с запасом 10%, чтобы не сканировать директорию на каждой записи).
+
+        Возвращает:
+            Количество удалённых записей
+        """
+        self._writes_since_check = 0
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size_bytes:
+            return 0
+
+        target = int(self.max_size_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass  # уже удалена другим процессом
+            total -= size
+
+        self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        """Полная очистка кэша результатов."""
+        for _, _, path in self._scan():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        """Статистика использования кэша текущим экземпляром."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions
+        }
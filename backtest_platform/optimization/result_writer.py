@@ -0,0 +1,478 @@
+# backtest_platform/optimization/result_writer.py
+
+"""
+Потоковая запись результатов оптимизации с контрольной точкой и возобновлением.
+
+Версия: 1.0.0
+Версия: 1.1.0 (части CSV сохраняют типы колонок: схема в контрольной точке)
+Версия: 1.2.0 (pyarrow импортируется лениво, при первом выборе формата частей)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+optimize_dual_momentum копит все строки результатов в памяти, и CSV
+записывается только в конце шага. Падение на 90% перебора теряет всё, а память
+растёт с размером сетки. ResultWriter сбрасывает строки пакетами в
+append-only набор файлов-частей и ведёт контрольную точку с номерами
+завершённых комбинаций; повторный запуск той же оптимизации пропускает их.
+
+УСТРОЙСТВО ДИРЕКТОРИИ:
+  <output_dir>/part-00000.parquet   — пакет строк, отсортированный по sort_by
+  <output_dir>/part-00001.parquet     (CSV, если pyarrow не установлен)
+  <output_dir>/checkpoint.json      — ключ прогона, файлы-части, диапазоны
+                                      завершённых номеров комбинаций
+  • Часть пишется атомарно ДО обновления контрольной точки; часть, не попавшая
+    в контрольную точку (падение между записями), удаляется при возобновлении,
+    а её комбинации пересчитываются
+  • Ключ прогона (данные + сетка + издержки + версия движка) задаёт оптимизатор
+    через bind(); при несовпадении ключа старые части удаляются
+
+ТИПЫ КОЛОНОК:
+Итог совпадает с pd.DataFrame(строки) режима без записи на диск: None в
+параметрах не превращается в NaN, целые и логические колонки не становятся
+float. Parquet (pyarrow — необязательная зависимость: extras 'parquet' в
+setup.py) хранит типы сам; для частей CSV
+схема колонок (тип, JSON-кодирование нечисловых значений) записывается в
+контрольную точку рядом с именем части (write_frame_csv / read_frame_csv).
+Если типы колонок у частей различаются, итог собирается из строк
+(combine_frames) — так же, как DataFrame из всего списка строк.
+
+ИТОГОВАЯ СОРТИРОВКА:
+Каждая часть отсортирована при записи, поэтому итог собирается k-путевым
+слиянием частей (heapq.merge) с чтением по кускам. Если строк больше
+max_rows_in_memory, отсортированный результат пишется в results_sorted.csv
+без загрузки в память, а в DataFrame возвращаются только лучшие строки.
+"""
+
+import bisect
+import functools
+import glob
+import hashlib
+import heapq
+import json
+import math
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from optimization.result_cache import ENGINE_VERSION
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+CHECKPOINT_VERSION = 2   # 2: номера комбинаций — позиции в ParamGrid (только допустимые)
+
+
+@functools.lru_cache(maxsize=None)
+def has_pyarrow() -> bool:
+    """Доступен ли pyarrow для частей parquet (импорт — при первом вызове, не при импорте модуля)."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _json_value(value):
+    """numpy-скаляры → значения Python для json.dumps."""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Значение типа {type(value).__name__} не сериализуется в JSON")
+
+
+def write_frame_csv(path: str, df: pd.DataFrame) -> Dict:
+    """
+    Атомарная запись DataFrame в CSV с сохранением типов колонок.
+
+    Нечисловые колонки (object, str) пишутся как JSON значений — None, bool и
+    строки переживают чтение без превращения в NaN и 'True'.
+
+    Возвращает:
+        Схема колонок для read_frame_csv
+    """
+    layout = {
+        'columns': [str(name) for name in df.columns],
+        'dtypes': {str(name): str(df[name].dtype) for name in df.columns},
+        'json': [str(name) for name in df.columns if df[name].dtype.kind not in 'biufcmM']
+    }
+    out = df.copy(deep=False)
+    for name in layout['json']:
+        out[name] = [json.dumps(value, default=_json_value) for value in df[name].tolist()]
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    os.close(fd)
+    try:
+        out.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return layout
+
+
+def _restore(df: pd.DataFrame, layout: Dict) -> pd.DataFrame:
+    for name in layout['json']:
+        if layout['dtypes'][name] != 'object':
+            df[name] = df[name].astype(layout['dtypes'][name])
+    return df
+
+
+def read_frame_csv(path: str, layout: Optional[Dict] = None, chunksize: Optional[int] = None):
+    """
+    Чтение CSV, записанного write_frame_csv (layout=None — обычный pd.read_csv).
+
+    Возвращает:
+        DataFrame или итератор DataFrame по chunksize строк
+    """
+    if layout is None:
+        return pd.read_csv(path, chunksize=chunksize)
+    if not layout['columns']:
+        return pd.DataFrame() if chunksize is None else iter(())
+    reader = pd.read_csv(
+        path,
+        dtype={name: dtype for name, dtype in layout['dtypes'].items() if name not in layout['json']},
+        converters={name: json.loads for name in layout['json']},
+        chunksize=chunksize
+    )
+    if chunksize is None:
+        return _restore(reader, layout)
+    return (_restore(chunk, layout) for chunk in reader)
+
+
+def combine_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Объединение частей так, как pd.DataFrame(все строки) построил бы его сразу.
+
+    При одинаковых колонках и типах — pd.concat; иначе (например, колонка из
+    одних None в одной части и целых в другой) — сборка из строк.
+    """
+    frames = [df for df in frames if len(df.columns)]
+    if not frames:
+        return pd.DataFrame()
+    first = frames[0]
+    if all(list(df.columns) == list(first.columns) and df.dtypes.equals(first.dtypes) for df in frames[1:]):
+        return pd.concat(frames, ignore_index=True)
+    return pd.DataFrame([row for df in frames for row in df.to_dict('records')])
+
+
+def make_run_key(inputs_fingerprint: str, param_grid: Dict[str, List], settings: Dict) -> str:
+    """
+    Ключ прогона оптимизации: номера комбинаций в контрольной точке имеют смысл
+    только для той же сетки (порядок осей и значений), тех же данных и настроек.
+    """
+    payload = json.dumps(
+        {
+            'engine': ENGINE_VERSION,
+            'inputs': inputs_fingerprint,
+            'grid': [[key, list(values)] for key, values in param_grid.items()],
+            'settings': settings
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _RangeSet:
+    """Множество номеров комбинаций, хранимое как отсортированные полуинтервалы [a, b)."""
+
+    def __init__(self, ranges: Optional[List[List[int]]] = None):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for a, b in sorted(ranges or []):
+            self._add_range(a, b)
+
+    def _add_range(self, a: int, b: int) -> None:
+        if self.ends and a <= self.ends[-1]:
+            self.ends[-1] = max(self.ends[-1], b)
+        else:
+            self.starts.append(a)
+            self.ends.append(b)
+
+    def add(self, index: int) -> None:
+        # Быстрый путь: номера обычно приходят по возрастанию
+        if self.ends and self.ends[-1] == index:
+            self.ends[-1] += 1
+            return
+        if not self.starts or index > self.ends[-1]:
+            self.starts.append(index)
+            self.ends.append(index + 1)
+            return
+        if index in self:
+            return
+        pos = bisect.bisect_right(self.starts, index)
+        self.starts.insert(pos, index)
+        self.ends.insert(pos, index + 1)
+        # Склейка с соседями
+        if pos + 1 < len(self.starts) and self.starts[pos + 1] == self.ends[pos]:
+            self.ends[pos] = self.ends.pop(pos + 1)
+            self.starts.pop(pos + 1)
+        if pos > 0 and self.ends[pos - 1] == self.starts[pos]:
+            self.ends[pos - 1] = self.ends.pop(pos)
+            self.starts.pop(pos)
+
+    def __contains__(self, index: int) -> bool:
+        pos = bisect.bisect_right(self.starts, index) - 1
+        return pos >= 0 and index < self.ends[pos]
+
+    def __len__(self) -> int:
+        return sum(b - a for a, b in zip(self.starts, self.ends))
+
+    def to_list(self) -> List[List[int]]:
+        return [[a, b] for a, b in zip(self.starts, self.ends)]
+
+
+def _atomic_write_text(path: str, text: str) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ResultWriter:
+    """
+    Append-only хранилище строк результатов с контрольной точкой.
+
+    Пример:
+        writer = ResultWriter('data-optimization/step_1.parts')
+        writer.bind(run_key)                  # возобновление, если ключ совпал
+        for idx, params in enumerate(grid):
+            if writer.is_done(idx):
+                continue
+            writer.add(idx, row)              # row=None — комбинация без строки (ошибка/пропуск)
+        df = writer.finalize()
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        batch_size: int = 500,
+        sort_by: str = 'sharpe',
+        ascending: bool = False,
+        file_format: str = 'auto'
+    ):
+        """
+        Аргументы:
+            output_dir: директория частей и контрольной точки
+            batch_size: строк в одной части (сброс на диск)
+            sort_by, ascending: порядок итогового результата
+            file_format: 'parquet', 'csv' или 'auto' (parquet при наличии pyarrow)
+        """
+        if file_format == 'auto':
+            file_format = 'parquet' if has_pyarrow() else 'csv'
+        if file_format not in ('parquet', 'csv'):
+            raise ValueError(f"Неизвестный формат частей: {file_format} (допустимо: 'parquet', 'csv')")
+        if file_format == 'parquet' and not has_pyarrow():
+            raise ImportError("Для формата parquet требуется pyarrow (pip install pyarrow)")
+
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.sort_by = sort_by
+        self.ascending = ascending
+        self.file_format = file_format
+        self.checkpoint_path = os.path.join(output_dir, 'checkpoint.json')
+        self.sorted_path = os.path.join(output_dir, 'results_sorted.csv')
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.run_key: Optional[str] = None
+        self.parts: List[Dict] = []
+        self.rows = 0
+        self.resumed = 0                 # завершённых комбинаций из прошлого запуска
+        self._completed = _RangeSet()
+        self._buffer: List[Dict] = []
+        self._pending: List[int] = []    # номера комбинаций в несброшенном буфере
+        self._pending_set = set()
+
+    # ======================
+    # КОНТРОЛЬНАЯ ТОЧКА
+    # ======================
+
+    def bind(self, run_key: str) -> int:
+        """
+        Привязка к прогону: возобновление по контрольной точке или чистый старт.
+
+        Возвращает:
+            Количество уже завершённых комбинаций
+        """
+        self.run_key = run_key
+        checkpoint = None
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if (checkpoint and checkpoint.get('version') == CHECKPOINT_VERSION
+                and checkpoint.get('run_key') == run_key
+                and checkpoint.get('format') == self.file_format):
+            self.parts = checkpoint['parts']
+            self.rows = checkpoint['rows']
+            self._completed = _RangeSet(checkpoint['completed'])
+        else:
+            if checkpoint:
+                print(f"   ♻️  Контрольная точка в {self.output_dir} относится к другому прогону — начинаем заново")
+            self.parts, self.rows, self._completed = [], 0, _RangeSet()
+
+        # Удаление частей, не попавших в контрольную точку, и временных файлов
+        known = {part['file'] for part in self.parts}
+        for path in glob.glob(os.path.join(self.output_dir, 'part-*')) + \
+                glob.glob(os.path.join(self.output_dir, '.tmp-*')):
+            if os.path.basename(path) not in known:
+                os.remove(path)
+        if os.path.exists(self.sorted_path):
+            os.remove(self.sorted_path)
+
+        self.resumed = len(self._completed)
+        self._save_checkpoint()
+        return self.resumed
+
+    def _save_checkpoint(self) -> None:
+        _atomic_write_text(self.checkpoint_path, json.dumps({
+            'version': CHECKPOINT_VERSION,
+            'run_key': self.run_key,
+            'format': self.file_format,
+            'parts': self.parts,
+            'rows': self.rows,
+            'completed': self._completed.to_list()
+        }))
+
+    def is_done(self, index: int) -> bool:
+        """Завершена ли комбинация с данным номером (в прошлом или текущем запуске)."""
+        return index in self._completed or index in self._pending_set
+
+    @property
+    def completed(self) -> int:
+        return len(self._completed) + len(self._pending)
+
+    # ======================
+    # ЗАПИСЬ
+    # ======================
+
+    def add(self, index: int, row: Optional[Dict]) -> None:
+        """Регистрация завершённой комбинации (row=None — без строки результата)."""
+        if self.run_key is None:
+            raise RuntimeError("ResultWriter.bind(run_key) должен быть вызван до записи")
+        self._pending.append(index)
+        self._pending_set.add(index)
+        if row is not None:
+            self._buffer.append(row)
+        # Комбинации без строк тоже сбрасываются, чтобы контрольная точка не отставала
+        if len(self._buffer) >= self.batch_size or len(self._pending) >= 10 * self.batch_size:
+            self.flush()
+
+    def _sort(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.sort_by not in df.columns:
+            return df
+        return df.sort_values(self.sort_by, ascending=self.ascending,
+                              na_position='last', kind='stable')
+
+    def flush(self) -> None:
+        """Сброс буфера в новую часть и обновление контрольной точки."""
+        if not self._pending:
+            return
+        if self._buffer:
+            name = f"part-{len(self.parts):05d}.{self.file_format}"
+            path = os.path.join(self.output_dir, name)
+            df = self._sort(pd.DataFrame(self._buffer))
+            part = {'file': name, 'rows': len(df)}
+            if self.file_format == 'parquet':
+                fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix='.tmp-')
+                os.close(fd)
+                try:
+                    df.to_parquet(tmp_path, index=False)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+            else:
+                part['layout'] = write_frame_csv(path, df)
+            self.parts.append(part)
+            self.rows += len(df)
+
+        for index in self._pending:
+            self._completed.add(index)
+        self._buffer, self._pending = [], []
+        self._pending_set = set()
+        self._save_checkpoint()
+
+    # ======================
+    # ЧТЕНИЕ И ИТОГОВАЯ СОРТИРОВКА
+    # ======================
+
+    def _read_part(self, part: Dict) -> pd.DataFrame:
+        path = os.path.join(self.output_dir, part['file'])
+        if self.file_format == 'parquet':
+            return pd.read_parquet(path)
+        return read_frame_csv(path, part.get('layout'))
+
+    def _iter_part(self, part: Dict, chunk_rows: int) -> Iterator[Dict]:
+        """Строки части по порядку, с чтением по кускам."""
+        path = os.path.join(self.output_dir, part['file'])
+        if self.file_format == 'parquet':
+            import pyarrow.parquet as pq
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+        else:
+            chunks = read_frame_csv(path, part.get('layout'), chunksize=chunk_rows)
+        for chunk in chunks:
+            yield from chunk.to_dict('records')
+
+    def _merge_key(self, row: Dict):
+        value = row.get(self.sort_by)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return (1, 0.0)
+        return (0, value if self.ascending else -value)
+
+    def finalize(self, max_rows_in_memory: int = 1_000_000, chunk_rows: int = 10_000) -> pd.DataFrame:
+        """
+        Итоговый результат, отсортированный по sort_by.
+
+        Если строк не больше max_rows_in_memory — возвращается полный DataFrame.
+        Иначе отсортированные строки пишутся в results_sorted.csv слиянием частей
+        (память ∝ числу частей × chunk_rows), а возвращаются лучшие max_rows_in_memory строк.
+        """
+        self.flush()
+        if not self.parts:
+            return pd.DataFrame()
+
+        if self.rows <= max_rows_in_memory:
+            df = combine_frames([self._read_part(p) for p in self.parts])
+            return self._sort(df).reset_index(drop=True)
+
+        streams = [self._iter_part(p, chunk_rows) for p in self.parts]
+        merged = heapq.merge(*streams, key=self._merge_key)
+
+        head: List[Dict] = []
+        chunk: List[Dict] = []
+        columns = None
+        if os.path.exists(self.sorted_path):
+            os.remove(self.sorted_path)
+        for row in merged:
+            if len(head) < max_rows_in_memory:
+                head.append(row)
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                columns = self._append_sorted(chunk, columns)
+                chunk = []
+        if chunk:
+            self._append_sorted(chunk, columns)
+
+        print(f"   💽 Результатов {self.rows:,} > {max_rows_in_memory:,}: полный отсортированный "
+              f"результат записан в {self.sorted_path}, в памяти — лучшие {len(head):,}")
+        return pd.DataFrame(head, columns=columns)
+
+    def _append_sorted(self, rows: List[Dict], columns: Optional[List[str]]) -> List[str]:
+        df = pd.DataFrame(rows, columns=columns)
+        df.to_csv(self.sorted_path, mode='a', header=columns is None, index=False)
+        return list(df.columns)
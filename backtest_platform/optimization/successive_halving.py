@@ -0,0 +1,184 @@
+# backtest_platform/optimization/successive_halving.py
+
+"""
+Многоуровневая оптимизация методом последовательного деления (successive halving).
+
+Версия: 1.0.0
+Версия: 1.1.0 (доли истории уровней строго возрастают: min_fraction ограничивает число уровней)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Большинство комбинаций сетки заведомо слабые и отсеиваются уже на короткой
+истории. Режим search_mode='halving' в optimize_dual_momentum оценивает ВСЕ
+допустимые комбинации на дешёвой истории, оставляет лучшую долю 1/eta и
+переоценивает выживших на всё более длинной и подробной истории вплоть до
+полной дневной.
+
+УРОВНИ ТОЧНОСТИ (для n_rungs = 4, eta = 3, min_fraction = 0.03 по умолчанию):
+  уровень 0: последние 1/27 истории, каждая weekly_stride-я дата
+  уровень 1: последние 1/9 истории, дневные данные
+  уровень 2: последняя 1/3 истории, дневные данные
+  уровень 3: полная дневная история — полноценный прогон через ComboEvaluator
+             (дедупликация, персистентный кэш, выбранный движок)
+Доля каждого уровня в eta раз больше предыдущей. Уровни, чья доля оказалась бы
+меньше min_fraction, не создаются: при min_fraction = 0.1 и eta = 3 план
+сокращается до 1/9 → 1/3 → 1 (короткие уровни не сливаются в одну долю).
+
+ПЕРЕИСПОЛЬЗОВАНИЕ ПРИЗНАКОВ:
+Промежуточные уровни считаются FastBacktester на общем FeatureCache: индикаторы
+строятся один раз по всей истории и лишь срезаются под отрезок уровня, поэтому
+короткие отрезки стартуют «прогретыми» (окна индикаторов заполнены данными до
+начала отрезка), а переход на следующий уровень не требует пересчёта признаков.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from optimization.canonical import unique_combinations
+from optimization.evaluator import ComboEvaluator
+from optimization.param_grid import ParamGrid
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+
+def _score(outcome, objective: str) -> float:
+    """Значение метрики для ранжирования (ошибка / NaN → −inf)."""
+    if isinstance(outcome, Exception):
+        return -np.inf
+    value = outcome.get(objective)
+    if value is None or not np.isfinite(value):
+        return -np.inf
+    return float(value)
+
+
+def plan_rungs(
+    n_candidates: int,
+    eta: int = 3,
+    n_rungs: Optional[int] = None,
+    max_rungs: int = 4,
+    min_fraction: float = 0.03,
+    weekly_stride: int = 5
+) -> List[Dict]:
+    """
+    План уровней точности.
+
+    Аргументы:
+        n_candidates: количество уникальных допустимых комбинаций
+        eta: во сколько раз сокращается число кандидатов на каждом уровне
+        n_rungs: число уровней (None — по размеру сетки, не больше max_rungs)
+        min_fraction: минимальная доля истории на промежуточном уровне; уровни
+                      с меньшей долей не создаются (число уровней сокращается)
+        weekly_stride: шаг по датам на первом уровне (1 — без прореживания)
+
+    Возвращает:
+        Список {'fraction': доля истории, 'stride': шаг по датам};
+        последний элемент — полная дневная история
+    """
+    if eta < 2:
+        raise ValueError(f"eta должно быть ≥ 2 (получено {eta})")
+    if not 0 < min_fraction <= 1:
+        raise ValueError(f"min_fraction должно быть в (0, 1] (получено {min_fraction})")
+    requested = n_rungs
+    if n_rungs is None:
+        n_rungs = 1
+        while n_rungs < max_rungs and n_candidates / eta ** n_rungs >= eta:
+            n_rungs += 1
+    # Самая короткая доля eta^−(n_rungs−1) не меньше min_fraction — иначе уровни совпали бы
+    fitting = 1
+    while float(eta) ** -fitting >= min_fraction * (1 - 1e-9):
+        fitting += 1
+    if requested is not None and n_rungs > fitting:
+        print(f"   ⚠️  Уровней {n_rungs} при eta={eta} требуют долю истории {float(eta) ** -(n_rungs - 1):.3f} "
+              f"< min_fraction={min_fraction} — уровней {fitting}")
+    n_rungs = min(n_rungs, fitting)
+    rungs = []
+    for level in range(n_rungs - 1):
+        rungs.append({
+            'fraction': float(eta) ** -(n_rungs - 1 - level),
+            'stride': weekly_stride if level == 0 else 1
+        })
+    rungs.append({'fraction': 1.0, 'stride': 1})
+    return rungs
+
+
+def run_successive_halving(
+    evaluator: ComboEvaluator,
+    param_grid: Union[Dict[str, List], ParamGrid],
+    is_valid: Optional[Callable[[Dict], bool]] = None,
+    progress_callback: Optional[Callable] = None,
+    eta: int = 3,
+    n_rungs: Optional[int] = None,
+    max_rungs: int = 4,
+    min_fraction: float = 0.03,
+    weekly_stride: int = 5,
+    n_jobs: int = 1,
+    objective: str = 'sharpe'
+) -> Tuple[List[Dict], Dict]:
+    """
+    Последовательное деление кандидатов по уровням точности.
+
+    Аргументы:
+        evaluator: оценщик комбинаций (данные, издержки, кэш)
+        param_grid: сетка значений параметров или ParamGrid с ограничениями
+        is_valid: фильтр допустимых комбинаций (например, правило окон волатильности)
+        progress_callback: вызывается на полном уровне как (номер, всего, params, строка результата)
+        eta, n_rungs, max_rungs, min_fraction, weekly_stride: план уровней (см. plan_rungs)
+        n_jobs: процессов для оценки уровня
+        objective: максимизируемая метрика
+
+    Возвращает:
+        (строки результатов полного уровня, статистика {'evaluated', 'errors',
+         'rejected_invalid', 'duplicates', 'candidates', 'rungs'})
+    """
+    # === КАНДИДАТЫ: уникальные допустимые комбинации ===
+    candidates, grid_stats = unique_combinations(param_grid, evaluator.has_rvi, is_valid)
+    stats = {'evaluated': 0, 'errors': 0, **grid_stats, 'candidates': len(candidates), 'rungs': []}
+    if not candidates:
+        return [], stats
+
+    rungs = plan_rungs(len(candidates), eta=eta, n_rungs=n_rungs, max_rungs=max_rungs,
+                       min_fraction=min_fraction, weekly_stride=weekly_stride)
+    n_dates = evaluator.fast_engine().features.n_dates if len(rungs) > 1 else 0
+    if evaluator.monitor is not None:
+        # Ожидаемое число оценок по всем уровням — для ETA монитора
+        expected, size = 0, len(candidates)
+        for _ in rungs:
+            expected += size
+            size = max(1, int(math.ceil(size / eta)))
+        evaluator.monitor.set_total(expected)
+
+    # === ПРОМЕЖУТОЧНЫЕ УРОВНИ: неполная история, отбор лучших 1/eta ===
+    survivors = candidates
+    for level, rung in enumerate(rungs[:-1]):
+        start = n_dates - max(2, int(math.ceil(rung['fraction'] * n_dates)))
+        outcomes = evaluator.evaluate_fidelity(survivors, start=max(0, start),
+                                               stride=rung['stride'], n_jobs=n_jobs)
+        scores = np.array([_score(o, objective) for o in outcomes])
+        keep = max(1, int(math.ceil(len(survivors) / eta)))
+        order = np.argsort(-scores, kind='stable')[:keep]
+        stats['rungs'].append({**rung, 'evaluated': len(survivors), 'kept': keep})
+        print(f"   🪜 Уровень {level + 1}/{len(rungs)}: {len(survivors):,} комбинаций "
+              f"(последние {rung['fraction']:.0%} истории, шаг {rung['stride']} дн.) → "
+              f"оставлено {keep:,}")
+        survivors = [survivors[i] for i in sorted(order)]
+
+    # === ПОЛНЫЙ УРОВЕНЬ: дневная история целиком ===
+    rows: List[Dict] = []
+    outcomes = evaluator.evaluate_many(survivors, n_jobs=n_jobs)
+    stats['rungs'].append({**rungs[-1], 'evaluated': len(survivors), 'kept': len(survivors)})
+    print(f"   🪜 Уровень {len(rungs)}/{len(rungs)}: {len(survivors):,} комбинаций на полной истории")
+    for params, outcome in zip(survivors, outcomes):
+        stats['evaluated'] += 1
+        if isinstance(outcome, Exception):
+            stats['errors'] += 1
+            continue
+        row = evaluator.build_row(params, outcome)
+        rows.append(row)
+        if progress_callback:
+            progress_callback(stats['evaluated'], len(survivors), params, row)
+    return rows, stats
@@ -0,0 +1,389 @@
+# backtest_platform/optimization/surrogate_pruning.py
+
+"""
+Отсев сетки суррогатной моделью, обученной на прошлых результатах оптимизации.
+
+Версия: 1.0.0
+Версия: 1.1.0 (после переобучения пакет выбирается заново из всех оставшихся
+               кандидатов; файлы optimization/pipeline.py не входят в историю)
+Версия: 1.2.0 (схлопывание осей включено по умолчанию:
+               collapse_threshold = DEFAULT_COLLAPSE_THRESHOLD = 0.01)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+В data-optimization/ накоплены десятки файлов optimization_results_step_*
+(CSV / XLSX) с параметрами и метриками прошлых шагов. Режим
+search_mode='surrogate' обучает на них быстрый суррогат — градиентный бустинг
+деревьев (GradientBoostingRegressor, scikit-learn) — и предсказывает метрику
+для ещё не оценённых комбинаций сетки. Настоящему бэктесту отправляется только
+перспективная доля (keep_fraction) — это бюджет бэктестов. Бюджет
+расходуется пакетами: после каждого пакета новые результаты добавляются в
+обучающую выборку, суррогат переобучается, и следующий пакет — лучшие по
+новому предсказанию среди ВСЕХ ещё не оценённых кандидатов, а не только
+среди отобранных первым предсказанием.
+
+ПРИЗНАКИ:
+Все поведенческие параметры стратегии (canonical.BEHAVIOUR_FIELDS) в
+эффективном виде: отсутствующая в старом файле колонка — значение по
+умолчанию DualMomentumStrategy, market_vol_window / market_vol_threshold = None
+— подстановка base_vol_window / max_vol_threshold. Поэтому строки шагов с
+разными фиксированными значениями обучают одну модель.
+
+СХЛОПЫВАНИЕ ОСЕЙ:
+feature_importances() — важности признаков суррогата. Ось сетки с важностью
+ниже collapse_threshold схлопывается до значения лучшей предсказанной
+комбинации. Схлопываются только оси, значения которых РЕАЛЬНО менялись в
+обучающей выборке: нулевая важность неизменной в истории оси означает
+отсутствие данных, а не отсутствие влияния.
+Порог по умолчанию — DEFAULT_COLLAPSE_THRESHOLD = 0.01: важности суммируются
+в 1 по 16 поведенческим признакам (равномерная доля ≈ 0.06), и ось, на
+которую приходится меньше 1 % разбиений бустинга, на метрику практически не
+влияет. collapse_threshold=0 отключает схлопывание, если нужен полный
+перебор всех осей в пределах бюджета.
+
+ОГРАНИЧЕНИЯ:
+Прошлые файлы могли считаться на другом периоде данных и с другими
+издержками — суррогат лишь упорядочивает кандидатов, итоговые метрики берутся
+только из бэктеста текущего прогона. Результаты optimization/pipeline.py
+(pipeline_*.csv) в историю не входят: шаги валидации содержат метрики на
+отложенном периоде, и обучение на них переносило бы его в поиск. Чтение XLSX
+требует openpyxl; без него XLSX-файлы пропускаются с предупреждением.
+"""
+
+import glob
+import inspect
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from strategies.dual_momentum import DualMomentumStrategy
+from optimization.canonical import BEHAVIOUR_FIELDS
+from optimization.evaluator import ComboEvaluator
+from optimization.param_grid import ParamGrid, as_param_grid
+
+__version__ = "1.2.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_HISTORY_DIR = os.path.join(project_root, "data-optimization")
+HISTORY_PATTERNS = ('optimization_results*.csv', 'optimization_results*.xlsx')
+DEFAULT_COLLAPSE_THRESHOLD = 0.01   # доля важности, ниже которой ось схлопывается
+
+# Значения по умолчанию конструктора стратегии — для колонок, отсутствующих в старых файлах
+_STRATEGY_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(DualMomentumStrategy.__init__).parameters.items()
+    if name != 'self'
+}
+
+
+def load_history(
+    directory: str = DEFAULT_HISTORY_DIR,
+    patterns: Sequence[str] = HISTORY_PATTERNS,
+    target: str = 'sharpe'
+) -> pd.DataFrame:
+    """
+    Прошлые результаты оптимизации из CSV / XLSX.
+
+    Возвращает:
+        DataFrame строк с конечным target (колонка source — имя файла);
+        пустой DataFrame, если файлов нет
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(os.path.join(directory, pattern))})
+    frames = []
+    skipped_xlsx = 0
+    for path in paths:
+        try:
+            if path.endswith('.xlsx'):
+                df = pd.read_excel(path)
+            else:
+                df = pd.read_csv(path)
+        except ImportError:
+            skipped_xlsx += 1   # нет openpyxl
+            continue
+        except Exception as e:
+            print(f"   ⚠️  Не удалось прочитать {os.path.basename(path)}: {e}")
+            continue
+        if target not in df.columns or 'base_lookback' not in df.columns:
+            continue
+        df = df[pd.to_numeric(df[target], errors='coerce').notna()].copy()
+        df['source'] = os.path.basename(path)
+        frames.append(df)
+    if skipped_xlsx:
+        print(f"   ⚠️  Пропущено XLSX-файлов: {skipped_xlsx} (для чтения установите openpyxl)")
+    if not frames:
+        return pd.DataFrame()
+    history = pd.concat(frames, ignore_index=True, sort=False)
+    history[target] = pd.to_numeric(history[target], errors='coerce')
+    return history[np.isfinite(history[target])].reset_index(drop=True)
+
+
+class SurrogateModel:
+    """
+    Суррогат «параметры → метрика» на градиентном бустинге деревьев.
+
+    Пример:
+        model = SurrogateModel().fit(load_history())
+        predicted = model.predict(list_of_params)
+        print(model.feature_importances())
+    """
+
+    def __init__(self, target: str = 'sharpe', n_estimators: int = 200, random_state: Optional[int] = 42):
+        self.target = target
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        self.features = list(BEHAVIOUR_FIELDS)
+        self._vocabulary: Dict[str, Dict] = {}   # категориальный признак → {значение: код}
+        self._train_x: Optional[pd.DataFrame] = None
+        self._train_y: Optional[np.ndarray] = None
+        self.model = None
+
+    # ======================
+    # КОДИРОВАНИЕ
+    # ======================
+
+    def effective_frame(self, rows: Union[pd.DataFrame, Iterable[Dict]]) -> pd.DataFrame:
+        """Эффективные значения поведенческих параметров (умолчания и подстановки стратегии)."""
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        out = pd.DataFrame(index=df.index)
+        for field in self.features:
+            if field in df.columns:
+                out[field] = df[field].astype(object)
+            else:
+                out[field] = _STRATEGY_DEFAULTS.get(field)
+        out['market_vol_window'] = out['market_vol_window'].where(out['market_vol_window'].notna(),
+                                                                  out['base_vol_window'])
+        out['market_vol_threshold'] = out['market_vol_threshold'].where(out['market_vol_threshold'].notna(),
+                                                                        out['max_vol_threshold'])
+        return out
+
+    def encode(self, frame: pd.DataFrame) -> np.ndarray:
+        """Числовая матрица признаков (bool → 0/1, строки → код словаря, пропуск → −1)."""
+        columns = []
+        for field in self.features:
+            values = frame[field]
+            numeric = pd.to_numeric(values.map(lambda v: float(v) if isinstance(v, (bool, np.bool_)) else v),
+                                    errors='coerce')
+            if numeric.notna().sum() == values.notna().sum():
+                columns.append(numeric.fillna(-1.0).to_numpy(dtype=float))
+                continue
+            vocabulary = self._vocabulary.setdefault(field, {})
+            for value in values.dropna().astype(str).unique():
+                vocabulary.setdefault(value, float(len(vocabulary)))
+            columns.append(values.map(lambda v: -1.0 if pd.isna(v) else vocabulary[str(v)]).to_numpy(dtype=float))
+        return np.column_stack(columns)
+
+    # ======================
+    # ОБУЧЕНИЕ И ПРЕДСКАЗАНИЕ
+    # ======================
+
+    @property
+    def n_samples(self) -> int:
+        return 0 if self._train_y is None else len(self._train_y)
+
+    def add(self, rows: Union[pd.DataFrame, Iterable[Dict]]) -> 'SurrogateModel':
+        """Добавление строк результатов в обучающую выборку (без переобучения)."""
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if df.empty or self.target not in df.columns:
+            return self
+        y = pd.to_numeric(df[self.target], errors='coerce')
+        df = df[np.isfinite(y)]
+        if df.empty:
+            return self
+        frame = self.effective_frame(df)
+        y = y[np.isfinite(y)].to_numpy(dtype=float)
+        if self._train_x is None:
+            self._train_x, self._train_y = frame, y
+        else:
+            self._train_x = pd.concat([self._train_x, frame], ignore_index=True)
+            self._train_y = np.concatenate([self._train_y, y])
+        return self
+
+    def fit(self, rows: Union[pd.DataFrame, Iterable[Dict], None] = None) -> 'SurrogateModel':
+        """Обучение на накопленной выборке (+ rows, если переданы)."""
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        if rows is not None:
+            self.add(rows)
+        if self.n_samples < 2:
+            raise ValueError(f"Для обучения суррогата нужно ≥ 2 строк с '{self.target}' (есть {self.n_samples})")
+        self.model = GradientBoostingRegressor(
+            n_estimators=self.n_estimators,
+            max_depth=3,
+            learning_rate=0.05,
+            subsample=0.8 if self.n_samples >= 50 else 1.0,
+            random_state=self.random_state
+        )
+        self.model.fit(self.encode(self._train_x), self._train_y)
+        return self
+
+    def predict(self, rows: Union[pd.DataFrame, Iterable[Dict]]) -> np.ndarray:
+        if self.model is None:
+            raise RuntimeError("Суррогат не обучен: вызовите fit()")
+        return self.model.predict(self.encode(self.effective_frame(rows)))
+
+    def feature_importances(self) -> pd.Series:
+        """Важности признаков (сумма 1), по убыванию."""
+        if self.model is None:
+            raise RuntimeError("Суррогат не обучен: вызовите fit()")
+        return pd.Series(self.model.feature_importances_, index=self.features).sort_values(ascending=False)
+
+    def varied_features(self) -> List[str]:
+        """Признаки, значения которых менялись в обучающей выборке."""
+        if self._train_x is None:
+            return []
+        return [f for f in self.features if self._train_x[f].astype(str).nunique() > 1]
+
+    def collapsible_axes(self, grid: ParamGrid, threshold: float) -> List[str]:
+        """Оси сетки (≥ 2 значений) с важностью < threshold среди менявшихся в истории признаков."""
+        importances = self.feature_importances()
+        varied = set(self.varied_features())
+        return [
+            key for key, size in zip(grid.keys, grid.sizes)
+            if size > 1 and key in varied and importances.get(key, 1.0) < threshold
+        ]
+
+
+# ======================
+# РЕЖИМ ПОИСКА
+# ======================
+
+def run_surrogate_search(
+    evaluator: ComboEvaluator,
+    param_grid: Union[Dict[str, List], ParamGrid],
+    progress_callback: Optional[Callable] = None,
+    history: Optional[pd.DataFrame] = None,
+    history_dir: str = DEFAULT_HISTORY_DIR,
+    target: str = 'sharpe',
+    keep_fraction: float = 0.25,
+    collapse_threshold: float = DEFAULT_COLLAPSE_THRESHOLD,
+    batch_size: int = 128,
+    n_initial: int = 32,
+    n_trials: Optional[int] = None,
+    max_predict: int = 200_000,
+    n_jobs: int = 1,
+    random_state: Optional[int] = 42
+) -> Tuple[List[Dict], Dict]:
+    """
+    Бэктест только перспективной доли сетки по предсказанию суррогата.
+
+    Аргументы:
+        evaluator: оценщик комбинаций (данные, издержки, кэш)
+        param_grid: сетка значений или ParamGrid с ограничениями
+        progress_callback: вызывается как (номер, бюджет, params, строка результата)
+        history: прошлые результаты (None — load_history(history_dir, target=target))
+        target: предсказываемая и максимизируемая метрика
+        keep_fraction: бюджет бэктестов — доля оставшихся после схлопывания кандидатов
+        collapse_threshold: порог важности для схлопывания осей (по умолчанию 0.01; 0 — не схлопывать)
+        batch_size: пакет бэктестов между переобучениями суррогата
+        n_initial: случайных бэктестов до обучения, если истории меньше
+        n_trials: верхняя граница числа бэктестов (None — весь бюджет keep_fraction)
+        max_predict: при большей сетке кандидаты — случайная выборка такого размера
+        n_jobs: процессов для оценки пакета
+
+    Возвращает:
+        (строки результатов, статистика {'evaluated', 'errors', 'candidates', 'pruned',
+         'history_rows', 'collapsed', 'importances'})
+    """
+    if not 0 < keep_fraction <= 1:
+        raise ValueError(f"keep_fraction должно быть в (0, 1], получено {keep_fraction}")
+
+    grid = as_param_grid(param_grid)
+    rng = np.random.default_rng(random_state)
+    total = len(grid)
+    if total > max_predict:
+        indices = np.sort(rng.choice(total, size=max_predict, replace=False))
+        candidates = [grid[int(i)] for i in indices]
+    else:
+        candidates = list(grid)
+
+    model = SurrogateModel(target=target, random_state=random_state)
+    if history is None:
+        history = load_history(history_dir, target=target)
+    model.add(history)
+    stats = {
+        'evaluated': 0, 'errors': 0, 'candidates': len(candidates), 'pruned': 0,
+        'history_rows': model.n_samples, 'collapsed': {}, 'importances': {}
+    }
+    print(f"   🌲 Суррогат: {model.n_samples:,} строк истории, кандидатов {len(candidates):,}")
+
+    rows: List[Dict] = []
+    evaluated = np.zeros(len(candidates), dtype=bool)
+    budget = [0]
+
+    def evaluate(positions: Sequence[int]) -> None:
+        batch = [candidates[i] for i in positions]
+        outcomes = evaluator.evaluate_many(batch, n_jobs=n_jobs)
+        new_rows = []
+        for params, outcome in zip(batch, outcomes):
+            stats['evaluated'] += 1
+            if isinstance(outcome, Exception):
+                stats['errors'] += 1
+                continue
+            row = evaluator.build_row(params, outcome)
+            rows.append(row)
+            new_rows.append(row)
+            if progress_callback:
+                progress_callback(stats['evaluated'], budget[0], params, row)
+        evaluated[list(positions)] = True
+        model.add(new_rows)
+
+    # === СТАРТ БЕЗ ИСТОРИИ: случайные бэктесты для первого обучения ===
+    if model.n_samples < n_initial:
+        n_random = min(n_initial, len(candidates))
+        budget[0] = n_random
+        evaluate(rng.choice(len(candidates), size=n_random, replace=False).tolist())
+    if model.n_samples < 2 or evaluated.all():
+        stats['pruned'] = int((~evaluated).sum())
+        return rows, stats
+
+    model.fit()
+    predicted = model.predict(candidates)
+    importances = model.feature_importances()
+    stats['importances'] = {key: round(float(importances[key]), 4) for key in grid.keys}
+
+    # === СХЛОПЫВАНИЕ ОСЕЙ БЕЗ ВЛИЯНИЯ ===
+    alive = ~evaluated
+    if collapse_threshold > 0:
+        best = candidates[int(np.argmax(np.where(alive, predicted, -np.inf)))]
+        for axis in model.collapsible_axes(grid, collapse_threshold):
+            stats['collapsed'][axis] = best[axis]
+            alive &= np.fromiter((params[axis] == best[axis] for params in candidates),
+                                 dtype=bool, count=len(candidates))
+        if stats['collapsed']:
+            print(f"   ✂️  Схлопнуты оси с важностью < {collapse_threshold:.3f}: "
+                  + ', '.join(f"{axis}={value}" for axis, value in stats['collapsed'].items()))
+
+    # === БЮДЖЕТ БЭКТЕСТОВ ===
+    n_alive = int(alive.sum())
+    n_keep = max(1, int(np.ceil(keep_fraction * n_alive))) if n_alive else 0
+    if n_trials is not None:
+        n_keep = min(n_keep, max(0, n_trials - stats['evaluated']))
+    stats['pruned'] = n_alive - n_keep
+    budget[0] = stats['evaluated'] + n_keep
+    if evaluator.monitor is not None:
+        evaluator.monitor.set_total(n_keep)
+    top = ', '.join(f"{key} {importances[key]:.2f}" for key in importances.index[:5])
+    print(f"   🎯 В бэктест: {n_keep:,} из {n_alive:,} (отсеяно {stats['pruned']:,}); "
+          f"важности: {top}")
+
+    # === ПАКЕТЫ: ЛУЧШИЕ ПО ТЕКУЩЕМУ ПРЕДСКАЗАНИЮ СРЕДИ ВСЕХ НЕОЦЕНЁННЫХ ===
+    remaining = n_keep
+    while remaining > 0:
+        open_positions = np.flatnonzero(alive & ~evaluated)
+        if not len(open_positions):
+            break
+        size = min(batch_size, remaining)
+        batch = open_positions[np.argsort(predicted[open_positions])[::-1][:size]]
+        evaluate(batch.tolist())
+        remaining -= len(batch)
+        if remaining > 0:
+            model.fit()
+            open_positions = np.flatnonzero(alive & ~evaluated)
+            predicted[open_positions] = model.predict([candidates[i] for i in open_positions])
+
+    return rows, stats
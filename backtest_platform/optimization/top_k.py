@@ -0,0 +1,330 @@
+# backtest_platform/optimization/top_k.py
+
+"""
+Режим лучших K комбинаций с потоковой статистикой и ограниченной памятью.
+
+Версия: 1.0.0
+Версия: 1.0.1 (квартили P² не пересекаются: оценка не меньше оценок меньших квантилей)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Для разведочных сеток важны лишь несколько сотен лучших комбинаций, но
+optimize_dual_momentum хранит все строки и сортирует DataFrame целиком.
+TopKCollector держит K лучших строк в куче по выбранной целевой функции, а для
+остальных обновляет только потоковые агрегаты — память не зависит от размера сетки:
+  • куча из K строк (мин-куча: худшая из лучших вытесняется за O(log K))
+  • по каждому значению каждого параметра — среднее, std, min, max (алгоритм
+    Уэлфорда) и квантили P² (Jain & Chlamtac, 1985) для analyze_parameter_sensitivity
+
+ЦЕЛЕВАЯ ФУНКЦИЯ:
+  • имя колонки строки результата: 'sharpe', 'calmar', 'cagr', ...
+    (Calmar, если движок его не вернул, считается как CAGR / |max_drawdown|)
+  • 'constrained' — Sharpe среди комбинаций, удовлетворяющих риск-ограничениям
+    (optimization_settings['risk_constraints']); нарушители в кучу не попадают,
+    но учитываются в статистике
+  • функция row → число
+"""
+
+import heapq
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+__version__ = "1.0.1"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+# Метрики, агрегируемые по значениям параметров (как в analyze_parameter_sensitivity)
+SENSITIVITY_METRICS = ('sharpe', 'cagr', 'max_drawdown')
+
+
+class P2Quantile:
+    """
+    Потоковая оценка квантиля алгоритмом P² (пять маркеров, O(1) памяти).
+
+    До пяти наблюдений квантиль считается точно.
+    """
+
+    def __init__(self, p: float):
+        if not 0 < p < 1:
+            raise ValueError(f"Квантиль должен быть в (0, 1), получено {p}")
+        self.p = p
+        self._initial: List[float] = []
+        self._q: Optional[List[float]] = None
+        self._n: List[int] = []
+        self._desired: List[float] = []
+        self._step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        if self._q is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self._q = sorted(self._initial)
+                self._n = [0, 1, 2, 3, 4]
+                p = self.p
+                self._desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+            return
+
+        q, n = self._q, self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._step[i]
+
+        # Коррекция средних маркеров параболической (или линейной) интерполяцией
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self) -> float:
+        if self._q is not None:
+            return self._q[2]
+        if not self._initial:
+            return np.nan
+        return float(np.quantile(self._initial, self.p))
+
+
+class RunningStats:
+    """Потоковые count / mean / std / min / max и квантили одной величины."""
+
+    def __init__(self, quantiles: Iterable[float] = (0.25, 0.5, 0.75)):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x) -> None:
+        if x is None or not np.isfinite(x):
+            return
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+
+    @property
+    def std(self) -> float:
+        """Выборочное стандартное отклонение (ddof=1, как pandas)."""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def quantile(self, p: float) -> float:
+        """Оценка P²; независимые оценки могут пересекаться — приводятся к неубывающим по p."""
+        if not self.count:
+            return np.nan
+        value = self.quantiles[p].value()
+        for lower, estimator in self.quantiles.items():
+            if lower < p:
+                value = max(value, estimator.value())
+        return value
+
+
+def calmar_ratio(row: Dict) -> float:
+    """CAGR / |max_drawdown| (NaN при нулевой просадке или отсутствии метрик)."""
+    cagr, drawdown = row.get('cagr'), row.get('max_drawdown')
+    if cagr is None or drawdown is None or drawdown == 0:
+        return np.nan
+    return float(cagr) / abs(float(drawdown))
+
+
+def constrained_score(row: Dict, constraints: Dict, metric: str = 'sharpe') -> float:
+    """
+    Значение metric, если строка удовлетворяет риск-ограничениям, иначе −inf.
+
+    constraints: {'max_drawdown': 0.25, 'max_volatility': 0.30, 'min_cagr': 0.10}
+    (просадка в строке результата отрицательная, ограничение — модуль)
+    """
+    drawdown = row.get('max_drawdown')
+    if 'max_drawdown' in constraints and (drawdown is None or abs(drawdown) > constraints['max_drawdown']):
+        return -np.inf
+    volatility = row.get('volatility')
+    if 'max_volatility' in constraints and volatility is not None and volatility > constraints['max_volatility']:
+        return -np.inf
+    cagr = row.get('cagr')
+    if 'min_cagr' in constraints and (cagr is None or cagr < constraints['min_cagr']):
+        return -np.inf
+    value = row.get(metric)
+    return float(value) if value is not None else -np.inf
+
+
+class TopKCollector:
+    """
+    K лучших строк результата + потоковая статистика по значениям параметров.
+
+    Аргументы:
+        k: сколько лучших строк хранить
+        objective: колонка строки, 'constrained' или функция row → число
+        params: параметры для статистики чувствительности (None — задаются через
+                set_params до первой строки; optimize_dual_momentum берёт оси сетки)
+        constraints: риск-ограничения для objective='constrained'
+
+    Пример:
+        top = TopKCollector(k=300, objective='calmar')
+        df = optimize_dual_momentum(data, market_df, param_grid=grid, top_k=top)
+        print(analyze_parameter_sensitivity(top, 'base_lookback'))
+    """
+
+    def __init__(
+        self,
+        k: int = 200,
+        objective: Union[str, Callable[[Dict], float]] = 'sharpe',
+        params: Optional[Iterable[str]] = None,
+        constraints: Optional[Dict] = None
+    ):
+        if k < 1:
+            raise ValueError(f"k должно быть ≥ 1 (получено {k})")
+        self.k = k
+        self.objective = objective
+        self.constraints = constraints
+        if objective == 'constrained' and constraints is None:
+            from config import optimization_settings
+            self.constraints = optimization_settings['risk_constraints']
+        self.params: Optional[List[str]] = list(params) if params is not None else None
+
+        self.seen = 0            # строк передано в add()
+        self.rejected = 0        # строк с −inf / NaN целевой функцией (в кучу не попали)
+        self._heap: List = []    # (score, −номер, строка): при равенстве остаётся более ранняя
+        self.overall: Dict[str, RunningStats] = {m: RunningStats() for m in SENSITIVITY_METRICS}
+        self.by_value: Dict[str, Dict] = {}
+
+    @property
+    def objective_name(self) -> str:
+        if callable(self.objective):
+            return getattr(self.objective, '__name__', 'objective')
+        return self.objective
+
+    def set_params(self, params: Iterable[str]) -> None:
+        """Задание параметров для статистики (до первой строки)."""
+        if self.params is None:
+            self.params = list(params)
+
+    def score(self, row: Dict) -> float:
+        if callable(self.objective):
+            value = self.objective(row)
+        elif self.objective == 'constrained':
+            value = constrained_score(row, self.constraints)
+        else:
+            value = row.get(self.objective)
+            if value is None and self.objective == 'calmar':
+                value = calmar_ratio(row)
+        if value is None or not np.isfinite(value):
+            return -np.inf
+        return float(value)
+
+    def add(self, row: Dict) -> None:
+        """Учёт строки результата: статистика всегда, куча — если строка в числе K лучших."""
+        if self.params is None:
+            self.params = []
+        self.seen += 1
+
+        for metric in SENSITIVITY_METRICS:
+            self.overall[metric].add(row.get(metric))
+        for param in self.params:
+            if param not in row:
+                continue
+            groups = self.by_value.setdefault(param, {})
+            stats = groups.get(row[param])
+            if stats is None:
+                stats = groups[row[param]] = {'rows': 0, **{m: RunningStats() for m in SENSITIVITY_METRICS}}
+            stats['rows'] += 1
+            for metric in SENSITIVITY_METRICS:
+                stats[metric].add(row.get(metric))
+
+        score = self.score(row)
+        if score == -np.inf:
+            self.rejected += 1
+            return
+        item = (score, -self.seen, row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # ======================
+    # РЕЗУЛЬТАТЫ
+    # ======================
+
+    def rows(self) -> List[Dict]:
+        """Лучшие строки по убыванию целевой функции."""
+        return [row for _, _, row in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Лучшие строки (DataFrame, по убыванию целевой функции; колонка objective_score)."""
+        ordered = sorted(self._heap, key=lambda item: item[:2], reverse=True)
+        return pd.DataFrame([{**row, 'objective_score': score} for score, _, row in ordered])
+
+    def summary(self) -> Dict:
+        """Итоговые показатели по всем строкам (не только по K лучшим)."""
+        sharpe = self.overall['sharpe']
+        return {
+            'seen': self.seen,
+            'kept': len(self._heap),
+            'rejected': self.rejected,
+            'sharpe_mean': sharpe.mean if sharpe.count else np.nan,
+            'sharpe_median': sharpe.quantile(0.5),
+            'sharpe_min': sharpe.min if sharpe.count else np.nan,
+            'sharpe_max': sharpe.max if sharpe.count else np.nan
+        }
+
+    def sensitivity(self, parameter: str) -> pd.DataFrame:
+        """
+        Чувствительность метрик к параметру по ВСЕМ строкам — колонки как у
+        analyze_parameter_sensitivity + квартили Sharpe (медиана и квартили — оценка P²).
+        """
+        if parameter not in self.by_value:
+            raise ValueError(f"Параметр '{parameter}' отсутствует в статистике")
+        records = []
+        for value, stats in self.by_value[parameter].items():
+            sharpe, cagr, drawdown = stats['sharpe'], stats['cagr'], stats['max_drawdown']
+            records.append({
+                parameter: value,
+                'sharpe_mean': sharpe.mean if sharpe.count else np.nan,
+                'sharpe_median': sharpe.quantile(0.5),
+                'sharpe_max': sharpe.max if sharpe.count else np.nan,
+                'sharpe_min': sharpe.min if sharpe.count else np.nan,
+                'sharpe_std': sharpe.std,
+                'cagr_mean': cagr.mean if cagr.count else np.nan,
+                'cagr_max': cagr.max if cagr.count else np.nan,
+                'max_drawdown_mean': drawdown.mean if drawdown.count else np.nan,
+                'max_drawdown_min': drawdown.min if drawdown.count else np.nan,
+                'combinations': stats['rows'],
+                'sharpe_q25': sharpe.quantile(0.25),
+                'sharpe_q75': sharpe.quantile(0.75)
+            })
+        df = pd.DataFrame(records).set_index(parameter).round(4)
+        return df.sort_values('sharpe_mean', ascending=False)
@@ -0,0 +1,250 @@
+# backtest_platform/optimization/walk_forward.py
+
+"""
+Параллельный walk-forward анализ стратегии Dual Momentum.
+
+Версия: 1.0.0
+Версия: 1.1.0 (тестовое окно без заглядывания вперёд; позиция переносится между фолдами)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Проверка устойчивости параметров на «будущих» данных (optimization_settings
+['walk_forward_validation']): на каждом обучающем окне выбирается лучшая
+комбинация сетки, затем она торгуется на следующем тестовом окне, которое в
+обучении не участвовало. Тестовые отрезки склеиваются в единую
+out-of-sample (OOS) кривую капитала.
+
+СХЕМЫ ОКОН:
+  • rolling  — обучающее окно фиксированной длины сдвигается на step_days
+  • anchored — обучающее окно всегда начинается с начала истории и растёт
+
+ПРИЗНАКИ:
+Индикаторы (FeatureCache) считаются один раз по всей истории и срезаются под
+каждое окно — все индикаторы причинные, поэтому срез совпадает с пересчётом
+на усечённых данных, а окна стартуют «прогретыми». Рыночная волатильность
+в Backtester берётся по всему ряду индекса; в walk-forward ряд ограничивается
+концом обучающего окна (market_until) — и при выборе параметров, и при
+торговле на тестовом окне: на тесте известна только история до его начала.
+
+СКЛЕЙКА OOS-КРИВОЙ:
+Тестовые окна торгуются последовательно одним портфелем: фолд начинает с
+позиции и денег, с которыми закончился предыдущий, и при смене выбранного
+актива платит обычные издержки. Так доходность дня на стыке фолдов —
+доходность удерживаемой позиции, а не искусственный нулевой день «из денег».
+Если между тестовыми окнами есть разрыв (step_days > test_days), даты
+разрыва в кривую не входят, а следующий фолд начинает из денег с капиталом
+предыдущего.
+
+ПАРАЛЛЕЛЬНОСТЬ:
+Фолды оптимизируются независимо в пуле процессов; кэш признаков передаётся
+в процессы один раз через initializer.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from optimization.fast_backtester import FastBacktester, portfolio_metrics
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+
+def make_folds(
+    n_dates: int,
+    train_days: int,
+    test_days: int,
+    step_days: Optional[int] = None,
+    anchored: bool = False
+) -> List[Dict]:
+    """
+    Разбиение календаря на обучающие и тестовые окна.
+
+    Аргументы:
+        n_dates: длина торгового календаря
+        train_days: длина обучающего окна (для anchored — длина первого окна)
+        test_days: длина тестового окна
+        step_days: сдвиг между фолдами (по умолчанию test_days; не меньше test_days,
+                   чтобы тестовые окна не перекрывались при склейке OOS-кривой)
+        anchored: расширяющееся обучающее окно от начала истории
+
+    Возвращает:
+        Список {'fold', 'train': (начало, конец), 'test': (начало, конец)} —
+        позиции календаря в формате среза Python
+    """
+    step_days = step_days or test_days
+    if train_days < 2 or test_days < 2:
+        raise ValueError("train_days и test_days должны быть ≥ 2")
+    if step_days < test_days:
+        raise ValueError(f"step_days ({step_days}) < test_days ({test_days}): тестовые окна перекрываются")
+    if train_days + test_days > n_dates:
+        raise ValueError(
+            f"Недостаточно истории для walk-forward: {n_dates} дат < "
+            f"train_days ({train_days}) + test_days ({test_days})"
+        )
+
+    folds = []
+    train_end = train_days
+    while train_end + 2 <= n_dates:
+        test_end = min(train_end + test_days, n_dates)
+        train_start = 0 if anchored else train_end - train_days
+        folds.append({
+            'fold': len(folds) + 1,
+            'train': (train_start, train_end),
+            'test': (train_end, test_end)
+        })
+        train_end += step_days
+    return folds
+
+
+# ======================
+# ПУЛ ПРОЦЕССОВ
+# ======================
+
+_WORKER_ENGINE: Optional[FastBacktester] = None
+
+
+def _init_worker(engine: FastBacktester) -> None:
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = engine
+
+
+def _score(result: Dict, objective: str) -> float:
+    value = result.get(objective)
+    if value is None or not np.isfinite(value):
+        return -np.inf
+    return float(value)
+
+
+def _run_fold(engine: FastBacktester, fold: Dict, candidates: List[Dict], objective: str) -> Dict:
+    """Выбор лучшей комбинации на обучающем окне (тест торгуется в _trade_oos)."""
+    calendar = engine.features.calendar
+    train_start, train_end = fold['train']
+
+    best_params, best_result, best_score = None, None, -np.inf
+    errors = 0
+    for params in candidates:
+        try:
+            result = engine.run(params, start=train_start, end=train_end,
+                                market_until=calendar[train_end - 1])
+        except Exception:
+            errors += 1
+            continue
+        score = _score(result, objective)
+        if best_params is None or score > best_score:
+            best_params, best_result, best_score = params, result, score
+
+    return {'fold': fold, 'params': best_params, 'train': best_result, 'errors': errors}
+
+
+def _trade_oos(engine: FastBacktester, outcomes: List[Dict]) -> List[pd.DataFrame]:
+    """
+    Последовательная торговля тестовых окон одним портфелем.
+
+    Дополняет outcome['test'] метриками теста фолда; возвращает части
+    OOS-кривой (date, value, fold).
+    """
+    calendar = engine.features.calendar
+    state = engine.initial_state()
+    previous_end = None
+    equity_parts = []
+    for outcome in outcomes:
+        outcome['test'] = None
+        if outcome['params'] is None:
+            continue
+        fold = outcome['fold']
+        train_end = fold['train'][1]
+        test_start, test_end = fold['test']
+        if previous_end is not None and test_start != previous_end:
+            # Разрыв между тестовыми окнами — начинаем из денег с накопленным капиталом
+            state = {**engine.initial_state(), 'cash': equity_parts[-1]['value'].iloc[-1]}
+
+        signals = engine.signals(outcome['params'], market_until=calendar[train_end - 1])
+        index = np.arange(test_start, test_end)
+        values, next_state = engine.advance(signals, index, state)
+        outcome['test'] = {
+            **portfolio_metrics(values),
+            'total_trades': next_state['trades'] - state['trades']
+        }
+        equity_parts.append(pd.DataFrame({
+            'date': pd.DatetimeIndex(calendar[index]),
+            'value': values,
+            'fold': fold['fold']
+        }))
+        state, previous_end = next_state, test_end
+    return equity_parts
+
+
+def _worker_run_fold(task):
+    fold, candidates, objective = task
+    return _run_fold(_WORKER_ENGINE, fold, candidates, objective)
+
+
+# ======================
+# ОСНОВНАЯ ФУНКЦИЯ
+# ======================
+
+def run_walk_forward(
+    engine: FastBacktester,
+    candidates: List[Dict],
+    folds: List[Dict],
+    objective: str = 'sharpe',
+    n_jobs: int = 1
+) -> Dict:
+    """
+    Walk-forward анализ по готовому списку фолдов.
+
+    Аргументы:
+        engine: быстрый движок на кэше признаков всей истории
+        candidates: комбинации параметров (уже отфильтрованные и уникальные)
+        folds: результат make_folds()
+        objective: метрика выбора лучшей комбинации на обучающем окне
+        n_jobs: процессов (фолды считаются параллельно)
+
+    Возвращает:
+        {'folds': DataFrame по фолдам (окна, лучшие параметры, метрики обучения и теста),
+         'oos_equity': склеенная OOS-кривая капитала (date, value, fold),
+         'oos_metrics': метрики OOS-кривой (final_value, cagr, sharpe, max_drawdown)}
+    """
+    tasks = [(fold, candidates, objective) for fold in folds]
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)),
+                                 initializer=_init_worker, initargs=(engine,)) as pool:
+            outcomes = list(pool.map(_worker_run_fold, tasks))
+    else:
+        outcomes = [_run_fold(engine, *task) for task in tasks]
+    equity_parts = _trade_oos(engine, outcomes)
+
+    calendar = engine.features.calendar
+    rows = []
+    for outcome in outcomes:
+        fold = outcome['fold']
+        row = {
+            'fold': fold['fold'],
+            'train_start': pd.Timestamp(calendar[fold['train'][0]]),
+            'train_end': pd.Timestamp(calendar[fold['train'][1] - 1]),
+            'test_start': pd.Timestamp(calendar[fold['test'][0]]),
+            'test_end': pd.Timestamp(calendar[fold['test'][1] - 1]),
+            'train_errors': outcome['errors']
+        }
+        if outcome['params'] is None:
+            rows.append(row)
+            continue
+        row.update(outcome['params'])
+        for prefix in ('train', 'test'):
+            for metric in ('cagr', 'sharpe', 'max_drawdown', 'total_trades'):
+                row[f'{prefix}_{metric}'] = outcome[prefix][metric]
+        rows.append(row)
+
+    oos_equity = pd.concat(equity_parts, ignore_index=True) if equity_parts else pd.DataFrame()
+    oos_metrics = portfolio_metrics(oos_equity['value'].to_numpy()) if not oos_equity.empty else {}
+
+    return {
+        'folds': pd.DataFrame(rows),
+        'oos_equity': oos_equity,
+        'oos_metrics': oos_metrics
+    }
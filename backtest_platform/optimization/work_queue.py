@@ -0,0 +1,621 @@
+# backtest_platform/optimization/work_queue.py
+
+"""
+Распределённая оптимизация через очередь заданий SQLite на общей файловой системе.
+
+Версия: 1.0.0
+Версия: 1.1.0 (координатор возвращает просроченные единицы, перезапускает упавших
+               локальных исполнителей, timeout; типы колонок результатов сохраняются)
+Автор: Oleg Dev
+Дата: 2026-10-19
+
+НАЗНАЧЕНИЕ:
+Полная сетка не помещается в ресурсы одной машины. Координатор делит ленивую
+сетку ParamGrid на единицы работы — диапазоны номеров комбинаций [start, stop) —
+и кладёт их в очередь SQLite. Исполнители на любом числе машин, видящих общую
+директорию очереди, захватывают единицы, считают их и пишут результаты обратно.
+
+УСТРОЙСТВО ДИРЕКТОРИИ ОЧЕРЕДИ:
+  <queue_dir>/queue.sqlite                   — прогоны и единицы работы
+  <queue_dir>/<run>/job.pkl                  — входные данные и настройки прогона
+  <queue_dir>/<run>/results/unit-000042.csv  — строки результатов единицы (атомарная запись)
+  <queue_dir>/<run>/results/unit-000042.layout.json — типы колонок (write_frame_csv)
+
+АРЕНДА (lease):
+Захват единицы — транзакция BEGIN IMMEDIATE: единица получает исполнителя и
+срок аренды. Исполнитель продлевает аренду по ходу счёта; единица с истёкшей
+арендой (исполнитель упал или завис) возвращается в очередь при следующем
+захвате. Результат принимается только от текущего арендатора; после
+max_attempts неудачных попыток единица помечается 'failed'. Координатор
+тоже возвращает просроченные единицы на каждом такте ожидания — единицы
+упавшего исполнителя не зависят от того, придёт ли другой.
+
+ЛОКАЛЬНЫЙ РЕЖИМ:
+run_distributed(..., n_workers=4) запускает исполнителей локальными
+процессами — это те же исполнители, что и на удалённых машинах, поэтому
+схема проверяется без кластера. Если все локальные процессы завершились с
+ошибкой, а работа осталась, координатор перезапускает их (пока между
+перезапусками есть прогресс) или поднимает RuntimeError; timeout ограничивает
+общее ожидание. Удалённый исполнитель запускается командой
+    cd backtest_platform && python -m optimization.work_queue worker <queue_dir>
+
+ОГРАНИЧЕНИЯ:
+Блокировки SQLite на сетевых ФС (NFS, SMB) зависят от их реализации — для
+очереди используется классический журнал отката (без WAL), которому нужны
+рабочие fcntl-блокировки общей ФС.
+"""
+
+import glob
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# Запуск исполнителя командой python -m: стратегии импортируются как backtest_platform.*
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimization.evaluator import ComboEvaluator
+from optimization.result_cache import fingerprint_inputs
+from optimization.result_writer import combine_frames, make_run_key, read_frame_csv, write_frame_csv
+
+__version__ = "1.1.0"
+__author__ = "Oleg Dev"
+__date__ = "2026-10-19"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key    TEXT PRIMARY KEY,
+    created    REAL NOT NULL,
+    total      INTEGER NOT NULL,
+    unit_size  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    run_key     TEXT NOT NULL,
+    unit_id     INTEGER NOT NULL,
+    start       INTEGER NOT NULL,
+    stop        INTEGER NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    rows        INTEGER,
+    errors      INTEGER,
+    finished    REAL,
+    PRIMARY KEY (run_key, unit_id)
+);
+CREATE INDEX IF NOT EXISTS units_by_status ON units (run_key, status, unit_id);
+"""
+
+
+def default_worker_id() -> str:
+    """Идентификатор исполнителя: хост и номер процесса."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _atomic_pickle(path: str, obj) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _write_unit_results(path: str, df: pd.DataFrame) -> None:
+    """Результаты единицы: CSV с сохранением типов и схема колонок рядом (схема — первой)."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.csv')
+    os.close(fd)
+    try:
+        layout = write_frame_csv(tmp_path, df)
+        fd, tmp_layout = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(layout, f)
+        os.replace(tmp_layout, _layout_path(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _layout_path(result_path: str) -> str:
+    return result_path[:-len('.csv')] + '.layout.json'
+
+
+def _read_unit_results(path: str) -> pd.DataFrame:
+    """Результаты единицы с исходными типами колонок (без схемы — обычный CSV)."""
+    try:
+        with open(_layout_path(path), 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+    except (OSError, ValueError):
+        layout = None
+    try:
+        return read_frame_csv(path, layout)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()   # единица без успешных строк
+
+
+class WorkQueue:
+    """
+    Очередь единиц работы в SQLite.
+
+    Пример:
+        queue = WorkQueue('data-optimization/queue')
+        queue.submit(run_key, total=len(grid), unit_size=500)
+        unit = queue.claim(run_key, 'host-1', lease_seconds=600)
+        ...
+        queue.complete(run_key, unit['unit_id'], 'host-1', rows=480, errors=0)
+    """
+
+    def __init__(self, queue_dir: str, timeout: float = 60.0):
+        self.queue_dir = queue_dir
+        self.timeout = timeout
+        os.makedirs(queue_dir, exist_ok=True)
+        self.db_path = os.path.join(queue_dir, 'queue.sqlite')
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с немедленной блокировкой записи (захват без гонок между исполнителями)."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+
+    # ======================
+    # ПУТИ ПРОГОНА
+    # ======================
+
+    def run_dir(self, run_key: str) -> str:
+        return os.path.join(self.queue_dir, run_key[:16])
+
+    def job_path(self, run_key: str) -> str:
+        return os.path.join(self.run_dir(run_key), 'job.pkl')
+
+    def result_path(self, run_key: str, unit_id: int) -> str:
+        return os.path.join(self.run_dir(run_key), 'results', f'unit-{unit_id:06d}.csv')
+
+    # ======================
+    # КООРДИНАТОР
+    # ======================
+
+    def submit(self, run_key: str, total: int, unit_size: int) -> int:
+        """
+        Регистрация прогона и нарезка [0, total) на единицы по unit_size комбинаций.
+
+        Повторная регистрация того же прогона ничего не меняет (возобновление).
+
+        Возвращает:
+            Количество единиц прогона
+        """
+        if unit_size < 1:
+            raise ValueError(f"unit_size должен быть ≥ 1 (получено {unit_size})")
+        os.makedirs(os.path.join(self.run_dir(run_key), 'results'), exist_ok=True)
+        with self._transaction() as conn:
+            existing = conn.execute('SELECT unit_size FROM runs WHERE run_key = ?', (run_key,)).fetchone()
+            if existing is None:
+                conn.execute('INSERT INTO runs (run_key, created, total, unit_size) VALUES (?, ?, ?, ?)',
+                             (run_key, time.time(), total, unit_size))
+                conn.executemany(
+                    'INSERT INTO units (run_key, unit_id, start, stop) VALUES (?, ?, ?, ?)',
+                    [(run_key, unit_id, start, min(start + unit_size, total))
+                     for unit_id, start in enumerate(range(0, total, unit_size))]
+                )
+            return conn.execute('SELECT COUNT(*) FROM units WHERE run_key = ?', (run_key,)).fetchone()[0]
+
+    def requeue_expired(self, run_key: str, now: Optional[float] = None) -> int:
+        """Возврат в очередь единиц с истёкшей арендой."""
+        with self._transaction() as conn:
+            return self._requeue_expired(conn, run_key, now or time.time())
+
+    @staticmethod
+    def _requeue_expired(conn: sqlite3.Connection, run_key: str, now: float) -> int:
+        cursor = conn.execute(
+            "UPDATE units SET status = 'pending', worker = NULL, lease_until = NULL "
+            "WHERE run_key = ? AND status = 'leased' AND lease_until < ?",
+            (run_key, now)
+        )
+        return cursor.rowcount
+
+    def retry_failed(self, run_key: str) -> int:
+        """Повторная постановка единиц в состоянии 'failed' (счётчик попыток сбрасывается)."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE units SET status = 'pending', attempts = 0 WHERE run_key = ? AND status = 'failed'",
+                (run_key,)
+            ).rowcount
+
+    def progress(self, run_key: str) -> Dict[str, int]:
+        """Количество единиц по состояниям + строк и ошибок в завершённых."""
+        conn = self._connect()
+        try:
+            counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+            for row in conn.execute('SELECT status, COUNT(*) AS n FROM units WHERE run_key = ? GROUP BY status',
+                                    (run_key,)):
+                counts[row['status']] = row['n']
+            totals = conn.execute(
+                "SELECT COALESCE(SUM(rows), 0), COALESCE(SUM(errors), 0), COALESCE(SUM(stop - start), 0) "
+                "FROM units WHERE run_key = ? AND status = 'done'", (run_key,)
+            ).fetchone()
+            counts.update({'rows': totals[0], 'errors': totals[1], 'combinations_done': totals[2]})
+            counts['units'] = sum(counts[s] for s in ('pending', 'leased', 'done', 'failed'))
+            return counts
+        finally:
+            conn.close()
+
+    def latest_run(self) -> Optional[str]:
+        """Ключ последнего зарегистрированного прогона с незавершёнными единицами."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT r.run_key FROM runs r WHERE EXISTS (SELECT 1 FROM units u WHERE u.run_key = r.run_key "
+                "AND u.status IN ('pending', 'leased')) ORDER BY r.created DESC LIMIT 1"
+            ).fetchone()
+            return row['run_key'] if row else None
+        finally:
+            conn.close()
+
+    # ======================
+    # ИСПОЛНИТЕЛЬ
+    # ======================
+
+    def claim(self, run_key: str, worker: str, lease_seconds: float = 600) -> Optional[Dict]:
+        """
+        Захват следующей свободной единицы (единицы с истёкшей арендой освобождаются).
+
+        Возвращает:
+            {'unit_id', 'start', 'stop', 'attempts'} или None, если свободных нет
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, run_key, now)
+            row = conn.execute(
+                "SELECT unit_id, start, stop, attempts FROM units "
+                "WHERE run_key = ? AND status = 'pending' ORDER BY unit_id LIMIT 1",
+                (run_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE units SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE run_key = ? AND unit_id = ?",
+                (worker, now + lease_seconds, run_key, row['unit_id'])
+            )
+            return {'unit_id': row['unit_id'], 'start': row['start'], 'stop': row['stop'],
+                    'attempts': row['attempts'] + 1}
+
+    def renew(self, run_key: str, unit_id: int, worker: str, lease_seconds: float = 600) -> bool:
+        """Продление аренды; False — аренда потеряна (единица отдана другому исполнителю)."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE units SET lease_until = ? WHERE run_key = ? AND unit_id = ? "
+                "AND status = 'leased' AND worker = ?",
+                (time.time() + lease_seconds, run_key, unit_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, run_key: str, unit_id: int, worker: str, rows: int, errors: int) -> bool:
+        """Отметка о завершении; принимается только от текущего арендатора."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE units SET status = 'done', lease_until = NULL, rows = ?, errors = ?, finished = ? "
+                "WHERE run_key = ? AND unit_id = ? AND status = 'leased' AND worker = ?",
+                (rows, errors, time.time(), run_key, unit_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, run_key: str, unit_id: int, worker: str, max_attempts: int = 3) -> None:
+        """Возврат единицы в очередь после сбоя исполнителя ('failed' после max_attempts попыток)."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_until = NULL "
+                "WHERE run_key = ? AND unit_id = ? AND status = 'leased' AND worker = ?",
+                (max_attempts, run_key, unit_id, worker)
+            )
+
+
+# ======================
+# ИСПОЛНИТЕЛЬ
+# ======================
+
+def run_worker(
+    queue_dir: str,
+    run_key: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 600,
+    max_units: Optional[int] = None,
+    max_attempts: int = 3,
+    poll_seconds: float = 5.0,
+    wait_for_leased: bool = True
+) -> Dict[str, int]:
+    """
+    Цикл исполнителя: захват единицы → расчёт → запись результатов → отметка.
+
+    Аргументы:
+        queue_dir: директория очереди на общей ФС
+        run_key: прогон (None — последний прогон с незавершёнными единицами)
+        worker_id: имя исполнителя (по умолчанию хост-pid)
+        lease_seconds: срок аренды; продлевается по ходу счёта
+        max_units: остановиться после стольких единиц (None — до опустошения очереди)
+        max_attempts: попыток на единицу до состояния 'failed'
+        poll_seconds: пауза, пока чужие единицы в аренде (могут вернуться в очередь)
+        wait_for_leased: ждать чужие арендованные единицы вместо немедленного выхода
+
+    Возвращает:
+        {'units': обработано единиц, 'rows': строк, 'errors': ошибок бэктеста}
+    """
+    # Отложенный импорт: optimizer импортирует этот модуль
+    from optimizer import build_param_grid
+
+    queue = WorkQueue(queue_dir)
+    run_key = run_key or queue.latest_run()
+    worker_id = worker_id or default_worker_id()
+    done = {'units': 0, 'rows': 0, 'errors': 0}
+    if run_key is None:
+        return done
+
+    with open(queue.job_path(run_key), 'rb') as f:
+        job = pickle.load(f)
+    grid = build_param_grid(job['param_grid'], job['skip_invalid_windows'])
+    evaluator = ComboEvaluator(job['data_dict'], job['market_data'], job['rvi_data'], **job['evaluator'])
+
+    while max_units is None or done['units'] < max_units:
+        unit = queue.claim(run_key, worker_id, lease_seconds)
+        if unit is None:
+            progress = queue.progress(run_key)
+            if wait_for_leased and progress['leased'] > 0:
+                time.sleep(poll_seconds)
+                continue
+            break
+
+        rows: List[Dict] = []
+        errors = 0
+        lost = False
+        renewed = time.time()
+        try:
+            for offset, params in enumerate(grid.iter_range(unit['start'], unit['stop'])):
+                outcome = evaluator.evaluate(params)
+                if isinstance(outcome, Exception):
+                    errors += 1
+                else:
+                    row = evaluator.build_row(params, outcome)
+                    row['grid_index'] = unit['start'] + offset
+                    rows.append(row)
+                if time.time() - renewed > lease_seconds / 3:
+                    renewed = time.time()
+                    if not queue.renew(run_key, unit['unit_id'], worker_id, lease_seconds):
+                        lost = True
+                        break
+        except Exception as e:
+            print(f"   ❌ [{worker_id}] Единица {unit['unit_id']}: {type(e).__name__}: {e}")
+            queue.fail(run_key, unit['unit_id'], worker_id, max_attempts=max_attempts)
+            continue
+        if lost:
+            print(f"   ⚠️  [{worker_id}] Аренда единицы {unit['unit_id']} истекла — единица пересчитывается другим исполнителем")
+            continue
+
+        # Файл пишется до отметки в очереди: отмеченная единица всегда имеет результаты
+        _write_unit_results(queue.result_path(run_key, unit['unit_id']), pd.DataFrame(rows))
+        if queue.complete(run_key, unit['unit_id'], worker_id, rows=len(rows), errors=errors):
+            done['units'] += 1
+            done['rows'] += len(rows)
+            done['errors'] += errors
+    evaluator.close()
+    return done
+
+
+def _local_worker(queue_dir: str, run_key: str, worker_id: str, lease_seconds: float, max_attempts: int) -> None:
+    run_worker(queue_dir, run_key, worker_id=worker_id, lease_seconds=lease_seconds,
+               max_attempts=max_attempts, poll_seconds=1.0)
+
+
+# ======================
+# КООРДИНАТОР
+# ======================
+
+def collect_results(queue: WorkQueue, run_key: str) -> pd.DataFrame:
+    """
+    Строки всех завершённых единиц прогона (по возрастанию номера комбинации).
+
+    Типы колонок — как у pd.DataFrame(строки) при расчёте на одной машине.
+    """
+    paths = sorted(glob.glob(os.path.join(queue.run_dir(run_key), 'results', 'unit-*.csv')))
+    df = combine_frames([_read_unit_results(path) for path in paths])
+    if df.empty:
+        return df
+    return df.sort_values('grid_index').reset_index(drop=True)
+
+
+def run_distributed(
+    data_dict: Dict[str, pd.DataFrame],
+    market_data: pd.DataFrame,
+    rvi_data: Optional[pd.DataFrame],
+    param_grid: Dict[str, List],
+    queue_dir: str,
+    n_workers: int = 2,
+    unit_size: int = 500,
+    lease_seconds: float = 600,
+    max_attempts: int = 3,
+    skip_invalid_windows: bool = True,
+    evaluator_settings: Optional[Dict] = None,
+    poll_seconds: float = 5.0,
+    timeout: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Координатор: регистрация прогона, локальные исполнители, ожидание, сбор результатов.
+
+    Аргументы:
+        param_grid: словарь {параметр: значения} (ограничения строятся build_param_grid
+                    одинаково у координатора и исполнителей)
+        queue_dir: директория очереди (на общей ФС, если есть удалённые исполнители)
+        n_workers: локальных процессов-исполнителей (0 — только удалённые)
+        unit_size: комбинаций в единице работы
+        lease_seconds, max_attempts: аренда и число попыток единицы
+        evaluator_settings: издержки, капитал, engine, deduplicate для ComboEvaluator
+        poll_seconds: такт ожидания (опрос прогресса, возврат просроченных единиц)
+        timeout: предельное время ожидания, секунд (None — без ограничения)
+
+    Возвращает:
+        DataFrame строк всех завершённых единиц (колонка grid_index — номер в ParamGrid)
+
+    Исключения:
+        RuntimeError: локальные исполнители завершились с ошибкой без прогресса
+                      с прошлого запуска, а единицы остались
+        TimeoutError: работа не завершена за timeout секунд
+    """
+    import multiprocessing
+    from optimizer import build_param_grid
+
+    settings = dict(evaluator_settings or {})
+    grid = build_param_grid(param_grid, skip_invalid_windows)
+    run_key = make_run_key(
+        fingerprint_inputs(data_dict, market_data, rvi_data),
+        grid.to_dict(),
+        {**settings, 'skip_invalid_windows': skip_invalid_windows}
+    )
+
+    queue = WorkQueue(queue_dir)
+    n_units = queue.submit(run_key, total=len(grid), unit_size=unit_size)
+    if not os.path.exists(queue.job_path(run_key)):
+        _atomic_pickle(queue.job_path(run_key), {
+            'data_dict': data_dict,
+            'market_data': market_data,
+            'rvi_data': rvi_data,
+            'param_grid': grid.to_dict(),
+            'skip_invalid_windows': skip_invalid_windows,
+            'evaluator': settings
+        })
+
+    progress = queue.progress(run_key)
+    print(f"   🗂️  Очередь {queue_dir}: прогон {run_key[:16]}, {len(grid):,} комбинаций в {n_units:,} единицах "
+          f"(готово {progress['done']:,})")
+    print(f"   🖥️  Удалённый исполнитель: cd backtest_platform && "
+          f"python -m optimization.work_queue worker {os.path.abspath(queue_dir)} {run_key}")
+
+    def start_workers(generation: int) -> List:
+        started = []
+        for i in range(n_workers):
+            process = multiprocessing.Process(
+                target=_local_worker,
+                args=(queue_dir, run_key, f"{default_worker_id()}-w{i}-g{generation}", lease_seconds, max_attempts),
+                daemon=True
+            )
+            process.start()
+            started.append(process)
+        return started
+
+    workers = start_workers(0)
+    generation = 0
+    started_at = time.monotonic()
+    try:
+        last_done = -1
+        done_at_start = queue.progress(run_key)['done']
+        while True:
+            # Единицы упавших исполнителей возвращаются в очередь без участия других исполнителей
+            queue.requeue_expired(run_key)
+            progress = queue.progress(run_key)
+            if progress['done'] != last_done:
+                last_done = progress['done']
+                print(f"   📦 Единиц готово: {progress['done']:,}/{progress['units']:,} "
+                      f"(в работе {progress['leased']:,}, ошибок единиц {progress['failed']:,})")
+            if progress['pending'] == 0 and progress['leased'] == 0:
+                break
+
+            if workers and not any(p.is_alive() for p in workers):
+                exit_codes = [p.exitcode for p in workers]
+                for process in workers:
+                    process.join()
+                workers = []
+                if any(code != 0 for code in exit_codes):
+                    if progress['done'] == done_at_start:
+                        raise RuntimeError(
+                            f"Локальные исполнители завершились с ошибкой (коды {exit_codes}) без прогресса: "
+                            f"готово {progress['done']:,}/{progress['units']:,} единиц"
+                        )
+                    generation += 1
+                    done_at_start = progress['done']
+                    print(f"   🔁 Локальные исполнители завершились с ошибкой (коды {exit_codes}) — перезапуск")
+                    workers = start_workers(generation)
+                else:
+                    print("   ⚠️  Локальные исполнители завершились, единицы остались — ожидание удалённых")
+
+            if timeout is not None and time.monotonic() - started_at > timeout:
+                raise TimeoutError(
+                    f"Прогон {run_key[:16]} не завершён за {timeout:.0f} с: готово {progress['done']:,}/"
+                    f"{progress['units']:,} единиц, в работе {progress['leased']:,}, в очереди {progress['pending']:,}"
+                )
+            time.sleep(poll_seconds)
+    except BaseException:
+        for process in workers:
+            process.terminate()
+        raise
+    finally:
+        for process in workers:
+            process.join(timeout=1)
+
+    if progress['failed']:
+        print(f"   ⚠️  Единиц в состоянии 'failed': {progress['failed']:,} "
+              f"(повторная постановка — WorkQueue.retry_failed)")
+    return collect_results(queue, run_key)
+
+
+def _main(argv: List[str]) -> int:
+    """
+    Командная строка:
+        python -m optimization.work_queue worker <queue_dir> [run_key]
+        python -m optimization.work_queue status <queue_dir> [run_key]
+    """
+    if len(argv) < 2 or argv[0] not in ('worker', 'status'):
+        print(_main.__doc__)
+        return 2
+    command, queue_dir = argv[0], argv[1]
+    run_key = argv[2] if len(argv) > 2 else None
+    if command == 'worker':
+        done = run_worker(queue_dir, run_key)
+        print(f"✅ Исполнитель завершён: единиц {done['units']:,}, строк {done['rows']:,}, ошибок {done['errors']:,}")
+        return 0
+    queue = WorkQueue(queue_dir)
+    run_key = run_key or queue.latest_run()
+    if run_key is None:
+        print("Нет прогонов с незавершёнными единицами")
+        return 0
+    print(run_key, queue.progress(run_key))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
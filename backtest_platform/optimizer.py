@@ -16,19 +16,126 @@
 
 Ошибка вызывала сбой статического анализатора (Pylance) и потенциальный
 крах при выполнении из-за некорректного синтаксиса аннотаций типов.
+
+Версия: 1.4.0 (дедупликация канонических наборов параметров)
+Дата обновления: 2026-10-19
+- ДОБАВЛЕНО: каждая комбинация приводится к эффективному каноническому набору
+  (optimization/canonical.py); бэктест выполняется один раз на набор, результат
+  размножается на все эквивалентные строки (deduplicate=True по умолчанию)
+
+Версия: 1.5.0 (персистентный кэш результатов)
+- ДОБАВЛЕНО: параметр result_cache — метрики прогонов сохраняются на диск
+  (optimization/result_cache.py) и переиспользуются между запусками
+
+Версия: 1.6.0 (модельно-ориентированный поиск)
+- ДОБАВЛЕНО: search_mode='bayesian' — поиск по той же сетке в пределах бюджета
+  с суррогатной моделью и параллельными пакетами кандидатов
+- Прогон комбинаций вынесен в optimization/evaluator.py (ComboEvaluator)
+
+Версия: 1.7.0 (многоуровневое последовательное деление)
+- ДОБАВЛЕНО: search_mode='halving' — все комбинации оцениваются на короткой /
+  недельной истории, лучшая доля переоценивается на всё более полной истории
+  (optimization/successive_halving.py)
+- ДОБАВЛЕНО: параметр engine — 'fast' включает векторизованный движок
+  (optimization/fast_backtester.py) с результатами, совпадающими с Backtester
+
+Версия: 1.8.0 (walk-forward анализ)
+- ДОБАВЛЕНО: walk_forward_dual_momentum() — оптимизация на скользящих или
+  расширяющихся обучающих окнах (параллельно по фолдам), проверка на следующем
+  тестовом окне и склейка out-of-sample кривой капитала
+  (optimization/walk_forward.py)
+
+Версия: 1.9.0 (потоковая запись результатов с возобновлением)
+- ДОБАВЛЕНО: параметр result_writer (optimization/result_writer.py) — строки
+  результатов сбрасываются пакетами на диск вместе с контрольной точкой
+  завершённых комбинаций; повторный запуск пропускает их, итоговая сортировка
+  выполняется слиянием отсортированных частей
+
+Версия: 1.10.0 (ленивая сетка с ограничениями)
+- ДОБАВЛЕНО: build_param_grid() — сетка optimization/param_grid.py (ParamGrid):
+  количество комбинаций считается арифметически, перебор ленивый, правило окон
+  волатильности и порядок порогов RVI отсекают недопустимые поддеревья до генерации
+- УДАЛЕНО: подсчёт через len(list(itertools.product(...)))
+
+Версия: 1.11.0 (инструментирование прогона)
+- ДОБАВЛЕНО: параметр monitor (optimization/instrumentation.py, RunMonitor) —
+  скользящая скорость и ETA, источник результатов (бэктест / память / кэш),
+  время фаз и загрузка процессов пула; события экспортируются в JSON Lines
+
+Версия: 1.12.0 (общая память выбора актива)
+- При engine='fast' серии выбора актива переиспользуются между комбинациями
+  с совпадающими эффективными окнами (FastBacktester.selection_codes)
+
+Версия: 1.13.0 (режим лучших K комбинаций)
+- ДОБАВЛЕНО: параметр top_k (optimization/top_k.py, TopKCollector) — хранятся
+  только K лучших строк по целевой функции ('sharpe', 'calmar', 'constrained', ...),
+  по остальным — потоковая статистика; память не зависит от размера сетки
+- analyze_parameter_sensitivity() принимает TopKCollector (статистика по всем строкам)
+
+Версия: 1.14.0 (многокритериальный поиск)
+- ДОБАВЛЕНО: search_mode='pareto' — NSGA-II по Sharpe, просадке и числу сделок
+  (optimization/pareto_search.py); возвращается фронт Парето
+
+Версия: 1.15.0 (распределённый перебор)
+- ДОБАВЛЕНО: distributed_optimize_dual_momentum() — сетка делится на единицы
+  работы в очереди SQLite (optimization/work_queue.py); локальные и удалённые
+  исполнители забирают единицы в аренду с возвратом при истечении срока
+
+Версия: 1.16.0 (общий оценщик для последовательности шагов)
+- ДОБАВЛЕНО: параметр evaluator — готовый ComboEvaluator (признаки, память
+  дедупликации, пул процессов) переиспользуется между вызовами и не
+  закрывается по завершении (optimization/pipeline.py)
+
+Версия: 1.17.0 (отсев сетки суррогатом по истории результатов)
+- ДОБАВЛЕНО: search_mode='surrogate' — градиентный бустинг, обученный на
+  прошлых optimization_results_* из data-optimization/, отправляет в бэктест
+  только перспективную долю сетки (optimization/surrogate_pruning.py)
+
+Версия: 1.18.0 (инкрементальная переоптимизация)
+- ДОБАВЛЕНО: incremental_optimize_dual_momentum() — состояние симуляции каждой
+  комбинации сохраняется после прогона; при добавлении баров продвигаются
+  только новые дни (optimization/incremental.py)
+
+Версия: 1.19.0 (плато параметров)
+- ДОБАВЛЕНО: find_parameter_plateaus() — результаты раскладываются в плотный
+  массив по осям параметров, комбинации ранжируются по сглаженной по
+  окрестности целевой функции и её разбросу (optimization/plateau.py)
+
+Версия: 1.20.0 (проскальзывание из профиля спреда)
+- ДОБАВЛЕНО: при slippage=None и заданном config.spread_slippage_store
+  проскальзывание по тикерам берётся из профиля спреда MOEX
+  (datastore/spread_store.configured_slippage)
+- ИЗМЕНЕНО: сетка по умолчанию всех режимов — DEFAULT_PARAM_GRID
+
+Версия: 1.20.1 (общий оценщик без молчаливой подмены аргументов)
+- ИСПРАВЛЕНО: при evaluator= явно переданные издержки, капитал, фильтр времени,
+  engine, deduplicate и result_cache, противоречащие оценщику, — ValueError
+  (раньше молча заменялись настройками оценщика)
+
+Версия: 1.20.2 (market_vol_window=None в сетке)
+- ИСПРАВЛЕНО: проверка правила окон перед перебором пропускает None
+  (окно base_vol_window) вместо TypeError в max()
 """
 
-__version__ = "1.3.1"
+__version__ = "1.20.2"
 __author__ = "Oleg Dev"
-__date__ = "2026-02-13"
+__date__ = "2026-10-19"
 
-import itertools
+import os
 import pandas as pd
 import warnings
-from typing import Dict, Optional, List, Callable
+from contextlib import nullcontext
+from typing import Dict, Optional, List, Callable, Union
 
-from core.backtester import Backtester
-from strategies.dual_momentum import DualMomentumStrategy
+from datastore.spread_store import configured_slippage
+from optimization.canonical import unique_combinations
+from optimization.evaluator import ComboEvaluator
+from optimization.instrumentation import RunMonitor
+from optimization.param_grid import ParamGrid
+from optimization.plateau import find_parameter_plateaus
+from optimization.result_cache import ResultCache, fingerprint_inputs
+from optimization.result_writer import ResultWriter, make_run_key
+from optimization.top_k import TopKCollector
 
 # 🔑 ИМПОРТ ИЗДЕРЖЕК ИЗ МОДУЛЬНОЙ КОНФИГУРАЦИИ
 from config import (
@@ -38,10 +145,29 @@ from config import (
     default_slippage as DEFAULT_SLIPPAGE_FALLBACK,
     use_slippage as DEFAULT_USE_SLIPPAGE,
     ANNUAL_TO_DAILY,
-    CRITICAL_WARNING_COMMON
+    CRITICAL_WARNING_COMMON,
+    optimization_settings
 )
 
 
+# Сетка по умолчанию для всех режимов оптимизации (param_grid=None)
+DEFAULT_PARAM_GRID: Dict[str, List] = {
+    'base_lookback': [20, 25, 30],
+    'base_vol_window': [8, 10, 12],
+    'market_vol_window': [21, 30, 40],
+    'max_vol_threshold': [0.30, 0.35, 0.40],
+    'market_vol_threshold': [0.30, 0.35, 0.40]
+}
+
+# Значения по умолчанию аргументов optimize_dual_momentum, задаваемых оценщиком (остальные — None)
+EVALUATOR_ARG_DEFAULTS = {'initial_capital': 100_000, 'engine': 'backtester', 'deduplicate': True}
+
+
+def _default_slippage(data_dict: Dict[str, pd.DataFrame]):
+    """Проскальзывание по умолчанию: профиль спреда (config.spread_slippage_store) или slippage."""
+    return configured_slippage(DEFAULT_SLIPPAGE, tickers=list(data_dict))
+
+
 def _validate_volatility_windows(param_combo: Dict) -> bool:
     """
     Валидация критического правила: разделение окон волатильности.
@@ -66,6 +192,45 @@ def _validate_volatility_windows(param_combo: Dict) -> bool:
     return True
 
 
+def _thresholds_ordered(lower, upper) -> bool:
+    """Порог lower строго меньше upper (None — значение не задано, ограничение не действует)."""
+    return lower is None or upper is None or lower < upper
+
+
+def build_param_grid(
+    param_grid: Union[Dict[str, List], ParamGrid],
+    skip_invalid_windows: bool = True
+) -> ParamGrid:
+    """
+    Сетка оптимизации с ограничениями стратегии Dual Momentum.
+
+    При skip_invalid_windows недопустимые комбинации отсекаются при генерации:
+      • base_vol_window < market_vol_window (правило _validate_volatility_windows)
+      • rvi_low_threshold < rvi_medium_threshold < rvi_high_exit_threshold
+
+    Готовый ParamGrid возвращается без изменений (ограничения задаёт вызывающий код).
+    """
+    if isinstance(param_grid, ParamGrid):
+        return param_grid
+    grid = ParamGrid(param_grid)
+    if skip_invalid_windows:
+        grid.add_constraint(
+            ('base_vol_window', 'market_vol_window'),
+            lambda base, market: _validate_volatility_windows(
+                {'base_vol_window': base, 'market_vol_window': market}
+            ),
+            name='base_vol_window < market_vol_window'
+        )
+        grid.add_constraint(('rvi_low_threshold', 'rvi_medium_threshold'), _thresholds_ordered)
+        grid.add_constraint(('rvi_medium_threshold', 'rvi_high_exit_threshold'), _thresholds_ordered)
+    return grid
+
+
+def _timed_phase(monitor: Optional[RunMonitor], name: str):
+    """Замер фазы монитором (без монитора — пустой контекст)."""
+    return monitor.phase(name) if monitor is not None else nullcontext()
+
+
 def _format_error_context(params: Dict, error: Exception) -> str:
     """Форматирование контекста ошибки для логирования."""
     param_str = ", ".join([f"{k}={v}" for k, v in params.items() if v is not None])
@@ -76,7 +241,7 @@ def optimize_dual_momentum(
     data_dict: Dict[str, pd.DataFrame],
     market_data: pd.DataFrame,  # ✅ ИСПРАВЛЕНО: добавлено двоеточие после имени параметра
     rvi_data: Optional[pd.DataFrame] = None,
-    param_grid: Optional[Dict[str, List]] = None,
+    param_grid: Optional[Union[Dict[str, List], ParamGrid]] = None,
     commission: Optional[float] = None,
     default_commission: Optional[float] = None,
     slippage: Optional[float] = None,
@@ -84,7 +249,16 @@ def optimize_dual_momentum(
     initial_capital: float = 100_000,
     trade_time_filter: Optional[str] = None,
     skip_invalid_windows: bool = True,
-    progress_callback: Optional[Callable] = None
+    progress_callback: Optional[Callable] = None,
+    deduplicate: bool = True,
+    result_cache: Optional[ResultCache] = None,
+    search_mode: str = 'grid',
+    search_options: Optional[Dict] = None,
+    engine: str = 'backtester',
+    result_writer: Optional[ResultWriter] = None,
+    monitor: Optional[RunMonitor] = None,
+    top_k: Optional[Union[int, TopKCollector]] = None,
+    evaluator: Optional[ComboEvaluator] = None
 ) -> pd.DataFrame:
     """
     Оптимизация стратегии Dual Momentum через перебор комбинаций параметров.
@@ -97,10 +271,40 @@ def optimize_dual_momentum(
         data_dict: Словарь данных по активам {тикер: DataFrame}
         market_data: pd.DataFrame — ДАННЫЕ РЫНОЧНОГО ИНДЕКСА (исправлено)
         rvi_data: Данные индекса волатильности РТС (опционально)
+        param_grid: словарь {параметр: значения} или готовый ParamGrid с ограничениями
         ... остальные параметры без изменений ...
+        deduplicate: запускать бэктест один раз на канонический набор параметров
+                     (эквивалентные комбинации получают копию результата)
+        result_cache: персистентный кэш результатов (optimization/result_cache.py);
+                      закэшированные комбинации не пересчитываются
+        search_mode: 'grid' — полный перебор; 'bayesian' — модельно-ориентированный
+                     поиск в пределах бюджета (optimization/bayesian_search.py);
+                     'halving' — последовательное деление по уровням точности
+                     (optimization/successive_halving.py); 'pareto' — NSGA-II,
+                     фронт Парето по Sharpe / просадке / сделкам (optimization/pareto_search.py);
+                     'surrogate' — бэктест только перспективной доли сетки по суррогату,
+                     обученному на прошлых результатах (optimization/surrogate_pruning.py)
+        search_options: настройки поискового режима (bayesian: n_trials, batch_size,
+                        n_jobs, surrogate='forest'|'tpe', ...; halving: eta, n_rungs,
+                        min_fraction, weekly_stride, n_jobs, ...; pareto: objectives,
+                        population_size, n_generations, n_jobs, return_all, ...;
+                        surrogate: keep_fraction, collapse_threshold, history_dir, n_trials, ...)
+        engine: 'backtester' — Backtester.run(); 'fast' — векторизованный FastBacktester
+        result_writer: потоковая запись строк на диск с контрольной точкой (режим 'grid');
+                       повторный запуск с тем же writer пропускает завершённые комбинации
+        monitor: RunMonitor — периодические события прогресса (скорость, ETA),
+                 время фаз и статистика процессов; сводка — monitor.summary()
+        top_k: число K или TopKCollector — вернуть только K лучших строк по целевой
+               функции коллектора (по умолчанию Sharpe); статистика по всем строкам
+               доступна через переданный TopKCollector (sensitivity, summary)
+        evaluator: готовый ComboEvaluator, общий для нескольких вызовов (признаки и
+                   результаты предыдущих шагов переиспользуются); издержки, капитал,
+                   trade_time_filter, engine, deduplicate и result_cache берутся из него,
+                   пул не закрывается. Эти аргументы можно не передавать: значение,
+                   отличное и от значения по умолчанию, и от настройки оценщика, — ValueError
     
     Возвращает:
-        pd.DataFrame: Отсортированный по Sharpe Ratio
+        pd.DataFrame: Отсортированный по Sharpe Ratio (в режиме top_k — по целевой функции)
     """
     # === ВАЛИДАЦИЯ ВХОДНЫХ ДАННЫХ ===
     if not data_dict:
@@ -109,36 +313,58 @@ def optimize_dual_momentum(
         raise ValueError("market_data обязателен и не может быть пустым")
     
     # === НАСТРОЙКА ИЗДЕРЖЕК ===
+    if evaluator is not None:
+        # Общий оценщик задаёт издержки и движок сам — явно переданное другое значение противоречит ему
+        passed = {
+            'commission': commission, 'default_commission': default_commission,
+            'slippage': slippage, 'use_slippage': use_slippage,
+            'initial_capital': initial_capital, 'trade_time_filter': trade_time_filter,
+            'engine': engine, 'deduplicate': deduplicate, 'result_cache': result_cache
+        }
+        conflicts = [
+            f"{name}={value!r} (у оценщика {getattr(evaluator, name)!r})"
+            for name, value in passed.items()
+            if value is not None and value != EVALUATOR_ARG_DEFAULTS.get(name)
+            and value != getattr(evaluator, name)
+        ]
+        if conflicts:
+            raise ValueError("Аргументы противоречат настройкам переданного evaluator: " + ', '.join(conflicts))
     commission = commission if commission is not None else DEFAULT_COMMISSION
     default_commission = default_commission if default_commission is not None else DEFAULT_COMMISSION_FALLBACK
-    slippage = slippage if slippage is not None else DEFAULT_SLIPPAGE
+    slippage = slippage if slippage is not None else _default_slippage(data_dict)
     use_slippage = use_slippage if use_slippage is not None else DEFAULT_USE_SLIPPAGE
+    if evaluator is not None:
+        engine, result_cache = evaluator.engine, evaluator.result_cache
+        commission, default_commission = evaluator.commission, evaluator.default_commission
+        slippage, use_slippage = evaluator.slippage, evaluator.use_slippage
+        initial_capital, trade_time_filter = evaluator.initial_capital, evaluator.trade_time_filter
     
     # === СЕТКА ПАРАМЕТРОВ ПО УМОЛЧАНИЮ ===
     if param_grid is None:
-        param_grid = {
-            'base_lookback': [20, 25, 30],
-            'base_vol_window': [8, 10, 12],
-            'market_vol_window': [21, 30, 40],
-            'max_vol_threshold': [0.30, 0.35, 0.40],
-            'market_vol_threshold': [0.30, 0.35, 0.40]
-        }
+        param_grid = DEFAULT_PARAM_GRID
     
     # === ПОДГОТОВКА К ПЕРЕБОРУ ===
-    keys = list(param_grid.keys())
-    values = list(param_grid.values())
-    total_combinations = len(list(itertools.product(*values)))
+    # 🔑 Ленивая сетка: недопустимые комбинации не генерируются, количество считается без перебора
+    grid = build_param_grid(param_grid, skip_invalid_windows)
+    grid_values = grid.to_dict()
+    total_combinations = grid.total
+    feasible_combinations = len(grid)
     
     print(f"\n🔍 НАЧАЛО ОПТИМИЗАЦИИ")
-    print(f"   Количество комбинаций: {total_combinations:,}")
-    print(f"   Издержки: комиссия={commission:.2%}, проскальзывание={slippage:.2%} (использовать={use_slippage})")
+    print(f"   Количество комбинаций: {total_combinations:,} (допустимых: {feasible_combinations:,})")
+    slippage_text = (f"{slippage:.2%}" if not isinstance(slippage, dict) else
+                     "по профилю спреда (" + ', '.join(f"{t} {v}" for t, v in slippage.items()) + " bps)")
+    print(f"   Издержки: комиссия={commission:.2%}, проскальзывание={slippage_text} (использовать={use_slippage})")
     print(f"   Капитал: {initial_capital:,.0f} ₽")
     print(f"   ⚠️  {CRITICAL_WARNING_COMMON}")
     
     # Проверка потенциальных нарушений правила окон
-    if 'base_vol_window' in param_grid and 'market_vol_window' in param_grid:
-        min_base = min(param_grid['base_vol_window'])
-        max_market = max(param_grid['market_vol_window'])
+    # (market_vol_window=None — окно base_vol_window, правилу не подлежит)
+    base_windows = [w for w in grid_values.get('base_vol_window', []) if w is not None]
+    market_windows = [w for w in grid_values.get('market_vol_window', []) if w is not None]
+    if base_windows and market_windows:
+        min_base = min(base_windows)
+        max_market = max(market_windows)
         if min_base >= max_market:
             warning_msg = (
                 f"⚠️  ПОТЕНЦИАЛЬНОЕ НАРУШЕНИЕ ПРАВИЛА: "
@@ -150,99 +376,275 @@ def optimize_dual_momentum(
                 raise ValueError(warning_msg)
     
     results = []
-    invalid_count = 0
+    invalid_count = total_combinations - feasible_combinations
     error_count = 0
-    
-    # === ПЕРЕБОР КОМБИНАЦИЙ ===
-    for idx, combo in enumerate(itertools.product(*values), 1):
-        params = dict(zip(keys, combo))
-        
-        # 🔑 ВАЛИДАЦИЯ КРИТИЧЕСКОГО ПРАВИЛА
-        if skip_invalid_windows and not _validate_volatility_windows(params):
-            invalid_count += 1
-            continue
-        
-        strategy = DualMomentumStrategy(**params)
-        
-        bt = Backtester(
+    attempted = feasible_combinations
+
+    # 🔑 ОЦЕНЩИК: дедупликация канонических наборов + персистентный кэш
+    owns_evaluator = evaluator is None
+    if owns_evaluator:
+        evaluator = ComboEvaluator(
+            data_dict,
+            market_data,
+            rvi_data,
             commission=commission,
             default_commission=default_commission,
             slippage=slippage,
             use_slippage=use_slippage,
-            trade_time_filter=trade_time_filter
+            initial_capital=initial_capital,
+            trade_time_filter=trade_time_filter,
+            deduplicate=deduplicate,
+            result_cache=result_cache,
+            engine=engine,
+            monitor=monitor
         )
-        
+    else:
+        evaluator.monitor = monitor
+    runs_before, reused_before = evaluator.runs, evaluator.reused
+
+    if result_writer is not None and search_mode != 'grid':
+        raise ValueError("result_writer поддерживается только в режиме search_mode='grid'")
+    if result_writer is not None and top_k is not None:
+        raise ValueError("result_writer и top_k несовместимы: выберите запись всех строк или K лучших")
+
+    # 🏆 РЕЖИМ K ЛУЧШИХ: строки не накапливаются, статистика считается потоково
+    collector = None
+    if top_k is not None:
+        collector = top_k if isinstance(top_k, TopKCollector) else TopKCollector(k=top_k)
+        collector.set_params(grid.keys)
+        print(f"   🏆 Режим top-K: хранится {collector.k:,} лучших строк "
+              f"(целевая функция: {collector.objective_name})")
+
+    if search_mode == 'grid':
+        # 💽 ВОЗОБНОВЛЕНИЕ ПО КОНТРОЛЬНОЙ ТОЧКЕ
+        if result_writer is not None:
+            run_key = make_run_key(
+                fingerprint_inputs(data_dict, market_data, rvi_data),
+                grid_values,
+                {
+                    'commission': commission,
+                    'default_commission': default_commission,
+                    'slippage': slippage,
+                    'use_slippage': use_slippage,
+                    'initial_capital': initial_capital,
+                    'trade_time_filter': trade_time_filter,
+                    'skip_invalid_windows': skip_invalid_windows
+                }
+            )
+            resumed = result_writer.bind(run_key)
+            if resumed:
+                print(f"   ⏯️  Возобновление: {resumed:,} комбинаций уже завершены "
+                      f"({result_writer.rows:,} строк на диске)")
+
+        if monitor is not None:
+            resumed_count = result_writer.resumed if result_writer is not None else 0
+            monitor.start(total=feasible_combinations - resumed_count, mode='grid', engine=engine,
+                          grid_total=total_combinations, feasible=feasible_combinations)
+
+        # === ПЕРЕБОР КОМБИНАЦИЙ ===
         try:
-            res = bt.run(
-                strategy,
-                data_dict,
-                market_data=market_data,  # ✅ Корректная передача параметра
-                rvi_data=rvi_data,
-                initial_capital=initial_capital
+            for idx, params in enumerate(grid, 1):
+                if result_writer is not None and result_writer.is_done(idx - 1):
+                    continue
+
+                outcome = evaluator.evaluate(params)
+
+                if isinstance(outcome, Exception):
+                    error_count += 1
+                    if error_count <= 5:
+                        print(f"   ⚠️  Ошибка при комбинации {idx}/{feasible_combinations}: {_format_error_context(params, outcome)}")
+                    if result_writer is not None:
+                        with _timed_phase(monitor, 'write'):
+                            result_writer.add(idx - 1, None)
+                    continue
+
+                # 🔑 ЯВНОЕ СОХРАНЕНИЕ параметров адаптации под RVI + диагностических полей
+                result_row = evaluator.build_row(params, outcome)
+                if result_writer is not None:
+                    with _timed_phase(monitor, 'write'):
+                        result_writer.add(idx - 1, result_row)
+                elif collector is not None:
+                    collector.add(result_row)
+                else:
+                    results.append(result_row)
+
+                if progress_callback:
+                    progress_callback(idx, feasible_combinations, params, result_row)
+        finally:
+            # Завершённые комбинации сохраняются и при прерывании (Ctrl+C, ошибка)
+            if result_writer is not None:
+                result_writer.flush()
+
+    elif search_mode == 'bayesian':
+        # === МОДЕЛЬНО-ОРИЕНТИРОВАННЫЙ ПОИСК ПО ТОЙ ЖЕ СЕТКЕ ===
+        from optimization.bayesian_search import run_bayesian_search
+
+        options = search_options or {}
+        print(f"   🧠 Режим поиска: bayesian (бюджет {options.get('n_trials', 100):,} комбинаций, "
+              f"суррогат={options.get('surrogate', 'forest')})")
+        if monitor is not None:
+            monitor.start(total=min(options.get('n_trials', 100), feasible_combinations),
+                          mode='bayesian', engine=engine, feasible=feasible_combinations)
+        try:
+            results, search_stats = run_bayesian_search(
+                evaluator,
+                grid,
+                progress_callback=progress_callback,
+                **options
             )
-            
-            # 🔑 ЯВНОЕ СОХРАНЕНИЕ параметров адаптации под RVI + диагностических полей
-            result_row = {
-                **params,
-                'rvi_low_multiplier': getattr(strategy, 'rvi_low_multiplier', None),
-                'rvi_high_multiplier': getattr(strategy, 'rvi_high_multiplier', None),
-                'rvi_low_threshold': getattr(strategy, 'rvi_low_threshold', None),
-                'rvi_medium_threshold': getattr(strategy, 'rvi_medium_threshold', None),
-                'rvi_high_exit_threshold': getattr(strategy, 'rvi_high_exit_threshold', None),
-                'use_rvi_adaptation': getattr(strategy, 'use_rvi_adaptation', None),
-                'use_trend_filter': getattr(strategy, 'use_trend_filter', None),
-                'used_market_vol_window': res.get('used_market_vol_window', None),
-                'total_trades': res.get('total_trades', None),
-                'time_in_cash_pct': res.get('time_in_cash_pct', None),
-                'final_value': res['final_value'],
-                'cagr': res['cagr'],
-                'sharpe': res['sharpe'],
-                'max_drawdown': res['max_drawdown'],
-                'calmar': res.get('calmar', None),
-                'sortino': res.get('sortino', None),
-                'volatility': res.get('volatility', None)
-            }
-            results.append(result_row)
-            
-            if progress_callback:
-                progress_callback(idx, total_combinations, params, result_row)
-            
-        except Exception as e:
-            error_count += 1
-            if error_count <= 5:
-                print(f"   ⚠️  Ошибка при комбинации {idx}/{total_combinations}: {_format_error_context(params, e)}")
-            continue
-    
+        finally:
+            if owns_evaluator:
+                evaluator.close()
+        error_count = search_stats['errors']
+        attempted = search_stats['evaluated']
+    elif search_mode == 'halving':
+        # === ПОСЛЕДОВАТЕЛЬНОЕ ДЕЛЕНИЕ ПО УРОВНЯМ ТОЧНОСТИ ===
+        from optimization.successive_halving import run_successive_halving
+
+        options = search_options or {}
+        print(f"   🪜 Режим поиска: halving (eta={options.get('eta', 3)})")
+        if monitor is not None:
+            monitor.start(total=None, mode='halving', engine=engine, feasible=feasible_combinations)
+        try:
+            results, search_stats = run_successive_halving(
+                evaluator,
+                grid,
+                progress_callback=progress_callback,
+                **options
+            )
+        finally:
+            if owns_evaluator:
+                evaluator.close()
+        error_count = search_stats['errors']
+        attempted = search_stats['evaluated']
+    elif search_mode == 'pareto':
+        # === МНОГОКРИТЕРИАЛЬНЫЙ ПОИСК: ФРОНТ ПАРЕТО ===
+        from optimization.pareto_search import run_pareto_search
+
+        options = search_options or {}
+        print(f"   🧬 Режим поиска: pareto (популяция {options.get('population_size', 40)}, "
+              f"поколений {options.get('n_generations', 10)})")
+        if monitor is not None:
+            budget = options.get('population_size', 40) * (options.get('n_generations', 10) + 1)
+            monitor.start(total=min(budget, feasible_combinations), mode='pareto', engine=engine,
+                          feasible=feasible_combinations)
+        try:
+            results, search_stats = run_pareto_search(
+                evaluator,
+                grid,
+                progress_callback=progress_callback,
+                **options
+            )
+        finally:
+            if owns_evaluator:
+                evaluator.close()
+        error_count = search_stats['errors']
+        attempted = search_stats['evaluated']
+        print(f"   🧬 Фронт Парето: {search_stats['front_size']:,} недоминируемых комбинаций "
+              f"из {attempted:,} оценённых")
+    elif search_mode == 'surrogate':
+        # === ОТСЕВ СЕТКИ СУРРОГАТОМ, ОБУЧЕННЫМ НА ПРОШЛЫХ РЕЗУЛЬТАТАХ ===
+        from optimization.surrogate_pruning import run_surrogate_search
+
+        options = search_options or {}
+        print(f"   🌲 Режим поиска: surrogate (в бэктест {options.get('keep_fraction', 0.25):.0%} "
+              f"перспективных комбинаций)")
+        if monitor is not None:
+            monitor.start(total=None, mode='surrogate', engine=engine, feasible=feasible_combinations)
+        try:
+            results, search_stats = run_surrogate_search(
+                evaluator,
+                grid,
+                progress_callback=progress_callback,
+                **options
+            )
+        finally:
+            if owns_evaluator:
+                evaluator.close()
+        error_count = search_stats['errors']
+        attempted = search_stats['evaluated']
+    else:
+        raise ValueError(f"Неизвестный режим поиска: {search_mode} "
+                         "(допустимо: 'grid', 'bayesian', 'halving', 'pareto', 'surrogate')")
+
     # === ПОСТ-ОБРАБОТКА РЕЗУЛЬТАТОВ ===
     if invalid_count > 0:
-        print(f"   ⚠️  Пропущено комбинаций из-за нарушения правила окон: {invalid_count:,} ({invalid_count/total_combinations:.1%})")
-    
+        print(f"   ⚠️  Пропущено комбинаций из-за нарушения правила окон / порядка порогов RVI: "
+              f"{invalid_count:,} ({invalid_count/total_combinations:.1%})")
+
+    runs, reused = evaluator.runs - runs_before, evaluator.reused - reused_before
+    if reused > 0:
+        print(f"   ♻️  Выполнено бэктестов: {runs:,} "
+              f"(повторно использовано результатов эквивалентных комбинаций: {reused:,})")
+
+    selection_stats = evaluator.selection_stats()
+    if selection_stats is not None and selection_stats['hits'] > 0:
+        print(f"   🧩 Серии выбора актива: рассчитано {selection_stats['misses']:,}, "
+              f"переиспользовано {selection_stats['hits']:,} (совпадающие эффективные окна)")
+
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        print(f"   💾 Кэш результатов: попаданий {cache_stats['hits']:,}, промахов {cache_stats['misses']:,} "
+              f"(hit rate {cache_stats['hit_rate']:.1%})")
+
     if error_count > 0:
-        print(f"   ⚠️  Ошибок при бэктесте: {error_count:,} ({error_count/total_combinations:.1%})")
-    
-    if not results:
+        print(f"   ⚠️  Ошибок при бэктесте: {error_count:,} ({error_count/max(attempted, 1):.1%})")
+
+    # 💽 При потоковой записи итог собирается слиянием отсортированных частей на диске
+    with _timed_phase(monitor, 'finalize'):
+        if result_writer is not None:
+            df = result_writer.finalize()
+        elif collector is not None:
+            # Поисковые режимы возвращают ограниченный бюджетом список — он проходит через коллектор
+            collector.extend(results)
+            df = collector.to_frame()
+        else:
+            df = pd.DataFrame(results)
+
+    if monitor is not None:
+        summary = monitor.finish(successful=collector.seen if collector is not None else len(df),
+                                 errors_total=error_count)
+        print(f"   ⏱️  Скорость: {summary['throughput']:.1f} комб/с "
+              f"(за {summary['elapsed_seconds']:.1f} с, повторно использовано {summary['reuse_rate']:.0%})")
+
+    if df.empty and collector is not None and collector.seen > 0:
+        raise ValueError(
+            f"Ни одна из {collector.seen:,} успешных комбинаций не прошла целевую функцию "
+            f"'{collector.objective_name}' (например, риск-ограничения режима 'constrained')"
+        )
+
+    if df.empty:
         if invalid_count == total_combinations:
             raise RuntimeError(
                 f"Все {total_combinations:,} комбинаций отфильтрованы из-за нарушения правила "
-                "разделения окон волатильности (base_vol_window ≥ market_vol_window). "
+                "разделения окон волатильности (base_vol_window ≥ market_vol_window) "
+                "или порядка порогов RVI (low < medium < high_exit). "
                 "Измените сетку параметров или установите skip_invalid_windows=False."
             )
         raise ValueError(
             f"Ни одна комбинация параметров не прошла бэктест успешно "
-            f"(всего попыток: {total_combinations:,}, ошибок: {error_count:,}). "
+            f"(всего попыток: {attempted:,}, ошибок: {error_count:,}). "
             "Проверьте корректность данных и параметров стратегии."
         )
     
-    df = pd.DataFrame(results)
-    
     # Гарантируем наличие критических колонок
     for col in ['rvi_low_multiplier', 'used_market_vol_window', 'sharpe']:
         if col not in df.columns:
             df[col] = None
     
+    if collector is not None:
+        # Итоги по всем строкам — из потоковой статистики (в df только K лучших)
+        summary = collector.summary()
+        df = df.reset_index(drop=True)
+        print(f"✅ ОПТИМИЗАЦИЯ ЗАВЕРШЕНА: {summary['seen']:,} успешных комбинаций из {attempted:,} попыток "
+              f"(сохранено лучших: {len(df):,})")
+        print(f"   Лучший Sharpe: {summary['sharpe_max']:.4f} | Худший Sharpe: {summary['sharpe_min']:.4f}")
+        print(f"   Медианный Sharpe (оценка P²): {summary['sharpe_median']:.4f}")
+        return df
+
     df = df.sort_values('sharpe', ascending=False).reset_index(drop=True)
     
-    print(f"✅ ОПТИМИЗАЦИЯ ЗАВЕРШЕНА: {len(df):,} успешных комбинаций из {total_combinations:,} попыток")
+    print(f"✅ ОПТИМИЗАЦИЯ ЗАВЕРШЕНА: {len(df):,} успешных комбинаций из {attempted:,} попыток")
     print(f"   Лучший Sharpe: {df['sharpe'].max():.4f} | Худший Sharpe: {df['sharpe'].min():.4f}")
     print(f"   Медианный Sharpe: {df['sharpe'].median():.4f}")
     
@@ -253,8 +655,19 @@ def optimize_dual_momentum(
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ======================
 
-def analyze_parameter_sensitivity(results_df: pd.DataFrame, parameter: str) -> pd.DataFrame:
-    """Анализ чувствительности метрик к изменению конкретного параметра."""
+def analyze_parameter_sensitivity(
+    results_df: Union[pd.DataFrame, TopKCollector],
+    parameter: str
+) -> pd.DataFrame:
+    """
+    Анализ чувствительности метрик к изменению конкретного параметра.
+
+    results_df: таблица результатов или TopKCollector режима top_k (статистика
+                по всем оценённым строкам, медиана — потоковая оценка P²)
+    """
+    if isinstance(results_df, TopKCollector):
+        return results_df.sensitivity(parameter)
+
     if parameter not in results_df.columns:
         raise ValueError(f"Параметр '{parameter}' отсутствует в результатах")
     
@@ -311,4 +724,234 @@ OPTIMIZER_METADATA = {
         'slippage': DEFAULT_SLIPPAGE,
         'use_slippage': DEFAULT_USE_SLIPPAGE
     }
-}
\ No newline at end of file
+}
+
+
+def walk_forward_dual_momentum(
+    data_dict: Dict[str, pd.DataFrame],
+    market_data: pd.DataFrame,
+    rvi_data: Optional[pd.DataFrame] = None,
+    param_grid: Optional[Union[Dict[str, List], ParamGrid]] = None,
+    train_days: Optional[int] = None,
+    test_days: Optional[int] = None,
+    step_days: Optional[int] = None,
+    anchored: Optional[bool] = None,
+    objective: str = 'sharpe',
+    n_jobs: int = 1,
+    commission: Optional[float] = None,
+    default_commission: Optional[float] = None,
+    slippage: Optional[float] = None,
+    use_slippage: Optional[bool] = None,
+    initial_capital: float = 100_000,
+    trade_time_filter: Optional[str] = None,
+    skip_invalid_windows: bool = True
+) -> Dict:
+    """
+    Walk-forward анализ стратегии Dual Momentum.
+
+    На каждом обучающем окне перебирается сетка и выбирается лучшая комбинация
+    по objective; она торгуется на следующем тестовом окне. Размеры окон по
+    умолчанию берутся из optimization_settings (walk_forward_train_days,
+    walk_forward_test_days, walk_forward_anchored).
+
+    Аргументы:
+        param_grid: сетка параметров (по умолчанию — DEFAULT_PARAM_GRID)
+        train_days, test_days, step_days, anchored: схема окон (см. optimization/walk_forward.py)
+        objective: метрика выбора параметров на обучающем окне
+        n_jobs: процессов (фолды оптимизируются параллельно)
+        остальные — как в optimize_dual_momentum
+
+    Возвращает:
+        {'folds': DataFrame по фолдам, 'oos_equity': склеенная OOS-кривая капитала,
+         'oos_metrics': метрики OOS-кривой}
+    """
+    from optimization.walk_forward import make_folds, run_walk_forward
+
+    if not data_dict:
+        raise ValueError("data_dict не может быть пустым")
+    if market_data is None or market_data.empty:
+        raise ValueError("market_data обязателен и не может быть пустым")
+
+    train_days = train_days or optimization_settings.get('walk_forward_train_days', 504)
+    test_days = test_days or optimization_settings.get('walk_forward_test_days', 126)
+    if anchored is None:
+        anchored = optimization_settings.get('walk_forward_anchored', False)
+
+    evaluator = ComboEvaluator(
+        data_dict,
+        market_data,
+        rvi_data,
+        commission=commission if commission is not None else DEFAULT_COMMISSION,
+        default_commission=default_commission if default_commission is not None else DEFAULT_COMMISSION_FALLBACK,
+        slippage=slippage if slippage is not None else _default_slippage(data_dict),
+        use_slippage=use_slippage if use_slippage is not None else DEFAULT_USE_SLIPPAGE,
+        initial_capital=initial_capital,
+        trade_time_filter=trade_time_filter,
+        engine='fast'
+    )
+    engine = evaluator.fast_engine()
+
+    if param_grid is None:
+        param_grid = DEFAULT_PARAM_GRID
+    grid = build_param_grid(param_grid, skip_invalid_windows)
+    candidates, grid_stats = unique_combinations(grid, evaluator.has_rvi)
+    if not candidates:
+        raise ValueError("Сетка не содержит допустимых комбинаций для walk-forward анализа")
+
+    folds = make_folds(engine.features.n_dates, train_days, test_days,
+                       step_days=step_days, anchored=anchored)
+
+    print(f"\n🚶 WALK-FORWARD АНАЛИЗ ({'anchored' if anchored else 'rolling'})")
+    print(f"   Окна: обучение {train_days} дн., тест {test_days} дн., фолдов: {len(folds)}")
+    print(f"   Уникальных комбинаций: {len(candidates):,} "
+          f"(эквивалентных: {grid_stats['duplicates']:,}, недопустимых: {grid.total - len(grid):,})")
+
+    result = run_walk_forward(engine, candidates, folds, objective=objective, n_jobs=n_jobs)
+
+    oos = result['oos_metrics']
+    if oos:
+        print(f"✅ WALK-FORWARD ЗАВЕРШЁН: OOS Sharpe {oos['sharpe']:.4f} | "
+              f"CAGR {oos['cagr']:.2%} | Max DD {oos['max_drawdown']:.2%}")
+    else:
+        print("⚠️  Ни на одном фолде не удалось подобрать параметры")
+    return result
+
+
+def distributed_optimize_dual_momentum(
+    data_dict: Dict[str, pd.DataFrame],
+    market_data: pd.DataFrame,
+    rvi_data: Optional[pd.DataFrame] = None,
+    param_grid: Optional[Dict[str, List]] = None,
+    queue_dir: Optional[str] = None,
+    n_workers: int = 2,
+    unit_size: int = 500,
+    lease_seconds: float = 600,
+    commission: Optional[float] = None,
+    default_commission: Optional[float] = None,
+    slippage: Optional[float] = None,
+    use_slippage: Optional[bool] = None,
+    initial_capital: float = 100_000,
+    trade_time_filter: Optional[str] = None,
+    skip_invalid_windows: bool = True,
+    engine: str = 'fast',
+    timeout: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Распределённый полный перебор через очередь заданий (optimization/work_queue.py).
+
+    Сетка делится на единицы по unit_size комбинаций в очереди SQLite в queue_dir;
+    n_workers локальных процессов и любые удалённые исполнители с доступом к
+    queue_dir забирают единицы в аренду. Повторный вызов с теми же входными
+    данными продолжает прогон с завершённых единиц.
+
+    Аргументы:
+        queue_dir: директория очереди на общей файловой системе
+                   (по умолчанию data-optimization/queue в корне проекта)
+        n_workers: локальных исполнителей (0 — только удалённые)
+        unit_size, lease_seconds: размер единицы работы и срок аренды
+        timeout: предельное время ожидания прогона, секунд (None — без ограничения)
+        остальные — как в optimize_dual_momentum
+
+    Возвращает:
+        pd.DataFrame: Отсортированный по Sharpe Ratio
+    """
+    from optimization.work_queue import run_distributed
+
+    if queue_dir is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        queue_dir = os.path.join(project_root, 'data-optimization', 'queue')
+    if not data_dict:
+        raise ValueError("data_dict не может быть пустым")
+    if market_data is None or market_data.empty:
+        raise ValueError("market_data обязателен и не может быть пустым")
+    if param_grid is None:
+        param_grid = DEFAULT_PARAM_GRID
+
+    print(f"\n🌐 РАСПРЕДЕЛЁННАЯ ОПТИМИЗАЦИЯ")
+    df = run_distributed(
+        data_dict,
+        market_data,
+        rvi_data,
+        param_grid,
+        queue_dir,
+        n_workers=n_workers,
+        unit_size=unit_size,
+        lease_seconds=lease_seconds,
+        skip_invalid_windows=skip_invalid_windows,
+        timeout=timeout,
+        evaluator_settings={
+            'commission': commission if commission is not None else DEFAULT_COMMISSION,
+            'default_commission': default_commission if default_commission is not None else DEFAULT_COMMISSION_FALLBACK,
+            'slippage': slippage if slippage is not None else _default_slippage(data_dict),
+            'use_slippage': use_slippage if use_slippage is not None else DEFAULT_USE_SLIPPAGE,
+            'initial_capital': initial_capital,
+            'trade_time_filter': trade_time_filter,
+            'engine': engine
+        }
+    )
+    if df.empty:
+        raise ValueError("Ни одна единица работы не дала успешных строк результатов")
+
+    df = df.sort_values('sharpe', ascending=False).reset_index(drop=True)
+    print(f"✅ РАСПРЕДЕЛЁННАЯ ОПТИМИЗАЦИЯ ЗАВЕРШЕНА: {len(df):,} успешных комбинаций")
+    print(f"   Лучший Sharpe: {df['sharpe'].max():.4f} | Медианный Sharpe: {df['sharpe'].median():.4f}")
+    return df
+
+
+def incremental_optimize_dual_momentum(
+    data_dict: Dict[str, pd.DataFrame],
+    market_data: pd.DataFrame,
+    rvi_data: Optional[pd.DataFrame] = None,
+    param_grid: Optional[Dict[str, List]] = None,
+    state_path: Optional[str] = None,
+    n_jobs: int = 1,
+    commission: Optional[float] = None,
+    default_commission: Optional[float] = None,
+    slippage: Optional[float] = None,
+    use_slippage: Optional[bool] = None,
+    initial_capital: float = 100_000,
+    trade_time_filter: Optional[str] = None,
+    skip_invalid_windows: bool = True
+) -> pd.DataFrame:
+    """
+    Полный перебор сетки с сохранением состояния симуляции каждой комбинации.
+
+    Первый вызов прогоняет всю историю; последующие вызовы с дополненными
+    данными продвигают комбинации только по новым торговым дням
+    (optimization/incremental.py). Комбинации, у которых новый бар переключил
+    рыночный фильтр, и все комбинации при изменении старой истории
+    пересчитываются целиком.
+
+    Аргументы:
+        state_path: файл состояния (по умолчанию data-optimization/incremental/<ключ>.npz)
+        n_jobs: процессов для продвижения комбинаций
+        остальные — как в optimize_dual_momentum
+
+    Возвращает:
+        pd.DataFrame: Отсортированный по Sharpe Ratio
+    """
+    from optimization.incremental import IncrementalOptimizer
+
+    if not data_dict:
+        raise ValueError("data_dict не может быть пустым")
+    if market_data is None or market_data.empty:
+        raise ValueError("market_data обязателен и не может быть пустым")
+    if param_grid is None:
+        param_grid = DEFAULT_PARAM_GRID
+
+    optimizer = IncrementalOptimizer(
+        param_grid,
+        state_path=state_path,
+        commission=commission if commission is not None else DEFAULT_COMMISSION,
+        default_commission=default_commission if default_commission is not None else DEFAULT_COMMISSION_FALLBACK,
+        slippage=slippage if slippage is not None else _default_slippage(data_dict),
+        use_slippage=use_slippage if use_slippage is not None else DEFAULT_USE_SLIPPAGE,
+        initial_capital=initial_capital,
+        trade_time_filter=trade_time_filter,
+        skip_invalid_windows=skip_invalid_windows,
+        n_jobs=n_jobs
+    )
+    df = optimizer.refresh(data_dict, market_data, rvi_data)
+    if df.empty:
+        raise ValueError("Нет допустимых комбинаций для инкрементальной оптимизации")
+    return df
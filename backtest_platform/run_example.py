@@ -3,6 +3,8 @@
 """
 Основной скрипт для запуска бэктеста с production-параметрами.
 Версия: 2.2.4 (прямой экспорт расширенного лога сделок из бэктестера)
+Версия: 2.3.0 (загрузка через datastore/catalog.py; рыночный индекс читается из своего файла)
+Версия: 2.4.0 (проскальзывание из профиля спреда MOEX при заданном spread_slippage_store)
 КРИТИЧЕСКОЕ УЛУЧШЕНИЕ:
 - Использует расширенные данные сделок напрямую из Backtester.run() версии 1.3.2+
 - Каждая сделка содержит: количество бумаг, цену исполнения, остаток наличных, стоимость позиции и общую стоимость портфеля
@@ -15,7 +17,7 @@ import pandas as pd
 from itertools import product
 from datetime import datetime
 
-__version__ = "2.2.4"
+__version__ = "2.4.0"
 __author__ = "Oleg Dev"
 __date__ = "2026-02-14"
 
@@ -25,13 +27,14 @@ if project_root not in sys.path:
 
 from core.backtester import Backtester
 from strategies.dual_momentum import DualMomentumStrategy
-from utils import load_market_data
+from datastore.catalog import get_catalog
+from datastore.spread_store import configured_slippage
 
 # 🔑 ИМПОРТ ИЗ МОДУЛЬНОЙ СИСТЕМЫ КОНФИГУРАЦИИ
 from config import (
     data_dir, tickers, market_ticker, rvi_ticker,
     commission, default_commission, slippage, use_slippage,
-    trading_start_time, time_filter_enabled, initial_capital,
+    initial_capital,
     production_params,
     param_grid,
     CRITICAL_WARNING_COMMON, CRITICAL_WARNING_PRODUCTION
@@ -156,30 +159,9 @@ def main():
     print(f"⚠️  {CRITICAL_WARNING_PRODUCTION}")
     
     # === ЗАГРУЗКА ДАННЫХ ===
-    data_path = os.path.join(project_root, data_dir)
-    data = {}
-    print("\n📥 ЗАГРУЗКА ДАННЫХ ИЗ CSV...")
-    for ticker in tickers:
-        file_path = os.path.join(data_path, f'{ticker}.csv')
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"❌ Файл не найден: {file_path}")
-        df = load_market_data(file_path)
-        if 'TRADEDATE' not in df.columns:
-            raise ValueError(f"❌ В {ticker}.csv отсутствует колонка TRADEDATE")
-        df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
-        data[ticker] = df
-        print(f"✅ {ticker}: {df['TRADEDATE'].min().date()} → {df['TRADEDATE'].max().date()} ({len(df)} строк)")
-
-    rvi_path = os.path.join(data_path, f'{rvi_ticker}.csv')
-    rvi_data = None
-    if os.path.exists(rvi_path):
-        rvi_data = load_market_data(rvi_path)
-        rvi_data['TRADEDATE'] = pd.to_datetime(rvi_data['TRADEDATE'])
-        print(f"✅ {rvi_ticker} загружен: {rvi_data['TRADEDATE'].min().date()} → {rvi_data['TRADEDATE'].max().date()}")
-    else:
-        print(f"⚠️ {rvi_ticker}.csv не найден — используется средний уровень волатильности")
-
-    market_df = data[market_ticker].copy()
+    catalog = get_catalog(data_dir, tickers, market_ticker, rvi_ticker)
+    data, market_df, rvi_data = catalog.as_tuple()
+    market_df = market_df.copy()
 
     # === ДИАГНОСТИКА ВОЛАТИЛЬНОСТИ ===
     from backtest_platform.indicators.volatility import rolling_volatility
@@ -195,8 +177,7 @@ def main():
     print(f"  ⚠️  Минимальное окно для стабильного расчёта: 5 дней")
 
     # === ФИЛЬТР ПО ВРЕМЕНИ ===
-    has_time = data[tickers[0]]['TRADEDATE'].iloc[0].time() != pd.Timestamp('00:00:00').time()
-    trade_time_filter = trading_start_time if has_time and time_filter_enabled else None
+    trade_time_filter = catalog.trade_time_filter()
     if trade_time_filter:
         print(f"⏳ Применён фильтр по времени: {trade_time_filter}")
     else:
@@ -239,10 +220,14 @@ def main():
     strategy_params = filter_strategy_params(production_params)
     strategy = DualMomentumStrategy(**strategy_params)
     
+    run_slippage = configured_slippage(slippage, tickers=list(data))
+    if isinstance(run_slippage, dict):
+        print("   Проскальзывание из профиля спреда, bps: "
+              + ', '.join(f"{ticker} {value}" for ticker, value in run_slippage.items()))
     bt = Backtester(
         commission=commission,
         default_commission=default_commission,
-        slippage=slippage,
+        slippage=run_slippage,
         use_slippage=use_slippage,
         trade_time_filter=trade_time_filter
     )
@@ -3,15 +3,22 @@
 """
 Скрипт для пошаговой оптимизации параметров стратегии Dual Momentum.
 Версия: 1.3.0 (интеграция модульной конфигурации + улучшенная диагностика)
+Версия: 1.4.0 (персистентный кэш результатов в config.cache_dir)
+Версия: 1.5.0 (потоковая запись результатов шага с возобновлением после сбоя)
+Версия: 1.6.0 (подсчёт комбинаций через ParamGrid без материализации сетки)
+Версия: 1.7.0 (события прогресса и сводка скорости шага в JSON Lines)
+Версия: 1.8.0 (расчёт шага на долгоживущем сервисе optimization/daemon.py)
+Версия: 1.9.0 (устойчивые комбинации шага по плато параметров, optimization/plateau.py)
+Версия: 1.10.0 (загрузка данных через общий каталог datastore/catalog.py)
 """
 
 import os
 import sys
 import pandas as pd
 
-__version__ = "1.3.0"
+__version__ = "1.10.0"
 __author__ = "Oleg Dev"
-__date__ = "2026-02-13"
+__date__ = "2026-10-19"
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
@@ -19,55 +26,28 @@ if project_root not in sys.path:
 
 from core.backtester import Backtester
 from strategies.dual_momentum import DualMomentumStrategy
-from optimizer import optimize_dual_momentum
-from utils import load_market_data
+from optimizer import optimize_dual_momentum, build_param_grid
+from optimization.result_cache import ResultCache
+from optimization.result_writer import ResultWriter
+from optimization.instrumentation import RunMonitor
+from optimization.daemon import OptimizationClient
+from optimization.plateau import find_parameter_plateaus
+from datastore.catalog import get_catalog
 
 # 🔑 ИМПОРТ ИЗ МОДУЛЬНОЙ СИСТЕМЫ КОНФИГУРАЦИИ
 from config import (
-    data_dir, tickers, market_ticker, rvi_ticker,
+    data_dir, cache_dir, result_cache_max_mb,
+    tickers, market_ticker, rvi_ticker,
     commission, initial_capital,
     trading_start_time, time_filter_enabled,
-    production_params,
+    production_params, optimization_settings,
     CRITICAL_WARNING_COMMON, CRITICAL_WARNING_STRATEGY
 )
 
 
 def load_all_data():
-    """Загрузка рыночных данных из CSV-файлов."""
-    data_path = os.path.join(project_root, data_dir)
-    data = {}
-    print("\n📥 ЗАГРУЗКА ДАННЫХ ИЗ CSV...")
-    for ticker in tickers:
-        file_path = os.path.join(data_path, f'{ticker}.csv')
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"❌ Файл не найден: {file_path}")
-        df = load_market_data(file_path)
-        if 'TRADEDATE' not in df.columns:
-            raise ValueError(f"❌ В {ticker}.csv отсутствует колонка TRADEDATE")
-        df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
-        data[ticker] = df
-        print(f"✅ {ticker}: {df['TRADEDATE'].min().date()} → {df['TRADEDATE'].max().date()} ({len(df)} строк)")
-
-    # 🔧 ИСПРАВЛЕНИЕ: Загрузка market_df отдельно (как RVI), а не из data[tickers]
-    market_path = os.path.join(data_path, f'{market_ticker}.csv')
-    market_df = None
-    if os.path.exists(market_path):
-        market_df = load_market_data(market_path)
-        market_df['TRADEDATE'] = pd.to_datetime(market_df['TRADEDATE'])
-        print(f"✅ {market_ticker} загружен: {market_df['TRADEDATE'].min().date()} → {market_df['TRADEDATE'].max().date()} ({len(market_df)} строк)")
-    else:
-        raise FileNotFoundError(f"❌ Файл рыночного индекса не найден: {market_path}")
-
-    rvi_path = os.path.join(data_path, f'{rvi_ticker}.csv')
-    rvi_data = None
-    if os.path.exists(rvi_path):
-        rvi_data = load_market_data(rvi_path)
-        rvi_data['TRADEDATE'] = pd.to_datetime(rvi_data['TRADEDATE'])
-        print(f"✅ {rvi_ticker} загружен: {rvi_data['TRADEDATE'].min().date()} → {rvi_data['TRADEDATE'].max().date()}")
-    else:
-        print(f"⚠️ {rvi_ticker}.csv не найден — используется средний уровень волатильности для рыночного фильтра")
-
-    return data, market_df, rvi_data
+    """Загрузка рыночных данных из CSV-файлов (единый каталог datastore/catalog.py)."""
+    return get_catalog(data_dir, tickers, market_ticker, rvi_ticker).as_tuple()
 
 
 def run_stepwise_optimization(temp_param_grid, step_name):
@@ -82,9 +62,9 @@ def run_stepwise_optimization(temp_param_grid, step_name):
         dict: Лучшие параметры по метрике Sharpe Ratio
     """
     print(f"\n🚀 ЗАПУСК ПОШАГОВОЙ ОПТИМИЗАЦИИ: {step_name}")
-    from itertools import product
-    total_combinations = len(list(product(*temp_param_grid.values())))
-    print(f"   ⚙️  Количество комбинаций для тестирования: {total_combinations:,}")
+    grid = build_param_grid(temp_param_grid)
+    print(f"   ⚙️  Количество комбинаций для тестирования: {len(grid):,} "
+          f"(всего в сетке: {grid.total:,})")
     
     # Валидация критического правила: разделение окон волатильности
     if 'base_vol_window' in temp_param_grid and 'market_vol_window' in temp_param_grid:
@@ -95,6 +75,13 @@ def run_stepwise_optimization(temp_param_grid, step_name):
             print(f"   Мин. base_vol_window={min_base} ≥ Макс. market_vol_window={max_market}")
             print(f"   Рекомендуется: base_vol_window < market_vol_window (мин. разрыв 5 дней)")
 
+    # 🔥 Запущенный сервис оптимизации держит данные и признаки в памяти — шаг начинается сразу
+    if optimization_settings.get('use_daemon'):
+        client = OptimizationClient(port=optimization_settings.get('daemon_port', 8765))
+        if client.ping():
+            return run_step_on_daemon(client, temp_param_grid, step_name)
+        print(f"   ⚠️  Сервис оптимизации не отвечает на порту {client.port} — локальный расчёт")
+
     data, market_df, rvi_data = load_all_data()
 
     has_time = data[tickers[0]]['TRADEDATE'].iloc[0].time() != pd.Timestamp('00:00:00').time()
@@ -104,6 +91,20 @@ def run_stepwise_optimization(temp_param_grid, step_name):
     else:
         print(f"   📅 Данные дневные — фильтр по времени отключён")
 
+    # 💾 Кэш результатов: комбинации, оценённые на предыдущих шагах, не пересчитываются
+    result_cache = ResultCache(os.path.join(project_root, cache_dir), max_size_mb=result_cache_max_mb)
+
+    # 💽 Строки шага пишутся на диск пакетами; после сбоя шаг продолжается с места остановки
+    output_dir = os.path.join(project_root, "data-optimization")
+    step_slug = step_name.lower().replace(' ', '_')
+    result_writer = ResultWriter(os.path.join(output_dir, f"optimization_results_{step_slug}.parts"))
+
+    # ⏱️ Скорость, ETA и время фаз шага — в консоль и в JSON Lines рядом с результатами
+    monitor = RunMonitor(
+        report_every=optimization_settings.get('progress_report_seconds', 30),
+        jsonl_path=os.path.join(output_dir, f"optimization_events_{step_slug}.jsonl")
+    )
+
     try:
         results_df = optimize_dual_momentum(
             data_dict=data,
@@ -112,81 +113,131 @@ def run_stepwise_optimization(temp_param_grid, step_name):
             param_grid=temp_param_grid,
             commission=commission,
             initial_capital=initial_capital,
-            trade_time_filter=trade_time_filter
+            trade_time_filter=trade_time_filter,
+            result_cache=result_cache,
+            result_writer=result_writer,
+            monitor=monitor
         )
 
-        # 🔑 ДИАГНОСТИКА: Проверка влияния критических параметров
-        print(f"\n🔍 ДИАГНОСТИКА ВЛИЯНИЯ ПАРАМЕТРОВ:")
-        
-        # Проверка влияния market_vol_window
-        if 'market_vol_window' in results_df.columns and len(results_df) > 1:
-            unique_windows = results_df['market_vol_window'].nunique()
-            if unique_windows > 1:
-                # Группируем по комбинации других параметров
-                group_cols = [col for col in results_df.columns 
-                            if col not in ['market_vol_window', 'cagr', 'sharpe', 'max_drawdown', 'final_value', 'total_trades']]
-                if group_cols:
-                    grouped = results_df.groupby(group_cols)['sharpe'].nunique()
-                    if (grouped > 1).any():
-                        print(f"✅ Параметр market_vol_window ВЛИЯЕТ на результаты (различия в Sharpe для одинаковых комбинаций)")
-                    else:
-                        print(f"⚠️  Внимание: для всех комбинаций других параметров Sharpe одинаков при разных market_vol_window.")
-                        print(f"   Возможно, рыночный фильтр не срабатывает в вашем периоде данных или пороги завышены.")
+        return report_step_results(results_df, step_name, output_dir)
+
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА ПРИ ОПТИМИЗАЦИИ: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def report_step_results(results_df, step_name, output_dir):
+    """
+    Диагностика, топ-5, сохранение CSV и лучшие параметры шага.
+
+    Returns:
+        dict: Лучшие параметры по метрике Sharpe Ratio (без метрик производительности)
+    """
+    step_slug = step_name.lower().replace(' ', '_')
+
+    # 🔑 ДИАГНОСТИКА: Проверка влияния критических параметров
+    print(f"\n🔍 ДИАГНОСТИКА ВЛИЯНИЯ ПАРАМЕТРОВ:")
+
+    # Проверка влияния market_vol_window
+    if 'market_vol_window' in results_df.columns and len(results_df) > 1:
+        unique_windows = results_df['market_vol_window'].nunique()
+        if unique_windows > 1:
+            # Группируем по комбинации других параметров
+            group_cols = [col for col in results_df.columns 
+                        if col not in ['market_vol_window', 'cagr', 'sharpe', 'max_drawdown', 'final_value', 'total_trades']]
+            if group_cols:
+                grouped = results_df.groupby(group_cols)['sharpe'].nunique()
+                if (grouped > 1).any():
+                    print(f"✅ Параметр market_vol_window ВЛИЯЕТ на результаты (различия в Sharpe для одинаковых комбинаций)")
                 else:
-                    print(f"ℹ️  Недостаточно параметров для группировки — пропуск анализа влияния")
+                    print(f"⚠️  Внимание: для всех комбинаций других параметров Sharpe одинаков при разных market_vol_window.")
+                    print(f"   Возможно, рыночный фильтр не срабатывает в вашем периоде данных или пороги завышены.")
             else:
-                print(f"ℹ️  Тестирование проводилось с фиксированным market_vol_window={results_df['market_vol_window'].iloc[0]}")
-
-        # Анализ распределения лучших результатов по активам
-        if 'selected_ticker' in results_df.columns:
-            top_20 = results_df.nlargest(int(len(results_df) * 0.2), 'sharpe')
-            asset_distribution = top_20['selected_ticker'].value_counts(normalize=True) * 100
-            print(f"\n📊 Распределение лучших 20% комбинаций по активам:")
-            for asset, pct in asset_distribution.items():
-                bar = '█' * int(pct / 5)
-                print(f"   {asset:6s}: {pct:5.1f}% {bar}")
-
-        # Вывод топ-5 результатов
-        top_results = results_df.sort_values('sharpe', ascending=False).head(5)
-        print(f"\n🏆 ТОП-5 РЕЗУЛЬТАТОВ для '{step_name}':")
-        display_cols = ['base_lookback', 'base_vol_window', 'market_vol_window', 
-                       'market_vol_threshold', 'max_vol_threshold',
-                       'cagr', 'sharpe', 'max_drawdown', 'total_trades']
-        display_cols = [c for c in display_cols if c in top_results.columns]
-        
-        # Форматирование вывода для лучшей читаемости
-        formatted = top_results[display_cols].copy()
-        if 'cagr' in formatted.columns:
-            formatted['cagr'] = formatted['cagr'].apply(lambda x: f"{x:.2%}")
-        if 'max_drawdown' in formatted.columns:
-            formatted['max_drawdown'] = formatted['max_drawdown'].apply(lambda x: f"{x:.2%}")
-        if 'market_vol_threshold' in formatted.columns:
-            formatted['market_vol_threshold'] = formatted['market_vol_threshold'].apply(lambda x: f"{x:.1%}")
-        if 'max_vol_threshold' in formatted.columns:
-            formatted['max_vol_threshold'] = formatted['max_vol_threshold'].apply(lambda x: f"{x:.1%}")
-        
-        print(formatted.to_string(index=False))
-
-        # Сохранение результатов
-        output_dir = os.path.join(project_root, "data-optimization")
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"optimization_results_{step_name.lower().replace(' ', '_')}.csv")
-        results_df.to_csv(output_file, index=False)
-        print(f"\n✅ Результаты сохранены: '{output_file}'")
-        print(f"   Всего записей: {len(results_df):,}")
-
-        # Извлечение лучших параметров (без метрик производительности)
-        best_params = top_results.iloc[0].to_dict()
-        metrics_to_remove = [
-            'final_value', 'cagr', 'sharpe', 'max_drawdown', 'total_trades',
-            'calmar', 'sortino', 'volatility', 'win_rate', 'profit_factor',
-            'used_market_vol_window', 'selected_ticker', 'entry_dates', 'exit_dates'
-        ]
-        for metric in metrics_to_remove:
-            best_params.pop(metric, None)
-        
-        return best_params
+                print(f"ℹ️  Недостаточно параметров для группировки — пропуск анализа влияния")
+        else:
+            print(f"ℹ️  Тестирование проводилось с фиксированным market_vol_window={results_df['market_vol_window'].iloc[0]}")
+
+    # Анализ распределения лучших результатов по активам
+    if 'selected_ticker' in results_df.columns:
+        top_20 = results_df.nlargest(int(len(results_df) * 0.2), 'sharpe')
+        asset_distribution = top_20['selected_ticker'].value_counts(normalize=True) * 100
+        print(f"\n📊 Распределение лучших 20% комбинаций по активам:")
+        for asset, pct in asset_distribution.items():
+            bar = '█' * int(pct / 5)
+            print(f"   {asset:6s}: {pct:5.1f}% {bar}")
+
+    # Вывод топ-5 результатов
+    top_results = results_df.sort_values('sharpe', ascending=False).head(5)
+    print(f"\n🏆 ТОП-5 РЕЗУЛЬТАТОВ для '{step_name}':")
+    display_cols = ['base_lookback', 'base_vol_window', 'market_vol_window', 
+                   'market_vol_threshold', 'max_vol_threshold',
+                   'cagr', 'sharpe', 'max_drawdown', 'total_trades']
+    display_cols = [c for c in display_cols if c in top_results.columns]
+
+    # Форматирование вывода для лучшей читаемости
+    formatted = top_results[display_cols].copy()
+    if 'cagr' in formatted.columns:
+        formatted['cagr'] = formatted['cagr'].apply(lambda x: f"{x:.2%}")
+    if 'max_drawdown' in formatted.columns:
+        formatted['max_drawdown'] = formatted['max_drawdown'].apply(lambda x: f"{x:.2%}")
+    if 'market_vol_threshold' in formatted.columns:
+        formatted['market_vol_threshold'] = formatted['market_vol_threshold'].apply(lambda x: f"{x:.1%}")
+    if 'max_vol_threshold' in formatted.columns:
+        formatted['max_vol_threshold'] = formatted['max_vol_threshold'].apply(lambda x: f"{x:.1%}")
 
+    print(formatted.to_string(index=False))
+
+    # Устойчивые комбинации: Sharpe, сглаженный по соседним значениям параметров
+    if len(results_df) > 1:
+        try:
+            plateaus = find_parameter_plateaus(results_df, objective='sharpe')
+        except ValueError as e:
+            print(f"ℹ️  Анализ плато пропущен: {e}")
+        else:
+            plateau_cols = [c for c in display_cols if c in plateaus.columns and c not in ('cagr', 'max_drawdown')]
+            plateau_cols += ['plateau_mean', 'plateau_min', 'plateau_score']
+            print(f"\n🏔️  ТОП-5 УСТОЙЧИВЫХ КОМБИНАЦИЙ (среднее Sharpe окрестности − разброс):")
+            print(plateaus[plateau_cols].head(5).round(4).to_string(index=False))
+
+    # Сохранение результатов
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"optimization_results_{step_slug}.csv")
+    results_df.to_csv(output_file, index=False)
+    print(f"\n✅ Результаты сохранены: '{output_file}'")
+    print(f"   Всего записей: {len(results_df):,}")
+
+    # Извлечение лучших параметров (без метрик производительности)
+    best_params = top_results.iloc[0].to_dict()
+    metrics_to_remove = [
+        'final_value', 'cagr', 'sharpe', 'max_drawdown', 'total_trades',
+        'calmar', 'sortino', 'volatility', 'win_rate', 'profit_factor',
+        'used_market_vol_window', 'selected_ticker', 'entry_dates', 'exit_dates'
+    ]
+    for metric in metrics_to_remove:
+        best_params.pop(metric, None)
+
+    return best_params
+
+
+def run_step_on_daemon(client, temp_param_grid, step_name):
+    """Расчёт шага на сервисе оптимизации (python -m optimization.daemon serve)."""
+    print(f"   🔥 Расчёт на сервисе оптимизации {client.host}:{client.port}")
+    output_dir = os.path.join(project_root, "data-optimization")
+    try:
+        results_df = client.run_grid(
+            temp_param_grid,
+            on_rows=lambda done, total, rows: print(f"   📦 {done:,}/{total:,}", flush=True)
+        )
+        job = results_df.attrs['job']
+        print(f"   ⏱️  Сервис: {job['total']:,} комбинаций за {job['seconds']:.2f} с "
+              f"(бэктестов {job['runs']:,}, из памяти {job['reused']:,}, ошибок {job['errors']:,})")
+        for sample in job['error_samples']:
+            print(f"   ⚠️  {sample}")
+        if results_df.empty:
+            raise ValueError("Ни одна комбинация параметров не прошла бэктест успешно")
+        return report_step_results(results_df, step_name, output_dir)
     except Exception as e:
         print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА ПРИ ОПТИМИЗАЦИИ: {e}")
         import traceback
@@ -269,5 +320,7 @@ if __name__ == "__main__":
     print("="*70)
     print("1. Для поиска НОВЫХ оптимумов используйте расширенные сетки в optimization_cfg.py")
     print("2. Запустите валидацию на невидимом периоде (последние 6 месяцев данных)")
-    print("3. Проверьте устойчивость параметров через walk-forward анализ")
-    print("4. Перед продакшеном протестируйте на демо-счёте минимум 3 месяца")
\ No newline at end of file
+    print("3. Проверьте устойчивость параметров через walk-forward анализ (optimizer.walk_forward_dual_momentum)")
+    print("4. Полная калибровка шагов 1-4 без правки файла: python -m optimization.pipeline "
+          "(шаги — config.calibration_pipeline)")
+    print("5. Перед продакшеном протестируйте на демо-счёте минимум 3 месяца")
\ No newline at end of file
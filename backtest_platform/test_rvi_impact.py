@@ -12,20 +12,14 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from strategies.dual_momentum import DualMomentumStrategy
-from utils import load_market_data
-import optimization_config as cfg
+from datastore.catalog import get_catalog
+import config as cfg
 
 # Загрузка данных
-data_dir = os.path.join(project_root, cfg.data_dir)
-data = {}
-for ticker in cfg.tickers:
-    df = load_market_data(os.path.join(data_dir, f'{ticker}.csv'))
-    df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
-    data[ticker] = df
-
-market_df = data[cfg.market_ticker].copy()
-rvi_data = load_market_data(os.path.join(data_dir, f'{cfg.rvi_ticker}.csv'))
-rvi_data['TRADEDATE'] = pd.to_datetime(rvi_data['TRADEDATE'])
+data, market_df, rvi_data = get_catalog(cfg.data_dir, cfg.tickers, cfg.market_ticker, cfg.rvi_ticker).as_tuple()
+if rvi_data is None:
+    raise FileNotFoundError(f"{cfg.rvi_ticker}.csv обязателен для этого теста!")
+market_df = market_df.copy()
 
 # 🔑 НАХОДИМ ДАТУ С НИЗКИМ RVI (<18)
 rvi_low_days = rvi_data[rvi_data['CLOSE'] < 18]
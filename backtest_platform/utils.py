@@ -1,8 +1,14 @@
 # first_project\backtest_platform\utils.py
 
+import functools
+from typing import Optional, Sequence
+
+import numpy as np
 import pandas as pd
 
-def load_market_data(path: str) -> pd.DataFrame:
+
+def parse_market_csv(path: str) -> pd.DataFrame:
+    """Разбор CSV рыночных данных: TRADEDATE → datetime, строки с пропусками удаляются."""
     df = pd.read_csv(path)
     if 'TRADEDATE' in df.columns:
         df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
@@ -11,3 +17,38 @@ def load_market_data(path: str) -> pd.DataFrame:
     df = df.dropna()
     
     return df
+
+
+def load_market_data(
+    path: str,
+    use_cache: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    price_dtype: str = 'float64',
+    epoch_dates: bool = False,
+    chunksize: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Загрузка CSV рыночных данных.
+
+    Без columns — parse_market_csv: все колонки с выводом типов, строки с
+    пропусками удаляются. С columns — типизированное чтение только указанных
+    колонок (datastore/ingest.py: цены price_dtype, даты datetime64[ns] или
+    int64 при epoch_dates, пропуски проверяются лишь в TRADEDATE и CLOSE;
+    chunksize — чтение больших файлов частями).
+
+    При use_cache результат разбора сохраняется в бинарный кэш
+    (datastore/binary_cache.py, cache/market_data в корне проекта); повторные
+    загрузки неизменённого файла читают колонки через memory map и совпадают
+    с разбором CSV бит в бит. У выросшего файла разбираются только дописанные строки.
+    """
+    if columns is None:
+        parser, variant = parse_market_csv, ''
+    else:
+        from datastore.ingest import read_market_csv
+        parser = functools.partial(read_market_csv, columns=tuple(columns), price_dtype=price_dtype,
+                                   epoch_dates=epoch_dates, chunksize=chunksize)
+        variant = f"typed:{','.join(columns)}:{np.dtype(price_dtype).str}:{'epoch' if epoch_dates else 'datetime'}"
+    if not use_cache:
+        return parser(path)
+    from datastore.binary_cache import default_cache
+    return default_cache().load(path, parser, variant)
@@ -0,0 +1,50 @@
+# backtest_platform/validation/test11/test11_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 11: быстрый движок против Backtester
+Проверяет, что FastBacktester (optimization/fast_backtester.py) даёт те же
+метрики, что Backtester.run() + DualMomentumStrategy, во всех режимах стратегии
+"""
+
+data_dir = 'data-validation/test11'
+
+seed = 11
+n_dates = 320
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {'OBLG': [5, 50, 51]}   # пропуски торгов — календарь не совпадает у активов
+
+# Издержки: комиссия и проскальзывание в тех же единицах, что в Backtester
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
+
+# Режимы стратегии: базовый, bare, фильтр тренда, рыночный фильтр, без адаптации RVI
+param_cases = [
+    {'base_lookback': 20, 'base_vol_window': 10, 'market_vol_window': 40, 'market_vol_threshold': 0.6},
+    {'base_lookback': 10, 'base_vol_window': 5, 'market_vol_window': 40, 'market_vol_threshold': 0.6,
+     'bare_mode': True},
+    {'base_lookback': 40, 'base_vol_window': 10, 'market_vol_window': 40, 'market_vol_threshold': 0.6,
+     'use_trend_filter': True, 'trend_window': 60},
+    {'base_lookback': 20, 'base_vol_window': 5, 'market_vol_window': 40, 'market_vol_threshold': 0.6,
+     'use_trend_filter': True, 'trend_window': 500, 'trend_filter_on_insufficient_data': 'block'},
+    {'base_lookback': 20, 'base_vol_window': 10, 'market_vol_window': 21, 'market_vol_threshold': 0.15},
+    {'base_lookback': 80, 'base_vol_window': 30, 'market_vol_window': 60, 'market_vol_threshold': 0.6,
+     'max_vol_threshold': 0.15},
+    {'base_lookback': 20, 'base_vol_window': 10, 'market_vol_window': 40, 'market_vol_threshold': 0.6,
+     'use_rvi_adaptation': False},
+    {'base_lookback': 5, 'base_vol_window': 3, 'market_vol_window': 21, 'market_vol_threshold': 0.6,
+     'rvi_low_threshold': 22, 'rvi_medium_threshold': 30, 'rvi_high_exit_threshold': 35}
+]
+
+# Сравниваемые метрики и допустимое относительное расхождение (порядок операций одинаков)
+compared_metrics = ['total_trades', 'final_value', 'cagr', 'sharpe', 'max_drawdown',
+                    'used_market_vol_window', 'rvi_low_days']
+rtol = 1e-9
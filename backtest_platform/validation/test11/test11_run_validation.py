@@ -0,0 +1,101 @@
+# backtest_platform/validation/test11/test11_run_validation.py
+
+import os
+import sys
+
+import numpy as np
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test11_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def same_value(expected, actual, rtol):
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    if isinstance(expected, float) and np.isnan(expected):
+        return isinstance(actual, float) and np.isnan(actual)
+    return bool(np.isclose(actual, expected, rtol=rtol, atol=0.0))
+
+
+def validate_case(case_name, params, slow, fast, cfg):
+    """Сравнивает метрики Backtester и FastBacktester для одной комбинации"""
+    diffs = [(metric, slow[metric], fast[metric]) for metric in cfg.compared_metrics
+             if not same_value(slow[metric], fast[metric], cfg.rtol)]
+    print(f"  {case_name}: Sharpe {slow['sharpe']:.4f}, сделок {slow['total_trades']}")
+    assert not diffs, f"❌ {case_name} {params}: расхождение метрик {diffs}"
+
+
+def main():
+    project_root = setup_paths()
+
+    import test11_optimization_config_validation as cfg
+    from core.backtester import Backtester
+    from strategies.dual_momentum import DualMomentumStrategy
+    from optimization.features import FeatureCache
+    from optimization.fast_backtester import FastBacktester
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 11: FastBacktester совпадает с Backtester.run()")
+    print("=" * 70)
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+
+    for with_rvi in (True, False):
+        rvi = rvi_data if with_rvi else None
+        print(f"\n[{'С RVI' if with_rvi else 'Без RVI'}] {len(cfg.param_cases)} комбинаций")
+        engine = FastBacktester(FeatureCache(data, market_df, rvi), **cfg.costs)
+        for number, params in enumerate(cfg.param_cases, 1):
+            slow = Backtester(**cfg.costs).run(DualMomentumStrategy(**params), data,
+                                               market_data=market_df, rvi_data=rvi)
+            fast = engine.run(params)
+            validate_case(f"Случай {number}", params, slow, fast, cfg)
+        print("  ✅ Пройден")
+
+    # Общая память выбора актива не должна менять результат повторного прогона
+    engine = FastBacktester(FeatureCache(data, market_df, rvi_data), **cfg.costs)
+    first = [engine.run(params)['final_value'] for params in cfg.param_cases]
+    second = [engine.run(params)['final_value'] for params in cfg.param_cases]
+    assert first == second, "❌ Повторный прогон с памятью выбора актива дал другой результат"
+    assert engine.selection_stats()['hits'] > 0, "❌ Память выбора актива не использовалась"
+    print(f"\n[Память выбора актива] {engine.selection_stats()} — ✅ результат не меняется")
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 11 ПРОЙДЕН УСПЕШНО: быстрый движок эквивалентен Backtester")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 11 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
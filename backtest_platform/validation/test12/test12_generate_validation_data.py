@@ -0,0 +1,40 @@
+# backtest_platform/validation/test12/test12_generate_validation_data.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def main():
+    _config_path = os.path.dirname(__file__)
+    if _config_path not in sys.path:
+        sys.path.insert(0, _config_path)
+
+    import test12_optimization_config_validation as cfg
+
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    output_dir = os.path.join(project_root, cfg.data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Генерация полного ряда {cfg.ticker} для теста 12...")
+    rng = np.random.default_rng(cfg.seed)
+    dates = pd.bdate_range(cfg.start_date, periods=cfg.n_dates)
+    close = 2.5 * np.cumprod(1 + rng.normal(0.0005, 0.012, cfg.n_dates))
+    df = pd.DataFrame({
+        'TRADEDATE': dates.strftime('%Y-%m-%d'),
+        'OPEN': close,
+        'HIGH': close * 1.01,
+        'LOW': close * 0.99,
+        'CLOSE': close,
+        'VOLUME': rng.integers(1000, 10000, cfg.n_dates)
+    })
+    path = os.path.join(output_dir, f"{cfg.ticker}_full.csv")
+    df.to_csv(path, index=False)
+    print(f"  ✅ {os.path.basename(path)}: {len(df)} строк")
+    print(f"\n✅ Данные теста 12 сохранены в {output_dir}")
+
+
+if __name__ == '__main__':
+    main()
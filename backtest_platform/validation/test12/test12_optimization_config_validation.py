@@ -0,0 +1,19 @@
+# backtest_platform/validation/test12/test12_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 12: бинарный кэш и хранилище цен
+Проверяет циклы «разбор → попадание → дописывание → исправление истории» для
+datastore/binary_cache.py и PriceStore.sync_csv (datastore/price_store.py)
+"""
+
+data_dir = 'data-validation/test12'
+
+seed = 12
+n_dates = 260
+start_date = '2022-01-03'
+ticker = 'GOLD'
+
+initial_rows = 200          # строк в исходном файле
+appended_rows = [1, 40]     # последующие дописывания (ежедневное и пакетное)
+corrected_row = 10          # строка истории, в которой «биржа» исправляет CLOSE
+corrected_close = 999.0
@@ -0,0 +1,180 @@
+# backtest_platform/validation/test12/test12_run_validation.py
+
+import os
+import shutil
+import sys
+
+import numpy as np
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули datastore импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def write_lines(path, lines):
+    """Перезапись источника; mtime гарантированно меняется даже на грубых файловых системах"""
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(lines)
+    if previous is not None and os.stat(path).st_mtime_ns == previous:
+        os.utime(path, ns=(previous + 1_000_000, previous + 1_000_000))
+
+
+def check_cache(cache, path, expected_status, case_name):
+    """Результат кэша совпадает с разбором CSV, статус — ожидаемый"""
+    from utils import parse_market_csv
+
+    df, status = cache.update(path, parse_market_csv)
+    print(f"  {case_name}: статус '{status}', строк {len(df)}")
+    assert status == expected_status, f"❌ {case_name}: ожидался статус '{expected_status}', получен '{status}'"
+    expected = parse_market_csv(path)
+    assert list(df.columns) == list(expected.columns) and list(df.dtypes) == list(expected.dtypes), \
+        f"❌ {case_name}: колонки или типы отличаются от разбора CSV"
+    for column in expected.columns:
+        assert np.array_equal(np.asarray(df[column]), np.asarray(expected[column])), \
+            f"❌ {case_name}: колонка {column} отличается от разбора CSV"
+    return df
+
+
+def check_store(store, ticker, path, expected_written, case_name):
+    """sync_csv записывает ожидаемое число строк, ряд хранилища совпадает с CSV"""
+    from utils import parse_market_csv
+
+    written = store.sync_csv(ticker, path)
+    print(f"  {case_name}: записано строк {written}")
+    assert written == expected_written, f"❌ {case_name}: ожидалось {expected_written} строк, записано {written}"
+    source = parse_market_csv(path)
+    frame = PriceStoreView(store).frame(ticker)
+    assert np.array_equal(frame['TRADEDATE'].to_numpy(), source['TRADEDATE'].to_numpy(dtype='datetime64[ns]')), \
+        f"❌ {case_name}: даты хранилища не совпадают с CSV"
+    assert np.allclose(frame['CLOSE'].to_numpy(), source['CLOSE'].to_numpy()), \
+        f"❌ {case_name}: цены хранилища не совпадают с CSV"
+
+
+class PriceStoreView:
+    """Независимый читатель хранилища (как бэктест в другом процессе)"""
+
+    def __init__(self, store):
+        from datastore.price_store import PriceStore
+        self.reader = PriceStore(store.path)
+
+    def frame(self, ticker):
+        return self.reader.frame(ticker).dropna(subset=['CLOSE']).reset_index(drop=True)
+
+
+def data_files(entry_dir):
+    return sorted(name for name in os.listdir(entry_dir) if name.startswith('columns'))
+
+
+def main():
+    project_root = setup_paths()
+
+    import test12_optimization_config_validation as cfg
+    from datastore.binary_cache import BinaryFrameCache
+    from datastore.price_store import PriceStore
+    from utils import parse_market_csv
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 12: бинарный кэш и хранилище цен — разбор, попадание, дописывание")
+    print("=" * 70)
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    full_path = os.path.join(case_dir, f"{cfg.ticker}_full.csv")
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(f"❌ Файл не найден: {full_path} (запустите test12_generate_validation_data.py)")
+    work_dir = os.path.join(case_dir, 'work')
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+
+    with open(full_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    header, rows = lines[:1], lines[1:]
+    source = os.path.join(work_dir, f"{cfg.ticker}.csv")
+    n_rows = cfg.initial_rows
+    write_lines(source, header + rows[:n_rows])
+
+    # === БИНАРНЫЙ КЭШ ===
+    print("\n[Бинарный кэш]")
+    cache = BinaryFrameCache(os.path.join(work_dir, 'cache'))
+    check_cache(cache, source, 'parse', "Первая загрузка")
+    check_cache(cache, source, 'hit', "Повторная загрузка")
+    for count in cfg.appended_rows:
+        write_lines(source, header + rows[:n_rows + count])
+        n_rows += count
+        check_cache(cache, source, 'append', f"Дописано {count} строк")
+        check_cache(cache, source, 'hit', "Загрузка после дописывания")
+
+    corrected = rows[:n_rows]
+    fields = corrected[cfg.corrected_row].rstrip('\n').split(',')
+    fields[header[0].rstrip('\n').split(',').index('CLOSE')] = str(cfg.corrected_close)
+    corrected[cfg.corrected_row] = ','.join(fields) + '\n'
+    write_lines(source, header + corrected)
+    df = check_cache(cache, source, 'parse', "Исправление истории")
+    assert df['CLOSE'].iloc[cfg.corrected_row] == cfg.corrected_close, "❌ Исправленное значение не прочитано"
+
+    entries = [os.path.join(cache.cache_dir, name) for name in os.listdir(cache.cache_dir)
+               if os.path.isdir(os.path.join(cache.cache_dir, name))]
+    assert len(entries) == 1, f"❌ Ожидалась одна запись кэша, найдено {len(entries)}"
+    assert len(data_files(entries[0])) == 1, \
+        f"❌ Прежние файлы данных записи не удалены: {data_files(entries[0])}"
+    print("  ✅ Пройден (файлы прежних версий записи удалены)")
+
+    # === ХРАНИЛИЩЕ ЦЕН ===
+    print("\n[Хранилище цен: sync_csv по отпечатку источника]")
+    n_rows = cfg.initial_rows
+    write_lines(source, header + rows[:n_rows])
+    store_cache = BinaryFrameCache(os.path.join(work_dir, 'store-cache'))
+    store = PriceStore.create(os.path.join(work_dir, 'store'), ticker_capacity=1)
+    written = store.sync_csv(cfg.ticker, source, cache=store_cache)
+    assert written == n_rows, f"❌ Первая синхронизация: ожидалось {n_rows} строк, записано {written}"
+    check_store(store, cfg.ticker, source, 0, "Источник не менялся")
+
+    for count in cfg.appended_rows:
+        write_lines(source, header + rows[:n_rows + count])
+        n_rows += count
+        # Другой загрузчик обновил общий кэш раньше хранилища — решение не должно от этого зависеть
+        store_cache.update(source, parse_market_csv)
+        check_store(store, cfg.ticker, source, count, f"Дописано {count} строк")
+
+    corrected = rows[:n_rows]
+    fields = corrected[cfg.corrected_row].rstrip('\n').split(',')
+    fields[header[0].rstrip('\n').split(',').index('CLOSE')] = str(cfg.corrected_close)
+    corrected[cfg.corrected_row] = ','.join(fields) + '\n'
+    write_lines(source, header + corrected)
+    store_cache.update(source, parse_market_csv)
+    check_store(store, cfg.ticker, source, n_rows, "Исправление истории")
+    value = PriceStoreView(store).frame(cfg.ticker)['CLOSE'].iloc[cfg.corrected_row]
+    assert value == cfg.corrected_close, f"❌ Исправление истории не попало в хранилище: {value}"
+
+    # Новый тикер сверх ёмкости — перестройка в новые файлы, прежние удаляются
+    second = os.path.join(work_dir, 'SECOND.csv')
+    write_lines(second, header + rows)
+    check_store(store, 'SECOND', second, len(rows), "Новый тикер (перестройка хранилища)")
+    price_files = [name for name in os.listdir(store.path) if name.startswith('prices')]
+    assert store.ticker_capacity >= 2 and len(price_files) == 1, \
+        f"❌ После перестройки ожидался один файл цен: {price_files}"
+    print("  ✅ Пройден")
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 12 ПРОЙДЕН УСПЕШНО: кэш и хранилище совпадают с разбором CSV")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 12 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
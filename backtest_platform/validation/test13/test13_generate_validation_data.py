@@ -0,0 +1,57 @@
+# backtest_platform/validation/test13/test13_generate_validation_data.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def write_series(path, dates, close, rng):
+    """Сохраняет ряд в формате CSV MOEX (TRADEDATE, OPEN, HIGH, LOW, CLOSE, VOLUME)"""
+    df = pd.DataFrame({
+        'TRADEDATE': dates.strftime('%Y-%m-%d'),
+        'OPEN': close,
+        'HIGH': close * 1.01,
+        'LOW': close * 0.99,
+        'CLOSE': close,
+        'VOLUME': rng.integers(1000, 10000, len(close))
+    })
+    df.to_csv(path, index=False)
+    print(f"  ✅ {os.path.basename(path)}: {len(df)} строк")
+
+
+def main():
+    _config_path = os.path.dirname(__file__)
+    if _config_path not in sys.path:
+        sys.path.insert(0, _config_path)
+
+    import test13_optimization_config_validation as cfg
+
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    output_dir = os.path.join(project_root, cfg.data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Генерация данных для теста 13: случайные блуждания активов, индекса и RVI...")
+    rng = np.random.default_rng(cfg.seed)
+    dates = pd.bdate_range(cfg.start_date, periods=cfg.n_dates)
+
+    series = dict(cfg.assets)
+    series[cfg.market[0]] = cfg.market[1:]
+    for ticker, (mu, sigma, price) in series.items():
+        close = price * np.cumprod(1 + rng.normal(mu, sigma, cfg.n_dates))
+        keep = np.ones(cfg.n_dates, dtype=bool)
+        keep[cfg.missing_dates.get(ticker, [])] = False
+        write_series(os.path.join(output_dir, f"{ticker}.csv"), dates[keep], close[keep], rng)
+
+    # RVI начинается позже активов — первые даты без значения индекса волатильности
+    rvi = np.clip(22 + np.cumsum(rng.normal(0, 1.5, cfg.n_dates)), 8, 50)
+    pd.DataFrame({'TRADEDATE': dates.strftime('%Y-%m-%d'), 'CLOSE': rvi}).iloc[3:].to_csv(
+        os.path.join(output_dir, f"{cfg.rvi_ticker}.csv"), index=False)
+    print(f"  ✅ {cfg.rvi_ticker}.csv: {cfg.n_dates - 3} строк")
+
+    print(f"\n✅ Данные теста 13 сохранены в {output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# backtest_platform/validation/test13/test13_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 13: очередь заданий распределённой оптимизации
+Проверяет аренду единиц работы, возврат в очередь по истечении аренды, отказ
+от результата потерявшего аренду исполнителя и совпадение распределённого
+перебора (optimization/work_queue.py) с обычным полным перебором
+"""
+
+data_dir = 'data-validation/test13'
+
+seed = 13
+n_dates = 220
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {'OBLG': [5, 50, 51]}   # пропуски торгов — календарь не совпадает у активов
+
+# Очередь: 10 комбинаций по 4 → 3 единицы; короткая аренда для проверки истечения
+queue_total = 10
+queue_unit_size = 4
+short_lease_seconds = 0.3
+max_attempts = 2
+
+# Распределённый перебор
+param_grid = {
+    'base_lookback': [10, 20, 30],
+    'base_vol_window': [5, 10],
+    'market_vol_window': [21, 40],
+    'market_vol_threshold': [0.3, 0.6]
+}
+n_workers = 2
+unit_size = 5
+lease_seconds = 60
+compared_metrics = ['final_value', 'cagr', 'sharpe', 'max_drawdown', 'total_trades']
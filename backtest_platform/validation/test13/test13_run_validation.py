@@ -0,0 +1,141 @@
+# backtest_platform/validation/test13/test13_run_validation.py
+
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test13_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def validate_leases(queue_dir, cfg):
+    """Аренда, истечение аренды, повторный захват, отказ и повтор после отказа"""
+    from optimization.work_queue import WorkQueue
+
+    queue = WorkQueue(queue_dir)
+    run_key = 'test13-leases'
+    units = queue.submit(run_key, total=cfg.queue_total, unit_size=cfg.queue_unit_size)
+    expected_units = -(-cfg.queue_total // cfg.queue_unit_size)
+    assert units == expected_units, f"❌ Ожидалось {expected_units} единиц, создано {units}"
+    assert queue.submit(run_key, total=cfg.queue_total, unit_size=cfg.queue_unit_size) == units, \
+        "❌ Повторная регистрация прогона изменила очередь"
+
+    first = queue.claim(run_key, 'worker-a', lease_seconds=cfg.short_lease_seconds)
+    second = queue.claim(run_key, 'worker-b', lease_seconds=60)
+    assert (first['unit_id'], first['start'], first['stop']) == (0, 0, cfg.queue_unit_size), \
+        f"❌ Первая единица: {first}"
+    assert second['unit_id'] == 1, f"❌ Вторая единица должна быть следующей: {second}"
+    print(f"  Захвачены единицы {first['unit_id']} (worker-a) и {second['unit_id']} (worker-b)")
+
+    time.sleep(cfg.short_lease_seconds * 2)
+    requeued = queue.requeue_expired(run_key)
+    assert requeued == 1, f"❌ По истечении аренды ожидался возврат 1 единицы, возвращено {requeued}"
+    assert not queue.complete(run_key, first['unit_id'], 'worker-a', rows=4, errors=0), \
+        "❌ Принят результат исполнителя, потерявшего аренду"
+    assert not queue.renew(run_key, first['unit_id'], 'worker-a'), "❌ Продлена потерянная аренда"
+    print("  Аренда worker-a истекла: единица возвращена, результат и продление отклонены")
+
+    again = queue.claim(run_key, 'worker-c', lease_seconds=60)
+    assert again['unit_id'] == first['unit_id'] and again['attempts'] == 2, \
+        f"❌ Возвращённая единица должна быть захвачена повторно (попытка 2): {again}"
+    queue.fail(run_key, again['unit_id'], 'worker-c', max_attempts=cfg.max_attempts)
+    assert queue.progress(run_key)['failed'] == 1, "❌ После max_attempts единица должна стать 'failed'"
+    assert queue.retry_failed(run_key) == 1, "❌ retry_failed не вернул единицу в очередь"
+
+    assert queue.complete(run_key, second['unit_id'], 'worker-b', rows=4, errors=0), \
+        "❌ Не принят результат действующего арендатора"
+    progress = queue.progress(run_key)
+    assert (progress['done'], progress['pending'], progress['failed']) == (1, 2, 0), \
+        f"❌ Итоговое состояние очереди: {progress}"
+    print(f"  Итог очереди: {progress}")
+
+
+def validate_distributed(queue_dir, data, market_df, rvi_data, cfg):
+    """Распределённый перебор совпадает с полным перебором по всем комбинациям"""
+    from optimizer import distributed_optimize_dual_momentum, optimize_dual_momentum
+
+    costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
+    distributed = distributed_optimize_dual_momentum(
+        data, market_df, rvi_data, cfg.param_grid, queue_dir=queue_dir,
+        n_workers=cfg.n_workers, unit_size=cfg.unit_size, lease_seconds=cfg.lease_seconds,
+        engine='fast', timeout=600, **costs
+    )
+    grid = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast', **costs)
+
+    keys = list(cfg.param_grid)
+    distributed_rows = {tuple(row[k] for k in keys): row for row in distributed.to_dict('records')}
+    grid_rows = {tuple(row[k] for k in keys): row for row in grid.to_dict('records')}
+    assert len(distributed_rows) == len(distributed), "❌ Распределённый перебор вернул повторяющиеся комбинации"
+    assert distributed_rows.keys() == grid_rows.keys(), \
+        f"❌ Наборы комбинаций различаются: {len(distributed_rows)} против {len(grid_rows)}"
+    for combo, row in grid_rows.items():
+        for metric in cfg.compared_metrics:
+            assert np.isclose(distributed_rows[combo][metric], row[metric], rtol=1e-12, atol=0.0), \
+                f"❌ {dict(zip(keys, combo))}: {metric} {distributed_rows[combo][metric]} != {row[metric]}"
+    print(f"  Комбинаций: {len(grid_rows)}, метрики совпадают с полным перебором")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test13_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 13: очередь заданий — аренда, возврат, распределённый перебор")
+    print("=" * 70)
+
+    work_dir = os.path.join(project_root, cfg.data_dir, 'queue')
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[Аренда и возврат единиц в очередь]")
+    validate_leases(os.path.join(work_dir, 'leases'), cfg)
+    print("  ✅ Пройден")
+
+    print("\n[Распределённый перебор против полного перебора]")
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    validate_distributed(os.path.join(work_dir, 'distributed'), data, market_df, rvi_data, cfg)
+    print("  ✅ Пройден")
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 13 ПРОЙДЕН УСПЕШНО: очередь заданий работает корректно")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 13 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
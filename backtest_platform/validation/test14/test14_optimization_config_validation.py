@@ -0,0 +1,39 @@
+# backtest_platform/validation/test14/test14_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 14: инкрементальная переоптимизация
+Проверяет, что IncrementalOptimizer (optimization/incremental.py), продвигающий
+сохранённое состояние только по новым дням, даёт ту же таблицу результатов,
+что полный пересчёт сетки на всей истории
+"""
+
+data_dir = 'data-validation/test14'
+
+seed = 14
+n_dates = 260
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {'OBLG': [5, 50, 51]}   # пропуски торгов — календарь не совпадает у активов
+
+# История поступает частями: первый прогон, затем один день, затем неделя
+history_steps = [240, 241, 246, 260]
+
+param_grid = {
+    'base_lookback': [10, 20, 30],
+    'base_vol_window': [5, 10],
+    'market_vol_window': [21, 40],
+    'market_vol_threshold': [0.3, 0.6],
+    'use_trend_filter': [False, True]
+}
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
+compared_metrics = ['final_value', 'cagr', 'sharpe', 'max_drawdown', 'total_trades']
+rtol = 1e-9
@@ -0,0 +1,119 @@
+# backtest_platform/validation/test14/test14_run_validation.py
+
+import os
+import shutil
+import sys
+
+import numpy as np
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test14_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def truncate(data, market_df, rvi_data, cutoff):
+    """История до cutoff включительно (как если бы позже данных ещё не было)"""
+    def cut(df):
+        return df[df['TRADEDATE'] <= cutoff].reset_index(drop=True)
+    return {ticker: cut(df) for ticker, df in data.items()}, cut(market_df), cut(rvi_data)
+
+
+def compare_tables(actual, expected, cfg, case_name):
+    """Таблицы результатов совпадают по набору комбинаций и метрикам"""
+    keys = list(cfg.param_grid)
+    actual_rows = {tuple(row[k] for k in keys): row for row in actual.to_dict('records')}
+    expected_rows = {tuple(row[k] for k in keys): row for row in expected.to_dict('records')}
+    assert actual_rows.keys() == expected_rows.keys(), \
+        f"❌ {case_name}: наборы комбинаций различаются ({len(actual_rows)} против {len(expected_rows)})"
+    for combo, row in expected_rows.items():
+        for metric in cfg.compared_metrics:
+            assert np.isclose(actual_rows[combo][metric], row[metric], rtol=cfg.rtol, atol=0.0), \
+                f"❌ {case_name} {dict(zip(keys, combo))}: {metric} {actual_rows[combo][metric]} != {row[metric]}"
+
+
+def main():
+    project_root = setup_paths()
+
+    import test14_optimization_config_validation as cfg
+    from optimization.incremental import IncrementalOptimizer
+    from optimizer import optimize_dual_momentum
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 14: инкрементальный пересчёт совпадает с полным")
+    print("=" * 70)
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    calendar = market_df['TRADEDATE'].sort_values().to_numpy()
+    work_dir = os.path.join(project_root, cfg.data_dir, 'state')
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Состояние сохраняется в файл и читается заново: каждый шаг — как отдельный ежедневный запуск
+    state_path = os.path.join(work_dir, 'daily.npz')
+    for step, n_days in enumerate(cfg.history_steps):
+        cutoff = calendar[n_days - 1]
+        step_data = truncate(data, market_df, rvi_data, cutoff)
+        daily = IncrementalOptimizer(cfg.param_grid, state_path=state_path, **cfg.costs)
+        incremental = daily.refresh(*step_data)
+        info = daily.last_refresh
+        expected_mode = 'full' if step == 0 else 'incremental'
+        print(f"\n[{n_days} дней] режим {info['mode']}, новых дней {info['new_days']}, "
+              f"пересчитано заново {info['resimulated']} из {info['n_combos']}")
+        assert info['mode'] == expected_mode, f"❌ Ожидался режим {expected_mode}, получен {info['mode']}"
+
+        fresh = IncrementalOptimizer(cfg.param_grid, state_path=os.path.join(work_dir, f'full-{n_days}.npz'),
+                                     **cfg.costs)
+        compare_tables(incremental, fresh.refresh(*step_data), cfg, f"{n_days} дней: полный пересчёт")
+        assert fresh.last_refresh['mode'] == 'full', "❌ Новый файл состояния должен давать полный пересчёт"
+
+        grid = optimize_dual_momentum(*step_data, cfg.param_grid, engine='fast', **cfg.costs)
+        compare_tables(incremental, grid, cfg, f"{n_days} дней: полный перебор")
+        print("  ✅ Совпадает с полным пересчётом и полным перебором")
+
+    # Исправление уже обработанной истории — состояние непригодно, полный пересчёт
+    changed = {ticker: df.copy() for ticker, df in data.items()}
+    changed['GOLD'].loc[10, 'CLOSE'] *= 1.5
+    daily = IncrementalOptimizer(cfg.param_grid, state_path=state_path, **cfg.costs)
+    daily.refresh(changed, market_df, rvi_data)
+    assert daily.last_refresh['mode'] == 'full', \
+        f"❌ После исправления истории ожидался полный пересчёт, режим {daily.last_refresh['mode']}"
+    print("\n[Исправление истории] ✅ Сохранённое состояние отброшено, выполнен полный пересчёт")
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 14 ПРОЙДЕН УСПЕШНО: инкрементальный пересчёт эквивалентен полному")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 14 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
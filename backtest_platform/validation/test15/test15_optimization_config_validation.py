@@ -0,0 +1,35 @@
+# backtest_platform/validation/test15/test15_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 15: перезагрузка данных сервиса оптимизации
+Проверяет, что команда reload (optimization/daemon.py) действительно читает CSV
+заново, когда данные загружаются через общий каталог datastore/catalog.py
+"""
+
+data_dir = 'data-validation/test15'
+
+seed = 15
+n_dates = 120
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {}
+
+# Новый торговый день: дописывается в CSV всех активов и индекса
+appended_tickers = ['GOLD', 'EQMX', 'LQDT', 'IMOEX']
+appended_change = 0.01
+
+param_grid = {
+    'base_lookback': [10, 20],
+    'base_vol_window': [5],
+    'market_vol_window': [21],
+    'market_vol_threshold': [0.6]
+}
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
@@ -0,0 +1,122 @@
+# backtest_platform/validation/test15/test15_run_validation.py
+
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+
+import pandas as pd
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def append_day(path, change):
+    """Дописывает в CSV следующий рабочий день с ценой, изменённой на change"""
+    df = pd.read_csv(path)
+    last = df.iloc[-1].copy()
+    last['TRADEDATE'] = (pd.Timestamp(last['TRADEDATE']) + pd.offsets.BDay(1)).strftime('%Y-%m-%d')
+    for column in ('OPEN', 'HIGH', 'LOW', 'CLOSE'):
+        last[column] = last[column] * (1 + change)
+    pd.concat([df, last.to_frame().T], ignore_index=True).to_csv(path, index=False)
+    return last['TRADEDATE']
+
+
+def main():
+    project_root = setup_paths()
+
+    import test15_optimization_config_validation as cfg
+    from datastore.catalog import get_catalog
+    from optimization.daemon import OptimizationClient, OptimizationService, serve
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 15: reload сервиса оптимизации перечитывает данные")
+    print("=" * 70)
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    if not os.path.exists(os.path.join(case_dir, f"{cfg.market[0]}.csv")):
+        raise FileNotFoundError(f"❌ Нет данных в {case_dir} (запустите test15_generate_validation_data.py)")
+
+    # Тест дописывает строки — работает с копией сгенерированных файлов
+    work_dir = os.path.join(case_dir, 'work')
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    for name in os.listdir(case_dir):
+        if name.endswith('.csv'):
+            shutil.copy(os.path.join(case_dir, name), work_dir)
+
+    # Загрузчик устроен как stepwise_optimization4.load_all_data(): через память каталогов процесса
+    tickers = list(cfg.assets)
+
+    def loader():
+        return get_catalog(work_dir, tickers, cfg.market[0], cfg.rvi_ticker, verbose=False).as_tuple()
+
+    service = OptimizationService(loader, n_jobs=1, **cfg.costs)
+    port = free_port()
+    server = threading.Thread(target=serve, args=(service,), kwargs={'port': port}, daemon=True)
+    server.start()
+    client = OptimizationClient(port=port, timeout=60)
+    for _ in range(100):
+        if client.ping():
+            break
+        time.sleep(0.1)
+    else:
+        raise RuntimeError("Сервис оптимизации не запустился")
+
+    try:
+        rows_before = client.status()['rows']
+        before = client.run_grid(cfg.param_grid)
+        print(f"\n[Старт] строк: {rows_before}, комбинаций {len(before)}")
+
+        new_date = None
+        for ticker in cfg.appended_tickers:
+            new_date = append_day(os.path.join(work_dir, f"{ticker}.csv"), cfg.appended_change)
+        print(f"[CSV] дописан день {new_date} в {', '.join(cfg.appended_tickers)}")
+
+        rows_after = client.reload()['rows']
+        print(f"[reload] строк: {rows_after}")
+        for ticker in tickers:
+            assert rows_after[ticker] == rows_before[ticker] + 1, \
+                f"❌ {ticker}: после reload {rows_after[ticker]} строк, ожидалось {rows_before[ticker] + 1}"
+
+        after = client.run_grid(cfg.param_grid)
+        assert len(after) == len(before), "❌ После reload изменилось число комбинаций"
+        assert not after['final_value'].equals(before['final_value']), \
+            "❌ Результаты после reload не учитывают новый день"
+        print("  ✅ Новый день загружен, задания считаются на обновлённых данных")
+    finally:
+        client.shutdown()
+        server.join(timeout=10)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 15 ПРОЙДЕН УСПЕШНО: reload читает данные с диска")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 15 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
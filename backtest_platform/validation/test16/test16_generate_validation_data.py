@@ -0,0 +1,37 @@
+# backtest_platform/validation/test16/test16_generate_validation_data.py
+
+import json
+import os
+import sys
+
+
+def main():
+    _config_path = os.path.dirname(__file__)
+    if _config_path not in sys.path:
+        sys.path.insert(0, _config_path)
+
+    import test16_optimization_config_validation as cfg
+
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    output_dir = os.path.join(project_root, cfg.data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Генерация данных для теста 16: ответы ISS marketdata по доскам...")
+    # Полный набор колонок ISS: сборщик должен запрашивать проекцию, заглушка её применяет
+    columns = ['SECID', 'BOARDID', 'BID', 'BIDDEPTH', 'OFFER', 'OFFERDEPTH', 'LAST',
+               'BIDDEPTHT', 'OFFERDEPTHT', 'UPDATETIME']
+    for board, book in cfg.quotes.items():
+        data = []
+        for secid, (bid, offer, bid_depth, offer_depth) in book.items():
+            last = round((bid + offer) / 2, 6) if bid is not None else None
+            data.append([secid, board, bid, 1, offer, 1, last, bid_depth, offer_depth, '12:00:00'])
+        path = os.path.join(output_dir, f"iss_{board}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'marketdata': {'columns': columns, 'data': data}}, f, ensure_ascii=False, indent=1)
+        print(f"  ✅ iss_{board}.json: {len(data)} инструментов")
+
+    print(f"\n✅ Данные теста 16 сохранены в {output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# backtest_platform/validation/test16/test16_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 16: сборщик спредов MOEX против заглушки ISS
+Проверяет SpreadCollector (collect_moex_spreads.py) на локальном HTTP-сервере
+в формате ISS: один запрос на группу (market, board), постоянные соединения,
+повтор после 429/5xx с учётом Retry-After, ограничение частоты запросов
+"""
+
+data_dir = 'data-validation/test16'
+
+# Тикеры сборщика: две группы (market, board) → два запроса на опрос
+tickers_config = {
+    'OBLG': {'market': 'shares', 'board': 'TQTF', 'secid': 'OBLG'},
+    'EQMX': {'market': 'shares', 'board': 'TQTF', 'secid': 'EQMX'},
+    'GOLD': {'market': 'shares', 'board': 'TQTF', 'secid': 'GOLD'},
+    'LQDT': {'market': 'shares', 'board': 'TQTF', 'secid': 'LQDT'},
+    'SBER': {'market': 'shares', 'board': 'TQBR', 'secid': 'SBER'},
+    'GAZP': {'market': 'shares', 'board': 'TQBR', 'secid': 'GAZP'}
+}
+
+# Стакан заглушки: SECID → (BID, OFFER, BIDDEPTHT, OFFERDEPTHT); None — котировок нет
+quotes = {
+    'TQTF': {
+        'OBLG': (145.10, 145.30, 1200, 900),
+        'EQMX': (151.00, 151.40, 300, 450),
+        'GOLD': (2.501, 2.503, 50000, 61000),
+        'LQDT': (1.7000, 1.7002, 990000, 1000000),
+        'TMOS': (7.10, 7.11, 100, 100)           # не входит в конфигурацию — в ответ не запрашивается
+    },
+    'TQBR': {
+        'SBER': (301.10, 301.15, 5000, 7000),
+        'GAZP': (None, None, 0, 0)               # нет котировок — записи нет
+    }
+}
+
+# Сбои заглушки: (board, номер запроса к доске с 1) → (статус, Retry-After или None)
+failures = {
+    ('TQTF', 1): (429, 0.4),
+    ('TQBR', 2): (503, None)
+}
+
+polls = 3
+collector_settings = {
+    'rate_limit': 20.0,          # не чаще одного запроса в 50 мс
+    'retries': 3,
+    'backoff_sec': 0.01,
+    'timeout_sec': 5.0,
+    'max_workers': 2,
+    'trading_hours': None
+}
+rate_tolerance = 0.8             # допуск на интервал между запросами (доля 1 / rate_limit)
@@ -0,0 +1,207 @@
+# backtest_platform/validation/test16/test16_run_validation.py
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули сборщика импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+class IssStubHandler(BaseHTTPRequestHandler):
+    """Ответы в формате ISS securities.json с проекцией колонок marketdata; сбои — по плану теста"""
+    protocol_version = 'HTTP/1.1'   # keep-alive: соединение обслуживает несколько запросов
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        board = parts[parts.index('boards') + 1]
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with stub.lock:
+            stub.board_requests[board] = stub.board_requests.get(board, 0) + 1
+            failure = stub.failures.get((board, stub.board_requests[board]))
+            stub.log.append({
+                'time': time.monotonic(),
+                'board': board,
+                'number': stub.board_requests[board],
+                'connection': self.client_address,
+                'params': params,
+                'status': failure[0] if failure else 200
+            })
+
+        if failure:
+            status, retry_after = failure
+            body = b'{"error": "stub failure"}'
+            self.send_response(status)
+            if retry_after is not None:
+                self.send_header('Retry-After', str(retry_after))
+        else:
+            marketdata = stub.books[board]['marketdata']
+            wanted = set(params.get('securities', '').split(','))
+            columns = params.get('marketdata.columns', '').split(',')
+            index = [marketdata['columns'].index(column) for column in columns]
+            rows = [[row[i] for i in index] for row in marketdata['data'] if row[0] in wanted]
+            body = json.dumps({'marketdata': {'columns': columns, 'data': rows}}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub(case_dir, cfg):
+    """Сервер-заглушка ISS на свободном порту 127.0.0.1"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), IssStubHandler)
+    server.daemon_threads = True
+    server.books = {}
+    for board in cfg.quotes:
+        path = os.path.join(case_dir, f"iss_{board}.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test16_generate_validation_data.py)")
+        with open(path, encoding='utf-8') as f:
+            server.books[board] = json.load(f)
+    server.failures = dict(cfg.failures)
+    server.board_requests = {}
+    server.log = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def validate_records(polled, cfg):
+    """Записи каждого опроса: все тикеры с котировками, спред по формуле spread_from_marketdata"""
+    expected_aliases = sorted(alias for alias, config in cfg.tickers_config.items()
+                              if cfg.quotes[config['board']][config['secid']][0] is not None)
+    for number, records in enumerate(polled, 1):
+        aliases = sorted(record['alias'] for record in records)
+        assert aliases == expected_aliases, f"❌ Опрос {number}: записи {aliases}, ожидались {expected_aliases}"
+        for record in records:
+            bid, offer, bid_depth, offer_depth = cfg.quotes[record['board']][record['secid']]
+            spread_bps = round((offer - bid) / ((offer + bid) / 2) * 10_000, 3)
+            assert record['bid'] == bid and record['ask'] == offer, f"❌ {record['alias']}: неверные bid/ask"
+            assert record['spread_bps'] == spread_bps, \
+                f"❌ {record['alias']}: спред {record['spread_bps']} bps, ожидалось {spread_bps}"
+            assert (record['volume_bid'], record['volume_ask']) == (bid_depth, offer_depth), \
+                f"❌ {record['alias']}: неверная глубина стакана"
+    print(f"  ✅ {len(polled)} опросов по {len(expected_aliases)} записей, спреды совпадают")
+
+
+def validate_grouping(log, groups, cfg):
+    """Один успешный запрос на группу за опрос, в запросе — все тикеры группы и проекция колонок"""
+    from collect_moex_spreads import MARKETDATA_COLUMNS
+
+    ok = [entry for entry in log if entry['status'] == 200]
+    assert len(ok) == cfg.polls * len(groups), \
+        f"❌ Успешных запросов {len(ok)}, ожидалось {cfg.polls * len(groups)} (опросов × групп)"
+    for entry in log:
+        aliases = groups[('shares', entry['board'])]
+        expected = sorted(cfg.tickers_config[alias]['secid'] for alias in aliases)
+        assert sorted(entry['params']['securities'].split(',')) == expected, \
+            f"❌ Запрос {entry['board']}: тикеры {entry['params']['securities']}, ожидались {expected}"
+        assert entry['params'].get('iss.only') == 'marketdata', "❌ Запрос без iss.only=marketdata"
+        assert entry['params'].get('marketdata.columns') == ','.join(MARKETDATA_COLUMNS), \
+            "❌ Запрос без проекции колонок marketdata"
+    print(f"  ✅ {len(groups)} группы (market, board) → {len(groups)} запроса на опрос")
+
+
+def validate_retries(log, stats, cfg):
+    """Сбойные запросы повторены; повтор после 429 — не раньше Retry-After"""
+    assert stats['retries'] == len(cfg.failures), \
+        f"❌ Повторов {stats['retries']}, ожидалось {len(cfg.failures)}"
+    assert stats['failures'] == 0, f"❌ Опросов с ошибкой группы: {stats['failures']}"
+    for (board, number), (status, retry_after) in cfg.failures.items():
+        failed = next(e for e in log if e['board'] == board and e['number'] == number)
+        retried = next(e for e in log if e['board'] == board and e['number'] == number + 1)
+        assert failed['status'] == status and retried['status'] == 200, \
+            f"❌ {board}: после {status} повтор не получил ответ 200"
+        delay = retried['time'] - failed['time']
+        if retry_after is not None:
+            assert delay >= retry_after * 0.95, \
+                f"❌ {board}: повтор через {delay:.3f} с, Retry-After {retry_after} с"
+        print(f"  ✅ {board}: HTTP {status} → повтор через {delay:.3f} с"
+              + (f" (Retry-After {retry_after} с)" if retry_after is not None else ""))
+
+
+def validate_connections(log, stats, groups):
+    """Соединения keep-alive переиспользуются: их не больше, чем параллельных групп"""
+    connections = {entry['connection'] for entry in log}
+    assert len(connections) == stats['connections'], \
+        f"❌ Сервер видел {len(connections)} соединений, сборщик открыл {stats['connections']}"
+    assert len(connections) <= len(groups), \
+        f"❌ Открыто {len(connections)} соединений на {len(log)} запросов (ожидалось ≤ {len(groups)})"
+    print(f"  ✅ {len(log)} запросов по {len(connections)} соединениям keep-alive")
+
+
+def validate_rate(log, cfg):
+    """Интервал между запросами не меньше 1 / rate_limit (с допуском на планировщик)"""
+    times = sorted(entry['time'] for entry in log)
+    min_gap = min(b - a for a, b in zip(times, times[1:]))
+    limit = 1.0 / cfg.collector_settings['rate_limit']
+    assert min_gap >= limit * cfg.rate_tolerance, \
+        f"❌ Минимальный интервал между запросами {min_gap * 1000:.1f} мс < {limit * 1000:.0f} мс"
+    print(f"  ✅ Минимальный интервал между запросами {min_gap * 1000:.1f} мс (лимит {limit * 1000:.0f} мс)")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test16_optimization_config_validation as cfg
+    from collect_moex_spreads import SpreadCollector
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 16: сборщик спредов MOEX на заглушке ISS")
+    print("=" * 70)
+
+    stub = start_stub(os.path.join(project_root, cfg.data_dir), cfg)
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    sunk = []
+    try:
+        with SpreadCollector(cfg.tickers_config, base_url=base_url, sink=sunk.append,
+                             **cfg.collector_settings) as collector:
+            groups = collector.groups()
+            polled = [collector.poll_once(verbose=False) for _ in range(cfg.polls)]
+            stats = dict(collector.stats)
+    finally:
+        stub.shutdown()
+        stub.server_close()
+    print(f"\n[Сборщик] {stats}")
+
+    assert sunk == polled, "❌ В sink переданы не те записи, что вернул опрос"
+    validate_records(polled, cfg)
+    validate_grouping(stub.log, groups, cfg)
+    validate_retries(stub.log, stats, cfg)
+    validate_connections(stub.log, stats, groups)
+    validate_rate(stub.log, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 16 ПРОЙДЕН УСПЕШНО: сборщик группирует запросы, держит соединения и соблюдает лимиты")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 16 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
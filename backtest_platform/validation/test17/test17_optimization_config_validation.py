@@ -0,0 +1,49 @@
+# backtest_platform/validation/test17/test17_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 17: режим лучших K комбинаций
+Проверяет TopKCollector (optimization/top_k.py) против полной таблицы:
+куча K лучших с порядком при равенстве, статистика Уэлфорда и квантили P²
+в sensitivity() против analyze_parameter_sensitivity и полной сортировки
+"""
+
+data_dir = 'data-validation/test17'
+
+seed = 17
+n_dates = 300
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {}
+
+# Часть 1: синтетический поток строк (без бэктеста) — много строк и намеренные равенства
+stream_rows = 20000
+stream_params = {'alpha': [1, 2, 3, 4, 5], 'beta': ['a', 'b', 'c', 'd']}
+stream_sharpe_decimals = 2     # округление Sharpe — много строк с равной целевой функцией
+stream_k = 150
+
+# Часть 2: сетка стратегии, полный перебор против top_k
+param_grid = {
+    'base_lookback': [10, 15, 20, 25, 30, 40],
+    'base_vol_window': [5, 8, 10],
+    'market_vol_window': [21, 40],
+    'market_vol_threshold': [0.3, 0.6],
+    'use_trend_filter': [False, True]
+}
+grid_k = 25
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
+
+# Допуски: агрегаты Уэлфорда — до округления round(4) в таблице чувствительности;
+# квантили P² — доля межквартильного размаха точного распределения (поток из тысяч
+# строк; на десятках строк сетки в порядке перебора P² лишь грубая оценка —
+# там проверяются порядок q25 ≤ медиана ≤ q75 и попадание в [min, max])
+stats_atol = 1e-4
+p2_tolerance_iqr = 0.05
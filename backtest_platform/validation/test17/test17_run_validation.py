@@ -0,0 +1,189 @@
+# backtest_platform/validation/test17/test17_run_validation.py
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test17_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def stream_rows(cfg):
+    """Синтетические строки результатов: Sharpe зависит от alpha, округлён (равенства), часть — NaN"""
+    rng = np.random.default_rng(cfg.seed)
+    alphas = rng.choice(cfg.stream_params['alpha'], cfg.stream_rows)
+    betas = rng.choice(cfg.stream_params['beta'], cfg.stream_rows)
+    sharpe = np.round(rng.normal(0.1 * alphas, 1.0), cfg.stream_sharpe_decimals)
+    sharpe[::500] = np.nan                      # отвергнутые строки: в кучу не попадают
+    cagr = rng.normal(0.08, 0.05, cfg.stream_rows)
+    drawdown = -np.abs(rng.normal(0.15, 0.05, cfg.stream_rows))
+    return [
+        {'row_id': i, 'alpha': int(alphas[i]), 'beta': str(betas[i]), 'sharpe': float(sharpe[i]),
+         'cagr': float(cagr[i]), 'max_drawdown': float(drawdown[i]), 'final_value': 1e5 * (1 + cagr[i])}
+        for i in range(cfg.stream_rows)
+    ]
+
+
+def compare_sensitivity(collector, full_df, parameter, cfg, p2_tolerance, case_name):
+    """
+    sensitivity() против analyze_parameter_sensitivity и точных квартилей полной таблицы
+    (p2_tolerance=None — для квантилей P² только порядок и диапазон)
+    """
+    from optimizer import analyze_parameter_sensitivity
+
+    actual = collector.sensitivity(parameter)
+    expected = analyze_parameter_sensitivity(full_df, parameter)
+    assert set(actual.index) == set(expected.index), \
+        f"❌ {case_name} {parameter}: значения {sorted(actual.index)} != {sorted(expected.index)}"
+    worst_p2 = 0.0
+    for value in expected.index:
+        sharpe = full_df.loc[full_df[parameter] == value, 'sharpe'].dropna()
+        iqr = max(sharpe.quantile(0.75) - sharpe.quantile(0.25), 1e-12)
+        quartiles = [actual.loc[value, column] for column in ('sharpe_q25', 'sharpe_median', 'sharpe_q75')]
+        assert sharpe.min() - cfg.stats_atol <= quartiles[0] <= quartiles[1] <= quartiles[2] \
+            <= sharpe.max() + cfg.stats_atol, \
+            f"❌ {case_name} {parameter}={value}: квартили P² {quartiles} вне порядка или диапазона"
+        for column in expected.columns:
+            got, want = actual.loc[value, column], expected.loc[value, column]
+            if column == 'sharpe_median' and p2_tolerance is None:
+                continue
+            if column == 'sharpe_median':
+                error = abs(got - want) / iqr
+                worst_p2 = max(worst_p2, error)
+                assert error <= p2_tolerance, \
+                    f"❌ {case_name} {parameter}={value}: медиана P² {got} против {want} ({error:.2f} IQR)"
+            else:
+                assert np.isclose(got, want, rtol=0.0, atol=cfg.stats_atol, equal_nan=True), \
+                    f"❌ {case_name} {parameter}={value}: {column} {got} против {want}"
+        for column, p in (('sharpe_q25', 0.25), ('sharpe_q75', 0.75)) if p2_tolerance is not None else ():
+            error = abs(actual.loc[value, column] - sharpe.quantile(p)) / iqr
+            worst_p2 = max(worst_p2, error)
+            assert error <= p2_tolerance, \
+                f"❌ {case_name} {parameter}={value}: {column} P² {actual.loc[value, column]} " \
+                f"против {sharpe.quantile(p):.4f} ({error:.2f} IQR)"
+    return worst_p2
+
+
+def validate_stream(cfg):
+    """Часть 1: куча и статистика на потоке строк с равенствами целевой функции"""
+    from optimization.top_k import TopKCollector
+
+    rows = stream_rows(cfg)
+    full_df = pd.DataFrame(rows)
+    collector = TopKCollector(k=cfg.stream_k, params=list(cfg.stream_params))
+    collector.extend(rows)
+
+    # Полная сортировка: по убыванию Sharpe, при равенстве — более ранняя строка
+    ranked = full_df.dropna(subset=['sharpe'])
+    ranked = ranked.iloc[np.lexsort((ranked['row_id'].to_numpy(), -ranked['sharpe'].to_numpy()))]
+    expected_ids = ranked['row_id'].head(cfg.stream_k).tolist()
+    top = collector.to_frame()
+    assert top['row_id'].tolist() == expected_ids, "❌ Поток: K лучших строк или их порядок при равенстве не совпадают"
+    assert (top['objective_score'] == top['sharpe']).all(), "❌ Поток: objective_score не равен Sharpe"
+    ties = int(ranked['sharpe'].head(cfg.stream_k).duplicated().sum())
+    assert ties > 0, "❌ Поток: в K лучших нет равенств — порядок при равенстве не проверен"
+    assert collector.seen == len(rows) and collector.rejected == int(full_df['sharpe'].isna().sum()), \
+        f"❌ Поток: seen={collector.seen}, rejected={collector.rejected}"
+    print(f"  ✅ K={cfg.stream_k} лучших из {len(rows)} строк совпадают с полной сортировкой "
+          f"(равенств среди лучших: {ties}, отвергнуто NaN: {collector.rejected})")
+
+    for parameter in cfg.stream_params:
+        worst = compare_sensitivity(collector, full_df, parameter, cfg, cfg.p2_tolerance_iqr, "Поток")
+        print(f"  ✅ sensitivity('{parameter}') совпадает с analyze_parameter_sensitivity "
+              f"(квантили P²: до {worst:.3f} IQR)")
+
+    summary = collector.summary()
+    sharpe = full_df['sharpe'].dropna()
+    assert np.isclose(summary['sharpe_mean'], sharpe.mean(), rtol=1e-12), "❌ Поток: средний Sharpe"
+    assert summary['sharpe_min'] == sharpe.min() and summary['sharpe_max'] == sharpe.max(), \
+        "❌ Поток: min/max Sharpe"
+
+
+def validate_grid(project_root, cfg):
+    """Часть 2: optimize_dual_momentum(top_k=...) против полного перебора той же сетки"""
+    from optimizer import optimize_dual_momentum
+    from optimization.top_k import TopKCollector
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    full = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast', **cfg.costs)
+    collector = TopKCollector(k=cfg.grid_k, params=list(cfg.param_grid))
+    top = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast',
+                                 top_k=collector, **cfg.costs)
+
+    keys = list(cfg.param_grid)
+    expected_sharpe = np.sort(full['sharpe'].dropna().to_numpy())[::-1][:cfg.grid_k]
+    assert len(top) == cfg.grid_k, f"❌ Сетка: строк {len(top)}, ожидалось {cfg.grid_k}"
+    assert np.allclose(top['sharpe'].to_numpy(), expected_sharpe, rtol=1e-12), \
+        "❌ Сетка: Sharpe K лучших не совпадает с полной сортировкой"
+    boundary = expected_sharpe[-1]
+    must_have = {tuple(row[k] for k in keys) for row in full[full['sharpe'] > boundary].to_dict('records')}
+    kept = {tuple(row[k] for k in keys) for row in top.to_dict('records')}
+    assert must_have <= kept, "❌ Сетка: комбинация выше границы K лучших не попала в результат"
+    assert collector.seen == len(full), f"❌ Сетка: коллектор видел {collector.seen} строк из {len(full)}"
+    print(f"\n  ✅ top_k={cfg.grid_k}: те же лучшие комбинации, что у полного перебора {len(full)} строк")
+
+    for parameter in keys:
+        compare_sensitivity(collector, full, parameter, cfg, None, "Сетка")
+        print(f"  ✅ sensitivity('{parameter}') совпадает с полной таблицей")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test17_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 17: TopKCollector против полной таблицы результатов")
+    print("=" * 70)
+
+    print("\n[Часть 1] Синтетический поток строк")
+    validate_stream(cfg)
+
+    print("\n[Часть 2] Сетка стратегии")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        validate_grid(project_root, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 17 ПРОЙДЕН УСПЕШНО: режим top-K совпадает с полным перебором")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 17 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
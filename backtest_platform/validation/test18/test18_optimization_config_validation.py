@@ -0,0 +1,43 @@
+# backtest_platform/validation/test18/test18_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 18: фронт Парето (NSGA-II)
+Проверяет non_dominated_sort, pareto_front_mask и crowding_distance
+(optimization/pareto_search.py) против прямого перебора пар, а фронт режима
+search_mode='pareto' — против недоминируемых строк всех оценённых комбинаций
+"""
+
+data_dir = 'data-validation/test18'
+
+seed = 18
+n_dates = 300
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {}
+
+# Часть 1: случайные матрицы критериев (целые значения — совпадающие точки и равенства)
+matrix_cases = [(60, 2), (150, 3), (300, 4)]   # (строк, критериев)
+matrix_value_range = 6
+matrix_inf_share = 0.05                        # NaN / отсутствующие метрики → +inf
+mask_chunk = 7                                 # маленький блок: границы блоков pareto_front_mask
+
+# Часть 2: NSGA-II по сетке стратегии (бюджет меньше сетки — оценена только часть)
+param_grid = {
+    'base_lookback': [10, 15, 20, 25, 30, 40],
+    'base_vol_window': [5, 8, 10],
+    'market_vol_window': [21, 40],
+    'market_vol_threshold': [0.3, 0.6],
+    'use_trend_filter': [False, True]
+}
+search_options = {'population_size': 16, 'n_generations': 5, 'random_state': 18}
+objectives = [('sharpe', 'max'), ('max_drawdown', 'max'), ('total_trades', 'min')]
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
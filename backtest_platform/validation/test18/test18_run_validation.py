@@ -0,0 +1,179 @@
+# backtest_platform/validation/test18/test18_run_validation.py
+
+import os
+import sys
+import warnings
+
+import numpy as np
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test18_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+# ======================
+# ПРЯМОЙ ПЕРЕБОР ПАР
+# ======================
+
+def dominates(a, b):
+    """a доминирует b (минимизация): не хуже по всем критериям и лучше хотя бы по одному"""
+    return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+
+def brute_front(F, members):
+    """Недоминируемые строки среди members"""
+    return [i for i in members if not any(dominates(F[j], F[i]) for j in members if j != i)]
+
+
+def brute_ranks(F):
+    """Ранги фронтов снятием недоминируемых слоёв (0 — фронт Парето)"""
+    ranks = [-1] * len(F)
+    remaining = list(range(len(F)))
+    rank = 0
+    while remaining:
+        front = brute_front(F, remaining)
+        for i in front:
+            ranks[i] = rank
+        remaining = [i for i in remaining if ranks[i] < 0]
+        rank += 1
+    return ranks
+
+
+def brute_crowding(F):
+    """Crowding distance по определению Deb et al. (значения без равенств)"""
+    n, m = len(F), len(F[0])
+    if n <= 2:
+        return [np.inf] * n
+    distance = [0.0] * n
+    for j in range(m):
+        order = sorted(range(n), key=lambda i: F[i][j])
+        span = F[order[-1]][j] - F[order[0]][j]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        for k in range(1, n - 1):
+            if span > 0:
+                distance[order[k]] += (F[order[k + 1]][j] - F[order[k - 1]][j]) / span
+    return distance
+
+
+def validate_matrices(cfg):
+    """Часть 1: функции сортировки против прямого перебора на случайных матрицах"""
+    from optimization.pareto_search import crowding_distance, non_dominated_sort, pareto_front_mask
+
+    rng = np.random.default_rng(cfg.seed)
+    for n, m in cfg.matrix_cases:
+        F = rng.integers(0, cfg.matrix_value_range, size=(n, m)).astype(np.float64)
+        F[rng.random((n, m)) < cfg.matrix_inf_share] = np.inf
+        F_list = F.tolist()
+
+        expected_ranks = brute_ranks(F_list)
+        ranks = non_dominated_sort(F)
+        assert ranks.tolist() == expected_ranks, f"❌ [{n}×{m}] non_dominated_sort расходится с перебором"
+        expected_mask = [rank == 0 for rank in expected_ranks]
+        for chunk in (cfg.mask_chunk, 512):
+            mask = pareto_front_mask(F, chunk=chunk)
+            assert mask.tolist() == expected_mask, f"❌ [{n}×{m}] pareto_front_mask(chunk={chunk}) расходится"
+        duplicates = n - len({tuple(row) for row in F_list})
+        print(f"  ✅ [{n}×{m}] фронтов {max(expected_ranks) + 1}, на фронте {sum(expected_mask)} "
+              f"(совпадающих точек {duplicates})")
+
+        front = F[np.asarray(expected_mask)]
+        front = front[np.isfinite(front).all(axis=1)]
+        continuous = front + rng.random(front.shape) * 1e-3   # без равенств: порядок сортировки однозначен
+        actual = crowding_distance(continuous)
+        expected = brute_crowding(continuous.tolist())
+        assert np.allclose(actual, expected, rtol=1e-12, equal_nan=False), \
+            f"❌ [{n}×{m}] crowding_distance расходится с определением"
+    print("  ✅ crowding_distance совпадает с определением на каждом фронте")
+
+
+def validate_search(project_root, cfg):
+    """Часть 2: фронт search_mode='pareto' против перебора пар по всем оценённым строкам"""
+    from optimizer import optimize_dual_momentum
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    options = {**cfg.search_options, 'objectives': cfg.objectives}
+    all_rows = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast',
+                                      search_mode='pareto', search_options={**options, 'return_all': True},
+                                      **cfg.costs)
+    front_rows = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast',
+                                        search_mode='pareto', search_options=options, **cfg.costs)
+
+    F = []
+    for row in all_rows.to_dict('records'):
+        point = []
+        for column, direction in cfg.objectives:
+            value = row[column]
+            point.append(np.inf if value is None or not np.isfinite(value) else
+                         (-value if direction == 'max' else value))
+        F.append(point)
+    expected_ranks = brute_ranks(F)
+    assert all_rows['pareto_rank'].tolist() == expected_ranks, \
+        "❌ Поиск: pareto_rank строк return_all расходится с перебором пар"
+
+    keys = list(cfg.param_grid)
+    expected_front = {tuple(row[k] for k in keys) for row, rank in zip(all_rows.to_dict('records'), expected_ranks)
+                      if rank == 0}
+    front = {tuple(row[k] for k in keys) for row in front_rows.to_dict('records')}
+    assert front == expected_front, \
+        f"❌ Поиск: фронт {len(front)} комбинаций, перебор пар даёт {len(expected_front)}"
+    assert (front_rows['pareto_rank'] == 0).all(), "❌ Поиск: во фронте есть строки с pareto_rank ≠ 0"
+    print(f"\n  ✅ Оценено {len(all_rows)} комбинаций, фронт Парето {len(front)} — совпадает с перебором пар, "
+          f"рангов {max(expected_ranks) + 1}")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test18_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 18: фронт Парето против перебора пар")
+    print("=" * 70)
+
+    print("\n[Часть 1] Случайные матрицы критериев")
+    validate_matrices(cfg)
+
+    print("\n[Часть 2] NSGA-II по сетке стратегии")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        validate_search(project_root, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 18 ПРОЙДЕН УСПЕШНО: недоминируемая сортировка и фронт Парето корректны")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 18 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,51 @@
+# backtest_platform/validation/test19/test19_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 19: схлопывание осей суррогатом
+Проверяет, что SurrogateModel.collapsible_axes (optimization/surrogate_pruning.py)
+находит ось сетки, не влияющую на метрику, и не трогает влияющие оси и оси,
+не менявшиеся в истории; а search_mode='surrogate' с порогом по умолчанию
+схлопывает такую ось в реальном прогоне
+"""
+
+data_dir = 'data-validation/test19'
+
+seed = 19
+n_dates = 320
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {}
+
+# Часть 1: синтетическая история — sharpe зависит от всех осей, кроме no_effect_axis
+history_grid = {
+    'base_lookback': [10, 20, 40, 60, 80],
+    'base_vol_window': [5, 10, 20],
+    'max_vol_threshold': [0.2, 0.3],
+    'use_rvi_adaptation': [True, False]
+}
+no_effect_axis = 'use_rvi_adaptation'
+history_repeats = 3       # повторы каждой комбинации (шум метрики)
+history_noise = 0.02      # СКО шума sharpe
+unseen_axis = ('trend_window', [50, 100])   # ось сетки, не менявшаяся в истории
+
+# Часть 2: реальные бэктесты — trend_window не влияет при выключенном фильтре тренда
+param_grid = {
+    'base_lookback': [10, 20, 30, 40, 60],
+    'base_vol_window': [5, 10, 20],
+    'max_vol_threshold': [0.1, 0.3],
+    'use_rvi_adaptation': [True, False],
+    'use_trend_filter': [False],
+    'trend_window': [50, 100, 200]
+}
+grid_no_effect_axis = 'trend_window'
+search_options = {'keep_fraction': 0.25, 'batch_size': 8, 'random_state': 19}
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
@@ -0,0 +1,137 @@
+# backtest_platform/validation/test19/test19_run_validation.py
+
+import itertools
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test19_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def synthetic_history(cfg):
+    """Строки истории: sharpe — гладкая функция всех осей history_grid, кроме no_effect_axis, плюс шум"""
+    rng = np.random.default_rng(cfg.seed)
+    keys = list(cfg.history_grid)
+    rows = []
+    for values in itertools.product(*cfg.history_grid.values()):
+        params = dict(zip(keys, values))
+        sharpe = (1.0 - ((params['base_lookback'] - 40) / 30) ** 2
+                  + 0.4 * np.log(params['base_vol_window'])
+                  + (0.3 if params['max_vol_threshold'] == 0.3 else 0.0))
+        for _ in range(cfg.history_repeats):
+            rows.append({**params, 'sharpe': sharpe + rng.normal(0, cfg.history_noise)})
+    return pd.DataFrame(rows)
+
+
+def validate_history(cfg):
+    """collapsible_axes на синтетической истории: только ось без влияния, порог 0 — ничего"""
+    from optimization.param_grid import as_param_grid
+    from optimization.surrogate_pruning import DEFAULT_COLLAPSE_THRESHOLD, SurrogateModel
+
+    history = synthetic_history(cfg)
+    model = SurrogateModel(random_state=cfg.seed).fit(history)
+    importances = model.feature_importances()
+    print(f"  {len(history)} строк истории; важности: "
+          + ', '.join(f"{key} {importances[key]:.4f}" for key in cfg.history_grid))
+
+    grid = as_param_grid({**cfg.history_grid, cfg.unseen_axis[0]: cfg.unseen_axis[1]})
+    collapsible = model.collapsible_axes(grid, DEFAULT_COLLAPSE_THRESHOLD)
+    assert collapsible == [cfg.no_effect_axis], \
+        f"❌ Схлопываемые оси {collapsible}, ожидалось [{cfg.no_effect_axis}]"
+    assert cfg.unseen_axis[0] not in model.varied_features(), \
+        f"❌ Ось {cfg.unseen_axis[0]} не менялась в истории, но считается менявшейся"
+    assert model.collapsible_axes(grid, 0.0) == [], "❌ Порог 0 должен отключать схлопывание"
+    print(f"  Порог {DEFAULT_COLLAPSE_THRESHOLD}: схлопывается {collapsible} — ✅ Пройден")
+
+
+def validate_search(project_root, cfg):
+    """run_surrogate_search с порогом по умолчанию на истории полного перебора той же сетки"""
+    from optimizer import optimize_dual_momentum
+    from optimization.evaluator import ComboEvaluator
+    from optimization.param_grid import as_param_grid
+    from optimization.surrogate_pruning import run_surrogate_search
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    full = optimize_dual_momentum(data, market_df, rvi_data, cfg.param_grid, engine='fast', **cfg.costs)
+    grid = as_param_grid(cfg.param_grid)
+    assert len(full) == len(grid), f"❌ Полный перебор: {len(full)} строк из {len(grid)}"
+
+    evaluator = ComboEvaluator(data, market_df, rvi_data, engine='fast', **cfg.costs)
+    try:
+        rows, stats = run_surrogate_search(evaluator, grid, history=full, **cfg.search_options)
+    finally:
+        evaluator.close()
+    print(f"  {len(grid)} комбинаций, оценено {stats['evaluated']}, схлопнуто {stats['collapsed']}")
+
+    axis = cfg.grid_no_effect_axis
+    assert list(stats['collapsed']) == [axis], \
+        f"❌ Схлопнуты оси {list(stats['collapsed'])}, ожидалось [{axis}]"
+    assert all(row[axis] == stats['collapsed'][axis] for row in rows), \
+        f"❌ После схлопывания оценены комбинации с другим {axis}"
+    n_alive = len(grid) // len(cfg.param_grid[axis])
+    assert stats['evaluated'] == int(np.ceil(cfg.search_options['keep_fraction'] * n_alive)), \
+        f"❌ Бюджет {stats['evaluated']} не соответствует доле от {n_alive} оставшихся комбинаций"
+    print("  ✅ Пройден")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test19_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 19: суррогат схлопывает оси без влияния на метрику")
+    print("=" * 70)
+
+    print("\n[Часть 1] Синтетическая история")
+    validate_history(cfg)
+
+    print("\n[Часть 2] search_mode='surrogate' по сетке стратегии")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        validate_search(project_root, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 19 ПРОЙДЕН УСПЕШНО: ось без влияния найдена и схлопнута")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 19 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
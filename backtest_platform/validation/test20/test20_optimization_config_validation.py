@@ -0,0 +1,57 @@
+# backtest_platform/validation/test20/test20_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 20: дедупликация эквивалентных комбинаций
+Проверяет, что optimize_dual_momentum(deduplicate=True) возвращает те же строки
+(параметры и метрики), что и deduplicate=False, при меньшем числе бэктестов:
+с RVI и без него, на FastBacktester и на Backtester
+"""
+
+data_dir = 'data-validation/test20'
+
+seed = 20
+n_dates = 320
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {'OBLG': [5, 50, 51]}
+
+# Эквивалентные комбинации: market_vol_window=None ≡ base_vol_window,
+# market_vol_threshold=None ≡ max_vol_threshold, trend_window без фильтра тренда
+# или при адаптации RVI, пороги RVI без данных RVI или без адаптации
+param_grid = {
+    'base_lookback': [10, 20],
+    'base_vol_window': [10],
+    'market_vol_window': [None, 10, 40],
+    'max_vol_threshold': [0.2],
+    'market_vol_threshold': [None, 0.2],
+    'use_rvi_adaptation': [True, False],
+    'use_trend_filter': [False, True],
+    'trend_window': [50, 200],
+    'rvi_low_threshold': [20, 25]
+}
+
+# Медленный Backtester — малая сетка из одного канонического набора
+slow_param_grid = {
+    'base_lookback': [20],
+    'base_vol_window': [10],
+    'market_vol_window': [40],
+    'max_vol_threshold': [0.2],
+    'market_vol_threshold': [None, 0.2],
+    'use_trend_filter': [False],
+    'trend_window': [50, 200]
+}
+
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
+
+# Метрики, которые обязаны быть в строках (сравниваются все колонки результата)
+compared_metrics = ['total_trades', 'final_value', 'cagr', 'sharpe', 'max_drawdown',
+                    'used_market_vol_window', 'time_in_cash_pct']
@@ -0,0 +1,138 @@
+# backtest_platform/validation/test20/test20_run_validation.py
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test20_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def same_value(expected, actual):
+    if expected is None or (isinstance(expected, float) and np.isnan(expected)):
+        return actual is None or (isinstance(actual, float) and np.isnan(actual))
+    return expected == actual
+
+
+def rows_by_params(df, keys):
+    """Строки результата по ключу — кортежу значений осей сетки (NaN → None)"""
+    by_params = {}
+    for row in df.to_dict('records'):
+        key = tuple(None if pd.isna(row[k]) else row[k] for k in keys)
+        assert key not in by_params, f"❌ Повторяющаяся комбинация в результате: {key}"
+        by_params[key] = row
+    return by_params
+
+
+def run_case(name, data, market_df, rvi_data, param_grid, engine, cfg):
+    """Прогон сетки с дедупликацией и без: одинаковые строки, меньше бэктестов"""
+    from optimizer import optimize_dual_momentum
+    from optimization.canonical import canonical_key
+    from optimization.evaluator import ComboEvaluator
+    from optimization.param_grid import as_param_grid
+
+    results, evaluators = {}, {}
+    for deduplicate in (True, False):
+        evaluator = ComboEvaluator(data, market_df, rvi_data, engine=engine,
+                                   deduplicate=deduplicate, **cfg.costs)
+        try:
+            results[deduplicate] = optimize_dual_momentum(
+                data, market_df, rvi_data, param_grid, engine=engine, deduplicate=deduplicate,
+                skip_invalid_windows=False, evaluator=evaluator, **cfg.costs
+            )
+        finally:
+            evaluator.close()
+        evaluators[deduplicate] = evaluator
+
+    grid = as_param_grid(param_grid)   # без правила окон: market_vol_window=10 ≡ None входит в сетку
+    keys = list(grid.keys)
+    unique = {canonical_key(params, rvi_data is not None) for params in grid}
+    deduped, full = rows_by_params(results[True], keys), rows_by_params(results[False], keys)
+    print(f"  {name}: {len(grid)} комбинаций, {len(unique)} канонических наборов, "
+          f"бэктестов {evaluators[True].runs} против {evaluators[False].runs}")
+
+    assert set(deduped) == set(full), \
+        f"❌ {name}: разные наборы комбинаций ({len(deduped)} и {len(full)} строк)"
+    assert list(results[True].columns) == list(results[False].columns), \
+        f"❌ {name}: разные колонки результата"
+    for key, expected in full.items():
+        actual = deduped[key]
+        diffs = [(column, expected[column], actual[column]) for column in results[False].columns
+                 if not same_value(expected[column], actual[column])]
+        assert not diffs, f"❌ {name} {dict(zip(keys, key))}: расхождение {diffs}"
+    for metric in cfg.compared_metrics:
+        assert metric in results[False].columns, f"❌ {name}: нет метрики {metric}"
+
+    assert evaluators[False].runs == len(grid) and evaluators[False].reused == 0, \
+        f"❌ {name}: без дедупликации выполнено {evaluators[False].runs} бэктестов из {len(grid)}"
+    assert evaluators[True].runs == len(unique), \
+        f"❌ {name}: с дедупликацией {evaluators[True].runs} бэктестов, канонических наборов {len(unique)}"
+    assert evaluators[True].runs + evaluators[True].reused == len(grid), \
+        f"❌ {name}: выполнено + повторно использовано ≠ {len(grid)}"
+    print("  ✅ Пройден")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test20_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 20: deduplicate=True совпадает с deduplicate=False")
+    print("=" * 70)
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+    cases = [
+        ("FastBacktester, с RVI", cfg.param_grid, 'fast', rvi_data),
+        ("FastBacktester, без RVI", cfg.param_grid, 'fast', None),
+        ("Backtester, с RVI", cfg.slow_param_grid, 'backtester', rvi_data)
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for name, param_grid, engine, rvi in cases:
+            print(f"\n[{name}]")
+            run_case(name, data, market_df, rvi, param_grid, engine, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 20 ПРОЙДЕН УСПЕШНО: дедупликация не меняет результат")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 20 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,50 @@
+# backtest_platform/validation/test21/test21_optimization_config_validation.py
+
+"""
+Конфигурация валидационного теста 21: round-trip персистентного кэша результатов
+Проверяет, что ResultCache (optimization/result_cache.py) возвращает записанные
+метрики с теми же значениями и типами (включая numpy-скаляры), что ключ не
+зависит от numpy- или Python-типа параметров, и что повторный прогон
+optimize_dual_momentum с тем же кэшем не выполняет ни одного бэктеста и даёт
+те же строки
+"""
+
+data_dir = 'data-validation/test21'
+cache_subdir = 'cache'   # кэш теста — внутри data_dir, очищается при каждом запуске
+
+seed = 21
+n_dates = 320
+start_date = '2022-01-03'
+
+# Тикер: (средняя дневная доходность, дневная волатильность, начальная цена)
+assets = {
+    'GOLD': (0.0006, 0.012, 2.5),
+    'EQMX': (0.0004, 0.020, 140.0),
+    'OBLG': (0.0002, 0.005, 180.0),
+    'LQDT': (0.0004, 0.0002, 1.5)
+}
+market = ('IMOEX', 0.0003, 0.018, 3000.0)
+rvi_ticker = 'RVI'
+missing_dates = {'OBLG': [5, 50, 51]}
+
+# Часть 2: первый прогон — значения осей numpy_axes как numpy-скаляры (np.arange),
+# повторный — те же значения как int Python
+param_grid = {
+    'base_lookback': [10, 20, 30, 40],
+    'base_vol_window': [5, 10],
+    'market_vol_window': [21, 40],
+    'market_vol_threshold': [0.3, 0.6],
+    'use_trend_filter': [False, True],
+    'trend_window': [60, 120]
+}
+numpy_axes = ['base_lookback', 'base_vol_window', 'market_vol_window', 'trend_window']
+
+engines = ['fast', 'backtester']
+slow_param_grid = {
+    'base_lookback': [20, 40],
+    'base_vol_window': [10],
+    'market_vol_window': [40],
+    'market_vol_threshold': [0.6]
+}
+
+costs = {'commission': 0.05, 'slippage': 5, 'use_slippage': True}
@@ -0,0 +1,194 @@
+# backtest_platform/validation/test21/test21_run_validation.py
+
+import os
+import shutil
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def setup_paths():
+    """Корень проекта и backtest_platform/ в sys.path (модули оптимизации импортируются без префикса)"""
+    _config_path = os.path.dirname(os.path.abspath(__file__))
+    platform_root = os.path.dirname(os.path.dirname(_config_path))
+    project_root = os.path.dirname(platform_root)
+    for path in (_config_path, project_root, platform_root):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return project_root
+
+
+def load_case_data(project_root, cfg):
+    """Загружает активы, рыночный индекс и RVI теста (без бинарного кэша)"""
+    from utils import load_market_data
+
+    case_dir = os.path.join(project_root, cfg.data_dir)
+    paths = {ticker: os.path.join(case_dir, f"{ticker}.csv")
+             for ticker in list(cfg.assets) + [cfg.market[0], cfg.rvi_ticker]}
+    for path in paths.values():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Файл не найден: {path} (запустите test21_generate_validation_data.py)")
+    data = {ticker: load_market_data(paths[ticker], use_cache=False) for ticker in cfg.assets}
+    market_df = load_market_data(paths[cfg.market[0]], use_cache=False)
+    rvi_data = load_market_data(paths[cfg.rvi_ticker], use_cache=False)
+    return data, market_df, rvi_data
+
+
+def same_value(expected, actual):
+    """Равенство значения и типа Python (NaN == NaN)"""
+    if isinstance(expected, float) and np.isnan(expected):
+        return isinstance(actual, float) and np.isnan(actual)
+    return type(actual) is type(expected) and actual == expected
+
+
+def fresh_cache_dir(project_root, cfg):
+    cache_dir = os.path.join(project_root, cfg.data_dir, cfg.cache_subdir)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return cache_dir
+
+
+# ======================
+# ЧАСТЬ 1: ЗАПИСЬ И ЧТЕНИЕ
+# ======================
+
+def validate_round_trip(cache_dir, data, market_df, rvi_data, cfg):
+    """Метрики с numpy-скалярами переживают запись и чтение другим экземпляром кэша"""
+    from optimization.result_cache import ResultCache, fingerprint_inputs
+
+    inputs_fp = fingerprint_inputs(data, market_df, rvi_data)
+    metrics = {
+        'total_trades': np.int64(12),
+        'used_market_vol_window': np.int32(40),
+        'final_value': np.float64(123456.789),
+        'cagr': np.float32(0.25),
+        'sharpe': 0.8123456789012345,
+        'max_drawdown': float('nan'),
+        'calmar': None,
+        'use_trend_filter': np.bool_(True)
+    }
+    expected = {
+        'total_trades': 12,
+        'used_market_vol_window': 40,
+        'final_value': 123456.789,
+        'cagr': 0.25,
+        'sharpe': 0.8123456789012345,
+        'max_drawdown': float('nan'),
+        'calmar': None,
+        'use_trend_filter': True
+    }
+    numpy_params = {'base_lookback': np.int64(20), 'max_vol_threshold': np.float64(0.2),
+                    'use_trend_filter': np.bool_(False), 'market_vol_window': None}
+    python_params = {'base_lookback': 20, 'max_vol_threshold': 0.2,
+                     'use_trend_filter': False, 'market_vol_window': None}
+
+    writer = ResultCache(cache_dir)
+    key = writer.make_key(inputs_fp, numpy_params, cfg.costs)
+    assert key == writer.make_key(inputs_fp, python_params, cfg.costs), \
+        "❌ Ключ зависит от типа параметров: np.int64(20) и 20 дают разные записи"
+    assert key != writer.make_key(inputs_fp, {**python_params, 'base_lookback': 21}, cfg.costs), \
+        "❌ Разные параметры дали одинаковый ключ"
+    assert writer.get(key) is None, "❌ Попадание в пустом кэше"
+    writer.put(key, metrics)
+
+    reader = ResultCache(cache_dir)
+    restored = reader.get(key)
+    assert restored is not None, "❌ Записанная метрика не найдена другим экземпляром кэша"
+    diffs = [(name, expected[name], restored.get(name)) for name in expected
+             if not same_value(expected[name], restored.get(name))]
+    assert not diffs, f"❌ Значения или типы после чтения из кэша отличаются: {diffs}"
+    assert reader.stats()['hits'] == 1 and writer.stats()['writes'] == 1, \
+        f"❌ Статистика кэша: запись {writer.stats()}, чтение {reader.stats()}"
+    print(f"  {len(metrics)} метрик, ключ {key[:12]}… — ✅ Пройден")
+
+
+# ======================
+# ЧАСТЬ 2: ПОВТОРНЫЙ ПРОГОН
+# ======================
+
+def run_with_cache(data, market_df, rvi_data, param_grid, engine, cache_dir, cfg):
+    """Прогон сетки с кэшем в cache_dir (новый экземпляр ResultCache); (строки, оценщик, кэш)"""
+    from optimizer import optimize_dual_momentum
+    from optimization.evaluator import ComboEvaluator
+    from optimization.result_cache import ResultCache
+
+    cache = ResultCache(cache_dir)
+    evaluator = ComboEvaluator(data, market_df, rvi_data, engine=engine, result_cache=cache, **cfg.costs)
+    try:
+        df = optimize_dual_momentum(data, market_df, rvi_data, param_grid, engine=engine,
+                                    result_cache=cache, evaluator=evaluator, **cfg.costs)
+    finally:
+        evaluator.close()
+    return df, evaluator, cache
+
+
+def validate_rerun(cache_dir, data, market_df, rvi_data, param_grid, engine, cfg):
+    """Первый прогон (numpy-сетка) заполняет кэш; повторный (int-сетка) — 0 бэктестов, те же строки"""
+    numpy_grid = {key: list(np.array(values)) if key in cfg.numpy_axes else values
+                  for key, values in param_grid.items()}
+    first, first_evaluator, first_cache = run_with_cache(data, market_df, rvi_data, numpy_grid,
+                                                         engine, cache_dir, cfg)
+    second, second_evaluator, second_cache = run_with_cache(data, market_df, rvi_data, param_grid,
+                                                            engine, cache_dir, cfg)
+    print(f"  {engine}: первый прогон — бэктестов {first_evaluator.runs}, записей {first_cache.stats()['writes']}; "
+          f"повторный — бэктестов {second_evaluator.runs}, попаданий {second_cache.stats()['hits']}")
+
+    assert first_evaluator.runs > 0 and first_cache.stats()['writes'] == first_evaluator.runs, \
+        f"❌ {engine}: первый прогон не записал результаты в кэш"
+    assert second_evaluator.runs == 0, \
+        f"❌ {engine}: повторный прогон выполнил {second_evaluator.runs} бэктестов вместо 0"
+    assert second_cache.stats()['hits'] == first_evaluator.runs and second_cache.stats()['writes'] == 0, \
+        f"❌ {engine}: статистика повторного прогона {second_cache.stats()}"
+
+    assert list(first.columns) == list(second.columns) and len(first) == len(second), \
+        f"❌ {engine}: разная форма результатов ({first.shape} и {second.shape})"
+    metric_columns = [c for c in first.columns if c not in param_grid]
+    for column in metric_columns:
+        assert first[column].dtype == second[column].dtype, \
+            f"❌ {engine}: тип колонки {column}: {first[column].dtype} и {second[column].dtype}"
+    key_columns = list(param_grid)
+    first = first.sort_values(key_columns).reset_index(drop=True)
+    second = second.sort_values(key_columns).reset_index(drop=True)
+    pd.testing.assert_frame_equal(first, second, check_exact=True)
+    print("  ✅ Пройден")
+
+
+def main():
+    project_root = setup_paths()
+
+    import test21_optimization_config_validation as cfg
+
+    print("=" * 70)
+    print("ЗАПУСК ТЕСТА 21: round-trip кэша результатов")
+    print("=" * 70)
+
+    data, market_df, rvi_data = load_case_data(project_root, cfg)
+
+    print("\n[Часть 1] Запись и чтение метрик с numpy-скалярами")
+    validate_round_trip(fresh_cache_dir(project_root, cfg), data, market_df, rvi_data, cfg)
+
+    print("\n[Часть 2] Повторный прогон optimize_dual_momentum с тем же кэшем")
+    grids = {'fast': cfg.param_grid, 'backtester': cfg.slow_param_grid}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for engine in cfg.engines:
+            validate_rerun(fresh_cache_dir(project_root, cfg), data, market_df, rvi_data,
+                           grids[engine], engine, cfg)
+
+    print("\n" + "=" * 70)
+    print("✅ ТЕСТ 21 ПРОЙДЕН УСПЕШНО: кэш возвращает те же метрики и строки")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n❌ ТЕСТ 21 ПРОВАЛЕН: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -8,6 +8,10 @@ setup(
         "pandas",
         "numpy",
     ],
+    extras_require={
+        # части ResultWriter в parquet; без pyarrow части пишутся в CSV
+        "parquet": ["pyarrow>=10.0.0"],
+    },
     author="Your Name",
     author_email="your.email@example.com",
     description="A modular and extensible backtesting platform for trading strategies",